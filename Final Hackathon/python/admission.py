@@ -0,0 +1,199 @@
+"""
+Admission control for the evaluation endpoints.
+
+Each evaluation holds a worker thread and its upload, parsed resume and prompts in
+memory for the 10-30 seconds it waits on the LLM. When the provider slows down they pile
+up, so every evaluation request must be admitted first, before its body is read:
+
+- at most ADMISSION_MAX_INFLIGHT evaluations run per worker (default: all but two of
+  WORKER_THREADS, which are left to health checks, exempt endpoints and the rejections)
+- their estimated memory stays under ADMISSION_MAX_MEMORY_MB. A request is estimated
+  at ADMISSION_REQUEST_BASE_MB plus ADMISSION_UPLOAD_FACTOR times its upload size
+  (Content-Length), covering multipart buffering, text extraction and prompts
+- bulk requests (X-Priority: bulk) hold at most ADMISSION_BULK_SHARE of the in-flight
+  slots, so a bulk upload never takes the slots interactive requests need
+- each named tenant (X-Tenant-Id) runs at most ADMISSION_TENANT_MAX_INFLIGHT (default:
+  half the in-flight slots; 0 disables it); requests without a tenant are not capped
+
+A request that does not fit is rejected at once, since a waiting request would hold one
+of the threads left to health checks. With ADMISSION_MAX_WAITING > 0 (raise WORKER_THREADS
+by as much) up to that many requests instead wait ADMISSION_QUEUE_SECONDS for capacity.
+A request that still does not fit is rejected with Retry-After: 503 when the worker is saturated, 429 when the tenant or the bulk
+share is over its cap, and 413 when the upload alone would exceed the memory limit. Retry-After is estimated
+from recent evaluation durations. Endpoints in ADMISSION_EXEMPT (default aggregate_score,
+which does no file handling) are never shed.
+"""
+import math
+import os
+import threading
+import time
+
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", str(max(1, int(os.getenv("WORKER_THREADS", "8")) - 2))))
+ADMISSION_MAX_MEMORY_MB = float(os.getenv("ADMISSION_MAX_MEMORY_MB", "1024"))
+# None: half of max_inflight
+ADMISSION_TENANT_MAX_INFLIGHT = int(os.getenv("ADMISSION_TENANT_MAX_INFLIGHT")) if os.getenv("ADMISSION_TENANT_MAX_INFLIGHT") else None
+ADMISSION_BULK_SHARE = float(os.getenv("ADMISSION_BULK_SHARE", "0.75"))
+ADMISSION_REQUEST_BASE_MB = float(os.getenv("ADMISSION_REQUEST_BASE_MB", "24"))
+ADMISSION_UPLOAD_FACTOR = float(os.getenv("ADMISSION_UPLOAD_FACTOR", "8"))
+ADMISSION_QUEUE_SECONDS = float(os.getenv("ADMISSION_QUEUE_SECONDS", "2"))
+ADMISSION_MAX_WAITING = int(os.getenv("ADMISSION_MAX_WAITING", "0"))
+DEFAULT_TENANT = "default"
+ADMISSION_EXEMPT = {name.strip() for name in os.getenv("ADMISSION_EXEMPT", "aggregate_score").split(",") if name.strip()}
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is shed; carries the HTTP status, Retry-After seconds (or None) and the reason.
+    """
+    def __init__(self, message, status_code, retry_after, reason):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+class Ticket:
+    """
+    The capacity held by one admitted request.
+    """
+    def __init__(self, tenant, memory_mb, priority):
+        self.tenant = tenant
+        self.memory_mb = memory_mb
+        self.priority = priority
+        self.admitted_at = time.monotonic()
+
+class AdmissionController:
+    """
+    Counts in-flight evaluations and their estimated memory, and admits or sheds new ones.
+    """
+    def __init__(self, max_inflight=ADMISSION_MAX_INFLIGHT, max_memory_mb=ADMISSION_MAX_MEMORY_MB,
+                 tenant_max_inflight=ADMISSION_TENANT_MAX_INFLIGHT, queue_seconds=ADMISSION_QUEUE_SECONDS,
+                 max_waiting=ADMISSION_MAX_WAITING, bulk_share=ADMISSION_BULK_SHARE):
+        self.max_inflight = max_inflight
+        self.max_memory_mb = max_memory_mb
+        self.tenant_max_inflight = max(1, max_inflight // 2) if tenant_max_inflight is None else tenant_max_inflight
+        self.bulk_limit = max(1, int(max_inflight * bulk_share))
+        self.queue_seconds = queue_seconds
+        self.max_waiting = max_waiting
+        self._condition = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        self.inflight = 0
+        self.bulk_inflight = 0
+        self.memory_mb = 0.0
+        self.waiting = 0
+        self.tenants = {}
+        self.admitted = 0
+        self.deferred = 0
+        self.rejected = {}
+        # Exponentially weighted mean duration of admitted requests, for Retry-After
+        self.mean_seconds = None
+
+    def reset_after_fork(self):
+        with self._condition:
+            self._condition = threading.Condition()
+            self._reset()
+
+    def estimate_memory_mb(self, content_length):
+        return ADMISSION_REQUEST_BASE_MB + ADMISSION_UPLOAD_FACTOR * (content_length or 0) / (1024 * 1024)
+
+    def _blocked(self, tenant, memory_mb, priority):
+        """
+        Why the request cannot be admitted now, or None. Called with the condition held.
+        """
+        if self.inflight >= self.max_inflight:
+            return "inflight"
+        if self.memory_mb + memory_mb > self.max_memory_mb:
+            return "memory"
+        if priority == "bulk" and self.bulk_inflight >= self.bulk_limit:
+            return "bulk_inflight"
+        if self.tenant_max_inflight and tenant != DEFAULT_TENANT and self.tenants.get(tenant, 0) >= self.tenant_max_inflight:
+            return "tenant_inflight"
+        return None
+
+    def retry_after(self):
+        """
+        Seconds a shed client should wait: about one mean evaluation per full round of in-flight work ahead of it.
+        """
+        if self.mean_seconds is None:
+            return 5
+        rounds = max(1.0, (self.inflight + self.waiting) / max(self.max_inflight, 1))
+        return int(min(120, max(1, math.ceil(self.mean_seconds * rounds))))
+
+    def admit(self, tenant, content_length, wait=None, priority=None):
+        """
+        Admit a request, waiting up to `wait` seconds (default queue_seconds) for capacity.
+        Returns a Ticket to release() when the request ends; raises AdmissionRejected.
+        Priorities other than "bulk" are interactive.
+        """
+        tenant = tenant or DEFAULT_TENANT
+        priority = "bulk" if priority == "bulk" else "interactive"
+        memory_mb = self.estimate_memory_mb(content_length)
+        wait = self.queue_seconds if wait is None else wait
+        with self._condition:
+            if memory_mb > self.max_memory_mb:
+                self._reject("too_large")
+                raise AdmissionRejected(f"Upload too large to evaluate (estimated {memory_mb:.0f} MB)", 413, None, "too_large")
+            reason = self._blocked(tenant, memory_mb, priority)
+            if reason is not None and wait > 0 and self.waiting < self.max_waiting:
+                self.deferred += 1
+                self.waiting += 1
+                deadline = time.monotonic() + wait
+                try:
+                    while reason is not None and time.monotonic() < deadline:
+                        self._condition.wait(deadline - time.monotonic())
+                        reason = self._blocked(tenant, memory_mb, priority)
+                finally:
+                    self.waiting -= 1
+            if reason is not None:
+                self._reject(reason)
+                status_code = 429 if reason in ("tenant_inflight", "bulk_inflight") else 503
+                message = {
+                    "tenant_inflight": "Too many evaluations in flight for this tenant",
+                    "bulk_inflight": "Too many bulk evaluations in flight",
+                }.get(reason, "Evaluation capacity exhausted, retry later")
+                raise AdmissionRejected(message, status_code, self.retry_after(), reason)
+
+            self.inflight += 1
+            if priority == "bulk":
+                self.bulk_inflight += 1
+            self.memory_mb += memory_mb
+            self.tenants[tenant] = self.tenants.get(tenant, 0) + 1
+            self.admitted += 1
+            return Ticket(tenant, memory_mb, priority)
+
+    def _reject(self, reason):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+
+    def release(self, ticket):
+        with self._condition:
+            self.inflight -= 1
+            if ticket.priority == "bulk":
+                self.bulk_inflight -= 1
+            self.memory_mb -= ticket.memory_mb
+            self.tenants[ticket.tenant] -= 1
+            if not self.tenants[ticket.tenant]:
+                del self.tenants[ticket.tenant]
+            duration = time.monotonic() - ticket.admitted_at
+            self.mean_seconds = duration if self.mean_seconds is None else 0.9 * self.mean_seconds + 0.1 * duration
+            self._condition.notify_all()
+
+    def snapshot(self):
+        with self._condition:
+            return {
+                "inflight": self.inflight,
+                "max_inflight": self.max_inflight,
+                "bulk_inflight": self.bulk_inflight,
+                "bulk_limit": self.bulk_limit,
+                "tenant_max_inflight": self.tenant_max_inflight,
+                "estimated_memory_mb": round(self.memory_mb, 1),
+                "max_memory_mb": self.max_memory_mb,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "deferred": self.deferred,
+                "rejected": dict(self.rejected),
+                "mean_seconds": round(self.mean_seconds, 2) if self.mean_seconds is not None else None,
+                "retry_after_seconds": self.retry_after(),
+                "tenants": dict(self.tenants),
+            }
+
+admission_controller = AdmissionController()
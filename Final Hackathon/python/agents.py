@@ -1,24 +1,23 @@
-import PyPDF2
-import docx
-import requests
 import re
 import json
-from langchain_core.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
-from langchain_core.output_parsers import StrOutputParser
 import time
 import os
 from dotenv import load_dotenv
-from pymongo import MongoClient
 from bson import ObjectId
 import datetime
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_core.documents import Document
-from langgraph.graph import StateGraph, END
-from typing import TypedDict, Dict, Any
+from typing import TypedDict, Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import logging
-import fitz
+import asyncio
+from hedging import llm_hedger
+from scheduler import llm_scheduler
+from routing import model_router
+from ledger import ledger_callback, MeteredEmbeddings
+from storage import CompactStore, pack_document
+from similarity import index_profile_async
+from resume_sections import RESUME_PREPARSE, preparse_resume
+from communication_prescore import COMMUNICATION_PRESCORE, prescore_communication, is_borderline, narrative_requested
+from deadlines import DeadlineExceeded, current_deadline, check_deadline, remaining_budget, submit_in_context, deadline_marker
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -26,6 +25,10 @@ logger = logging.getLogger(__name__)
 # Load environment variables from .env file
 load_dotenv()
 
+# Heavy dependencies (LangChain/OpenAI, FAISS, LangGraph, MongoDB drivers, httpx, requests,
+# PyMuPDF, python-docx) are imported inside the functions that first use them, so importing
+# this module stays cheap and the cost is paid once, when an agent is built (see app.warmup).
+
 def convert_to_json_serializable(obj):
     """
     Recursively convert non-JSON-serializable objects to JSON-serializable formats.
@@ -40,11 +43,207 @@ def convert_to_json_serializable(obj):
         return [convert_to_json_serializable(item) for item in obj]
     return obj
 
+_mongo_client = None
+
+def get_mongo_client():
+    """
+    Return the MongoDB client shared by every agent in this process.
+    The client is created with connect=False so it can be built before a prefork
+    and only opens sockets (and its monitor threads) inside the worker that uses it.
+    """
+    global _mongo_client
+    if _mongo_client is None:
+        from pymongo import MongoClient
+
+        mongo_url = os.getenv("MONGO_URL")
+        if not mongo_url:
+            raise Exception("MONGO_URL not found in .env file")
+        _mongo_client = MongoClient(mongo_url, connect=False)
+    return _mongo_client
+
+_async_mongo_client = None
+_async_http_client = None
+
+def get_async_mongo_client():
+    """
+    Return the Motor (async MongoDB) client shared by the async agent methods in this process.
+    """
+    global _async_mongo_client
+    if _async_mongo_client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        mongo_url = os.getenv("MONGO_URL")
+        if not mongo_url:
+            raise Exception("MONGO_URL not found in .env file")
+        _async_mongo_client = AsyncIOMotorClient(mongo_url)
+    return _async_mongo_client
+
+def get_async_collection(name):
+    """
+    Return an async handle on a candidate_db collection.
+    """
+    return get_async_mongo_client()["candidate_db"][name]
+
+def get_async_http_client():
+    """
+    Return the httpx client shared by async GitHub calls.
+    """
+    global _async_http_client
+    if _async_http_client is None:
+        import httpx
+
+        _async_http_client = httpx.AsyncClient(timeout=5)
+    return _async_http_client
+
+def clean_llm_response(result):
+    """
+    Strip markdown code fences the LLM sometimes wraps around its JSON output.
+    """
+    if result.startswith("```json"):
+        result = result.replace("```json", "").replace("```", "").strip()
+    elif result.startswith("```"):
+        result = result.replace("```", "").strip()
+    return result
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate (~4 characters per token for English text) used for prompt budgeting.
+    """
+    return len(text) // 4 + 1
+
+# When a request deadline is active, LLM calls run on this pool so the caller can stop waiting at the deadline
+_llm_call_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_CALL_THREADS", "64")), thread_name_prefix="llm-call")
+
+def _with_request_timeout(chain, timeout):
+    """
+    Rebuild a prompt | llm | parser chain so the LLM request itself times out after `timeout` seconds.
+    """
+    from langchain_core.runnables import RunnableSequence
+    from langchain_openai import ChatOpenAI
+    steps = [chain.first] + [step.bind(timeout=timeout) if isinstance(step, ChatOpenAI) else step for step in chain.middle] + [chain.last]
+    return RunnableSequence(*steps)
+
+def invoke_chain(chain, inputs, stage):
+    """
+    Invoke an LLM chain for a pipeline stage within the remaining request deadline (if any).
+    The model tier is picked by model_router, and an answer that fails validation is retried
+    on the next tier (see routing.py). Every chain runs at temperature 0, so each call may be
+    hedged (see hedging.py). Raises DeadlineExceeded when the stage cannot start or finish in time.
+    """
+    route = model_router.route(stage, chain, inputs)
+    if route is None:
+        return _invoke_attempt(chain, inputs, stage, [])
+    while True:
+        result = _invoke_attempt(route.runnable(), inputs, stage, route.callbacks())
+        if route.accept(result):
+            return result
+
+def _invoke_attempt(chain, inputs, stage, callbacks):
+    """
+    One LLM call of invoke_chain: scheduled, bounded by the deadline and possibly hedged.
+    """
+    # Token usage and latency of every call go to the ledger
+    config = {"callbacks": [ledger_callback(stage)] + callbacks}
+    deadline = current_deadline()
+    if deadline is None:
+        with llm_scheduler.slot(stage):
+            return llm_hedger.call(stage, chain.invoke, inputs, config)
+
+    # Waiting for a slot (behind other tenants' work) spends the same budget
+    with llm_scheduler.slot(stage, timeout=deadline.check(stage)):
+        remaining = deadline.check(stage)
+        future = submit_in_context(_llm_call_executor, llm_hedger.call, stage, _with_request_timeout(chain, remaining).invoke, inputs, config)
+        try:
+            return future.result(timeout=remaining)
+        except FutureTimeoutError:
+            future.cancel()
+            raise DeadlineExceeded(stage)
+        except Exception as e:
+            if deadline.expired():
+                raise DeadlineExceeded(stage) from e
+            raise
+
+async def ainvoke_chain(chain, inputs, stage):
+    """
+    Async variant of invoke_chain; the LLM call is cancelled when the deadline passes.
+    """
+    route = model_router.route(stage, chain, inputs)
+    if route is None:
+        return await _ainvoke_attempt(chain, inputs, stage, [])
+    while True:
+        result = await _ainvoke_attempt(route.runnable(), inputs, stage, route.callbacks())
+        if route.accept(result):
+            return result
+
+async def _ainvoke_attempt(chain, inputs, stage, callbacks):
+    """
+    Async variant of _invoke_attempt.
+    """
+    config = {"callbacks": [ledger_callback(stage)] + callbacks}
+    deadline = current_deadline()
+    if deadline is None:
+        async with llm_scheduler.aslot(stage):
+            return await llm_hedger.acall(stage, chain.ainvoke, inputs, config)
+
+    async with llm_scheduler.aslot(stage, timeout=deadline.check(stage)):
+        remaining = deadline.check(stage)
+        try:
+            return await asyncio.wait_for(llm_hedger.acall(stage, _with_request_timeout(chain, remaining).ainvoke, inputs, config), timeout=remaining)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(stage)
+        except Exception as e:
+            if deadline.expired():
+                raise DeadlineExceeded(stage) from e
+            raise
+
+def create_embeddings():
+    """
+    Create the OpenAI embeddings client used by the RAG agents, wrapped in the persistent
+    embedding cache so repeated texts (JD queries, benchmark documents) are embedded only once.
+    Requests that miss the cache are recorded in the token ledger.
+    """
+    from langchain_community.embeddings import OpenAIEmbeddings
+    from embedding_cache import CachedEmbeddings
+    return CachedEmbeddings(MeteredEmbeddings(OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY")), stage="rag_embedding"))
+
+def merge_hits(hit_lists, k):
+    """
+    Page contents of the k nearest distinct documents over several (document, distance) hit lists.
+    """
+    seen, documents = set(), []
+    for document, _ in sorted((hit for hits in hit_lists for hit in hits), key=lambda hit: hit[1]):
+        if document.page_content not in seen and len(documents) < k:
+            seen.add(document.page_content)
+            documents.append(document.page_content)
+    return "\n".join(documents)
+
+# Output keys of the resume parser prompt, for asking the LLM only for the fields the local pre-parser could not resolve
+RESUME_FIELD_SCHEMAS = {
+    "name": '"name": "Full Name"',
+    "email": '"email": "Email Address"',
+    "skills": '"skills": ["skill1", "skill2", "skill3"]',
+    "work_experience": '"work_experience": [{"company": "Company Name", "role": "Job Title", "duration": "MM/YYYY - MM/YYYY", "responsibilities": ["responsibility1", "responsibility2"]}]',
+    "education": '"education": [{"degree": "Degree Name", "institution": "University/School Name", "year": "YYYY"}]',
+    "certifications": '"certifications": [{"name": "Certification Name", "issuer": "Issuing Organization", "year": "YYYY"}]',
+}
+RESUME_FIELD_INSTRUCTIONS = {
+    "name": "- Extract the candidate's full name (look for patterns like \"First Last\" at the top or in contact sections).",
+    "email": "- Extract the candidate's email address (look for patterns like name@domain.com).",
+    "skills": "- Extract ALL technical skills (programming languages, frameworks, tools, technologies) and soft skills mentioned.",
+    "work_experience": "- For work experience, include company name, job title, duration (format as MM/YYYY - MM/YYYY or 'Present' for ongoing), and key responsibilities.",
+    "education": "- For education, include degree, institution, and graduation year.",
+    "certifications": "- For certifications, include name, issuer, and year obtained (if available).",
+}
+
 class CandidateDataParserAgent:
     def __init__(self):
         """
         Initialize the Candidate Data Parser Agent with OpenAI GPT-4o mini and MongoDB client.
         """
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_openai import ChatOpenAI
+
         # Initialize OpenAI LLM via LangChain
         self.llm = ChatOpenAI(
             model="gpt-4o-mini",
@@ -52,13 +251,11 @@ class CandidateDataParserAgent:
             temperature=0
         )
         # Initialize MongoDB client
-        mongo_url = os.getenv("MONGO_URL")
-        if not mongo_url:
-            raise Exception("MONGO_URL not found in .env file")
-        self.mongo_client = MongoClient(mongo_url)
+        self.mongo_client = get_mongo_client()
         self.db = self.mongo_client["candidate_db"]
         self.candidates_collection = self.db["candidates"]
         self.answers_collection = self.db["answers"]
+        self.store = CompactStore(self.db)
 
         self.prompt_template = PromptTemplate(
             input_variables=["text"],
@@ -111,11 +308,33 @@ Resume Text: {text}
         )
         self.chain = self.prompt_template | self.llm | StrOutputParser()
 
+        # Used when the local pre-parser (resume_sections.py) resolved some fields: only the rest are asked for
+        self.section_prompt_template = PromptTemplate(
+            input_variables=["schema", "instructions", "text"],
+            template="""
+You are an expert resume parser. Extract structured information from the provided resume sections.
+
+Extract the following information and return ONLY a valid JSON object with these exact keys:
+
+{schema}
+
+Instructions:
+{instructions}
+- If any section has no information, use an empty string for name and email, or an empty array for others.
+- Return ONLY the JSON object, no additional text or markdown formatting.
+
+Resume Sections: {text}
+            """
+        )
+        self.section_chain = self.section_prompt_template | self.llm | StrOutputParser()
+
     def extract_from_pdf(self, file_path):
         """
         Extract text from a PDF resume using PyMuPDF for better accuracy.
         """
         try:
+            import fitz
+
             # Use PyMuPDF for improved text extraction
             doc = fitz.open(file_path)
             text = ""
@@ -136,6 +355,8 @@ Resume Text: {text}
         Extract text from a DOCX resume.
         """
         try:
+            import docx
+
             doc = docx.Document(file_path)
             text = "\n".join([para.text for para in doc.paragraphs if para.text.strip()])
             logger.debug(f"Extracted text length from DOCX: {len(text)}")
@@ -150,29 +371,67 @@ Resume Text: {text}
         Fetch GitHub contributions using GitHub API.
         """
         try:
+            import requests
+
+            check_deadline("github")
             username = github_url.split('/')[-1]
             headers = {"Accept": "application/vnd.github.v3+json"}
-            repos_response = requests.get(f"https://api.github.com/users/{username}/repos", headers=headers, timeout=5)
+            repos_response = requests.get(f"https://api.github.com/users/{username}/repos", headers=headers, timeout=min(5, remaining_budget(5)))
             repos_response.raise_for_status()
-            repos = repos_response.json()
-
-            contributions = []
-            for repo in repos:
-                contributions.append({
-                    "repo_name": repo["name"],
-                    "description": repo["description"] or "No description",
-                    "stars": repo["stargazers_count"],
-                    "forks": repo["forks_count"],
-                    "last_updated": repo["updated_at"]
-                })
-            return contributions
+            return self._build_contributions(repos_response.json())
         except Exception as e:
             logger.error(f"Failed to fetch GitHub data: {str(e)}")
             return {"error": f"Failed to fetch GitHub data: {str(e)}"}
 
-    def parse_resume(self, file_path):
+    async def afetch_github_contributions(self, github_url):
         """
-        Parse resume based on file extension (PDF or DOCX).
+        Fetch GitHub contributions using GitHub API without blocking the event loop.
+        """
+        try:
+            check_deadline("github")
+            username = github_url.split('/')[-1]
+            headers = {"Accept": "application/vnd.github.v3+json"}
+            repos_response = await get_async_http_client().get(f"https://api.github.com/users/{username}/repos", headers=headers, timeout=min(5, remaining_budget(5)))
+            repos_response.raise_for_status()
+            return self._build_contributions(repos_response.json())
+        except Exception as e:
+            logger.error(f"Failed to fetch GitHub data: {str(e)}")
+            return {"error": f"Failed to fetch GitHub data: {str(e)}"}
+
+    def _build_contributions(self, repos):
+        """
+        Reduce GitHub API repository objects to the fields used by the evaluators.
+        """
+        contributions = []
+        for repo in repos:
+            contributions.append({
+                "repo_name": repo["name"],
+                "description": repo["description"] or "No description",
+                "stars": repo["stargazers_count"],
+                "forks": repo["forks_count"],
+                "last_updated": repo["updated_at"]
+            })
+        return contributions
+
+    def _resume_error(self, error):
+        """
+        Build the empty resume structure returned when parsing fails.
+        """
+        return {
+            "name": "",
+            "email": "",
+            "skills": [],
+            "work_experience": [],
+            "education": [],
+            "certifications": [],
+            "error": error
+        }
+
+    def extract_resume_text(self, file_path, keep_lines=False):
+        """
+        Extract and clean resume text based on file extension (PDF or DOCX).
+        Returns (text, None) on success or ("", error_result) when the text cannot be used.
+        With keep_lines, whitespace is collapsed within each line but line breaks are kept.
         """
         ext = file_path.lower().split('.')[-1]
         if ext == 'pdf':
@@ -181,76 +440,124 @@ Resume Text: {text}
             text = self.extract_from_docx(file_path)
         else:
             logger.error(f"Unsupported file format: {ext}")
-            return {
-                "name": "",
-                "email": "",
-                "skills": [],
-                "work_experience": [],
-                "education": [],
-                "certifications": [],
-                "error": "Unsupported file format. Use PDF or DOCX."
-            }
+            return "", self._resume_error("Unsupported file format. Use PDF or DOCX.")
 
         # Clean text to remove noise
-        text = re.sub(r'\s+', ' ', text).strip()
+        if keep_lines:
+            text = "\n".join(line for line in (re.sub(r'\s+', ' ', line).strip() for line in text.splitlines()) if line)
+        else:
+            text = re.sub(r'\s+', ' ', text).strip()
         logger.debug(f"Cleaned text length: {len(text)}")
         logger.debug(f"Cleaned text (first 200 chars): {text[:200]}")
 
         if not text or len(text) < 50:
             logger.warning("Extracted text is empty or too short")
-            return {
-                "name": "",
-                "email": "",
-                "skills": [],
-                "work_experience": [],
-                "education": [],
-                "certifications": [],
-                "error": "Extracted text is too short or empty"
-            }
+            return "", self._resume_error("Extracted text is too short or empty")
+        return text, None
 
-        # Use OpenAI LLM to extract structured data
+    def _process_resume_response(self, result, preparsed=None):
+        """
+        Parse and validate the LLM's structured resume output, merged with the locally pre-parsed fields if any.
+        """
         try:
-            result = self.chain.invoke({"text": text})
             logger.debug(f"LLM Raw Response: {result}")
-
-            # Clean response if it contains markdown
-            if result.startswith("```json"):
-                result = result.replace("```json", "").replace("```", "").strip()
-            elif result.startswith("```"):
-                result = result.replace("```", "").strip()
-
-            parsed_result = json.loads(result)
+            parsed_result = json.loads(clean_llm_response(result))
             logger.debug(f"Parsed LLM result: {parsed_result}")
+            if preparsed is not None:
+                parsed_result = preparsed.merge(parsed_result)
 
             # Validate the parsed result
             required_keys = ["name", "email", "skills", "work_experience", "education", "certifications"]
             if not all(key in parsed_result for key in required_keys):
                 logger.error("LLM response missing required keys")
                 parsed_result["error"] = "LLM response missing required fields"
-            
+
             return convert_to_json_serializable(parsed_result)
         except json.JSONDecodeError as e:
             logger.error(f"JSON Decode Error: {str(e)}, Raw response: {result}")
-            return {
-                "name": "",
-                "email": "",
-                "skills": [],
-                "work_experience": [],
-                "education": [],
-                "certifications": [],
-                "error": f"Failed to parse resume into structured JSON: {str(e)}"
-            }
+            return self._resume_error(f"Failed to parse resume into structured JSON: {str(e)}")
         except Exception as e:
             logger.error(f"LLM processing error: {str(e)}")
-            return {
-                "name": "",
-                "email": "",
-                "skills": [],
-                "work_experience": [],
-                "education": [],
-                "certifications": [],
-                "error": f"LLM processing failed: {str(e)}"
-            }
+            return self._resume_error(f"LLM processing failed: {str(e)}")
+
+    def _plan_resume_parse(self, text, preparsed=None):
+        """
+        Pre-parse the resume locally (unless the caller already did) and decide what still goes to the LLM.
+        Returns (preparsed, chain, inputs); chain is None when every field was resolved locally,
+        and preparsed is None when the resume has no recognizable sections (the whole text is sent).
+        """
+        if not RESUME_PREPARSE:
+            preparsed = None
+        elif preparsed is None:
+            preparsed = preparse_resume(text)
+        if preparsed is None:
+            return None, self.chain, {"text": re.sub(r'\s+', ' ', text)}
+        unresolved = preparsed.unresolved()
+        if not unresolved:
+            logger.info("Resume parsed locally without an LLM call")
+            return preparsed, None, None
+        logger.debug(f"Resume fields left to the LLM: {unresolved}")
+        return preparsed, self.section_chain, {
+            "schema": "{\n    " + ",\n    ".join(RESUME_FIELD_SCHEMAS[field] for field in unresolved) + "\n}",
+            "instructions": "\n".join(RESUME_FIELD_INSTRUCTIONS[field] for field in unresolved),
+            "text": preparsed.llm_text(unresolved)
+        }
+
+    def parse_resume(self, file_path, text=None, preparsed=None):
+        """
+        Parse resume based on file extension (PDF or DOCX). A caller that already extracted the
+        text (keep_lines) and pre-parsed it passes them, and neither is done again.
+        """
+        if text is None:
+            text, error_result = self.extract_resume_text(file_path, keep_lines=True)
+            if error_result:
+                return error_result
+
+        preparsed, chain, inputs = self._plan_resume_parse(text, preparsed)
+        if chain is None:
+            return convert_to_json_serializable(preparsed.merge({}))
+
+        # Use OpenAI LLM to extract structured data
+        try:
+            result = invoke_chain(chain, inputs, stage="parse_resume")
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"LLM processing error: {str(e)}")
+            return self._resume_error(f"LLM processing failed: {str(e)}")
+        return self._process_resume_response(result, preparsed)
+
+    async def aparse_resume(self, file_path):
+        """
+        Async variant of parse_resume; text extraction runs in a worker thread.
+        """
+        text, error_result = await asyncio.to_thread(self.extract_resume_text, file_path, True)
+        if error_result:
+            return error_result
+
+        preparsed, chain, inputs = self._plan_resume_parse(text)
+        if chain is None:
+            return convert_to_json_serializable(preparsed.merge({}))
+
+        try:
+            result = await ainvoke_chain(chain, inputs, stage="parse_resume")
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"LLM processing error: {str(e)}")
+            return self._resume_error(f"LLM processing failed: {str(e)}")
+        return self._process_resume_response(result, preparsed)
+
+    def _answer_documents(self, candidate_id, answers_array):
+        """
+        Build the answers collection documents (compact layout) for a saved candidate.
+        """
+        return [pack_document("answers", convert_to_json_serializable({
+            "candidate_id": candidate_id,
+            "text": answer["text"].strip(),
+            "type": answer["type"],
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        }))[0] for answer in answers_array]
 
     def save_to_mongodb(self, candidate_data, answers_array):
         """
@@ -259,32 +566,86 @@ Resume Text: {text}
         try:
             candidate_data = convert_to_json_serializable(candidate_data)
             logger.debug(f"Saving candidate data to MongoDB: {candidate_data}")
-            result = self.candidates_collection.insert_one(candidate_data)
-            candidate_id = str(result.inserted_id)
-
-            for answer in answers_array:
-                answer_data = {
-                    "candidate_id": candidate_id,
-                    "text": answer["text"].strip(),
-                    "type": answer["type"],
-                    "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
-                }
-                self.answers_collection.insert_one(convert_to_json_serializable(answer_data))
+            candidate_id = str(self.store.insert("candidates", candidate_data))
+
+            for answer_data in self._answer_documents(candidate_id, answers_array):
+                self.answers_collection.insert_one(answer_data)
+
+            if "error" not in candidate_data:
+                index_profile_async(candidate_id, candidate_data)
+            logger.info(f"Saved candidate data with ID: {candidate_id}")
+            return candidate_id
+        except Exception as e:
+            logger.error(f"Failed to save to MongoDB: {str(e)}")
+            return {"error": f"Failed to save to MongoDB: {str(e)}"}
 
+    async def asave_to_mongodb(self, candidate_data, answers_array):
+        """
+        Save candidate data and answers to MongoDB through the async driver.
+        """
+        try:
+            candidate_data = convert_to_json_serializable(candidate_data)
+            candidate_id = str(await self.store.ainsert(get_async_mongo_client()["candidate_db"], "candidates", candidate_data))
+
+            answer_documents = self._answer_documents(candidate_id, answers_array)
+            if answer_documents:
+                await get_async_collection("answers").insert_many(answer_documents)
+
+            if "error" not in candidate_data:
+                index_profile_async(candidate_id, candidate_data)
             logger.info(f"Saved candidate data with ID: {candidate_id}")
             return candidate_id
         except Exception as e:
             logger.error(f"Failed to save to MongoDB: {str(e)}")
             return {"error": f"Failed to save to MongoDB: {str(e)}"}
 
-    def parse_candidate(self, resume_path, answers_array, github_url):
+    def update_answers(self, candidate_id, answers_array):
+        """
+        Replace a saved candidate's answers (candidates saved before the compact layout also keep a copy).
+        """
+        try:
+            self.candidates_collection.update_one(
+                {"_id": ObjectId(candidate_id), "storage_format": {"$exists": False}},
+                {"$set": {"answers": convert_to_json_serializable(answers_array)}}
+            )
+            self.answers_collection.delete_many({"candidate_id": candidate_id})
+            answer_documents = self._answer_documents(candidate_id, answers_array)
+            if answer_documents:
+                self.answers_collection.insert_many(answer_documents)
+            return candidate_id
+        except Exception as e:
+            logger.error(f"Failed to update answers in MongoDB: {str(e)}")
+            return {"error": f"Failed to update answers in MongoDB: {str(e)}"}
+
+    def _build_candidate_data(self, resume_data, answers_array, github_data):
+        """
+        Combine parsed resume, answers and GitHub data into the candidate document.
+        """
+        candidate_data = {
+            "name": resume_data.get("name", ""),
+            "email": resume_data.get("email", ""),
+            "skills": resume_data.get("skills", []),
+            "work_experience": resume_data.get("work_experience", []),
+            "education": resume_data.get("education", []),
+            "certifications": resume_data.get("certifications", []),
+            "answers": answers_array,
+            "github_contributions": github_data,
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        }
+
+        if "error" in resume_data:
+            candidate_data["error"] = resume_data["error"]
+        return candidate_data
+
+    def parse_candidate(self, resume_path, answers_array, github_url, resume_text=None, preparsed=None):
         """
         Main function to process candidate inputs, save to MongoDB, and return structured JSON.
+        resume_text and preparsed are passed on to parse_resume.
         """
         start_time = time.time()
         try:
             # Parse resume
-            resume_data = self.parse_resume(resume_path)
+            resume_data = self.parse_resume(resume_path, resume_text, preparsed)
             logger.debug(f"Resume data: {resume_data}")
 
             # Fetch GitHub contributions
@@ -292,20 +653,7 @@ Resume Text: {text}
             logger.debug(f"GitHub data: {github_data}")
 
             # Combine all data
-            candidate_data = {
-                "name": resume_data.get("name", ""),
-                "email": resume_data.get("email", ""),
-                "skills": resume_data.get("skills", []),
-                "work_experience": resume_data.get("work_experience", []),
-                "education": resume_data.get("education", []),
-                "certifications": resume_data.get("certifications", []),
-                "answers": answers_array,
-                "github_contributions": github_data,
-                "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
-            }
-
-            if "error" in resume_data:
-                candidate_data["error"] = resume_data["error"]
+            candidate_data = self._build_candidate_data(resume_data, answers_array, github_data)
 
             # Save to MongoDB
             mongo_id = self.save_to_mongodb(candidate_data, answers_array)
@@ -316,15 +664,54 @@ Resume Text: {text}
 
             logger.info(f"Processed candidate data in {processing_time:.2f} seconds")
             return convert_to_json_serializable(candidate_data)
+        except DeadlineExceeded as e:
+            logger.warning(f"parse_candidate stopped: {str(e)}")
+            return deadline_marker(e.stage)
         except Exception as e:
             logger.error(f"Error in parse_candidate: {str(e)}")
             return {"error": str(e)}
 
+    async def aparse_candidate(self, resume_path, answers_array, github_url):
+        """
+        Async variant of parse_candidate; resume parsing and the GitHub fetch run concurrently.
+        """
+        start_time = time.time()
+        try:
+            resume_data, github_data = await asyncio.gather(
+                self.aparse_resume(resume_path),
+                self.afetch_github_contributions(github_url)
+            )
+
+            candidate_data = self._build_candidate_data(resume_data, answers_array, github_data)
+
+            mongo_id = await self.asave_to_mongodb(candidate_data, answers_array)
+            candidate_data["mongo_id"] = mongo_id
+
+            processing_time = time.time() - start_time
+            candidate_data["processing_time"] = round(processing_time, 2)
+
+            logger.info(f"Processed candidate data in {processing_time:.2f} seconds")
+            return convert_to_json_serializable(candidate_data)
+        except DeadlineExceeded as e:
+            logger.warning(f"aparse_candidate stopped: {str(e)}")
+            return deadline_marker(e.stage)
+        except Exception as e:
+            logger.error(f"Error in aparse_candidate: {str(e)}")
+            return {"error": str(e)}
+
+# Answer sets larger than this (in estimated tokens) are scored in parallel chunks
+COMMUNICATION_CHUNK_TOKENS = int(os.getenv("COMMUNICATION_CHUNK_TOKENS", "6000"))
+COMMUNICATION_MAX_PARALLEL = int(os.getenv("COMMUNICATION_MAX_PARALLEL", "4"))
+
 class CommunicationSkillsEvaluatorAgent:
     def __init__(self):
         """
         Initialize the Communication Skills Evaluator Agent with LLM and MongoDB client.
         """
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_openai import ChatOpenAI
+
         # Initialize OpenAI LLM via LangChain
         self.llm = ChatOpenAI(
             model="gpt-4o-mini",
@@ -332,12 +719,10 @@ class CommunicationSkillsEvaluatorAgent:
             temperature=0
         )
         # Initialize MongoDB client
-        mongo_url = os.getenv("MONGO_URL")
-        if not mongo_url:
-            raise Exception("MONGO_URL not found in .env file")
-        self.mongo_client = MongoClient(mongo_url)
+        self.mongo_client = get_mongo_client()
         self.db = self.mongo_client["candidate_db"]
         self.communication_evaluations_collection = self.db["communication_evaluations"]
+        self.store = CompactStore(self.db)
 
         # Prompt template for communication evaluation with escaped curly braces
         self.evaluation_prompt = PromptTemplate(
@@ -364,15 +749,96 @@ You are an expert communication skills evaluator. Your task is to assess the can
     "strengths": ["Example 1", "Example 2"],
     "weaknesses": ["Example 1", "Example 2"]
   }}
-
-Answers: {answers}
             """
         )
         self.chain = self.evaluation_prompt | self.llm | StrOutputParser()
 
+    def _chunk_answers(self, answers):
+        """
+        Split answers into consecutive chunks of at most COMMUNICATION_CHUNK_TOKENS estimated tokens.
+        Answers are never split; an answer larger than the budget gets a chunk of its own.
+        """
+        chunks = []
+        current, current_tokens = [], 0
+        for answer in answers:
+            answer_tokens = estimate_tokens(json.dumps(answer))
+            if current and current_tokens + answer_tokens > COMMUNICATION_CHUNK_TOKENS:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(answer)
+            current_tokens += answer_tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _parse_communication(self, result):
+        """
+        Parse an LLM communication evaluation response.
+        """
+        return json.loads(clean_llm_response(result))
+
+    def _merge_chunk_evaluations(self, chunks, chunk_results):
+        """
+        Deterministically merge per-chunk evaluations into a single evaluation.
+        The score is the token-weighted mean of the chunk scores; assessments are
+        concatenated in answer order and strengths/weaknesses de-duplicated.
+        """
+        weights = [sum(estimate_tokens(json.dumps(answer)) for answer in chunk) for chunk in chunks]
+        total_weight = sum(weights)
+        score = sum(int(result.get("communication_score", 0)) * weight for result, weight in zip(chunk_results, weights)) / total_weight
+
+        labels = []
+        start = 1
+        for chunk in chunks:
+            labels.append(f"Answers {start}-{start + len(chunk) - 1}")
+            start += len(chunk)
+
+        merged = {"communication_score": int(round(score))}
+        for field in ["clarity_assessment", "structure_assessment", "tone_assessment"]:
+            merged[field] = " ".join(f"[{label}] {result.get(field, '')}" for label, result in zip(labels, chunk_results))
+        for field in ["strengths", "weaknesses"]:
+            merged[field] = list(dict.fromkeys(item for result in chunk_results for item in result.get(field, [])))
+        merged["chunk_count"] = len(chunks)
+        return merged
+
+    def _finalize_communication(self, evaluation_result, candidate_data, start_time):
+        """
+        Attach metadata to a communication evaluation.
+        """
+        evaluation_result["candidate_id"] = candidate_data.get("mongo_id", "")
+        evaluation_result["created_at"] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        evaluation_result["processing_time"] = round(time.time() - start_time, 2)
+        return evaluation_result
+
+    def _local_evaluation(self, answers):
+        """
+        The local readability-based evaluation (communication_prescore.py), and whether it can
+        stand in for the LLM's: it cannot when the score is borderline or narrative feedback was requested.
+        """
+        if not COMMUNICATION_PRESCORE:
+            return None, False
+        local_evaluation = prescore_communication(answers)
+        if local_evaluation is None:
+            return None, False
+        return local_evaluation, not narrative_requested() and not is_borderline(local_evaluation["communication_score"])
+
+    def _evaluate_chunk(self, chunk):
+        """
+        Score one chunk of answers with the LLM.
+        """
+        return self._parse_communication(invoke_chain(self.chain, {"answers": json.dumps(chunk)}, stage="communication"))
+
+    async def _aevaluate_chunk(self, chunk, semaphore):
+        """
+        Score one chunk of answers with the LLM, bounded by the shared semaphore.
+        """
+        async with semaphore:
+            return self._parse_communication(await ainvoke_chain(self.chain, {"answers": json.dumps(chunk)}, stage="communication"))
+
     def evaluate_communication(self, candidate_data):
         """
         Evaluate candidate's communication skills based on answers from candidate_data and save to MongoDB.
+        Clear-cut answers are scored locally; large answer sets go to the LLM in parallel token-bounded chunks and are merged.
         """
         start_time = time.time()
         try:
@@ -381,27 +847,67 @@ Answers: {answers}
             if not candidate_answers:
                 return {"error": "No answers provided for communication evaluation"}
 
-            # Evaluate using LLM
-            result = self.chain.invoke({"answers": json.dumps(candidate_answers)})
+            local_evaluation, local_is_final = self._local_evaluation(candidate_answers)
+            if local_is_final:
+                evaluation_result = local_evaluation
+            else:
+                # Evaluate using LLM, in one call when the answers fit a single chunk
+                chunks = self._chunk_answers(candidate_answers)
+                if len(chunks) == 1:
+                    evaluation_result = self._evaluate_chunk(candidate_answers)
+                else:
+                    # Chunks that have not started when the deadline passes fail fast in invoke_chain
+                    with ThreadPoolExecutor(max_workers=min(len(chunks), COMMUNICATION_MAX_PARALLEL)) as executor:
+                        futures = [submit_in_context(executor, self._evaluate_chunk, chunk) for chunk in chunks]
+                        chunk_results = [future.result() for future in futures]
+                    evaluation_result = self._merge_chunk_evaluations(chunks, chunk_results)
+                evaluation_result["scored_by"] = "llm"
+                if local_evaluation:
+                    evaluation_result["local_score"] = local_evaluation["communication_score"]
+            evaluation_result = self._finalize_communication(evaluation_result, candidate_data, start_time)
 
-            # Clean and parse LLM response
-            if result.startswith("```json"):
-                result = result.replace("```json", "").replace("```", "").strip()
-            elif result.startswith("```"):
-                result = result.replace("```", "").strip()
+            # Save to MongoDB communication_evaluations collection
+            mongo_id = self.save_to_mongodb(evaluation_result)
+            evaluation_result["evaluation_id"] = mongo_id
 
-            evaluation_result = json.loads(result)
+            return convert_to_json_serializable(evaluation_result)
+        except DeadlineExceeded as e:
+            return deadline_marker(e.stage)
+        except Exception as e:
+            return {"error": f"Communication evaluation failed: {str(e)}"}
 
-            # Add metadata
-            evaluation_result["candidate_id"] = candidate_data.get("mongo_id", "")
-            evaluation_result["created_at"] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
-            evaluation_result["processing_time"] = round(time.time() - start_time, 2)
+    async def aevaluate_communication(self, candidate_data):
+        """
+        Async variant of evaluate_communication.
+        """
+        start_time = time.time()
+        try:
+            candidate_answers = candidate_data.get("answers", [])
+            if not candidate_answers:
+                return {"error": "No answers provided for communication evaluation"}
 
-            # Save to MongoDB communication_evaluations collection
-            mongo_id = self.save_to_mongodb(evaluation_result)
+            local_evaluation, local_is_final = self._local_evaluation(candidate_answers)
+            if local_is_final:
+                evaluation_result = local_evaluation
+            else:
+                chunks = self._chunk_answers(candidate_answers)
+                semaphore = asyncio.Semaphore(COMMUNICATION_MAX_PARALLEL)
+                if len(chunks) == 1:
+                    evaluation_result = await self._aevaluate_chunk(candidate_answers, semaphore)
+                else:
+                    chunk_results = await asyncio.gather(*(self._aevaluate_chunk(chunk, semaphore) for chunk in chunks))
+                    evaluation_result = self._merge_chunk_evaluations(chunks, chunk_results)
+                evaluation_result["scored_by"] = "llm"
+                if local_evaluation:
+                    evaluation_result["local_score"] = local_evaluation["communication_score"]
+            evaluation_result = self._finalize_communication(evaluation_result, candidate_data, start_time)
+
+            mongo_id = await self.asave_to_mongodb(evaluation_result)
             evaluation_result["evaluation_id"] = mongo_id
 
             return convert_to_json_serializable(evaluation_result)
+        except DeadlineExceeded as e:
+            return deadline_marker(e.stage)
         except Exception as e:
             return {"error": f"Communication evaluation failed: {str(e)}"}
 
@@ -411,8 +917,17 @@ Answers: {answers}
         """
         try:
             evaluation_data = convert_to_json_serializable(evaluation_data)
-            result = self.communication_evaluations_collection.insert_one(evaluation_data)
-            return str(result.inserted_id)
+            return str(self.store.insert("communication_evaluations", evaluation_data))
+        except Exception as e:
+            return {"error": f"Failed to save communication evaluation to MongoDB: {str(e)}"}
+
+    async def asave_to_mongodb(self, evaluation_data):
+        """
+        Save communication evaluation data through the async driver.
+        """
+        try:
+            evaluation_data = convert_to_json_serializable(evaluation_data)
+            return str(await self.store.ainsert(get_async_mongo_client()["candidate_db"], "communication_evaluations", evaluation_data))
         except Exception as e:
             return {"error": f"Failed to save communication evaluation to MongoDB: {str(e)}"}
 
@@ -421,6 +936,10 @@ class TechnicalDepthEvaluatorAgent:
         """
         Initialize the Technical Depth Evaluator Agent with RAG-enabled LLM, MongoDB client, and CandidateDataParserAgent.
         """
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_openai import ChatOpenAI
+
         # Initialize OpenAI LLM via LangChain
         self.llm = ChatOpenAI(
             model="gpt-4o-mini",
@@ -428,19 +947,17 @@ class TechnicalDepthEvaluatorAgent:
             temperature=0
         )
         # Initialize MongoDB client
-        mongo_url = os.getenv("MONGO_URL")
-        if not mongo_url:
-            raise Exception("MONGO_URL not found in .env file")
-        self.mongo_client = MongoClient(mongo_url)
+        self.mongo_client = get_mongo_client()
         self.db = self.mongo_client["candidate_db"]
         self.evaluations_collection = self.db["evaluations"]
+        self.store = CompactStore(self.db)
 
         # Initialize CandidateDataParserAgent and CommunicationSkillsEvaluatorAgent
         self.parser_agent = CandidateDataParserAgent()
         self.communication_agent = CommunicationSkillsEvaluatorAgent()
 
         # Initialize embeddings and RAG vector store
-        self.embeddings = OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"))
+        self.embeddings = create_embeddings()
         self.vector_store = self._initialize_vector_store()
 
         # Prompt template for skill matching and project evaluation
@@ -495,6 +1012,9 @@ Resume Text: {candidate_data}
         """
         Initialize FAISS vector store with technical benchmarks and job-specific contexts.
         """
+        from langchain_community.vectorstores import FAISS
+        from langchain_core.documents import Document
+
         # Sample technical benchmarks and job contexts (in production, load from a real knowledge base)
         technical_benchmarks = [
             Document(
@@ -516,16 +1036,36 @@ Resume Text: {candidate_data}
         ]
         return FAISS.from_documents(technical_benchmarks, self.embeddings)
 
-    def _retrieve_context(self, query):
+    def _retrieve_context(self, job_description, candidate_query):
         """
-        Retrieve relevant technical benchmarks using RAG.
+        Retrieve relevant technical benchmarks using RAG. The JD and the candidate's side are
+        embedded as separate texts, so every candidate after the first finds the JD's vector in
+        the embedding cache, and their hits are merged nearest first.
         """
         try:
-            results = self.vector_store.similarity_search(query, k=3)
-            return "\n".join([doc.page_content for doc in results])
+            vectors = self.embeddings.embed_documents([job_description, candidate_query])
+            return merge_hits([self.vector_store.similarity_search_with_score_by_vector(vector, k=3) for vector in vectors], 3)
         except Exception as e:
             return f"Error retrieving context: {str(e)}"
 
+    async def _aretrieve_context(self, job_description, candidate_query):
+        """
+        Retrieve relevant technical benchmarks using RAG without blocking the event loop.
+        """
+        try:
+            vectors = await self.embeddings.aembed_documents([job_description, candidate_query])
+            return merge_hits([await self.vector_store.asimilarity_search_with_score_by_vector(vector, k=3) for vector in vectors], 3)
+        except Exception as e:
+            return f"Error retrieving context: {str(e)}"
+
+    def reset_after_fork(self):
+        """
+        Replace the embeddings client in a freshly forked worker so it does not share
+        HTTP connections opened by the master while building the vector store.
+        """
+        self.embeddings = create_embeddings()
+        self.vector_store.embedding_function = self.embeddings
+
     def evaluate_project_complexity(self, repo):
         """
         Evaluate GitHub repository complexity based on stars, forks, and description.
@@ -557,6 +1097,68 @@ Resume Text: {candidate_data}
             "details": f"Stars: {stars}, Forks: {forks}, Description: {description}"
         }
 
+    def _finalize_technical(self, technical_result, candidate_data, job_description):
+        """
+        Parse the LLM's technical evaluation and merge in project complexity and coverage.
+        """
+        technical_evaluation = json.loads(clean_llm_response(technical_result))
+
+        # Evaluate GitHub projects
+        github_contributions = candidate_data.get("github_contributions", [])
+        project_evaluations = []
+        if isinstance(github_contributions, list):
+            project_evaluations = [self.evaluate_project_complexity(repo) for repo in github_contributions]
+
+        # Update technical evaluation with project evaluations
+        technical_evaluation["project_evaluation"] = project_evaluations
+
+        # Calculate coverage percentage
+        jd_skills = re.findall(r'\b[\w\s.]+(?:\s+\w+)*\b', job_description, re.IGNORECASE)
+        matched_skills = [skill["skill"] for skill in technical_evaluation["matched_skills"]]
+        coverage_percentage = (len(matched_skills) / max(len(jd_skills), 1)) * 100 if jd_skills else 0
+        technical_evaluation["coverage_percentage"] = round(max(coverage_percentage, 70), 2)
+        return technical_evaluation
+
+    def _build_evaluation_result(self, technical_evaluation, communication_evaluation, candidate_data, start_time):
+        """
+        Combine technical and communication evaluations into the stored evaluation document.
+        Stages that ran out of request budget are listed in incomplete_stages.
+        """
+        if "error" in communication_evaluation and not communication_evaluation.get("deadline_exceeded"):
+            communication_evaluation = {"error": communication_evaluation["error"]}
+
+        evaluation_result = {
+            "technical_evaluation": technical_evaluation,
+            "communication_evaluation": communication_evaluation,
+            "candidate_id": candidate_data.get("mongo_id", ""),
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),
+            "processing_time": round(time.time() - start_time, 2)
+        }
+        incomplete_stages = [evaluation["stage"] for evaluation in (technical_evaluation, communication_evaluation) if evaluation.get("deadline_exceeded")]
+        if incomplete_stages:
+            evaluation_result["partial"] = True
+            evaluation_result["incomplete_stages"] = incomplete_stages
+        return evaluation_result
+
+    def evaluate_technical(self, candidate_data, job_description, stage="technical"):
+        """
+        Evaluate already parsed candidate data against the JD (technical stage only, nothing is saved).
+        stage names the call for model routing, the ledger and the scheduler.
+        """
+        # Retrieve relevant context using RAG for technical evaluation
+        retrieved_context = self._retrieve_context(job_description, str(candidate_data.get('skills', [])))
+
+        # Prepare candidate data as string for LLM
+        candidate_data_str = json.dumps(candidate_data, indent=2)
+
+        # Perform technical evaluation using LLM
+        technical_result = invoke_chain(self.chain, {
+            "candidate_data": candidate_data_str,
+            "job_description": job_description,
+            "retrieved_context": retrieved_context
+        }, stage=stage)
+        return self._finalize_technical(technical_result, candidate_data, job_description)
+
     def evaluate_candidate(self, resume_path, answers_array, github_url, job_description):
         """
         Main function to evaluate candidate's technical depth and communication skills against JD.
@@ -565,62 +1167,66 @@ Resume Text: {candidate_data}
         try:
             # Parse candidate data using CandidateDataParserAgent
             candidate_data = self.parser_agent.parse_candidate(resume_path, answers_array, github_url)
+            if candidate_data.get("deadline_exceeded"):
+                return candidate_data
             if "error" in candidate_data:
                 return {"error": f"Candidate parsing failed: {candidate_data['error']}"}
 
-            # Retrieve relevant context using RAG for technical evaluation
-            query = f"{job_description}\n{candidate_data.get('skills', [])}"
-            retrieved_context = self._retrieve_context(query)
+            # Perform technical evaluation using RAG and the LLM
+            try:
+                technical_evaluation = self.evaluate_technical(candidate_data, job_description)
+            except DeadlineExceeded as e:
+                technical_evaluation = deadline_marker(e.stage)
 
-            # Prepare candidate data as string for LLM
-            candidate_data_str = json.dumps(candidate_data, indent=2)
-
-            # Perform technical evaluation using LLM
-            technical_result = self.chain.invoke({
-                "candidate_data": candidate_data_str,
-                "job_description": job_description,
-                "retrieved_context": retrieved_context
-            })
+            # Perform communication evaluation
+            communication_evaluation = self.communication_agent.evaluate_communication(candidate_data)
 
-            # Clean and parse technical LLM response
-            if technical_result.startswith("```json"):
-                technical_result = technical_result.replace("```json", "").replace("```", "").strip()
-            elif technical_result.startswith("```"):
-                technical_result = technical_result.replace("```", "").strip()
+            # Combine technical and communication evaluations
+            evaluation_result = self._build_evaluation_result(technical_evaluation, communication_evaluation, candidate_data, start_time)
 
-            technical_evaluation = json.loads(technical_result)
+            # Save combined evaluation to MongoDB evaluations collection
+            mongo_id = self.save_to_mongodb(evaluation_result)
+            evaluation_result["evaluation_id"] = mongo_id
 
-            # Evaluate GitHub projects
-            github_contributions = candidate_data.get("github_contributions", [])
-            project_evaluations = []
-            if isinstance(github_contributions, list):
-                project_evaluations = [self.evaluate_project_complexity(repo) for repo in github_contributions]
+            return convert_to_json_serializable(evaluation_result)
+        except Exception as e:
+            return {"error": f"Evaluation failed: {str(e)}"}
 
-            # Update technical evaluation with project evaluations
-            technical_evaluation["project_evaluation"] = project_evaluations
+    async def _atechnical_evaluation(self, candidate_data, job_description):
+        """
+        Run retrieval and the technical LLM evaluation without blocking the event loop.
+        """
+        retrieved_context = await self._aretrieve_context(job_description, str(candidate_data.get('skills', [])))
+        try:
+            technical_result = await ainvoke_chain(self.chain, {
+                "candidate_data": json.dumps(candidate_data, indent=2),
+                "job_description": job_description,
+                "retrieved_context": retrieved_context
+            }, stage="technical")
+        except DeadlineExceeded as e:
+            return deadline_marker(e.stage)
+        return self._finalize_technical(technical_result, candidate_data, job_description)
 
-            # Calculate coverage percentage
-            jd_skills = re.findall(r'\b[\w\s.]+(?:\s+\w+)*\b', job_description, re.IGNORECASE)
-            matched_skills = [skill["skill"] for skill in technical_evaluation["matched_skills"]]
-            coverage_percentage = (len(matched_skills) / max(len(jd_skills), 1)) * 100 if jd_skills else 0
-            technical_evaluation["coverage_percentage"] = round(max(coverage_percentage, 70), 2)
+    async def aevaluate_candidate(self, resume_path, answers_array, github_url, job_description):
+        """
+        Async variant of evaluate_candidate; technical and communication evaluations run concurrently.
+        """
+        start_time = time.time()
+        try:
+            candidate_data = await self.parser_agent.aparse_candidate(resume_path, answers_array, github_url)
+            if candidate_data.get("deadline_exceeded"):
+                return candidate_data
+            if "error" in candidate_data:
+                return {"error": f"Candidate parsing failed: {candidate_data['error']}"}
 
-            # Perform communication evaluation
-            communication_evaluation = self.communication_agent.evaluate_communication(candidate_data)
-            if "error" in communication_evaluation:
-                communication_evaluation = {"error": communication_evaluation["error"]}
+            technical_evaluation, communication_evaluation = await asyncio.gather(
+                self._atechnical_evaluation(candidate_data, job_description),
+                self.communication_agent.aevaluate_communication(candidate_data)
+            )
 
-            # Combine technical and communication evaluations
-            evaluation_result = {
-                "technical_evaluation": technical_evaluation,
-                "communication_evaluation": communication_evaluation,
-                "candidate_id": candidate_data.get("mongo_id", ""),
-                "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),
-                "processing_time": round(time.time() - start_time, 2)
-            }
+            evaluation_result = self._build_evaluation_result(technical_evaluation, communication_evaluation, candidate_data, start_time)
 
-            # Save combined evaluation to MongoDB evaluations collection
-            mongo_id = self.save_to_mongodb(evaluation_result)
+            mongo_id = await self.asave_to_mongodb(evaluation_result)
             evaluation_result["evaluation_id"] = mongo_id
 
             return convert_to_json_serializable(evaluation_result)
@@ -633,8 +1239,17 @@ Resume Text: {candidate_data}
         """
         try:
             evaluation_data = convert_to_json_serializable(evaluation_data)
-            result = self.evaluations_collection.insert_one(evaluation_data)
-            return str(result.inserted_id)
+            return str(self.store.insert("evaluations", evaluation_data))
+        except Exception as e:
+            return {"error": f"Failed to save evaluation to MongoDB: {str(e)}"}
+
+    async def asave_to_mongodb(self, evaluation_data):
+        """
+        Save evaluation data through the async driver.
+        """
+        try:
+            evaluation_data = convert_to_json_serializable(evaluation_data)
+            return str(await self.store.ainsert(get_async_mongo_client()["candidate_db"], "evaluations", evaluation_data))
         except Exception as e:
             return {"error": f"Failed to save evaluation to MongoDB: {str(e)}"}
 
@@ -643,6 +1258,10 @@ class CulturalFitEvaluatorAgent:
         """
         Initialize the Cultural Fit Evaluator Agent with LLM, MongoDB client, and embeddings for semantic analysis.
         """
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_openai import ChatOpenAI
+
         # Initialize OpenAI LLM via LangChain
         self.llm = ChatOpenAI(
             model="gpt-4o-mini",
@@ -650,15 +1269,13 @@ class CulturalFitEvaluatorAgent:
             temperature=0
         )
         # Initialize MongoDB client
-        mongo_url = os.getenv("MONGO_URL")
-        if not mongo_url:
-            raise Exception("MONGO_URL not found in .env file")
-        self.mongo_client = MongoClient(mongo_url)
+        self.mongo_client = get_mongo_client()
         self.db = self.mongo_client["candidate_db"]
         self.cultural_evaluations_collection = self.db["cultural_evaluations"]
+        self.store = CompactStore(self.db)
 
         # Initialize embeddings for semantic analysis
-        self.embeddings = OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"))
+        self.embeddings = create_embeddings()
         self.vector_store = self._initialize_vector_store()
 
         # Prompt template for cultural fit evaluation with escaped curly braces
@@ -712,6 +1329,9 @@ Candidate Data: {candidate_data}
         """
         Initialize FAISS vector store with cultural attribute benchmarks.
         """
+        from langchain_community.vectorstores import FAISS
+        from langchain_core.documents import Document
+
         cultural_benchmarks = [
             Document(
                 page_content="Collaboration: Working effectively with others. Synonyms: Team player, cooperative, teamwork. Evidence: Contributions to team projects, open-source involvement.",
@@ -732,16 +1352,62 @@ Candidate Data: {candidate_data}
         ]
         return FAISS.from_documents(cultural_benchmarks, self.embeddings)
 
-    def _retrieve_context(self, query):
+    def _retrieve_context(self, job_description, candidate_query):
         """
-        Retrieve relevant cultural benchmarks using RAG.
+        Retrieve relevant cultural benchmarks using RAG, embedding the JD and the candidate's
+        side separately as the technical agent does.
         """
         try:
-            results = self.vector_store.similarity_search(query, k=3)
-            return "\n".join([doc.page_content for doc in results])
+            vectors = self.embeddings.embed_documents([job_description, candidate_query])
+            return merge_hits([self.vector_store.similarity_search_with_score_by_vector(vector, k=3) for vector in vectors], 3)
         except Exception as e:
             return f"Error retrieving context: {str(e)}"
 
+    async def _aretrieve_context(self, job_description, candidate_query):
+        """
+        Retrieve relevant cultural benchmarks using RAG without blocking the event loop.
+        """
+        try:
+            vectors = await self.embeddings.aembed_documents([job_description, candidate_query])
+            return merge_hits([await self.vector_store.asimilarity_search_with_score_by_vector(vector, k=3) for vector in vectors], 3)
+        except Exception as e:
+            return f"Error retrieving context: {str(e)}"
+
+    def reset_after_fork(self):
+        """
+        Replace the embeddings client in a freshly forked worker so it does not share
+        HTTP connections opened by the master while building the vector store.
+        """
+        self.embeddings = create_embeddings()
+        self.vector_store.embedding_function = self.embeddings
+
+    def _cultural_inputs(self, candidate_data):
+        """
+        Select the soft skills, culture-fit answers and GitHub contributions used for cultural evaluation.
+        """
+        soft_skills = candidate_data.get("skills", [])
+        culture_fit_answers = [ans["text"] for ans in candidate_data.get("answers", []) if ans["type"].lower() == "culture-fit"]
+        github_contributions = candidate_data.get("github_contributions", [])
+        return soft_skills, culture_fit_answers, github_contributions
+
+    def _finalize_cultural(self, result, candidate_data, job_description, start_time):
+        """
+        Parse the LLM's cultural evaluation and attach coverage and metadata.
+        """
+        evaluation_result = json.loads(clean_llm_response(result))
+
+        # Calculate coverage percentage
+        jd_cultural_attributes = re.findall(r'\b[\w\s]+(?:\s+\w+)*\b', job_description, re.IGNORECASE)
+        matched_attributes = [attr["attribute"] for attr in evaluation_result["matched_cultural_attributes"]]
+        coverage_percentage = (len(matched_attributes) / max(len(jd_cultural_attributes), 1)) * 100 if jd_cultural_attributes else 0
+        evaluation_result["coverage_percentage"] = round(max(coverage_percentage, 70), 2)
+
+        # Add metadata
+        evaluation_result["candidate_id"] = candidate_data.get("mongo_id", "")
+        evaluation_result["created_at"] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        evaluation_result["processing_time"] = round(time.time() - start_time, 2)
+        return evaluation_result
+
     def evaluate_cultural_fit(self, candidate_data, job_description):
         """
         Evaluate candidate's cultural fit based on soft skills, culture-fit answers, and GitHub contributions.
@@ -749,16 +1415,13 @@ Candidate Data: {candidate_data}
         start_time = time.time()
         try:
             # Extract relevant data
-            soft_skills = candidate_data.get("skills", [])
-            culture_fit_answers = [ans["text"] for ans in candidate_data.get("answers", []) if ans["type"].lower() == "culture-fit"]
-            github_contributions = candidate_data.get("github_contributions", [])
+            soft_skills, culture_fit_answers, github_contributions = self._cultural_inputs(candidate_data)
 
             if not soft_skills and not culture_fit_answers and not github_contributions:
                 return {"error": "No relevant data (soft skills, culture-fit answers, or GitHub contributions) provided for cultural evaluation"}
 
             # Retrieve context using RAG
-            query = f"{job_description}\n{soft_skills}\n{json.dumps(culture_fit_answers)}"
-            retrieved_context = self._retrieve_context(query)
+            retrieved_context = self._retrieve_context(job_description, f"{soft_skills}\n{json.dumps(culture_fit_answers)}")
 
             # Prepare candidate data as string for LLM
             candidate_data_str = json.dumps({
@@ -768,36 +1431,55 @@ Candidate Data: {candidate_data}
             }, indent=2)
 
             # Perform cultural evaluation using LLM
-            result = self.chain.invoke({
+            result = invoke_chain(self.chain, {
                 "candidate_data": candidate_data_str,
                 "job_description": job_description,
                 "retrieved_context": retrieved_context
-            })
+            }, stage="cultural")
+            evaluation_result = self._finalize_cultural(result, candidate_data, job_description, start_time)
 
-            # Clean and parse LLM response
-            if result.startswith("```json"):
-                result = result.replace("```json", "").replace("```", "").strip()
-            elif result.startswith("```"):
-                result = result.replace("```", "").strip()
+            # Save to MongoDB
+            mongo_id = self.save_to_mongodb(evaluation_result)
+            evaluation_result["evaluation_id"] = mongo_id
+
+            return convert_to_json_serializable(evaluation_result)
+        except DeadlineExceeded as e:
+            return deadline_marker(e.stage)
+        except Exception as e:
+            return {"error": f"Cultural fit evaluation failed: {str(e)}"}
+
+    async def aevaluate_cultural_fit(self, candidate_data, job_description):
+        """
+        Async variant of evaluate_cultural_fit.
+        """
+        start_time = time.time()
+        try:
+            soft_skills, culture_fit_answers, github_contributions = self._cultural_inputs(candidate_data)
 
-            evaluation_result = json.loads(result)
+            if not soft_skills and not culture_fit_answers and not github_contributions:
+                return {"error": "No relevant data (soft skills, culture-fit answers, or GitHub contributions) provided for cultural evaluation"}
 
-            # Calculate coverage percentage
-            jd_cultural_attributes = re.findall(r'\b[\w\s]+(?:\s+\w+)*\b', job_description, re.IGNORECASE)
-            matched_attributes = [attr["attribute"] for attr in evaluation_result["matched_cultural_attributes"]]
-            coverage_percentage = (len(matched_attributes) / max(len(jd_cultural_attributes), 1)) * 100 if jd_cultural_attributes else 0
-            evaluation_result["coverage_percentage"] = round(max(coverage_percentage, 70), 2)
+            retrieved_context = await self._aretrieve_context(job_description, f"{soft_skills}\n{json.dumps(culture_fit_answers)}")
 
-            # Add metadata
-            evaluation_result["candidate_id"] = candidate_data.get("mongo_id", "")
-            evaluation_result["created_at"] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
-            evaluation_result["processing_time"] = round(time.time() - start_time, 2)
+            candidate_data_str = json.dumps({
+                "soft_skills": soft_skills,
+                "culture_fit_answers": culture_fit_answers,
+                "github_contributions": github_contributions
+            }, indent=2)
 
-            # Save to MongoDB
-            mongo_id = self.save_to_mongodb(evaluation_result)
+            result = await ainvoke_chain(self.chain, {
+                "candidate_data": candidate_data_str,
+                "job_description": job_description,
+                "retrieved_context": retrieved_context
+            }, stage="cultural")
+            evaluation_result = self._finalize_cultural(result, candidate_data, job_description, start_time)
+
+            mongo_id = await self.asave_to_mongodb(evaluation_result)
             evaluation_result["evaluation_id"] = mongo_id
 
             return convert_to_json_serializable(evaluation_result)
+        except DeadlineExceeded as e:
+            return deadline_marker(e.stage)
         except Exception as e:
             return {"error": f"Cultural fit evaluation failed: {str(e)}"}
 
@@ -807,8 +1489,17 @@ Candidate Data: {candidate_data}
         """
         try:
             evaluation_data = convert_to_json_serializable(evaluation_data)
-            result = self.cultural_evaluations_collection.insert_one(evaluation_data)
-            return str(result.inserted_id)
+            return str(self.store.insert("cultural_evaluations", evaluation_data))
+        except Exception as e:
+            return {"error": f"Failed to save cultural evaluation to MongoDB: {str(e)}"}
+
+    async def asave_to_mongodb(self, evaluation_data):
+        """
+        Save cultural evaluation data through the async driver.
+        """
+        try:
+            evaluation_data = convert_to_json_serializable(evaluation_data)
+            return str(await self.store.ainsert(get_async_mongo_client()["candidate_db"], "cultural_evaluations", evaluation_data))
         except Exception as e:
             return {"error": f"Failed to save cultural evaluation to MongoDB: {str(e)}"}
         
@@ -821,6 +1512,8 @@ class ScoringState(TypedDict):
     cultural_evaluation: Dict[str, Any]
     weights: Dict[str, float]
     candidate_id: str
+    job_id: str
+    incomplete_stages: List[str]
     score_breakdown: Dict[str, Any]
     final_score: float
     processing_time: float
@@ -831,13 +1524,17 @@ class ScoringAndAggregationAgent:
         """
         Initialize the Scoring and Aggregation Agent with MongoDB client and LangGraph workflow.
         """
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_openai import ChatOpenAI
+
+        from leaderboard import LeaderboardIndex
+
         # Initialize MongoDB client
-        mongo_url = os.getenv("MONGO_URL")
-        if not mongo_url:
-            raise Exception("MONGO_URL not found in .env file")
-        self.mongo_client = MongoClient(mongo_url)
+        self.mongo_client = get_mongo_client()
         self.db = self.mongo_client["candidate_db"]
         self.scores_collection = self.db["aggregate_scores"]
+        self.leaderboard = LeaderboardIndex(self.db)
 
         # Initialize OpenAI LLM for optional factors scoring
         self.llm = ChatOpenAI(
@@ -877,14 +1574,18 @@ You are an expert evaluator tasked with assessing optional factors (project impa
         """
         Build the LangGraph workflow for scoring and aggregation.
         """
+        from langchain_core.runnables import RunnableLambda
+        from langgraph.graph import StateGraph, END
+
         graph = StateGraph(ScoringState)
 
         # Define nodes
         graph.add_node("validate_inputs", self.validate_inputs)
         graph.add_node("extract_scores", self.extract_scores)
-        graph.add_node("score_optional_factors", self.score_optional_factors)
+        # Nodes that do I/O also get async implementations for the ASGI service (workflow.ainvoke)
+        graph.add_node("score_optional_factors", RunnableLambda(self.score_optional_factors, afunc=self.ascore_optional_factors))
         graph.add_node("aggregate_scores", self.aggregate_scores)
-        graph.add_node("save_to_mongodb", self.save_to_mongodb)
+        graph.add_node("save_to_mongodb", RunnableLambda(self.save_to_mongodb, afunc=self.asave_to_mongodb))
 
         # Define edges
         graph.add_edge("validate_inputs", "extract_scores")
@@ -967,26 +1668,58 @@ You are an expert evaluator tasked with assessing optional factors (project impa
             return state
 
         try:
-            result = self.optional_factors_chain.invoke({
-                "technical_evaluation": json.dumps(state["technical_evaluation"]),
-                "cultural_evaluation": json.dumps(state["cultural_evaluation"])
-            })
-
-            # Clean and parse LLM response
-            if result.startswith("```json"):
-                result = result.replace("```json", "").replace("```", "").strip()
-            elif result.startswith("```"):
-                result = result.replace("```", "").strip()
-
-            optional_result = json.loads(result)
-            state["score_breakdown"]["optional_score"] = optional_result["optional_factors_score"]
-            state["score_breakdown"]["optional_assessment"] = optional_result["assessment"]
+            result = invoke_chain(self.optional_factors_chain, self._optional_factors_inputs(state), stage="optional_factors")
+            return self._apply_optional_factors(state, result)
+        except DeadlineExceeded as e:
+            return self._skip_for_deadline(state, e.stage)
+        except Exception as e:
+            state["error"] = f"Optional factors scoring failed: {str(e)}"
+            return state
 
+    async def ascore_optional_factors(self, state: ScoringState) -> ScoringState:
+        """
+        Async variant of score_optional_factors.
+        """
+        if state.get("error"):
             return state
+
+        try:
+            result = await ainvoke_chain(self.optional_factors_chain, self._optional_factors_inputs(state), stage="optional_factors")
+            return self._apply_optional_factors(state, result)
+        except DeadlineExceeded as e:
+            return self._skip_for_deadline(state, e.stage)
         except Exception as e:
             state["error"] = f"Optional factors scoring failed: {str(e)}"
             return state
 
+    def _skip_for_deadline(self, state: ScoringState, stage) -> ScoringState:
+        """
+        Score a stage that ran out of request budget as 0 and mark the result partial.
+        """
+        logger.warning(f"Scoring stage {stage} skipped: request deadline exceeded")
+        state["score_breakdown"]["optional_score"] = 0
+        state["score_breakdown"]["optional_assessment"] = "Not evaluated: request deadline exceeded"
+        state["incomplete_stages"] = state.get("incomplete_stages", []) + [stage]
+        return state
+
+    def _optional_factors_inputs(self, state: ScoringState):
+        """
+        Build the optional factors prompt inputs from the evaluations in state.
+        """
+        return {
+            "technical_evaluation": json.dumps(state["technical_evaluation"]),
+            "cultural_evaluation": json.dumps(state["cultural_evaluation"])
+        }
+
+    def _apply_optional_factors(self, state: ScoringState, result) -> ScoringState:
+        """
+        Parse the optional factors LLM response into the score breakdown.
+        """
+        optional_result = json.loads(clean_llm_response(result))
+        state["score_breakdown"]["optional_score"] = optional_result["optional_factors_score"]
+        state["score_breakdown"]["optional_assessment"] = optional_result["assessment"]
+        return state
+
     def aggregate_scores(self, state: ScoringState) -> ScoringState:
         """
         Aggregate scores using provided weights.
@@ -1042,29 +1775,59 @@ You are an expert evaluator tasked with assessing optional factors (project impa
             return state
 
         try:
-            score_data = {
-                "candidate_id": state["candidate_id"],
-                "final_score": state["final_score"],
-                "score_breakdown": state["score_breakdown"],
-                "weights": state["weights"],
-                "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),
-                "processing_time": state["processing_time"]
-            }
-            score_data = convert_to_json_serializable(score_data)
-            result = self.scores_collection.insert_one(score_data)
+            result = self.scores_collection.insert_one(self._score_document(state))
             state["score_breakdown"]["mongo_id"] = str(result.inserted_id)
 
+            # Keep the job's leaderboard current; a score without a candidate cannot be ranked
+            if state.get("job_id") and state.get("candidate_id"):
+                self.leaderboard.record(state["job_id"], state["candidate_id"], state["final_score"], str(result.inserted_id))
+
             return state
         except Exception as e:
             state["error"] = f"Failed to save score to MongoDB: {str(e)}"
             return state
 
-    def calculate_score(self, technical_evaluation, communication_evaluation, cultural_evaluation, weights=None):
+    async def asave_to_mongodb(self, state: ScoringState) -> ScoringState:
         """
-        Main function to calculate aggregated score using LangGraph workflow.
+        Save aggregated score to MongoDB through the async driver.
         """
-        start_time = time.time()
+        if state.get("error"):
+            return state
+
+        try:
+            result = await get_async_collection("aggregate_scores").insert_one(self._score_document(state))
+            state["score_breakdown"]["mongo_id"] = str(result.inserted_id)
+
+            if state.get("job_id") and state.get("candidate_id"):
+                await asyncio.to_thread(self.leaderboard.record, state["job_id"], state["candidate_id"], state["final_score"], str(result.inserted_id))
+
+            return state
+        except Exception as e:
+            state["error"] = f"Failed to save score to MongoDB: {str(e)}"
+            return state
 
+    def _score_document(self, state: ScoringState):
+        """
+        Build the aggregate_scores document for a scored state.
+        """
+        score_data = {
+            "candidate_id": state["candidate_id"],
+            "job_id": state.get("job_id", ""),
+            "final_score": state["final_score"],
+            "score_breakdown": state["score_breakdown"],
+            "weights": state["weights"],
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),
+            "processing_time": state["processing_time"]
+        }
+        if state.get("incomplete_stages"):
+            score_data["partial"] = True
+            score_data["incomplete_stages"] = state["incomplete_stages"]
+        return convert_to_json_serializable(score_data)
+
+    def _initial_state(self, technical_evaluation, communication_evaluation, cultural_evaluation, weights, job_id=None):
+        """
+        Build the initial workflow state, falling back to the default weights.
+        """
         # Default weights
         default_weights = {
             "technical": 0.4,
@@ -1076,32 +1839,61 @@ You are an expert evaluator tasked with assessing optional factors (project impa
         # Use provided weights or default
         weights = weights if weights else default_weights
 
-        # Initialize state
-        state = ScoringState(
+        return ScoringState(
             technical_evaluation=technical_evaluation,
             communication_evaluation=communication_evaluation,
             cultural_evaluation=cultural_evaluation,
             weights=weights,
             candidate_id=technical_evaluation.get("candidate_id", ""),
+            job_id=job_id or "",
+            incomplete_stages=[],
             score_breakdown={},
             final_score=0.0,
             processing_time=0.0,
             error=""
         )
 
-        # Run the workflow
-        result = self.workflow.invoke(state)
+    def _format_result(self, result, start_time):
+        """
+        Convert the final workflow state into the API response.
+        """
         result["processing_time"] = round(time.time() - start_time, 2)
 
-        # Return result
         if result.get("error"):
             return {"error": result["error"]}
-        return convert_to_json_serializable({
+        response = {
             "candidate_id": result["candidate_id"],
+            "job_id": result.get("job_id", ""),
             "final_score": result["final_score"],
             "score_breakdown": result["score_breakdown"],
             "weights": result["weights"],
             "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),
             "processing_time": result["processing_time"],
             "mongo_id": result["score_breakdown"].get("mongo_id", "")
-        })
\ No newline at end of file
+        }
+        if result.get("incomplete_stages"):
+            response["partial"] = True
+            response["incomplete_stages"] = result["incomplete_stages"]
+        return convert_to_json_serializable(response)
+
+    def calculate_score(self, technical_evaluation, communication_evaluation, cultural_evaluation, weights=None, job_id=None):
+        """
+        Main function to calculate aggregated score using LangGraph workflow.
+        When job_id is given the score is also recorded on that job's leaderboard.
+        """
+        start_time = time.time()
+        state = self._initial_state(technical_evaluation, communication_evaluation, cultural_evaluation, weights, job_id)
+
+        # Run the workflow
+        result = self.workflow.invoke(state)
+        return self._format_result(result, start_time)
+
+    async def acalculate_score(self, technical_evaluation, communication_evaluation, cultural_evaluation, weights=None, job_id=None):
+        """
+        Async variant of calculate_score.
+        """
+        start_time = time.time()
+        state = self._initial_state(technical_evaluation, communication_evaluation, cultural_evaluation, weights, job_id)
+
+        result = await self.workflow.ainvoke(state)
+        return self._format_result(result, start_time)
@@ -1,13 +1,423 @@
-from flask import Flask, request, jsonify
-from agents import CandidateDataParserAgent, TechnicalDepthEvaluatorAgent, CommunicationSkillsEvaluatorAgent, CulturalFitEvaluatorAgent, ScoringAndAggregationAgent
+from flask import Flask, request, jsonify, Response
+from agents import CandidateDataParserAgent, TechnicalDepthEvaluatorAgent, CommunicationSkillsEvaluatorAgent, CulturalFitEvaluatorAgent, ScoringAndAggregationAgent, get_mongo_client
+from incremental import IncrementalEvaluator
+from screening import CandidateScreener, parse_screen_request
+from multi_role import MultiRoleEvaluator, parse_multi_role_request
+from funnel import CandidateFunnel
+from hedging import llm_hedger
+from routing import model_router
+from ledger import llm_ledger, set_ledger_context, reset_ledger_context, GROUP_FIELDS
+from scheduler import llm_scheduler, set_scheduling_context, reset_scheduling_context
+from communication_prescore import set_feedback_context, reset_feedback_context
+from admission import admission_controller, AdmissionRejected, ADMISSION_EXEMPT
+from traffic import get_recorder
+from idempotency import IdempotencyStore, request_fingerprint, IDEMPOTENCY_WAIT_SECONDS
+from deadlines import start_deadline, end_deadline, parse_deadline_seconds
+from similarity import get_profile_index
+from export import EvaluationExporter, parse_watermark
+from profiling import MemoryProfile, ProfileBusy, sample_stacks, get_memory_profile
 import os
+import hmac
 import json
+import threading
+import time
+import uuid
 
 app = Flask(__name__)
 
-# Initialize the parser and scoring agents
-parser_agent = CandidateDataParserAgent()
-scoring_agent = ScoringAndAggregationAgent()
+# Agents are built once per process and shared by every request. When served by serve.py
+# they are built in the master before forking, so the workers share them copy-on-write.
+AGENT_FACTORIES = {
+    "parser": CandidateDataParserAgent,
+    "technical": TechnicalDepthEvaluatorAgent,
+    "cultural": CulturalFitEvaluatorAgent,
+    "scoring": ScoringAndAggregationAgent,
+    "incremental": lambda: IncrementalEvaluator(get_agent("parser"), get_agent("technical"), get_agent("cultural"), get_agent("scoring")),
+    "screening": lambda: CandidateScreener(get_agent("technical")),
+    "multi_role": lambda: MultiRoleEvaluator(get_agent("technical"), get_agent("cultural")),
+    "funnel": lambda: CandidateFunnel(get_agent("parser"), get_agent("technical"), get_agent("cultural"), get_agent("scoring")),
+}
+_agents = {}
+# Re-entrant because composite factories (incremental) fetch other agents while building
+_agents_lock = threading.RLock()
+
+# Endpoints that run agent work and are waited for when a worker drains
+EVALUATION_ENDPOINTS = {"parse_candidate_data", "evaluate_candidate_data", "evaluate_cultural_fit", "aggregate_score", "reevaluate_candidate", "screen_candidates", "evaluate_roles", "funnel_evaluate"}
+_serving_state = {"draining": False, "inflight": 0}
+_serving_condition = threading.Condition()
+_idempotency_store = None
+# Anonymized request shapes for benchmarks/replay.py, only when TRAFFIC_RECORD_PATH is set
+traffic_recorder = get_recorder()
+# Admin endpoints (profiling) are disabled unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+def get_agent(name):
+    """
+    Return the shared agent registered under name, building it on first use.
+    """
+    agent = _agents.get(name)
+    if agent is None:
+        with _agents_lock:
+            agent = _agents.get(name)
+            if agent is None:
+                agent = AGENT_FACTORIES[name]()
+                _agents[name] = agent
+    return agent
+
+def get_idempotency_store():
+    """
+    Return the shared store of Idempotency-Key responses, creating it on first use.
+    """
+    global _idempotency_store
+    if _idempotency_store is None:
+        with _agents_lock:
+            if _idempotency_store is None:
+                _idempotency_store = IdempotencyStore(get_mongo_client()["candidate_db"])
+    return _idempotency_store
+
+def warmup():
+    """
+    Build every agent (LLM clients, FAISS vector stores, MongoDB client) ahead of the first request.
+    """
+    for name in AGENT_FACTORIES:
+        get_agent(name)
+    app.logger.info(f"Warmed up agents: {', '.join(_agents)}")
+
+def reset_after_fork():
+    """
+    Reset per-process state in a freshly forked worker.
+    """
+    for agent in _agents.values():
+        if hasattr(agent, "reset_after_fork"):
+            agent.reset_after_fork()
+    if _idempotency_store is not None:
+        _idempotency_store.reset_after_fork()
+    admission_controller.reset_after_fork()
+    llm_ledger.reset_after_fork()
+    with _serving_condition:
+        _serving_state["draining"] = False
+        _serving_state["inflight"] = 0
+
+def begin_drain():
+    """
+    Mark the process as draining so the readiness probe fails while in-flight evaluations finish.
+    """
+    with _serving_condition:
+        _serving_state["draining"] = True
+        _serving_condition.notify_all()
+
+def wait_for_drain(timeout):
+    """
+    Block until no evaluation is in flight or the timeout expires. Returns the number still running.
+    """
+    with _serving_condition:
+        _serving_condition.wait_for(lambda: _serving_state["inflight"] == 0, timeout=timeout)
+        return _serving_state["inflight"]
+
+def is_admin():
+    """
+    Whether the request carries the admin token (X-Admin-Token).
+    """
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN)
+
+@app.before_request
+def start_memory_profile():
+    # An admin request with X-Profile-Memory is traced with tracemalloc; other requests pay one header lookup
+    if "X-Profile-Memory" in request.headers and is_admin():
+        try:
+            request.environ["profiling.memory"] = MemoryProfile(uuid.uuid4().hex)
+        except ProfileBusy:
+            request.environ["profiling.memory"] = None
+
+def idempotent_response(scoped_key, outcome, stored):
+    """
+    The response for a begin() outcome, or None when this request claimed the key and should run.
+    """
+    if outcome == "claimed":
+        request.environ["idempotency.key"] = scoped_key
+        return None
+    if outcome == "mismatch":
+        return jsonify({"error": "Idempotency-Key was already used with a different request"}), 422
+    if outcome == "in_progress":
+        response = jsonify({"error": "A request with this Idempotency-Key is still in progress"})
+        response.status_code = 409
+        response.headers["Retry-After"] = str(admission_controller.retry_after())
+        return response
+    response = jsonify(stored["body"])
+    response.status_code = stored["status_code"]
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+def idempotency_key():
+    key = request.headers.get("Idempotency-Key")
+    if request.method != "POST" or request.endpoint not in EVALUATION_ENDPOINTS or not key:
+        return None
+    return f"{request.path}:{key}"
+
+@app.before_request
+def replay_idempotent_request():
+    # Runs before admission: a retry of a key already stored (done or in flight) takes no
+    # evaluation slot; only then is the body read, to check it matches the first attempt.
+    # It waits for an attempt in flight only briefly and within its own deadline
+    scoped_key = idempotency_key()
+    if scoped_key is None or get_idempotency_store().lookup(scoped_key) is None:
+        return None
+    wait = min(IDEMPOTENCY_WAIT_SECONDS, parse_deadline_seconds(request.headers.get("X-Request-Deadline")))
+    return idempotent_response(scoped_key, *get_idempotency_store().begin(scoped_key, request_fingerprint(request.form, request.files), wait))
+
+@app.before_request
+def admit_evaluation():
+    # Runs before the upload is parsed: a saturated worker sheds the request instead of buffering it
+    if request.endpoint not in EVALUATION_ENDPOINTS or request.endpoint in ADMISSION_EXEMPT:
+        return None
+    try:
+        request.environ["admission.ticket"] = admission_controller.admit(request.headers.get("X-Tenant-Id"), request.content_length,
+                                                                          priority=request.headers.get("X-Priority"))
+    except AdmissionRejected as e:
+        response = jsonify({"error": str(e), "reason": e.reason})
+        response.status_code = e.status_code
+        if e.retry_after is not None:
+            response.headers["Retry-After"] = str(e.retry_after)
+        return response
+    return None
+
+@app.before_request
+def track_inflight_start():
+    if request.endpoint in EVALUATION_ENDPOINTS:
+        with _serving_condition:
+            _serving_state["inflight"] += 1
+        request.environ["evaluation.tracked"] = True
+        request.environ["evaluation.started"] = time.monotonic()
+        # Every stage of the evaluation shares the client's budget (X-Request-Deadline, in seconds)
+        request.environ["evaluation.deadline"] = start_deadline(parse_deadline_seconds(request.headers.get("X-Request-Deadline")))
+        # LLM spend of every stage is attributed to the job (job_id field or URL segment, or X-Job-Id header)
+        job_id = request.form.get("job_id") or (request.view_args or {}).get("job_id") or request.headers.get("X-Job-Id")
+        request.environ["evaluation.ledger"] = set_ledger_context(job_id=job_id)
+        # LLM calls queue fairly per tenant (X-Tenant-Id), interactive ahead of bulk (X-Priority)
+        request.environ["evaluation.scheduling"] = set_scheduling_context(request.headers.get("X-Tenant-Id"), request.headers.get("X-Priority"))
+        # Communication is scored locally unless borderline or the client asks for narrative feedback (X-Communication-Feedback)
+        request.environ["evaluation.feedback"] = set_feedback_context(request.headers.get("X-Communication-Feedback"))
+
+@app.after_request
+def record_traffic(response):
+    # Registered before deadline_status, so it runs after it and records the final status
+    started = request.environ.get("evaluation.started")
+    if traffic_recorder is not None and started is not None:
+        try:
+            traffic_recorder.record(request, response.status_code, time.monotonic() - started)
+        except Exception as e:
+            app.logger.warning(f"Failed to record request shape: {str(e)}")
+    return response
+
+@app.before_request
+def claim_idempotency_key():
+    # A first attempt claims its Idempotency-Key once admitted. If a concurrent attempt claimed
+    # it meanwhile, this one holds an evaluation slot, so it does not wait for it
+    scoped_key = idempotency_key()
+    if scoped_key is None or "idempotency.key" in request.environ:
+        return None
+    return idempotent_response(scoped_key, *get_idempotency_store().begin(scoped_key, request_fingerprint(request.form, request.files), wait=0))
+
+@app.after_request
+def store_idempotent_response(response):
+    # Registered between record_traffic and deadline_status, so it stores the final status
+    key = request.environ.pop("idempotency.key", None)
+    if key is not None:
+        body = response.get_json(silent=True) if response.is_json else None
+        # Server errors and 200s carrying an agent "error" (e.g. a failed LLM call) are retried, not replayed
+        failed = response.status_code >= 500 or (response.status_code < 400 and isinstance(body, dict) and "error" in body)
+        if body is not None and not failed:
+            get_idempotency_store().complete(key, body, response.status_code)
+        else:
+            get_idempotency_store().release(key)
+    return response
+
+@app.after_request
+def deadline_status(response):
+    # A result that stopped at the deadline before producing anything is a gateway timeout
+    if request.environ.get("evaluation.deadline") is not None and response.is_json:
+        result = response.get_json(silent=True)
+        if isinstance(result, dict) and result.get("deadline_exceeded"):
+            response.status_code = 504
+    return response
+
+@app.after_request
+def finish_memory_profile(response):
+    # Registered last, so it runs first and the profile covers the endpoint itself
+    if "profiling.memory" in request.environ:
+        profile = request.environ.pop("profiling.memory")
+        if profile is None:
+            response.headers["X-Memory-Profile"] = "busy"
+        else:
+            profile.finish()
+            response.headers["X-Memory-Profile-Id"] = profile.profile_id
+            response.headers["X-Worker-Pid"] = str(os.getpid())
+    return response
+
+@app.teardown_request
+def track_inflight_end(exc):
+    profile = request.environ.pop("profiling.memory", None)
+    if profile is not None:
+        profile.finish()
+    # A claimed key whose request raised before producing a response
+    idempotency_key = request.environ.pop("idempotency.key", None)
+    if idempotency_key is not None:
+        get_idempotency_store().release(idempotency_key)
+    token = request.environ.pop("evaluation.deadline", None)
+    if token is not None:
+        end_deadline(token)
+    token = request.environ.pop("evaluation.ledger", None)
+    if token is not None:
+        reset_ledger_context(token)
+    token = request.environ.pop("evaluation.scheduling", None)
+    if token is not None:
+        reset_scheduling_context(token)
+    token = request.environ.pop("evaluation.feedback", None)
+    if token is not None:
+        reset_feedback_context(token)
+    ticket = request.environ.pop("admission.ticket", None)
+    if ticket is not None:
+        admission_controller.release(ticket)
+    if request.environ.pop("evaluation.tracked", False):
+        with _serving_condition:
+            _serving_state["inflight"] -= 1
+            _serving_condition.notify_all()
+
+@app.route('/healthz', methods=['GET'])
+def liveness():
+    """
+    Liveness probe: the process is up and able to answer HTTP requests.
+    """
+    return jsonify({"status": "ok"}), 200
+
+@app.route('/readyz', methods=['GET'])
+def readiness():
+    """
+    Readiness probe: agents are loaded, MongoDB is reachable and the worker is not draining.
+    """
+    with _serving_condition:
+        draining = _serving_state["draining"]
+        inflight = _serving_state["inflight"]
+    if draining:
+        return jsonify({"status": "draining", "inflight": inflight}), 503
+    missing = [name for name in AGENT_FACTORIES if name not in _agents]
+    if missing:
+        return jsonify({"status": "warming_up", "missing_agents": missing}), 503
+    try:
+        import pymongo
+
+        with pymongo.timeout(2):
+            get_mongo_client().admin.command("ping")
+    except Exception as e:
+        return jsonify({"status": "unavailable", "error": f"MongoDB ping failed: {str(e)}"}), 503
+    return jsonify({"status": "ready", "inflight": inflight}), 200
+
+@app.route('/metrics/llm', methods=['GET'])
+def llm_metrics():
+    """
+    Per-stage LLM call metrics for this worker: latency percentiles, hedge rate, hedge wins and time saved.
+    """
+    return jsonify(llm_hedger.snapshot()), 200
+
+@app.route('/metrics/llm/routing', methods=['GET'])
+def llm_routing_metrics():
+    """
+    Model routing decisions for this worker: per stage, attempts and final answers by tier, token upgrades and escalations by reason.
+    """
+    return jsonify(model_router.snapshot()), 200
+
+@app.route('/metrics/scheduler', methods=['GET'])
+def scheduler_metrics():
+    """
+    LLM call slots in use on this worker and, per tenant, queued and dispatched calls by priority and queue wait percentiles.
+    """
+    return jsonify(llm_scheduler.snapshot()), 200
+
+@app.route('/metrics/admission', methods=['GET'])
+def admission_metrics():
+    """
+    Admission control on this worker: evaluations in flight, their estimated memory, and admitted, deferred and shed requests by reason.
+    """
+    return jsonify(admission_controller.snapshot()), 200
+
+@app.route('/metrics/llm/cost', methods=['GET'])
+def llm_cost():
+    """
+    Token and cost roll-up of all LLM and embedding calls from the ledger.
+    Accepts group_by (comma-separated: stage, job, day, model, kind; default stage) and optional
+    job_id, kind, and since/until days (YYYY-MM-DD, inclusive).
+    """
+    group_by = [field.strip() for field in request.args.get('group_by', 'stage').split(',') if field.strip()]
+    if not group_by or any(field not in GROUP_FIELDS for field in group_by):
+        return jsonify({"error": f"group_by must be a comma-separated list of {', '.join(GROUP_FIELDS)}"}), 400
+
+    try:
+        return jsonify(llm_ledger.rollup(group_by, request.args.get('job_id'), request.args.get('since'),
+                                         request.args.get('until'), request.args.get('kind'))), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/admin/export', methods=['GET'])
+def export_evaluations():
+    """
+    Admin endpoint to stream every candidate joined with its latest evaluations and its scores as NDJSON.
+    Accepts an optional since watermark (UTC, YYYY-MM-DD HH:MM:SS) to export only candidates changed since.
+    Records are read and written in batches, so memory stays constant; use export.py for Parquet/Arrow files.
+    """
+    if not is_admin():
+        return jsonify({"error": "Not found"}), 404
+    try:
+        since = parse_watermark(request.args['since']) if request.args.get('since') else None
+    except ValueError:
+        return jsonify({"error": "since must be a UTC time formatted YYYY-MM-DD HH:MM:SS"}), 400
+
+    exporter = EvaluationExporter(get_mongo_client()["candidate_db"])
+
+    def generate():
+        for records in exporter.records(since):
+            yield "".join(json.dumps(record, separators=(",", ":"), default=str) + "\n" for record in records)
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+@app.route('/admin/profile/cpu', methods=['GET'])
+def profile_cpu():
+    """
+    Admin endpoint to sample every request thread of this worker for `seconds` (default 10, max 60).
+    Accepts optional interval_ms (default 5) and mode ("wall" for all samples, "cpu" to drop blocked threads).
+    Returns folded stacks for flamegraph.pl or speedscope.
+    """
+    if not is_admin():
+        return jsonify({"error": "Not found"}), 404
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval = float(request.args.get('interval_ms', 5)) / 1000
+    except ValueError:
+        return jsonify({"error": "seconds and interval_ms must be numbers"}), 400
+    mode = request.args.get('mode', 'wall')
+    if not 0 < seconds <= 60 or not 0.001 <= interval <= 1 or mode not in ("wall", "cpu"):
+        return jsonify({"error": "seconds must be in (0, 60], interval_ms in [1, 1000] and mode wall or cpu"}), 400
+
+    try:
+        folded, samples = sample_stacks(seconds, interval, mode)
+    except ProfileBusy as e:
+        return jsonify({"error": str(e)}), 409
+    return Response(folded, mimetype="text/plain", headers={"X-Profile-Samples": str(samples), "X-Worker-Pid": str(os.getpid())})
+
+@app.route('/admin/profile/memory/<profile_id>', methods=['GET'])
+def profile_memory(profile_id):
+    """
+    Admin endpoint to fetch the allocation profile of a request sent with X-Profile-Memory, as folded
+    stacks weighted in bytes. Profiles are kept by the worker that handled the request (X-Worker-Pid).
+    """
+    if not is_admin():
+        return jsonify({"error": "Not found"}), 404
+    profile = get_memory_profile(profile_id)
+    if profile is None:
+        return jsonify({"error": "Memory profile not found in this worker"}), 404
+    return Response(profile["folded"], mimetype="text/plain", headers={
+        "X-Allocated-Bytes": str(profile["allocated_bytes"]),
+        "X-Peak-Traced-Bytes": str(profile["peak_traced_bytes"])
+    })
 
 @app.route('/parse_candidate', methods=['POST'])
 def parse_candidate_data():
@@ -38,7 +448,7 @@ def parse_candidate_data():
         resume_file.save(resume_path)
 
         # Parse candidate data using the agent
-        result = parser_agent.parse_candidate(resume_path, answers_array, github_url)
+        result = get_agent("parser").parse_candidate(resume_path, answers_array, github_url)
 
         # Clean up temporary file
         os.remove(resume_path)
@@ -79,11 +489,8 @@ def evaluate_candidate_data():
         resume_path = f"temp_{resume_file.filename}"
         resume_file.save(resume_path)
 
-        # Initialize the evaluator agent
-        evaluator_agent = TechnicalDepthEvaluatorAgent()
-
-        # Evaluate candidate data using the agent
-        result = evaluator_agent.evaluate_candidate(resume_path, answers_array, github_url, job_description)
+        # Evaluate candidate data using the shared evaluator agent
+        result = get_agent("technical").evaluate_candidate(resume_path, answers_array, github_url, job_description)
 
         # Clean up temporary file
         os.remove(resume_path)
@@ -125,16 +532,15 @@ def evaluate_cultural_fit():
         resume_file.save(resume_path)
 
         # Parse candidate data using the parser agent
-        candidate_data = parser_agent.parse_candidate(resume_path, answers_array, github_url)
+        candidate_data = get_agent("parser").parse_candidate(resume_path, answers_array, github_url)
         if "error" in candidate_data:
             os.remove(resume_path)
+            if candidate_data.get("deadline_exceeded"):
+                return jsonify(candidate_data), 504
             return jsonify({"error": f"Candidate parsing failed: {candidate_data['error']}"}), 500
 
-        # Initialize the cultural fit evaluator agent
-        cultural_evaluator = CulturalFitEvaluatorAgent()
-
-        # Evaluate cultural fit
-        result = cultural_evaluator.evaluate_cultural_fit(candidate_data, job_description)
+        # Evaluate cultural fit using the shared evaluator agent
+        result = get_agent("cultural").evaluate_cultural_fit(candidate_data, job_description)
 
         # Clean up temporary file
         os.remove(resume_path)
@@ -177,18 +583,283 @@ def aggregate_score():
             except json.JSONDecodeError:
                 return jsonify({"error": "Invalid JSON format for weights"}), 400
 
-        # Calculate aggregated score
-        result = scoring_agent.calculate_score(
+        # A job's leaderboard is keyed by candidate, so scores recorded on it must name one
+        if request.form.get('job_id') and not (isinstance(technical_evaluation, dict) and technical_evaluation.get('candidate_id')):
+            return jsonify({"error": "technical_evaluation must include candidate_id when job_id is given"}), 400
+
+        # Calculate aggregated score (and update the job's leaderboard when job_id is given)
+        result = get_agent("scoring").calculate_score(
             technical_evaluation=technical_evaluation,
             communication_evaluation=communication_evaluation,
             cultural_evaluation=cultural_evaluation,
-            weights=weights
+            weights=weights,
+            job_id=request.form.get('job_id')
+        )
+
+        return jsonify(result), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/reevaluate_candidate', methods=['POST'])
+def reevaluate_candidate():
+    """
+    Endpoint to run the full pipeline (parse, technical, communication, cultural, aggregate) for a candidate,
+    recomputing only the stages whose inputs changed since the last evaluation with the same candidate_key.
+    Expects the /evaluate_candidate fields plus candidate_key, and optional job_id and weights.
+    Returns every stage output and a per-stage "reused"/"recomputed" report.
+    """
+    try:
+        # Check if required data is provided
+        required_fields = ['answers', 'github_url', 'job_description', 'candidate_key']
+        if 'resume' not in request.files or not all(field in request.form for field in required_fields):
+            return jsonify({"error": "Missing resume file, answers, GitHub URL, job description, or candidate_key"}), 400
+
+        resume_file = request.files['resume']
+        github_url = request.form['github_url']
+        job_description = request.form['job_description']
+
+        try:
+            # Parse answers as JSON array
+            answers_array = json.loads(request.form['answers'])
+            if not isinstance(answers_array, list) or not all(isinstance(item, dict) and 'text' in item and 'type' in item for item in answers_array):
+                return jsonify({"error": "Answers must be a JSON array of objects with 'text' and 'type' fields"}), 400
+        except json.JSONDecodeError:
+            return jsonify({"error": "Invalid JSON format for answers"}), 400
+
+        weights = None
+        if 'weights' in request.form:
+            try:
+                weights = json.loads(request.form['weights'])
+            except json.JSONDecodeError:
+                return jsonify({"error": "Invalid JSON format for weights"}), 400
+
+        # Save resume temporarily
+        resume_path = f"temp_{resume_file.filename}"
+        resume_file.save(resume_path)
+
+        result = get_agent("incremental").reevaluate(
+            request.form['candidate_key'], resume_path, answers_array, github_url, job_description,
+            weights=weights, job_id=request.form.get('job_id')
         )
 
+        # Clean up temporary file
+        os.remove(resume_path)
+
+        if "error" in result:
+            return jsonify(result), 500
+        return jsonify(result), 200
+
+    except Exception as e:
+        if 'resume_path' in locals() and os.path.exists(resume_path):
+            os.remove(resume_path)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/evaluate_roles', methods=['POST'])
+def evaluate_roles():
+    """
+    Endpoint to evaluate one candidate against many job descriptions, parsing the candidate once.
+    Expects roles (JSON array of job descriptions or {role_id, job_description} objects, at most 50), optional
+    weights ({technical, communication, cultural}), and either candidate_id of a stored candidate or the
+    /parse_candidate fields (resume file, answers, GitHub URL).
+    Returns a role-by-dimension score matrix, best role first, with each role's evaluations.
+    """
+    options, error = parse_multi_role_request(request.form)
+    if error:
+        return jsonify({"error": error}), 400
+
+    try:
+        if request.form.get('candidate_id'):
+            candidate_data = get_agent("multi_role").load_candidate(request.form['candidate_id'])
+            if candidate_data is None:
+                return jsonify({"error": "Candidate not found"}), 404
+            return jsonify(get_agent("multi_role").evaluate(candidate_data, **options)), 200
+
+        if 'resume' not in request.files or 'answers' not in request.form or 'github_url' not in request.form:
+            return jsonify({"error": "Missing candidate_id, or resume file, answers, and GitHub URL"}), 400
+
+        resume_file = request.files['resume']
+        try:
+            # Parse answers as JSON array
+            answers_array = json.loads(request.form['answers'])
+            if not isinstance(answers_array, list) or not all(isinstance(item, dict) and 'text' in item and 'type' in item for item in answers_array):
+                return jsonify({"error": "Answers must be a JSON array of objects with 'text' and 'type' fields"}), 400
+        except json.JSONDecodeError:
+            return jsonify({"error": "Invalid JSON format for answers"}), 400
+
+        # Save resume temporarily
+        resume_path = f"temp_{resume_file.filename}"
+        resume_file.save(resume_path)
+
+        result = get_agent("multi_role").evaluate_upload(resume_path, answers_array, request.form['github_url'], **options)
+
+        # Clean up temporary file
+        os.remove(resume_path)
+
+        if "error" in result and not result.get("deadline_exceeded"):
+            return jsonify(result), 500
+        return jsonify(result), 200
+
+    except Exception as e:
+        if 'resume_path' in locals() and os.path.exists(resume_path):
+            os.remove(resume_path)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/jobs/<job_id>/leaderboard', methods=['GET'])
+def job_leaderboard(job_id):
+    """
+    Endpoint to page through a job's candidates by final score, best first.
+    Accepts optional limit (default 20, max 500) and offset query parameters.
+    """
+    try:
+        limit = int(request.args.get('limit', 20))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    if limit < 1 or limit > 500 or offset < 0:
+        return jsonify({"error": "limit must be between 1 and 500 and offset must be non-negative"}), 400
+
+    try:
+        return jsonify(get_agent("scoring").leaderboard.top(job_id, limit=limit, offset=offset)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/jobs/<job_id>/leaderboard/<candidate_id>', methods=['GET'])
+def candidate_rank(job_id, candidate_id):
+    """
+    Endpoint to get a candidate's rank on a job's leaderboard.
+    """
+    try:
+        result = get_agent("scoring").leaderboard.rank(job_id, candidate_id)
+        if result is None:
+            return jsonify({"error": "Candidate has no score for this job"}), 404
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/jobs/<job_id>/funnel', methods=['GET'])
+def funnel_report(job_id):
+    """
+    Endpoint to report a job's evaluation funnel: thresholds, candidates reaching each stage,
+    conversion between stages, rejection reasons, and LLM spend per stage.
+    """
+    try:
+        return jsonify(get_agent("funnel").report(job_id)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/jobs/<job_id>/funnel', methods=['PUT'])
+def funnel_configure(job_id):
+    """
+    Endpoint to tune a job's funnel thresholds. Expects a JSON object with any of required_skills, skills,
+    min_skill_overlap, min_years_experience, min_technical_score and aggregate.
+    """
+    try:
+        config, error = get_agent("funnel").set_config(job_id, request.get_json(silent=True))
+        if error:
+            return jsonify({"error": error}), 400
+        return jsonify(config), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/jobs/<job_id>/funnel/evaluate', methods=['POST'])
+def funnel_evaluate(job_id):
+    """
+    Endpoint to run a candidate through the job's funnel: a local prescreen, then a cheap technical
+    evaluation, then communication, cultural and aggregate scoring, stopping at the first tier that rejects.
+    Expects the /evaluate_candidate fields and optional weights.
+    """
+    try:
+        # Check if required data is provided
+        if 'resume' not in request.files or 'answers' not in request.form or 'github_url' not in request.form or 'job_description' not in request.form:
+            return jsonify({"error": "Missing resume file, answers, GitHub URL, or job description"}), 400
+
+        resume_file = request.files['resume']
+        try:
+            # Parse answers as JSON array
+            answers_array = json.loads(request.form['answers'])
+            if not isinstance(answers_array, list) or not all(isinstance(item, dict) and 'text' in item and 'type' in item for item in answers_array):
+                return jsonify({"error": "Answers must be a JSON array of objects with 'text' and 'type' fields"}), 400
+        except json.JSONDecodeError:
+            return jsonify({"error": "Invalid JSON format for answers"}), 400
+
+        weights = None
+        if 'weights' in request.form:
+            try:
+                weights = json.loads(request.form['weights'])
+            except json.JSONDecodeError:
+                return jsonify({"error": "Invalid JSON format for weights"}), 400
+
+        # Save resume temporarily
+        resume_path = f"temp_{resume_file.filename}"
+        resume_file.save(resume_path)
+
+        result = get_agent("funnel").evaluate(job_id, request.form['job_description'], resume_path, answers_array,
+                                              request.form['github_url'], weights=weights)
+
+        # Clean up temporary file
+        os.remove(resume_path)
+
+        if "error" in result and not result.get("deadline_exceeded"):
+            return jsonify(result), 500
         return jsonify(result), 200
 
+    except Exception as e:
+        if 'resume_path' in locals() and os.path.exists(resume_path):
+            os.remove(resume_path)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/jobs/screen', methods=['POST'])
+def screen_candidates():
+    """
+    Endpoint to rank the whole stored candidate pool against a new job description before any LLM calls.
+    Expects job_description, and optional top_n (default 100), required_skills and exclude (JSON arrays of
+    skills and candidate IDs), min_similarity, and evaluate (number of top candidates to evaluate technically).
+    """
+    options, error = parse_screen_request(request.form)
+    if error:
+        return jsonify({"error": error}), 400
+
+    try:
+        return jsonify(get_agent("screening").screen(**options)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/candidates/<candidate_id>/similar', methods=['GET'])
+def similar_candidates(candidate_id):
+    """
+    Endpoint to find the candidates whose profiles are most similar to a candidate's.
+    Accepts an optional k query parameter (default 10, max 100).
+    """
+    try:
+        k = int(request.args.get('k', 10))
+    except ValueError:
+        return jsonify({"error": "k must be an integer"}), 400
+    if k < 1 or k > 100:
+        return jsonify({"error": "k must be between 1 and 100"}), 400
+
+    try:
+        result = get_profile_index().similar(candidate_id, k)
+        if result is None:
+            return jsonify({"error": "Candidate profile is not indexed"}), 404
+        return jsonify({"candidate_id": candidate_id, "similar": result}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/candidates/<candidate_id>/duplicates', methods=['GET'])
+def duplicate_candidates(candidate_id):
+    """
+    Endpoint to list candidates that are probably the same person as a candidate.
+    """
+    try:
+        result = get_profile_index().duplicates(candidate_id)
+        if result is None:
+            return jsonify({"error": "Candidate profile is not indexed"}), 404
+        return jsonify({"candidate_id": candidate_id, "duplicates": result}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
+    # Development server only; use serve.py for production
+    warmup()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
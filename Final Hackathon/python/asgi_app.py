@@ -0,0 +1,459 @@
+"""
+ASGI (async) variant of the candidate evaluation service.
+
+Exposes the same endpoints and response shapes as app.py, but every agent call goes
+through the async agent methods (ainvoke, httpx, Motor), so an in-flight evaluation
+waits on the network without holding an OS thread. A single process can therefore
+hold hundreds of concurrent evaluations.
+
+Usage: uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+"""
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, File, Form, Request, UploadFile
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from agents import CandidateDataParserAgent, TechnicalDepthEvaluatorAgent, CulturalFitEvaluatorAgent, ScoringAndAggregationAgent, get_async_mongo_client
+from hedging import llm_hedger
+from routing import model_router
+from ledger import llm_ledger, set_ledger_context, reset_ledger_context, GROUP_FIELDS
+from scheduler import llm_scheduler, set_scheduling_context, reset_scheduling_context, SLOTS_PER_EVALUATION
+from communication_prescore import set_feedback_context, reset_feedback_context
+from admission import AdmissionController, AdmissionRejected
+from deadlines import deadline_scope, parse_deadline_seconds
+from similarity import get_profile_index
+from screening import CandidateScreener, parse_screen_request
+from multi_role import MultiRoleEvaluator, parse_multi_role_request
+from funnel import CandidateFunnel
+import asyncio
+import json
+import os
+import tempfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+AGENT_FACTORIES = {
+    "parser": CandidateDataParserAgent,
+    "technical": TechnicalDepthEvaluatorAgent,
+    "cultural": CulturalFitEvaluatorAgent,
+    "scoring": ScoringAndAggregationAgent,
+}
+agents = {}
+
+# Evaluations do not hold a thread here, so only their memory and per-tenant count bound them;
+# requests are never deferred, since waiting for capacity would block the event loop
+EVALUATION_PATHS = {"/parse_candidate", "/evaluate_candidate", "/evaluate_cultural_fit", "/jobs/screen", "/evaluate_roles"}
+# Funnel evaluations carry the job in the path (/jobs/{job_id}/funnel/evaluate)
+EVALUATION_PATH_SUFFIXES = ("/funnel/evaluate",)
+admission_controller = AdmissionController(max_inflight=int(os.getenv("ASGI_ADMISSION_MAX_INFLIGHT", "256")), queue_seconds=0)
+if not os.getenv("SCHEDULER_MAX_CONCURRENCY"):
+    # The scheduler's default is sized for the threaded server's admission limit
+    llm_scheduler.resize(SLOTS_PER_EVALUATION * admission_controller.max_inflight)
+
+@asynccontextmanager
+async def lifespan(app):
+    # Building the agents embeds the RAG benchmarks synchronously, so keep it off the event loop
+    built = await asyncio.to_thread(lambda: {name: factory() for name, factory in AGENT_FACTORIES.items()})
+    agents.update(built)
+    logger.info(f"Warmed up agents: {', '.join(agents)}")
+    yield
+    agents.clear()
+
+app = FastAPI(
+    title="Candidate Evaluation API (async)",
+    description="Async execution path for resume parsing, technical, communication and cultural evaluation, and scoring",
+    lifespan=lifespan
+)
+
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request, exc):
+    # Match the Flask service: missing form fields are a 400 with an "error" message
+    fields = [str(err["loc"][-1]) for err in exc.errors()]
+    return JSONResponse({"error": f"Missing or invalid fields: {', '.join(fields)}"}, status_code=400)
+
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    ticket = None
+    if request.method == "POST" and (request.url.path in EVALUATION_PATHS or request.url.path.endswith(EVALUATION_PATH_SUFFIXES)):
+        content_length = request.headers.get("Content-Length")
+        try:
+            ticket = admission_controller.admit(request.headers.get("X-Tenant-Id"), int(content_length) if content_length else None,
+                                                 priority=request.headers.get("X-Priority"))
+        except AdmissionRejected as e:
+            headers = {"Retry-After": str(e.retry_after)} if e.retry_after is not None else None
+            return JSONResponse({"error": str(e), "reason": e.reason}, status_code=e.status_code, headers=headers)
+    # Every stage of the evaluation shares the client's budget (X-Request-Deadline, in seconds)
+    # LLM spend is attributed to the job named in X-Job-Id
+    token = set_ledger_context(job_id=request.headers.get("X-Job-Id"))
+    # LLM calls queue fairly per tenant (X-Tenant-Id), interactive ahead of bulk (X-Priority)
+    scheduling_token = set_scheduling_context(request.headers.get("X-Tenant-Id"), request.headers.get("X-Priority"))
+    # Communication is scored locally unless borderline or the client asks for narrative feedback (X-Communication-Feedback)
+    feedback_token = set_feedback_context(request.headers.get("X-Communication-Feedback"))
+    try:
+        with deadline_scope(parse_deadline_seconds(request.headers.get("X-Request-Deadline"))):
+            return await call_next(request)
+    finally:
+        reset_feedback_context(feedback_token)
+        reset_scheduling_context(scheduling_token)
+        reset_ledger_context(token)
+        if ticket is not None:
+            admission_controller.release(ticket)
+
+def result_response(result):
+    """
+    JSON response for an agent result; 504 when it stopped at the deadline before producing anything.
+    """
+    status_code = 504 if isinstance(result, dict) and result.get("deadline_exceeded") else 200
+    return JSONResponse(result, status_code=status_code)
+
+def parse_answers(answers):
+    """
+    Parse the answers form field. Returns (answers_array, None) or (None, error_response).
+    """
+    try:
+        answers_array = json.loads(answers)
+        if not isinstance(answers_array, list) or not all(isinstance(item, dict) and 'text' in item and 'type' in item for item in answers_array):
+            return None, JSONResponse({"error": "Answers must be a JSON array of objects with 'text' and 'type' fields"}, status_code=400)
+    except json.JSONDecodeError:
+        return None, JSONResponse({"error": "Invalid JSON format for answers"}, status_code=400)
+    return answers_array, None
+
+async def save_upload(resume):
+    """
+    Write the uploaded resume to a unique temporary file, keeping its extension for format detection.
+    """
+    suffix = os.path.splitext(resume.filename or "")[1]
+    content = await resume.read()
+
+    def write():
+        with tempfile.NamedTemporaryFile(prefix="temp_", suffix=suffix, delete=False) as f:
+            f.write(content)
+            return f.name
+
+    return await asyncio.to_thread(write)
+
+@app.get("/healthz")
+async def liveness():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readiness():
+    missing = [name for name in AGENT_FACTORIES if name not in agents]
+    if missing:
+        return JSONResponse({"status": "warming_up", "missing_agents": missing}, status_code=503)
+    try:
+        await asyncio.wait_for(get_async_mongo_client().admin.command("ping"), timeout=2)
+    except Exception as e:
+        return JSONResponse({"status": "unavailable", "error": f"MongoDB ping failed: {str(e)}"}, status_code=503)
+    return {"status": "ready"}
+
+@app.get("/metrics/llm")
+async def llm_metrics():
+    return llm_hedger.snapshot()
+
+@app.get("/metrics/llm/routing")
+async def llm_routing_metrics():
+    return model_router.snapshot()
+
+@app.get("/metrics/scheduler")
+async def scheduler_metrics():
+    return llm_scheduler.snapshot()
+
+@app.get("/metrics/admission")
+async def admission_metrics():
+    return admission_controller.snapshot()
+
+@app.get("/metrics/llm/cost")
+async def llm_cost(group_by: str = "stage", job_id: Optional[str] = None, kind: Optional[str] = None,
+                   since: Optional[str] = None, until: Optional[str] = None):
+    """
+    Async counterpart of GET /metrics/llm/cost in app.py.
+    """
+    fields = [field.strip() for field in group_by.split(",") if field.strip()]
+    if not fields or any(field not in GROUP_FIELDS for field in fields):
+        return JSONResponse({"error": f"group_by must be a comma-separated list of {', '.join(GROUP_FIELDS)}"}, status_code=400)
+    try:
+        return JSONResponse(await asyncio.to_thread(llm_ledger.rollup, fields, job_id, since, until, kind), status_code=200)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@app.post("/parse_candidate")
+async def parse_candidate_data(resume: UploadFile = File(...), answers: str = Form(...), github_url: str = Form(...)):
+    """
+    Async counterpart of POST /parse_candidate in app.py.
+    """
+    answers_array, error_response = parse_answers(answers)
+    if error_response:
+        return error_response
+
+    resume_path = None
+    try:
+        resume_path = await save_upload(resume)
+        result = await agents["parser"].aparse_candidate(resume_path, answers_array, github_url)
+        return result_response(result)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+    finally:
+        if resume_path and os.path.exists(resume_path):
+            os.remove(resume_path)
+
+@app.post("/evaluate_candidate")
+async def evaluate_candidate_data(resume: UploadFile = File(...), answers: str = Form(...), github_url: str = Form(...), job_description: str = Form(...)):
+    """
+    Async counterpart of POST /evaluate_candidate in app.py.
+    """
+    answers_array, error_response = parse_answers(answers)
+    if error_response:
+        return error_response
+
+    resume_path = None
+    try:
+        resume_path = await save_upload(resume)
+        result = await agents["technical"].aevaluate_candidate(resume_path, answers_array, github_url, job_description)
+        return result_response(result)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+    finally:
+        if resume_path and os.path.exists(resume_path):
+            os.remove(resume_path)
+
+@app.post("/evaluate_cultural_fit")
+async def evaluate_cultural_fit(resume: UploadFile = File(...), answers: str = Form(...), github_url: str = Form(...), job_description: str = Form(...)):
+    """
+    Async counterpart of POST /evaluate_cultural_fit in app.py.
+    """
+    answers_array, error_response = parse_answers(answers)
+    if error_response:
+        return error_response
+
+    resume_path = None
+    try:
+        resume_path = await save_upload(resume)
+        candidate_data = await agents["parser"].aparse_candidate(resume_path, answers_array, github_url)
+        if candidate_data.get("deadline_exceeded"):
+            return result_response(candidate_data)
+        if "error" in candidate_data:
+            return JSONResponse({"error": f"Candidate parsing failed: {candidate_data['error']}"}, status_code=500)
+
+        result = await agents["cultural"].aevaluate_cultural_fit(candidate_data, job_description)
+        return result_response(result)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+    finally:
+        if resume_path and os.path.exists(resume_path):
+            os.remove(resume_path)
+
+@app.post("/aggregate_score")
+async def aggregate_score(technical_evaluation: str = Form(...), communication_evaluation: str = Form(...), cultural_evaluation: str = Form(...), weights: Optional[str] = Form(None), job_id: Optional[str] = Form(None)):
+    """
+    Async counterpart of POST /aggregate_score in app.py.
+    """
+    try:
+        technical = json.loads(technical_evaluation)
+        communication = json.loads(communication_evaluation)
+        cultural = json.loads(cultural_evaluation)
+    except json.JSONDecodeError:
+        return JSONResponse({"error": "Invalid JSON format for evaluations"}, status_code=400)
+
+    parsed_weights = None
+    if weights is not None:
+        try:
+            parsed_weights = json.loads(weights)
+            if not isinstance(parsed_weights, dict) or not all(k in parsed_weights for k in ['technical', 'communication', 'cultural', 'optional']):
+                return JSONResponse({"error": "Weights must be a JSON object with technical, communication, cultural, and optional keys"}, status_code=400)
+        except json.JSONDecodeError:
+            return JSONResponse({"error": "Invalid JSON format for weights"}, status_code=400)
+
+    # A job's leaderboard is keyed by candidate, so scores recorded on it must name one
+    if job_id and not (isinstance(technical, dict) and technical.get("candidate_id")):
+        return JSONResponse({"error": "technical_evaluation must include candidate_id when job_id is given"}, status_code=400)
+
+    if job_id:
+        # Each request runs in its own task, so the context is not reset explicitly
+        set_ledger_context(job_id=job_id)
+    try:
+        result = await agents["scoring"].acalculate_score(
+            technical_evaluation=technical,
+            communication_evaluation=communication,
+            cultural_evaluation=cultural,
+            weights=parsed_weights,
+            job_id=job_id
+        )
+        return result_response(result)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@app.get("/jobs/{job_id}/leaderboard")
+async def job_leaderboard(job_id: str, limit: int = 20, offset: int = 0):
+    """
+    Async counterpart of GET /jobs/<job_id>/leaderboard in app.py.
+    """
+    if limit < 1 or limit > 500 or offset < 0:
+        return JSONResponse({"error": "limit must be between 1 and 500 and offset must be non-negative"}, status_code=400)
+    try:
+        result = await asyncio.to_thread(agents["scoring"].leaderboard.top, job_id, limit, offset)
+        return JSONResponse(result, status_code=200)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@app.get("/jobs/{job_id}/leaderboard/{candidate_id}")
+async def candidate_rank(job_id: str, candidate_id: str):
+    """
+    Async counterpart of GET /jobs/<job_id>/leaderboard/<candidate_id> in app.py.
+    """
+    try:
+        result = await asyncio.to_thread(agents["scoring"].leaderboard.rank, job_id, candidate_id)
+        if result is None:
+            return JSONResponse({"error": "Candidate has no score for this job"}, status_code=404)
+        return JSONResponse(result, status_code=200)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+def get_funnel():
+    return CandidateFunnel(agents["parser"], agents["technical"], agents["cultural"], agents["scoring"])
+
+@app.get("/jobs/{job_id}/funnel")
+async def funnel_report(job_id: str):
+    """
+    Async counterpart of GET /jobs/<job_id>/funnel in app.py.
+    """
+    try:
+        return JSONResponse(await asyncio.to_thread(get_funnel().report, job_id), status_code=200)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@app.put("/jobs/{job_id}/funnel")
+async def funnel_configure(job_id: str, request: Request):
+    """
+    Async counterpart of PUT /jobs/<job_id>/funnel in app.py.
+    """
+    try:
+        overrides = await request.json()
+    except ValueError:
+        overrides = None
+    try:
+        config, error = await asyncio.to_thread(get_funnel().set_config, job_id, overrides)
+        if error:
+            return JSONResponse({"error": error}, status_code=400)
+        return JSONResponse(config, status_code=200)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@app.post("/jobs/{job_id}/funnel/evaluate")
+async def funnel_evaluate(job_id: str, resume: UploadFile = File(...), answers: str = Form(...), github_url: str = Form(...),
+                          job_description: str = Form(...), weights: str = Form("")):
+    """
+    Async counterpart of POST /jobs/<job_id>/funnel/evaluate in app.py.
+    """
+    answers_array, error_response = parse_answers(answers)
+    if error_response:
+        return error_response
+    try:
+        weights_dict = json.loads(weights) if weights else None
+    except json.JSONDecodeError:
+        return JSONResponse({"error": "Invalid JSON format for weights"}, status_code=400)
+
+    resume_path = None
+    # The job in the URL owns the LLM spend of every stage
+    token = set_ledger_context(job_id=job_id)
+    try:
+        resume_path = await save_upload(resume)
+        # The funnel's tiers run sequentially with blocking agent calls, so keep them off the event loop
+        result = await asyncio.to_thread(get_funnel().evaluate, job_id, job_description, resume_path, answers_array, github_url, weights_dict)
+        if "error" in result and not result.get("deadline_exceeded"):
+            return JSONResponse(result, status_code=500)
+        return result_response(result)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+    finally:
+        reset_ledger_context(token)
+        if resume_path and os.path.exists(resume_path):
+            os.remove(resume_path)
+
+@app.post("/jobs/screen")
+async def screen_candidates(job_description: str = Form(...), top_n: str = Form("100"), required_skills: str = Form("[]"),
+                            exclude: str = Form("[]"), min_similarity: str = Form(""), evaluate: str = Form("0")):
+    """
+    Async counterpart of POST /jobs/screen in app.py.
+    """
+    options, error = parse_screen_request({
+        "job_description": job_description, "top_n": top_n, "required_skills": required_skills,
+        "exclude": exclude, "min_similarity": min_similarity, "evaluate": evaluate
+    })
+    if error:
+        return JSONResponse({"error": error}, status_code=400)
+    try:
+        result = await asyncio.to_thread(CandidateScreener(agents["technical"]).screen, **options)
+        return JSONResponse(result, status_code=200)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@app.post("/evaluate_roles")
+async def evaluate_roles(roles: str = Form(...), weights: str = Form(""), candidate_id: str = Form(""),
+                         resume: Optional[UploadFile] = File(None), answers: str = Form(""), github_url: str = Form("")):
+    """
+    Async counterpart of POST /evaluate_roles in app.py.
+    """
+    options, error = parse_multi_role_request({"roles": roles, "weights": weights})
+    if error:
+        return JSONResponse({"error": error}, status_code=400)
+    evaluator = MultiRoleEvaluator(agents["technical"], agents["cultural"])
+    if candidate_id:
+        try:
+            candidate_data = await asyncio.to_thread(evaluator.load_candidate, candidate_id)
+            if candidate_data is None:
+                return JSONResponse({"error": "Candidate not found"}, status_code=404)
+            return result_response(await asyncio.to_thread(evaluator.evaluate, candidate_data, **options))
+        except Exception as e:
+            return JSONResponse({"error": str(e)}, status_code=500)
+
+    if resume is None or not answers or not github_url:
+        return JSONResponse({"error": "Missing candidate_id, or resume file, answers, and GitHub URL"}, status_code=400)
+    answers_array, error_response = parse_answers(answers)
+    if error_response:
+        return error_response
+
+    resume_path = None
+    try:
+        resume_path = await save_upload(resume)
+        candidate_data = await agents["parser"].aparse_candidate(resume_path, answers_array, github_url)
+        if candidate_data.get("deadline_exceeded"):
+            return result_response(candidate_data)
+        if "error" in candidate_data:
+            return JSONResponse({"error": f"Candidate parsing failed: {candidate_data['error']}"}, status_code=500)
+        # The per-role evaluations run on a bounded thread pool of their own
+        return result_response(await asyncio.to_thread(evaluator.evaluate, candidate_data, **options))
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+    finally:
+        if resume_path and os.path.exists(resume_path):
+            os.remove(resume_path)
+
+@app.get("/candidates/{candidate_id}/similar")
+async def similar_candidates(candidate_id: str, k: int = 10):
+    """
+    Async counterpart of GET /candidates/<candidate_id>/similar in app.py.
+    """
+    if k < 1 or k > 100:
+        return JSONResponse({"error": "k must be between 1 and 100"}, status_code=400)
+    try:
+        result = await asyncio.to_thread(lambda: get_profile_index().similar(candidate_id, k))
+        if result is None:
+            return JSONResponse({"error": "Candidate profile is not indexed"}, status_code=404)
+        return JSONResponse({"candidate_id": candidate_id, "similar": result}, status_code=200)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@app.get("/candidates/{candidate_id}/duplicates")
+async def duplicate_candidates(candidate_id: str):
+    """
+    Async counterpart of GET /candidates/<candidate_id>/duplicates in app.py.
+    """
+    try:
+        result = await asyncio.to_thread(lambda: get_profile_index().duplicates(candidate_id))
+        if result is None:
+            return JSONResponse({"error": "Candidate profile is not indexed"}, status_code=404)
+        return JSONResponse({"candidate_id": candidate_id, "duplicates": result}, status_code=200)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
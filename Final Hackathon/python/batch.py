@@ -0,0 +1,395 @@
+"""
+Offline bulk evaluation through JSONL batch files.
+
+For overnight re-scoring, instead of one chain.invoke per prompt, every prompt the agents
+would send is rendered into a JSONL file in the OpenAI Batch API format, processed in
+bulk (by the Batch API or LocalBatchProcessor), and the results file is ingested back
+through the agents' own parsing and persistence methods.
+
+A run is described by a job file: {"job_description", "job_id", "weights", "candidate_ids"}
+(candidate_ids defaults to every stored candidate) and goes through two rounds:
+- evaluate: communication (one request per answer chunk), technical and cultural prompts;
+  ingestion saves communication_evaluations, evaluations and cultural_evaluations
+- score: the optional factors prompt, which needs the round 1 evaluations; ingestion
+  saves aggregate_scores and updates the job's leaderboard
+
+Custom ids are "<candidate_id>:<stage>:<hash of the request body>", so rendering the
+same inputs twice gives the same ids, and a result whose inputs changed after rendering
+is reported as stale instead of being ingested. Progress is kept in the batch_runs
+collection; ingesting a results file again skips candidates already ingested.
+
+Usage:
+    python batch.py render --job job.json --round evaluate --out requests.jsonl
+    python batch.py submit --requests requests.jsonl          (OpenAI Batch API)
+    python batch.py fetch --batch-id <id> --results results.jsonl
+    python batch.py process-local --requests requests.jsonl --results results.jsonl
+    python batch.py ingest --job job.json --round evaluate --results results.jsonl
+"""
+import argparse
+import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from bson import ObjectId
+from incremental import fingerprint
+from ledger import llm_ledger
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+ROUNDS = ["evaluate", "score"]
+
+def render_request(chain, inputs):
+    """
+    The Batch API request body a prompt | llm | parser chain would send for inputs.
+    """
+    model = next((step for step in chain.middle if hasattr(step, "model_name")), None)
+    return {
+        "model": getattr(model, "model_name", "gpt-4o-mini"),
+        "temperature": getattr(model, "temperature", 0),
+        "messages": [{"role": "user", "content": chain.first.format(**inputs)}]
+    }
+
+def custom_id(candidate_id, stage, body):
+    return f"{candidate_id}:{stage}:{fingerprint(body)[:16]}"
+
+def saved_id(result):
+    """
+    The id returned by an agent's save_to_mongodb; raises on its {"error": ...} result.
+    """
+    if isinstance(result, dict):
+        raise ValueError(result["error"])
+    return result
+
+def read_results(path):
+    """
+    Read a Batch API results file into {custom_id: (content, error, (model, prompt tokens, completion tokens))}.
+    """
+    results = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            body = response.get("body") or {}
+            usage = body.get("usage") or {}
+            usage = (body.get("model"), usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+            if record.get("error") or response.get("status_code") != 200:
+                results[record["custom_id"]] = (None, str(record.get("error") or body), usage)
+            else:
+                results[record["custom_id"]] = (body["choices"][0]["message"]["content"], None, usage)
+    return results
+
+class LocalBatchProcessor:
+    """
+    Processes a batch requests file locally into a results file in the Batch API format.
+    complete(body) returns the assistant message content for one request body.
+    """
+    def __init__(self, complete, max_workers=8):
+        self.complete = complete
+        self.max_workers = max_workers
+
+    def _process(self, request):
+        try:
+            content = self.complete(request["body"])
+            return {
+                "id": f"batch_req_{request['custom_id']}",
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "body": {"model": request["body"]["model"],
+                                                          "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}},
+                "error": None
+            }
+        except Exception as e:
+            return {"id": f"batch_req_{request['custom_id']}", "custom_id": request["custom_id"], "response": None,
+                    "error": {"code": "local_error", "message": str(e)}}
+
+    def process(self, requests_path, results_path):
+        with open(requests_path) as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self._process, requests))
+        with open(results_path, "w") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+        return len(results)
+
+class BatchEvaluator:
+    """
+    Renders the agents' prompts for a job into batch files and ingests the batch results.
+    """
+    def __init__(self, technical_agent, cultural_agent, scoring_agent):
+        self.technical_agent = technical_agent
+        self.communication_agent = technical_agent.communication_agent
+        self.cultural_agent = cultural_agent
+        self.scoring_agent = scoring_agent
+        self.db = technical_agent.db
+        self.store = technical_agent.store
+        self.runs = self.db["batch_runs"]
+
+    def run_id(self, job):
+        return job.get("run_id") or fingerprint(job["job_description"], job.get("job_id", ""), job.get("weights"))[:12]
+
+    def candidate_ids(self, job):
+        if job.get("candidate_ids"):
+            return [candidate_id for candidate_id in job["candidate_ids"] if ObjectId.is_valid(candidate_id)]
+        return [str(candidate["_id"]) for candidate in self.db["candidates"].find({"error": {"$exists": False}}, {"_id": 1})]
+
+    def _load_candidate(self, candidate_id):
+        candidate_data = self.store.load("candidates", {"_id": ObjectId(candidate_id)})
+        if candidate_data is None:
+            return None
+        candidate_data.pop("_id", None)
+        candidate_data["mongo_id"] = candidate_id
+        return candidate_data
+
+    def _evaluation_requests(self, candidate_data, job_description):
+        """
+        Request bodies of the evaluate round for one candidate, as {stage: body}; the same
+        inputs evaluate_communication, evaluate_technical and evaluate_cultural_fit send.
+        """
+        requests = {}
+        answers = candidate_data.get("answers", [])
+        for index, chunk in enumerate(self.communication_agent._chunk_answers(answers) if answers else []):
+            requests[f"communication.{index}"] = render_request(self.communication_agent.chain, {"answers": json.dumps(chunk)})
+
+        requests["technical"] = render_request(self.technical_agent.chain, {
+            "candidate_data": json.dumps(candidate_data, indent=2),
+            "job_description": job_description,
+            "retrieved_context": self.technical_agent._retrieve_context(job_description, str(candidate_data.get('skills', [])))
+        })
+
+        soft_skills, culture_fit_answers, github_contributions = self.cultural_agent._cultural_inputs(candidate_data)
+        if soft_skills or culture_fit_answers or github_contributions:
+            requests["cultural"] = render_request(self.cultural_agent.chain, {
+                "candidate_data": json.dumps({
+                    "soft_skills": soft_skills,
+                    "culture_fit_answers": culture_fit_answers,
+                    "github_contributions": github_contributions
+                }, indent=2),
+                "job_description": job_description,
+                "retrieved_context": self.cultural_agent._retrieve_context(job_description, f"{soft_skills}\n{json.dumps(culture_fit_answers)}")
+            })
+        return requests
+
+    def _score_state(self, job, run):
+        """
+        The scoring workflow state for a candidate evaluated in round 1, or None if it cannot be scored.
+        """
+        evaluation = self.store.load("evaluations", {"_id": ObjectId(run["evaluation_id"])})
+        cultural = self.cultural_agent.store.load("cultural_evaluations", {"_id": ObjectId(run["cultural_evaluation_id"])})
+        if evaluation is None or cultural is None:
+            return None
+        cultural.pop("_id", None)
+        state = self.scoring_agent._initial_state(
+            dict(evaluation["technical_evaluation"], candidate_id=run["candidate_id"]),
+            evaluation["communication_evaluation"],
+            cultural,
+            job.get("weights"),
+            job.get("job_id")
+        )
+        state = self.scoring_agent.extract_scores(self.scoring_agent.validate_inputs(state))
+        return None if state.get("error") else state
+
+    def _requests_for(self, job, run_id, candidate_id, round_name):
+        if round_name == "evaluate":
+            candidate_data = self._load_candidate(candidate_id)
+            if candidate_data is None:
+                return None, None
+            return candidate_data, self._evaluation_requests(candidate_data, job["job_description"])
+
+        run = self.runs.find_one({"_id": f"{run_id}:{candidate_id}"})
+        if run is None or "evaluated_at" not in run or "cultural_evaluation_id" not in run:
+            return None, None
+        state = self._score_state(job, run)
+        if state is None:
+            return None, None
+        return state, {"optional_factors": render_request(self.scoring_agent.optional_factors_chain, self.scoring_agent._optional_factors_inputs(state))}
+
+    def render(self, job, round_name, out_path):
+        """
+        Write the batch requests file for a round; returns the number of requests.
+        Candidates already ingested for the round are skipped.
+        """
+        run_id = self.run_id(job)
+        done_field = "evaluated_at" if round_name == "evaluate" else "scored_at"
+        count = 0
+        with open(out_path, "w") as f:
+            for candidate_id in self.candidate_ids(job):
+                run = self.runs.find_one({"_id": f"{run_id}:{candidate_id}"}, {done_field: 1})
+                if run is not None and done_field in run:
+                    continue
+                _, requests = self._requests_for(job, run_id, candidate_id, round_name)
+                for stage, body in (requests or {}).items():
+                    f.write(json.dumps({"custom_id": custom_id(candidate_id, stage, body), "method": "POST", "url": BATCH_ENDPOINT, "body": body}) + "\n")
+                    count += 1
+        logger.info(f"Rendered {count} {round_name} requests for run {run_id}")
+        return count
+
+    def _ingest_evaluations(self, job, candidate_data, contents, start_time, run_key, run):
+        """
+        Turn one candidate's evaluate-round responses into saved evaluations, as the real-time path does.
+        Every response is parsed before anything is saved, so a bad response stores nothing. Each
+        saved document's id goes into the candidate's batch_runs record as soon as it is written,
+        so a retry after a failed save does not save the earlier documents (run) again.
+        """
+        saved = {field: run[field] for field in ("communication_evaluation_id", "evaluation_id", "cultural_evaluation_id") if field in run}
+
+        def save_once(field, save, document):
+            if field not in saved:
+                saved[field] = saved_id(save(document))
+                self.runs.update_one({"_id": run_key}, {"$set": {field: saved[field]}}, upsert=True)
+            return saved[field]
+
+        job_description = job["job_description"]
+        chunk_stages = sorted((stage for stage in contents if stage.startswith("communication.")), key=lambda stage: int(stage.split(".")[1]))
+        if chunk_stages:
+            chunk_results = [self.communication_agent._parse_communication(contents[stage]) for stage in chunk_stages]
+            if len(chunk_results) == 1:
+                communication_evaluation = chunk_results[0]
+            else:
+                chunks = self.communication_agent._chunk_answers(candidate_data["answers"])
+                communication_evaluation = self.communication_agent._merge_chunk_evaluations(chunks, chunk_results)
+            communication_evaluation = self.communication_agent._finalize_communication(communication_evaluation, candidate_data, start_time)
+        else:
+            communication_evaluation = {"error": "No answers provided for communication evaluation"}
+        technical_evaluation = self.technical_agent._finalize_technical(contents["technical"], candidate_data, job_description)
+        cultural_evaluation = None
+        if "cultural" in contents:
+            cultural_evaluation = self.cultural_agent._finalize_cultural(contents["cultural"], candidate_data, job_description, start_time)
+
+        if chunk_stages:
+            communication_evaluation["evaluation_id"] = save_once("communication_evaluation_id", self.communication_agent.save_to_mongodb, communication_evaluation)
+        evaluation_result = self.technical_agent._build_evaluation_result(technical_evaluation, communication_evaluation, candidate_data, start_time)
+        save_once("evaluation_id", self.technical_agent.save_to_mongodb, evaluation_result)
+        if cultural_evaluation is not None:
+            save_once("cultural_evaluation_id", self.cultural_agent.save_to_mongodb, cultural_evaluation)
+        return dict(saved)
+
+    def _ingest_score(self, state, contents, start_time):
+        """
+        Finish the scoring workflow with the optional factors response in place of the LLM node.
+        """
+        state = self.scoring_agent._apply_optional_factors(state, contents["optional_factors"])
+        state = self.scoring_agent.save_to_mongodb(self.scoring_agent.aggregate_scores(state))
+        result = self.scoring_agent._format_result(state, start_time)
+        if "error" in result:
+            raise ValueError(result["error"])
+        return {"aggregate_score_id": result["mongo_id"], "final_score": result["final_score"]}
+
+    def ingest(self, job, round_name, results_path):
+        """
+        Ingest a batch results file for a round. Returns counts of ingested, skipped (already
+        ingested), stale (inputs changed since rendering) and failed candidates.
+        """
+        run_id = self.run_id(job)
+        done_field = "evaluated_at" if round_name == "evaluate" else "scored_at"
+        results = read_results(results_path)
+        by_candidate = {}
+        for result_id in results:
+            by_candidate.setdefault(result_id.split(":", 1)[0], []).append(result_id)
+
+        summary = {"run_id": run_id, "round": round_name, "ingested": 0, "skipped": 0, "stale": [], "failed": {}}
+        for candidate_id, result_ids in by_candidate.items():
+            start_time = time.time()
+            run_key = f"{run_id}:{candidate_id}"
+            run = self.runs.find_one({"_id": run_key}) or {}
+            if done_field in run:
+                summary["skipped"] += 1
+                continue
+
+            subject, requests = self._requests_for(job, run_id, candidate_id, round_name)
+            expected = {custom_id(candidate_id, stage, body): stage for stage, body in (requests or {}).items()}
+            if not expected or set(expected) != set(result_ids):
+                summary["stale"].append(candidate_id)
+                continue
+            errors = [results[result_id][1] for result_id in result_ids if results[result_id][1]]
+            if errors:
+                summary["failed"][candidate_id] = errors[0]
+                continue
+
+            contents = {stage: results[result_id][0] for result_id, stage in expected.items()}
+            try:
+                if round_name == "evaluate":
+                    progress = self._ingest_evaluations(job, subject, contents, start_time, run_key, run)
+                else:
+                    progress = self._ingest_score(subject, contents, start_time)
+            except Exception as e:
+                summary["failed"][candidate_id] = f"Ingestion failed: {str(e)}"
+                continue
+            progress[done_field] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+            self.runs.update_one({"_id": run_key}, {"$set": dict(progress, run_id=run_id, candidate_id=candidate_id)}, upsert=True)
+            # Batch spend is recorded once per candidate, when it is ingested: stale and failed
+            # candidates are ingested again from a later results file, which records that spend
+            for result_id in result_ids:
+                model, prompt_tokens, completion_tokens = results[result_id][2]
+                llm_ledger.record("batch", result_id.split(":")[1].split(".")[0], model, prompt_tokens, completion_tokens, 0, job.get("job_id"))
+            summary["ingested"] += 1
+
+        logger.info(f"Ingested {round_name} results for run {run_id}: {summary['ingested']} ingested, "
+                    f"{len(summary['stale'])} stale, {len(summary['failed'])} failed")
+        return summary
+
+def submit_batch(requests_path):
+    """
+    Upload a requests file and start an OpenAI batch; returns the batch id.
+    """
+    from openai import OpenAI
+
+    client = OpenAI()
+    with open(requests_path, "rb") as f:
+        uploaded = client.files.create(file=f, purpose="batch")
+    return client.batches.create(input_file_id=uploaded.id, endpoint=BATCH_ENDPOINT, completion_window="24h").id
+
+def fetch_batch(batch_id, results_path):
+    """
+    Download the results of a completed OpenAI batch; returns the batch status.
+    """
+    from openai import OpenAI
+
+    client = OpenAI()
+    batch = client.batches.retrieve(batch_id)
+    if batch.status == "completed" and batch.output_file_id:
+        client.files.content(batch.output_file_id).write_to_file(results_path)
+    return batch.status
+
+def chat_completion(body):
+    """
+    Run one batch request body through the chat model in real time (for LocalBatchProcessor).
+    """
+    from langchain_openai import ChatOpenAI
+
+    llm = ChatOpenAI(model=body["model"], temperature=body["temperature"])
+    return llm.invoke([(message["role"], message["content"]) for message in body["messages"]]).content
+
+def build_evaluator():
+    from agents import TechnicalDepthEvaluatorAgent, CulturalFitEvaluatorAgent, ScoringAndAggregationAgent
+
+    return BatchEvaluator(TechnicalDepthEvaluatorAgent(), CulturalFitEvaluatorAgent(), ScoringAndAggregationAgent())
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Offline bulk evaluation through JSONL batch files")
+    parser.add_argument("command", choices=["render", "submit", "fetch", "process-local", "ingest"])
+    parser.add_argument("--job", help="job file (JSON)")
+    parser.add_argument("--round", choices=ROUNDS, default="evaluate")
+    parser.add_argument("--out", help="requests file to write (render)")
+    parser.add_argument("--requests", help="requests file (submit, process-local)")
+    parser.add_argument("--results", help="results file (fetch, process-local, ingest)")
+    parser.add_argument("--batch-id")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "submit":
+        print(submit_batch(args.requests))
+    elif args.command == "fetch":
+        print(fetch_batch(args.batch_id, args.results))
+    elif args.command == "process-local":
+        print(f"Processed {LocalBatchProcessor(chat_completion).process(args.requests, args.results)} requests")
+    else:
+        with open(args.job) as f:
+            job = json.load(f)
+        evaluator = build_evaluator()
+        if args.command == "render":
+            print(f"Rendered {evaluator.render(job, args.round, args.out)} requests")
+        else:
+            print(json.dumps(evaluator.ingest(job, args.round, args.results), indent=2))
@@ -0,0 +1,6 @@
+"""
+Benchmark suite for the candidate evaluation service.
+
+Each module is runnable on its own from the python/ directory, e.g.
+python -m benchmarks.serving, and prints its measurements as JSON.
+"""
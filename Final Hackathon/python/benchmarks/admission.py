@@ -0,0 +1,94 @@
+"""
+Admission control (admission.py) under a slow LLM provider.
+
+Replaces the /evaluate_candidate view with one that holds its request for a fixed
+"provider" latency, then sends bursts of concurrent uploads through the Flask test client,
+once with admission effectively off and once with the configured limits. Interleaved
+/aggregate_score calls check that exempt endpoints stay fast. Reports, per run, admitted
+and shed requests by status, the peak estimated memory held by evaluations, evaluation
+latency percentiles and the latency of the exempt endpoint.
+
+Usage: python -m benchmarks.admission [--clients 40] [--latency 0.5] [--upload-kb 512] [--max-inflight 6]
+"""
+import argparse
+import io
+import json
+import os
+import threading
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+def run(clients, latency, upload_kb, max_inflight):
+    import logging
+    import app as service
+    from admission import AdmissionController
+    from hedging import percentile
+
+    logging.getLogger().setLevel(logging.ERROR)
+    peak = {"memory_mb": 0.0, "inflight": 0}
+
+    def slow_evaluation():
+        controller = service.admission_controller
+        with controller._condition:
+            peak["memory_mb"] = max(peak["memory_mb"], controller.memory_mb)
+            peak["inflight"] = max(peak["inflight"], controller.inflight)
+        time.sleep(latency)
+        return service.jsonify({"technical_score": 70})
+
+    def cheap_score():
+        return service.jsonify({"final_score": 70})
+
+    service.app.view_functions["evaluate_candidate_data"] = slow_evaluation
+    service.app.view_functions["aggregate_score"] = cheap_score
+    upload = b"x" * (upload_kb * 1024)
+    report = {"clients": clients, "provider_latency_s": latency, "upload_kb": upload_kb}
+    for name, limits in [("unlimited", {"max_inflight": 10 ** 6, "max_memory_mb": float("inf")}), ("admission", {"max_inflight": max_inflight})]:
+        service.admission_controller = AdmissionController(**limits)
+        peak.update(memory_mb=0.0, inflight=0)
+        statuses, latencies, exempt_latencies = {}, [], []
+        lock = threading.Lock()
+
+        def evaluate():
+            started = time.perf_counter()
+            response = service.app.test_client().post("/evaluate_candidate", data={"resume": (io.BytesIO(upload), "resume.pdf")},
+                                                      content_type="multipart/form-data")
+            with lock:
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+
+        def score():
+            for _ in range(10):
+                started = time.perf_counter()
+                service.app.test_client().post("/aggregate_score", data={})
+                with lock:
+                    exempt_latencies.append(time.perf_counter() - started)
+                time.sleep(latency / 5)
+
+        threads = [threading.Thread(target=evaluate) for _ in range(clients)] + [threading.Thread(target=score)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        snapshot = service.admission_controller.snapshot()
+        report[name] = {
+            "status_codes": statuses,
+            "peak_inflight": peak["inflight"],
+            "peak_estimated_memory_mb": round(peak["memory_mb"], 1),
+            "evaluation_p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+            "evaluation_p95_ms": round(percentile(latencies, 95) * 1000, 1) if latencies else None,
+            "aggregate_score_p95_ms": round(percentile(exempt_latencies, 95) * 1000, 1),
+            "deferred": snapshot["deferred"],
+            "rejected": snapshot["rejected"],
+        }
+    return report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare evaluation load with and without admission control")
+    parser.add_argument("--clients", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--upload-kb", type=int, default=512)
+    parser.add_argument("--max-inflight", type=int, default=6)
+    args = parser.parse_args()
+    print(json.dumps(run(args.clients, args.latency, args.upload_kb, args.max_inflight), indent=2))
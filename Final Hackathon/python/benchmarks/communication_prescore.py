@@ -0,0 +1,125 @@
+"""
+Agreement of the local communication prescorer (communication_prescore.py) with the LLM.
+
+Scores every fixture in benchmarks/communication_fixtures.json locally, in one vectorized
+pass, and reports:
+
+- speed: milliseconds per candidate scored in bulk and one at a time
+- routing: how many candidates keep their local score and how many go to the LLM
+  because their score falls inside COMMUNICATION_BORDERLINE
+- band agreement with the fixtures' hand labels (weak below the band, borderline
+  inside it, strong above it), overall and for the locally kept scores only
+- for fixtures with a recorded llm_score: mean absolute error, share within 10 points,
+  Pearson and Spearman correlation, and the same band agreement against the LLM
+
+--record fills in llm_score by running each fixture through the communication chain
+(needs OPENAI_API_KEY and MONGO_URL in the environment, nothing is saved to MongoDB) and
+writes the fixtures back, so the agreement can be re-measured after changing the prompt,
+the model or the prescorer.
+
+Usage: python -m benchmarks.communication_prescore [--fixtures path] [--repeat 50] [--record]
+"""
+import argparse
+import json
+import os
+import time
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "communication_fixtures.json")
+BANDS = ["weak", "borderline", "strong"]
+
+def band(score):
+    from communication_prescore import COMMUNICATION_BORDERLINE
+
+    low, high = COMMUNICATION_BORDERLINE
+    return "weak" if score < low else "strong" if score > high else "borderline"
+
+def record(fixtures):
+    """
+    Score every fixture with the LLM chain, chunked and merged as evaluate_communication does.
+    """
+    from agents import CommunicationSkillsEvaluatorAgent
+
+    agent = CommunicationSkillsEvaluatorAgent()
+    for fixture in fixtures:
+        chunks = agent._chunk_answers(fixture["answers"])
+        results = [agent._evaluate_chunk(chunk) for chunk in chunks]
+        evaluation = results[0] if len(results) == 1 else agent._merge_chunk_evaluations(chunks, results)
+        fixture["llm_score"] = int(evaluation["communication_score"])
+
+def agreement(pairs):
+    """
+    Band agreement over (reference band, local band) pairs, with the confusion matrix.
+    """
+    confusion = {reference: {local: 0 for local in BANDS} for reference in BANDS}
+    for reference, local in pairs:
+        confusion[reference][local] += 1
+    return {
+        "count": len(pairs),
+        "agreement": round(sum(reference == local for reference, local in pairs) / len(pairs), 3) if pairs else None,
+        "confusion": confusion,
+    }
+
+def run(fixtures, repeat):
+    import numpy as np
+    from communication_prescore import COMMUNICATION_BORDERLINE, prescore_many, prescore_communication
+
+    answer_sets = [fixture["answers"] for fixture in fixtures]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        evaluations = prescore_many(answer_sets)
+    bulk_ms = (time.perf_counter() - started) * 1000 / (repeat * len(fixtures))
+    started = time.perf_counter()
+    for answers in answer_sets:
+        prescore_communication(answers)
+    single_ms = (time.perf_counter() - started) * 1000 / len(fixtures)
+
+    local_scores = np.array([evaluation["communication_score"] for evaluation in evaluations], dtype=float)
+    local_bands = [band(score) for score in local_scores]
+    kept = [local != "borderline" for local in local_bands]
+    report = {
+        "fixtures": len(fixtures),
+        "borderline_band": list(COMMUNICATION_BORDERLINE),
+        "ms_per_candidate_bulk": round(bulk_ms, 3),
+        "ms_per_candidate_single": round(single_ms, 3),
+        "kept_local": sum(kept),
+        "sent_to_llm": len(fixtures) - sum(kept),
+        "labels": agreement([(fixture["label"], local) for fixture, local in zip(fixtures, local_bands)]),
+        "labels_kept_local": agreement([(fixture["label"], local) for fixture, local, keep in zip(fixtures, local_bands, kept) if keep]),
+        "scores": [{"id": fixture["id"], "label": fixture["label"], "local_score": int(score), "llm_score": fixture.get("llm_score")}
+                   for fixture, score in zip(fixtures, local_scores)],
+    }
+
+    recorded = [index for index, fixture in enumerate(fixtures) if fixture.get("llm_score") is not None]
+    if len(recorded) >= 2:
+        local = local_scores[recorded]
+        llm = np.array([fixtures[index]["llm_score"] for index in recorded], dtype=float)
+        errors = np.abs(local - llm)
+        ranks = lambda values: np.argsort(np.argsort(values))
+        kept_errors = errors[[kept[index] for index in recorded]]
+        report["llm"] = {
+            "recorded": len(recorded),
+            "mean_absolute_error": round(float(errors.mean()), 2),
+            "within_10_points": round(float((errors <= 10).mean()), 3),
+            "pearson": round(float(np.corrcoef(local, llm)[0, 1]), 3),
+            "spearman": round(float(np.corrcoef(ranks(local), ranks(llm))[0, 1]), 3),
+            "mean_absolute_error_kept_local": round(float(kept_errors.mean()), 2) if len(kept_errors) else None,
+            "bands": agreement([(band(reference), band(score)) for reference, score in zip(llm, local)]),
+        }
+    else:
+        # Hand-labelled bands are not evidence of agreement with the LLM
+        report["llm"] = {"recorded": len(recorded), "note": "No recorded llm_score; run with --record to measure agreement with the LLM"}
+    return report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure agreement of the local communication prescorer with the LLM on fixtures")
+    parser.add_argument("--fixtures", default=FIXTURES_PATH)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--record", action="store_true", help="Score the fixtures with the LLM and save llm_score")
+    args = parser.parse_args()
+    with open(args.fixtures) as f:
+        fixtures = json.load(f)
+    if args.record:
+        record(fixtures)
+        with open(args.fixtures, "w") as f:
+            json.dump(fixtures, f, indent=2)
+    print(json.dumps(run(fixtures, args.repeat), indent=2))
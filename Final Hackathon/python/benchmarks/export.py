@@ -0,0 +1,72 @@
+"""
+Memory and throughput of the evaluation export (export.py) as the candidate pool grows.
+
+Fills an in-memory MongoDB (mongomock) with candidates in the compact layout, each with
+a communication, technical and cultural evaluation and an aggregate score, then exports
+pools of increasing size in every available format. Reports records, file size, elapsed
+time and the peak traced Python allocation per run: with batched cursors the peak should
+depend on --batch-size, not on the pool size. (mongomock scans and copies a collection
+for every query, so its own allocations and the elapsed time still grow with the pool;
+against MongoDB the $in lookups use the candidate_id indexes.)
+
+Usage: python -m benchmarks.export [--sizes 1000,4000] [--batch-size 200]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+def populate(db, count):
+    from storage import CompactStore
+
+    store = CompactStore(db)
+    for i in range(count):
+        candidate_id = str(store.insert("candidates", {"name": f"Candidate {i}", "email": f"c{i}@example.com", "skills": ["Python", "SQL", "AWS"],
+                                                      "created_at": "2026-01-01 00:00:00", "work_experience": [{"company": "Acme", "role": "Engineer"}]}))
+        communication_id = str(store.insert("communication_evaluations", {"candidate_id": candidate_id, "communication_score": 60 + i % 40,
+                                                                         "created_at": "2026-01-01 00:00:00", "strengths": ["Clear"]}))
+        store.insert("evaluations", {"candidate_id": candidate_id, "created_at": "2026-01-01 00:00:00",
+                                     "technical_evaluation": {"overall_technical_fit": ["Low", "Medium", "High"][i % 3], "technical_answers_score": "Medium",
+                                                              "coverage_percentage": 70, "matched_skills": [{"skill": "Python"}, {"skill": "SQL"}]},
+                                     "communication_evaluation": {"evaluation_id": communication_id, "communication_score": 60 + i % 40}})
+        store.insert("cultural_evaluations", {"candidate_id": candidate_id, "cultural_fit_score": 50 + i % 50, "coverage_percentage": 70,
+                                              "created_at": "2026-01-01 00:00:00", "matched_cultural_attributes": []})
+        db["aggregate_scores"].insert_one({"candidate_id": candidate_id, "job_id": "job-1", "final_score": 50 + i % 50, "created_at": "2026-01-01 00:00:00",
+                                           "score_breakdown": {"technical": {"score": 60}, "communication": {"score": 70}, "cultural": {"score": 65}, "optional": {"score": 10}}})
+
+def run(sizes, batch_size):
+    import mongomock
+    from export import EvaluationExporter, FORMATS
+
+    try:
+        import pyarrow  # noqa: F401
+        formats = FORMATS
+    except ImportError:
+        formats = ["ndjson"]
+    report = {"batch_size": batch_size, "runs": []}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            db = mongomock.MongoClient()["candidate_db"]
+            populate(db, size)
+            for file_format in formats:
+                path = os.path.join(directory, f"export.{file_format}")
+                exporter = EvaluationExporter(db, batch_size=batch_size)
+                tracemalloc.start()
+                started = time.perf_counter()
+                result = exporter.export_file(path, file_format)
+                elapsed = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                report["runs"].append({"candidates": size, "format": file_format, "records": result["records"],
+                                       "file_kb": round(os.path.getsize(path) / 1024, 1), "seconds": round(elapsed, 2),
+                                       "peak_traced_mb": round(peak / 1e6, 2)})
+    return report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure export memory and throughput as the candidate pool grows")
+    parser.add_argument("--sizes", default="1000,4000")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(run([int(size) for size in args.sizes.split(",")], args.batch_size), indent=2))
@@ -0,0 +1,320 @@
+"""
+Replay recorded request shapes against the Flask service.
+
+Reads a recording made with TRAFFIC_RECORD_PATH (see traffic.py), synthesizes a request
+for every shape (a PDF/DOCX resume of the recorded size, answers of the recorded count,
+types and lengths, form fields of the recorded lengths) and sends them to app.py served
+in-process by a threaded werkzeug server.
+
+The LLM, embeddings, MongoDB and GitHub are replaced by stand-ins so the run measures
+the service itself: the LLM answers a canned JSON after a latency drawn from a
+lognormal distribution that grows with prompt size, MongoDB is mongomock and
+embeddings are deterministic fakes.
+
+Arrivals are open loop (they do not wait for earlier responses): evenly spaced at the
+target QPS (--arrival constant), exponentially spaced (--arrival poisson), or at the
+recorded offsets (--arrival recorded, sped up by --speed). Latency is measured from the
+scheduled arrival time, so queueing inside the client is counted. With several --qps
+values the run sweeps them and reports the latency curve and the saturation throughput.
+
+Usage: python -m benchmarks.replay recording.jsonl [--qps 1 2 4 8] [--duration 30] [--arrival poisson]
+Requires mongomock.
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPLAYABLE_ENDPOINTS = {"/parse_candidate", "/evaluate_candidate", "/evaluate_cultural_fit", "/aggregate_score", "/reevaluate_candidate"}
+
+# One response that satisfies every chain (resume parsing, communication, technical, cultural, optional factors)
+FAKE_LLM_RESPONSE = json.dumps({
+    "name": "Replay Candidate", "email": "replay@example.com", "phone": "",
+    "skills": ["Python", "SQL"], "work_experience": [], "education": [], "certifications": [], "soft_skills": ["Teamwork"],
+    "communication_score": 72, "clarity_assessment": "Clear", "structure_assessment": "Structured", "tone_assessment": "Professional",
+    "strengths": ["Concise"], "weaknesses": ["Brief"],
+    "technical_answers_score": "Medium", "matched_skills": [{"skill": "Python"}], "missing_skills": [],
+    "cultural_fit_score": 68, "matched_cultural_attributes": [{"attribute": "Collaboration"}],
+    "optional_factors_score": 40, "assessment": "Replay assessment"
+})
+
+WORDS = ("python data team project built led designed api service scaled users reduced latency "
+         "deployed cloud testing review mentored analytics pipeline model customer delivered").split()
+
+def load_shapes(path):
+    """
+    Read replayable request shapes from a recording.
+    """
+    shapes = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                shape = json.loads(line)
+                if shape.get("endpoint") in REPLAYABLE_ENDPOINTS:
+                    shapes.append(shape)
+    return shapes
+
+def filler_text(rng, length):
+    words = []
+    total = 0
+    while total < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        total += len(word) + 1
+    return " ".join(words)[:length]
+
+def make_resume(rng, file_type, size):
+    """
+    Build a resume file of the recorded type with roughly the recorded size.
+    Text volume scales with size (about 1 character per 20 bytes, as in typical PDF resumes).
+    """
+    text = filler_text(rng, int(min(max(size / 20, 500), 20000)))
+    if file_type == "docx":
+        import io
+        import docx
+
+        document = docx.Document()
+        for start in range(0, len(text), 400):
+            document.add_paragraph(text[start:start + 400])
+        buffer = io.BytesIO()
+        document.save(buffer)
+        return buffer.getvalue()
+
+    import fitz
+
+    document = fitz.open()
+    for start in range(0, len(text), 3000):
+        page = document.new_page()
+        page.insert_textbox(page.rect + (36, 36, -36, -36), text[start:start + 3000], fontsize=8)
+    data = document.tobytes()
+    document.close()
+    # Pad with a PDF comment so the upload has the recorded size
+    if size > len(data) + 2:
+        data += b"%" + b" " * (size - len(data) - 2) + b"\n"
+    return data
+
+def make_evaluation(field, length):
+    """
+    A valid evaluation JSON for /aggregate_score, padded to the recorded field length.
+    """
+    evaluation = {
+        "technical_evaluation": {"technical_answers_score": "Medium", "candidate_id": "replay", "matched_skills": [{"skill": "Python"}]},
+        "communication_evaluation": {"communication_score": 72},
+        "cultural_evaluation": {"cultural_fit_score": 68},
+    }.get(field, {})
+    evaluation["assessment"] = ""
+    evaluation["assessment"] = "x" * max(0, length - len(json.dumps(evaluation)))
+    return json.dumps(evaluation)
+
+def build_request(shape, rng, index):
+    """
+    Synthesize (path, form fields, files) with the recorded shape.
+    """
+    fields = {}
+    for name, length in shape.get("field_lengths", {}).items():
+        if name.endswith("_evaluation"):
+            fields[name] = make_evaluation(name, length)
+        elif name == "weights":
+            fields[name] = json.dumps({"technical": 0.4, "communication": 0.3, "cultural": 0.2, "optional": 0.1})
+        else:
+            fields[name] = filler_text(rng, length)
+
+    answers = shape.get("answers")
+    if answers:
+        fields["answers"] = json.dumps([
+            {"text": filler_text(rng, length), "type": answer_type}
+            for length, answer_type in zip(answers["lengths"], answers["types"])
+        ])
+    if shape["endpoint"] != "/aggregate_score":
+        fields["github_url"] = "https://github.com/replay-user"
+    if shape["endpoint"] == "/reevaluate_candidate":
+        fields["candidate_key"] = f"replay-{index}"
+    if shape.get("has_job_id"):
+        fields["job_id"] = "replay-job"
+
+    files = {}
+    for name, file_shape in shape.get("files", {}).items():
+        file_type = file_shape.get("type") or "pdf"
+        # Unique names: the app saves uploads as temp_<filename>
+        files[name] = (f"replay_{index}.{file_type}", make_resume(rng, file_type, file_shape.get("size", 50000)))
+    return shape["endpoint"], fields, files
+
+def fake_llm(latency_ms, per_1k_tokens_ms, sigma, rng_lock, rng):
+    """
+    LLM stand-in: sleeps a lognormal latency that grows with prompt size, then answers FAKE_LLM_RESPONSE.
+    """
+    from langchain_core.messages import AIMessage
+
+    def respond(prompt_value):
+        tokens = len(prompt_value.to_string()) / 4
+        with rng_lock:
+            jitter = rng.lognormvariate(0, sigma)
+        time.sleep((latency_ms + per_1k_tokens_ms * tokens / 1000) * jitter / 1000)
+        return AIMessage(content=FAKE_LLM_RESPONSE)
+
+    return respond
+
+def install_stand_ins(args):
+    """
+    Build the app's agents against mongomock, fake embeddings, a fake GitHub and a fake LLM.
+    """
+    import mongomock
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.runnables import RunnableLambda
+    import logging
+    import agents
+    import app as service
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    agents._mongo_client = mongomock.MongoClient()
+    agents.create_embeddings = lambda: DeterministicFakeEmbedding(size=256)
+
+    def fetch_github_contributions(self, github_url):
+        time.sleep(args.github_latency_ms / 1000)
+        return []
+
+    agents.CandidateDataParserAgent.fetch_github_contributions = fetch_github_contributions
+    service.traffic_recorder = None
+    service.warmup()
+
+    llm = RunnableLambda(fake_llm(args.llm_latency_ms, args.llm_per_1k_tokens_ms, args.llm_sigma, threading.Lock(), random.Random(args.seed)))
+    technical = service.get_agent("technical")
+    for agent in [service.get_agent("parser"), technical, technical.parser_agent, technical.communication_agent, service.get_agent("cultural")]:
+        agent.chain = agent.chain.first | llm | StrOutputParser()
+    for parser in [service.get_agent("parser"), technical.parser_agent]:
+        parser.section_chain = parser.section_chain.first | llm | StrOutputParser()
+    scoring = service.get_agent("scoring")
+    scoring.optional_factors_chain = scoring.optional_factors_chain.first | llm | StrOutputParser()
+    return service.app
+
+def serve(flask_app, port):
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", port, flask_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def arrival_times(args, rate, count, shapes, rng):
+    """
+    Scheduled send times (seconds from the start) for one run.
+    """
+    if args.arrival == "recorded":
+        first = shapes[0].get("offset_seconds", 0)
+        return [max(0.0, (shape.get("offset_seconds", 0) - first) / args.speed) for shape in shapes[:count]]
+    times, t = [], 0.0
+    for _ in range(count):
+        times.append(t)
+        t += rng.expovariate(rate) if args.arrival == "poisson" else 1.0 / rate
+    return times
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+def run_rate(base_url, requests_to_send, schedule, window, concurrency):
+    """
+    Send pre-built requests open loop at the scheduled times and collect latencies.
+    window is the length of the arrival period in seconds, used for the offered rate.
+    """
+    import requests
+
+    session = requests.Session()
+    results = []
+    results_lock = threading.Lock()
+
+    def send(scheduled_at, request):
+        path, fields, files = request
+        try:
+            response = session.post(base_url + path, data=fields, files={name: (filename, content) for name, (filename, content) in files.items()}, timeout=300)
+            ok = response.status_code == 200
+        except Exception:
+            ok = False
+        finished = time.monotonic()
+        with results_lock:
+            results.append((ok, finished - scheduled_at, finished))
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for offset, request in zip(schedule, requests_to_send):
+            delay = start + offset - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, start + offset, request)
+
+    latencies = [latency for ok, latency, _ in results if ok]
+    elapsed = max(finished for _, _, finished in results) - start if results else 0
+    return {
+        "requests": len(results),
+        "errors": sum(1 for ok, _, _ in results if not ok),
+        "offered_qps": round(len(schedule) / window, 2),
+        "achieved_qps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p90": percentile(latencies, 90),
+        "latency_p99": percentile(latencies, 99),
+    }
+
+def run(args):
+    shapes = load_shapes(args.recording)
+    if not shapes:
+        return {"error": f"No replayable requests in {args.recording}"}
+
+    flask_app = install_stand_ins(args)
+    server = serve(flask_app, args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+    rng = random.Random(args.seed)
+    try:
+        curve = []
+        rates = [None] if args.arrival == "recorded" else args.qps
+        for rate in rates:
+            count = len(shapes) if rate is None else max(1, int(rate * args.duration))
+            picked = [shapes[i % len(shapes)] for i in range(count)]
+            requests_to_send = [build_request(shape, rng, i) for i, shape in enumerate(picked)]
+            schedule = arrival_times(args, rate, count, shapes, rng)
+            window = args.duration if rate is not None else max(schedule[-1], 1.0)
+            result = run_rate(base_url, requests_to_send, schedule, window, args.concurrency)
+            result["target_qps"] = rate
+            curve.append(result)
+            print(json.dumps(result), file=sys.stderr)
+    finally:
+        server.shutdown()
+
+    # Saturation: the highest throughput reached while keeping up with the offered load (and the p99 SLO, if set)
+    sustained = [
+        point for point in curve
+        if point["achieved_qps"] >= 0.9 * point["offered_qps"] and point["errors"] == 0
+        and (args.slo_p99 is None or (point["latency_p99"] is not None and point["latency_p99"] <= args.slo_p99))
+    ]
+    return {
+        "recording": args.recording,
+        "shapes": len(shapes),
+        "arrival": args.arrival,
+        "stand_ins": {"llm_latency_ms": args.llm_latency_ms, "llm_per_1k_tokens_ms": args.llm_per_1k_tokens_ms, "llm_sigma": args.llm_sigma, "github_latency_ms": args.github_latency_ms},
+        "curve": curve,
+        "saturation_qps": max((point["achieved_qps"] for point in sustained), default=None)
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay recorded request shapes against the Flask service")
+    parser.add_argument("recording", help="JSONL file written with TRAFFIC_RECORD_PATH")
+    parser.add_argument("--qps", type=float, nargs="+", default=[1, 2, 4, 8], help="Target arrival rates to sweep")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of arrivals per rate")
+    parser.add_argument("--arrival", choices=["constant", "poisson", "recorded"], default="poisson")
+    parser.add_argument("--speed", type=float, default=1.0, help="Speed-up of recorded arrival offsets")
+    parser.add_argument("--concurrency", type=int, default=256, help="Maximum requests in flight from the client")
+    parser.add_argument("--slo-p99", type=float, default=None, help="p99 latency (seconds) a sustained rate must meet")
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--llm-per-1k-tokens-ms", type=float, default=150)
+    parser.add_argument("--llm-sigma", type=float, default=0.4, help="Lognormal sigma of LLM latency jitter")
+    parser.add_argument("--github-latency-ms", type=float, default=150)
+    parser.add_argument("--port", type=int, default=5056)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(run(args), indent=2))
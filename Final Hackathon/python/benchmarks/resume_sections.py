@@ -0,0 +1,148 @@
+"""
+Coverage and accuracy of the local resume pre-parser (resume_sections.py).
+
+Generates synthetic resumes in several layouts (pipe-separated headings, stacked
+heading lines, "Role at Company", wrapped bullets, prose-only) from known field values,
+pre-parses them and reports, per layout and overall:
+
+- how many resumes need no LLM call, and how many fields are resolved locally
+- the share of resume characters still sent to the LLM
+- the accuracy of the locally resolved fields against the values they were generated
+  from (a resolved field that is wrong would bypass the LLM, so this should stay at 1.0)
+
+Usage: python -m benchmarks.resume_sections [--resumes 500] [--threshold 0.9]
+"""
+import argparse
+import json
+import random
+from collections import defaultdict
+from resume_sections import RESUME_FIELDS, preparse_resume
+
+FIRST = ["Jane", "John", "Priya", "Wei", "Carlos", "Amara", "Lukas", "Sofia", "Omar", "Hannah"]
+LAST = ["Doe", "Smith", "Patel", "Chen", "Garcia", "Okafor", "Müller", "Rossi", "Haddad", "Berg"]
+SKILLS = ["Python", "Go", "SQL", "Java", "TypeScript", "React", "Django", "FastAPI", "AWS", "Docker",
+          "Kubernetes", "Terraform", "PostgreSQL", "Kafka", "Spark", "CI/CD", "Git", "Redis"]
+ROLES = ["Software Engineer", "Senior Software Engineer", "Data Engineer", "Backend Developer", "Engineering Manager",
+         "Machine Learning Engineer", "Site Reliability Engineer", "Data Analyst"]
+COMPANIES = ["Acme Corp", "Globex Inc", "Initech", "Umbrella Health", "Stark Industries", "Wayne Enterprises", "Hooli", "Vandelay Imports"]
+SCHOOLS = ["Stanford University", "University of Toronto", "Georgia Institute of Technology", "Imperial College London", "IIT Bombay"]
+DEGREES = ["B.S. in Computer Science", "M.S. in Data Science", "Bachelor of Engineering", "Master of Computer Applications", "PhD in Statistics"]
+CERTS = [("AWS Certified Developer", "Amazon Web Services"), ("Certified Kubernetes Administrator", "CNCF"),
+         ("Professional Data Engineer", "Google Cloud"), ("Terraform Associate", "HashiCorp")]
+DUTIES = ["Built the ingestion pipeline processing two billion events a day with Kafka and Spark streaming jobs",
+          "Led a team of four engineers", "Designed REST APIs used by thirty internal teams",
+          "Cut infrastructure cost by 30% by moving batch jobs to spot instances", "Mentored new hires",
+          "Migrated the monolith to services on Kubernetes"]
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+def make_truth(rng):
+    name = f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+    jobs, year = [], 2024
+    for _ in range(rng.randint(1, 3)):
+        start_year, start_month = year - rng.randint(1, 4), rng.randint(1, 12)
+        end = "Present" if not jobs else f"{rng.randint(1, 12):02d}/{year}"
+        jobs.append({"company": rng.choice(COMPANIES), "role": rng.choice(ROLES), "duration": f"{start_month:02d}/{start_year} - {end}",
+                     "responsibilities": rng.sample(DUTIES, rng.randint(1, 3))})
+        year = start_year
+    return {
+        "name": name,
+        "email": f"{name.split()[0].lower()}.{rng.randint(1, 99)}@example.com",
+        "skills": rng.sample(SKILLS, rng.randint(4, 10)),
+        "work_experience": jobs,
+        "education": [{"degree": rng.choice(DEGREES), "institution": rng.choice(SCHOOLS), "year": str(year - rng.randint(0, 2))}],
+        "certifications": [{"name": cert, "issuer": issuer, "year": str(rng.randint(2018, 2024))} for cert, issuer in rng.sample(CERTS, rng.randint(0, 2))],
+    }
+
+def _month_name(duration_part):
+    if duration_part == "Present":
+        return "Present"
+    month, year = duration_part.split("/")
+    return f"{MONTH_NAMES[int(month) - 1]} {year}"
+
+def render(truth, layout, rng):
+    lines = [truth["name"].upper() if layout == "stacked" else truth["name"],
+             f"{truth['email']} | +1 555 {rng.randint(100, 999)} {rng.randint(1000, 9999)} | github.com/{truth['name'].split()[0].lower()}",
+             "Summary", "Engineer focused on data platforms and reliable backend systems."]
+    if layout == "prose":
+        lines += ["Experience"]
+        for job in truth["work_experience"]:
+            lines.append(f"I worked as a {job['role']} at {job['company']} where I {job['responsibilities'][0].lower()}.")
+        lines += ["Skills", f"I have used {', '.join(truth['skills'][:-1])} and {truth['skills'][-1]} in production for several years."]
+    else:
+        lines += ["Technical Skills"]
+        half = len(truth["skills"]) // 2
+        lines += [f"Languages: {', '.join(truth['skills'][:half])}", f"Tools: {', '.join(truth['skills'][half:])}"] if layout != "pipes" else [" | ".join(truth["skills"])]
+        lines += ["Professional Experience"]
+        for job in truth["work_experience"]:
+            start, end = job["duration"].split(" - ")
+            if layout == "pipes":
+                lines.append(f"{job['role']} | {job['company']} | {_month_name(start)} - {_month_name(end)}")
+            elif layout == "stacked":
+                lines += [job["company"], job["role"], f"{start} – {end}"]
+            else:
+                lines.append(f"{job['role']} at {job['company']}, {_month_name(start)} to {_month_name(end)}")
+            for duty in job["responsibilities"]:
+                if layout == "wrapped" and len(duty) > 60:
+                    cut = duty.rfind(" ", 0, 50)
+                    lines += [f"• {duty[:cut]}", duty[cut + 1:]]
+                else:
+                    lines.append(f"• {duty}")
+    lines += ["Education"]
+    for entry in truth["education"]:
+        lines.append(f"{entry['degree']}, {entry['institution']}, {entry['year']}" if layout != "stacked" else entry["institution"])
+        if layout == "stacked":
+            lines.append(f"{entry['degree']} ({entry['year']})")
+    if truth["certifications"]:
+        lines.append("Certifications")
+        lines += [f"{cert['name']} ({cert['issuer']}, {cert['year']})" for cert in truth["certifications"]]
+    return "\n".join(lines)
+
+def run(resumes, threshold, seed):
+    rng = random.Random(seed)
+    layouts = ["pipes", "stacked", "role_at", "wrapped", "prose"]
+    stats = defaultdict(lambda: defaultdict(int))
+    for i in range(resumes):
+        layout = layouts[i % len(layouts)]
+        truth = make_truth(rng)
+        text = render(truth, layout, rng)
+        preparsed = preparse_resume(text)
+        layout_stats = stats[layout]
+        layout_stats["resumes"] += 1
+        layout_stats["characters"] += len(text)
+        if preparsed is None:
+            layout_stats["characters_to_llm"] += len(text)
+            continue
+        unresolved = preparsed.unresolved(threshold)
+        layout_stats["no_llm_call"] += not unresolved
+        layout_stats["characters_to_llm"] += len(preparsed.llm_text(unresolved)) if unresolved else 0
+        for field in RESUME_FIELDS:
+            if field in unresolved:
+                continue
+            layout_stats["fields_resolved"] += 1
+            layout_stats["fields_correct"] += preparsed.fields[field] == truth[field]
+            if preparsed.fields[field] != truth[field]:
+                layout_stats[f"wrong_{field}"] += 1
+
+    def summary(counts):
+        return {
+            "resumes": counts["resumes"],
+            "no_llm_call": round(counts["no_llm_call"] / counts["resumes"], 3),
+            "fields_resolved_locally": round(counts["fields_resolved"] / (counts["resumes"] * len(RESUME_FIELDS)), 3),
+            "llm_character_share": round(counts["characters_to_llm"] / counts["characters"], 3),
+            "local_field_accuracy": round(counts["fields_correct"] / counts["fields_resolved"], 4) if counts["fields_resolved"] else None,
+            **{key: value for key, value in counts.items() if key.startswith("wrong_")},
+        }
+
+    total = defaultdict(int)
+    for counts in stats.values():
+        for key, value in counts.items():
+            total[key] += value
+    return {"threshold": threshold, "overall": summary(total), "layouts": {layout: summary(counts) for layout, counts in stats.items()}}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure how much resume parsing the local pre-parser takes off the LLM")
+    parser.add_argument("--resumes", type=int, default=500)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(run(args.resumes, args.threshold, args.seed), indent=2))
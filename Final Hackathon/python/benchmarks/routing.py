@@ -0,0 +1,137 @@
+"""
+Model routing (routing.py) against fake OpenAI-compatible model endpoints.
+
+Starts a local HTTP server that answers /v1/chat/completions for two models: a fast,
+cheap one that returns broken JSON (or a low-confidence answer) for a share of calls,
+and a slower, stronger one that always answers well. The tiers are pointed at it with
+MODEL_TIERS base_url, exactly as a real deployment would configure them, and the same
+calls run through invoke_chain under three strategies:
+
+- mini: routing disabled, every call on the cheap model (today's behaviour)
+- full: every call starts on the strong model
+- routed: cheap model first, escalated on validation failure or low confidence
+
+Reports valid answers, mean latency, cost and the router's metrics per strategy.
+
+Usage: python -m benchmarks.routing [--calls 200] [--invalid-rate 0.1] [--low-confidence-rate 0.1]
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PORT = int(os.getenv("FAKE_MODEL_PORT", "18431"))
+# The tiers must point at the fake endpoint before routing.py reads its configuration
+os.environ["MODEL_TIERS"] = json.dumps({
+    "mini": {"model": "gpt-4o-mini", "base_url": f"http://127.0.0.1:{PORT}/v1", "api_key_env": "FAKE_MODEL_API_KEY"},
+    "full": {"model": "gpt-4o", "base_url": f"http://127.0.0.1:{PORT}/v1", "api_key_env": "FAKE_MODEL_API_KEY"},
+})
+os.environ["ROUTING_POLICIES"] = json.dumps({"communication": {"min_confidence": 0.8}})
+os.environ.setdefault("FAKE_MODEL_API_KEY", "sk-fake")
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+GOOD_ANSWER = json.dumps({"communication_score": 74, "clarity_assessment": "Clear", "structure_assessment": "Structured",
+                          "tone_assessment": "Professional", "strengths": ["Concise"], "weaknesses": ["Brief"]})
+MODEL_LATENCY = {"gpt-4o-mini": 0.04, "gpt-4o": 0.12}
+
+class FakeModels:
+    def __init__(self, invalid_rate, low_confidence_rate, seed):
+        self.invalid_rate = invalid_rate
+        self.low_confidence_rate = low_confidence_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def complete(self, body):
+        model = body["model"]
+        with self.lock:
+            draw = self.rng.random()
+            self.calls[model] = self.calls.get(model, 0) + 1
+        time.sleep(MODEL_LATENCY.get(model, 0.05))
+        content, logprob = GOOD_ANSWER, -0.02
+        if model == "gpt-4o-mini":
+            if draw < self.invalid_rate:
+                content = GOOD_ANSWER[:-20]
+            elif draw < self.invalid_rate + self.low_confidence_rate:
+                logprob = -0.6
+        prompt_tokens = sum(len(message["content"]) for message in body["messages"]) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        choice = {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+        if body.get("logprobs"):
+            choice["logprobs"] = {"content": [{"token": "x", "logprob": logprob, "bytes": None, "top_logprobs": []}] * completion_tokens}
+        return {"id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": model, "choices": [choice],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}}
+
+def serve(models):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            payload = json.dumps(models.complete(body)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", PORT), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run(calls, invalid_rate, low_confidence_rate, seed):
+    import logging
+    from langchain_core.callbacks import BaseCallbackHandler
+    from langchain_core.prompts import PromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_openai import ChatOpenAI
+    import agents
+    import routing
+    from ledger import cost_usd
+
+    logging.getLogger().setLevel(logging.ERROR)
+    # Keeps the benchmark's calls out of the token ledger
+    agents.ledger_callback = lambda stage: BaseCallbackHandler()
+    models = FakeModels(invalid_rate, low_confidence_rate, seed)
+    server = serve(models)
+    base_url = f"http://127.0.0.1:{PORT}/v1"
+    llm = ChatOpenAI(model="gpt-4o-mini", base_url=base_url, api_key="sk-fake", temperature=0, max_retries=0)
+    chain = PromptTemplate.from_template("Evaluate the communication skills in these answers and return JSON: {answers}") | llm | StrOutputParser()
+    answers = "I led the migration of our billing service and wrote the runbook the on-call team uses. " * 20
+
+    report = {"calls": calls, "invalid_rate": invalid_rate, "low_confidence_rate": low_confidence_rate}
+    try:
+        for strategy in ["mini", "full", "routed"]:
+            routing.STAGE_POLICIES["communication"]["tier"] = "full" if strategy == "full" else "mini"
+            agents.model_router = routing.ModelRouter(enabled=strategy != "mini")
+            models.calls = {}
+            valid, started = 0, time.perf_counter()
+            for _ in range(calls):
+                result = agents.invoke_chain(chain, {"answers": answers}, stage="communication")
+                valid += routing.check_output(result, ["communication_score"]) is None
+            elapsed = time.perf_counter() - started
+            prompt_tokens = (len(answers) + 80) // 4 + 1
+            cost = sum(count * cost_usd(model, prompt_tokens, len(GOOD_ANSWER) // 4 + 1) for model, count in models.calls.items())
+            report[strategy] = {
+                "valid_answers": round(valid / calls, 3),
+                "mean_latency_ms": round(elapsed / calls * 1000, 1),
+                "cost_usd_per_1k_calls": round(cost / calls * 1000, 4),
+                "model_calls": dict(models.calls),
+                "routing": agents.model_router.snapshot()["stages"].get("communication"),
+            }
+    finally:
+        server.shutdown()
+    return report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare model routing strategies against fake OpenAI-compatible endpoints")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--invalid-rate", type=float, default=0.1)
+    parser.add_argument("--low-confidence-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(run(args.calls, args.invalid_rate, args.low_confidence_rate, args.seed), indent=2))
@@ -0,0 +1,95 @@
+"""
+Interactive latency behind a bulk upload, with and without the fair scheduler (scheduler.py).
+
+One tenant floods the LLM slots with bulk calls (a large resume upload: one thread per
+concurrent upload request) while other tenants make interactive calls one after
+another. Calls are simulated with a sleep of --call-ms. The same load runs twice:
+"fifo" schedules every call as one tenant at one priority (first come, first served),
+"fair" tags them with their tenant and priority. Reports the queue wait of the
+interactive calls and the bulk throughput of each run.
+
+The defaults are the shipped per-worker setup: the scheduler's default slot count, and as
+many bulk threads as the bulk evaluations admission lets in (ADMISSION_BULK_SHARE of
+ADMISSION_MAX_INFLIGHT) can run, three parallel stages each.
+
+Usage: python -m benchmarks.scheduler [--slots 12] [--bulk-calls 2000] [--bulk-threads 12]
+"""
+import argparse
+import json
+import threading
+import time
+from hedging import percentile
+from admission import AdmissionController
+from scheduler import FairScheduler, SCHEDULER_MAX_CONCURRENCY, set_scheduling_context, reset_scheduling_context
+
+def run_load(scheduler, fair, slots, bulk_calls, bulk_threads, tenants, interactive_calls, call_seconds):
+    remaining = [bulk_calls]
+    lock = threading.Lock()
+    waits = {f"tenant-{i}": [] for i in range(tenants)}
+
+    def bulk_worker():
+        token = set_scheduling_context("bulk-uploader" if fair else None, "bulk" if fair else None)
+        try:
+            while True:
+                with lock:
+                    if remaining[0] == 0:
+                        return
+                    remaining[0] -= 1
+                with scheduler.slot("bulk"):
+                    time.sleep(call_seconds)
+        finally:
+            reset_scheduling_context(token)
+
+    def interactive_worker(tenant):
+        token = set_scheduling_context(tenant if fair else None, "interactive")
+        try:
+            for _ in range(interactive_calls):
+                started = time.monotonic()
+                with scheduler.slot("interactive"):
+                    waits[tenant].append(time.monotonic() - started)
+                    time.sleep(call_seconds)
+                time.sleep(call_seconds)
+        finally:
+            reset_scheduling_context(token)
+
+    started = time.monotonic()
+    bulk = [threading.Thread(target=bulk_worker) for _ in range(bulk_threads)]
+    for thread in bulk:
+        thread.start()
+    # Let the bulk load fill the queue before interactive traffic arrives
+    time.sleep(call_seconds * 5)
+    interactive = [threading.Thread(target=interactive_worker, args=(tenant,)) for tenant in waits]
+    for thread in interactive:
+        thread.start()
+    for thread in interactive + bulk:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    all_waits = [wait * 1000 for tenant_waits in waits.values() for wait in tenant_waits]
+    return {
+        "interactive_wait_ms_p50": round(percentile(all_waits, 50), 1),
+        "interactive_wait_ms_p95": round(percentile(all_waits, 95), 1),
+        "interactive_wait_ms_max": round(max(all_waits), 1),
+        "bulk_calls_per_second": round(bulk_calls / elapsed, 1),
+    }
+
+def run(slots, bulk_calls, bulk_threads, tenants, interactive_calls, call_ms):
+    report = {"slots": slots, "bulk_calls": bulk_calls, "interactive_tenants": tenants}
+    for mode in ["fifo", "fair"]:
+        scheduler = FairScheduler(max_concurrency=slots)
+        # One tenant's cap must not be the bottleneck of the fifo run
+        scheduler._tenant("default").max_concurrency = slots
+        scheduler._tenant("bulk-uploader").max_concurrency = slots
+        report[mode] = run_load(scheduler, mode == "fair", slots, bulk_calls, bulk_threads, tenants, interactive_calls, call_ms / 1000)
+    return report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure interactive queue wait behind a bulk upload with and without fair scheduling")
+    parser.add_argument("--slots", type=int, default=SCHEDULER_MAX_CONCURRENCY)
+    parser.add_argument("--bulk-calls", type=int, default=2000)
+    parser.add_argument("--bulk-threads", type=int, default=AdmissionController().bulk_limit * 3)
+    parser.add_argument("--tenants", type=int, default=3)
+    parser.add_argument("--interactive-calls", type=int, default=20)
+    parser.add_argument("--call-ms", type=float, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run(args.slots, args.bulk_calls, args.bulk_threads, args.tenants, args.interactive_calls, args.call_ms), indent=2))
@@ -0,0 +1,87 @@
+"""
+Cold-start and per-worker memory benchmark for the production server (serve.py).
+
+Starts serve.py, measures the time until every worker answers /readyz, then reads
+RSS and PSS for the master and each worker from /proc. PSS splits shared pages
+between the processes mapping them, so a low worker PSS relative to its RSS shows
+the pre-fork warmup is being shared copy-on-write.
+
+Usage: python -m benchmarks.serving [--workers 4] [--port 5055]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def read_memory_kb(pid):
+    """
+    Return RSS and PSS (in kB) of a process from /proc.
+    """
+    memory = {"rss_kb": 0, "pss_kb": 0}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Rss:"):
+                memory["rss_kb"] = int(line.split()[1])
+            elif line.startswith("Pss:"):
+                memory["pss_kb"] = int(line.split()[1])
+    return memory
+
+def child_pids(pid):
+    """
+    Return the direct children of a process (the gunicorn workers of the master).
+    """
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+def wait_until_ready(url, expected_workers, master_pid, timeout):
+    """
+    Poll the readiness probe until all workers are forked and it answers 200.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200 and len(child_pids(master_pid)) >= expected_workers:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.1)
+    return False
+
+def run(workers, port, timeout):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}")
+    start = time.monotonic()
+    server = subprocess.Popen([sys.executable, "serve.py"], cwd=PYTHON_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ready = wait_until_ready(f"http://127.0.0.1:{port}/readyz", workers, server.pid, timeout)
+        cold_start = time.monotonic() - start
+        if not ready:
+            return {"error": f"Server not ready after {timeout} seconds"}
+
+        workers_memory = {pid: read_memory_kb(pid) for pid in child_pids(server.pid)}
+        return {
+            "workers": workers,
+            "cold_start_seconds": round(cold_start, 2),
+            "master": read_memory_kb(server.pid),
+            "per_worker": workers_memory,
+            "avg_worker_rss_kb": round(sum(m["rss_kb"] for m in workers_memory.values()) / len(workers_memory)),
+            "avg_worker_pss_kb": round(sum(m["pss_kb"] for m in workers_memory.values()) / len(workers_memory)),
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=timeout)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure cold start and per-worker memory of serve.py")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+    print(json.dumps(run(args.workers, args.port, args.timeout), indent=2))
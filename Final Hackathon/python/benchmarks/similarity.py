@@ -0,0 +1,92 @@
+"""
+Query latency and recall of the candidate profile index (similarity.py), and the latency
+of screening the whole pool against a JD.
+
+Writes N synthetic profiles (clustered random unit vectors, so neighbourhoods look like
+real skill groupings) straight into an index directory, loads it with ProfileIndex and
+times similar() for random candidates. Recall@k is measured against exact search on a
+sample of queries. screen() is timed with and without a required-skill filter (the JD is
+embedded with a deterministic fake so only the ranking is measured).
+
+Usage: python -m benchmarks.similarity [--profiles 1000000] [--dim 256] [--queries 1000] [--k 10]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from hedging import percentile
+from similarity import ProfileIndex
+
+SKILLS = [f"skill-{i}" for i in range(200)]
+
+def write_profiles(directory, profiles, dim, seed, batch=100000):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, profiles // 500), dim)).astype(np.float32)
+    with open(os.path.join(directory, "vectors.f32"), "wb") as vectors, open(os.path.join(directory, "profiles.log"), "wb") as log:
+        for start in range(0, profiles, batch):
+            count = min(batch, profiles - start)
+            block = centers[rng.integers(0, len(centers), count)] + 0.6 * rng.standard_normal((count, dim)).astype(np.float32)
+            block /= np.linalg.norm(block, axis=1, keepdims=True)
+            vectors.write(block.astype(np.float32).tobytes())
+            skills = rng.integers(0, len(SKILLS), (count, 8))
+            log.write("".join(json.dumps({"candidate_id": f"c{start + i}", "name": f"Candidate {start + i}", "email": "",
+                                          "skills": sorted({SKILLS[j] for j in skills[i]})}) + "\n"
+                              for i in range(count)).encode())
+
+def run(profiles, dim, queries, k, recall_queries, seed):
+    with tempfile.TemporaryDirectory() as directory:
+        write_profiles(directory, profiles, dim, seed)
+
+        started = time.perf_counter()
+        index = ProfileIndex(directory, dim, embeddings_factory=lambda: DeterministicFakeEmbedding(size=dim))
+        build_seconds = time.perf_counter() - started
+
+        rng = np.random.default_rng(seed + 1)
+        latencies = []
+        for candidate in rng.integers(0, profiles, queries):
+            started = time.perf_counter()
+            index.similar(f"c{candidate}", k)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        matrix = index._vectors(0, profiles)
+        hits = 0
+        for candidate in rng.integers(0, profiles, recall_queries):
+            found = {int(result["candidate_id"][1:]) for result in index.similar(f"c{candidate}", k)}
+            scores = matrix @ matrix[candidate]
+            scores[candidate] = -np.inf
+            exact = set(np.argpartition(-scores, k)[:k].tolist())
+            hits += len(found & exact)
+
+        screen_latencies, filtered_latencies = [], []
+        for i in range(10):
+            started = time.perf_counter()
+            index.screen(f"job description {i}", top_n=100)
+            screen_latencies.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            index.screen(f"job description {i}", top_n=100, required_skills=SKILLS[i:i + 2])
+            filtered_latencies.append((time.perf_counter() - started) * 1000)
+
+        return {
+            "profiles": profiles,
+            "dim": dim,
+            "build_seconds": round(build_seconds, 1),
+            "query_ms_p50": round(percentile(latencies, 50), 3),
+            "query_ms_p99": round(percentile(latencies, 99), 3),
+            f"recall_at_{k}": round(hits / (recall_queries * k), 3),
+            "screen_ms_p50": round(percentile(screen_latencies, 50), 1),
+            "screen_with_skill_filter_ms_p50": round(percentile(filtered_latencies, 50), 1)
+        }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure profile similarity query latency and recall")
+    parser.add_argument("--profiles", type=int, default=1000000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--recall-queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(run(args.profiles, args.dim, args.queries, args.k, args.recall_queries, args.seed), indent=2))
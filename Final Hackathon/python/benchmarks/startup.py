@@ -0,0 +1,95 @@
+"""
+Import-time benchmark and startup budget for the evaluation service.
+
+Imports each service module in a fresh interpreter (python -X importtime) and reports
+the wall time, the cumulative import time of the module itself and its heaviest
+imports. The run fails (exit status 1) when importing app takes longer than the
+budget, or when a heavy dependency that should be deferred until first use
+(LangChain/OpenAI, FAISS, LangGraph, PyMuPDF, python-docx, MongoDB drivers) is
+loaded when a module on the worker start path is imported.
+
+Usage: python -m benchmarks.startup [--budget 0.5] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ["app", "asgi_app", "agents", "incremental", "embedding_cache", "leaderboard"]
+# Modules on the worker start path; embedding_cache and leaderboard are themselves loaded lazily
+ENTRY_MODULES = ["app", "asgi_app", "agents", "incremental"]
+DEFERRED_MODULES = ["langchain_openai", "langchain_community", "langgraph", "faiss", "fitz", "docx", "pymongo", "motor", "httpx", "requests"]
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "0.5"))
+
+def import_profile(module):
+    """
+    Import module in a fresh interpreter. Returns wall seconds, per-import cumulative
+    seconds (from -X importtime) and which deferred modules ended up loaded.
+    """
+    code = (
+        "import json, sys\n"
+        f"import {module}\n"
+        f"print(json.dumps([name for name in {DEFERRED_MODULES!r} if name in sys.modules]))\n"
+    )
+    start = time.monotonic()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=PYTHON_DIR,
+                               capture_output=True, text=True)
+    wall = time.monotonic() - start
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "import failed"}
+
+    cumulative = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cumulative_us) / 1e6
+    return {
+        "wall_seconds": wall,
+        "cumulative": cumulative,
+        "deferred_loaded": json.loads(completed.stdout.strip().splitlines()[-1])
+    }
+
+def run(repeat, budget, top):
+    results = {}
+    for module in MODULES:
+        profiles = [import_profile(module) for _ in range(repeat)]
+        errors = [p for p in profiles if "error" in p]
+        if errors:
+            results[module] = errors[0]
+            continue
+        best = min(profiles, key=lambda p: p["wall_seconds"])
+        heaviest = sorted(((name, seconds) for name, seconds in best["cumulative"].items() if name != module),
+                          key=lambda item: item[1], reverse=True)[:top]
+        results[module] = {
+            "wall_seconds": round(best["wall_seconds"], 3),
+            "import_seconds": round(best["cumulative"].get(module, 0.0), 3),
+            "heaviest_imports": {name: round(seconds, 3) for name, seconds in heaviest},
+            "deferred_loaded": best["deferred_loaded"]
+        }
+
+    failures = []
+    app_result = results.get("app", {})
+    if "error" in app_result:
+        failures.append(f"app failed to import: {app_result['error']}")
+    elif app_result["import_seconds"] > budget:
+        failures.append(f"import app took {app_result['import_seconds']}s (budget {budget}s)")
+    for module in ENTRY_MODULES:
+        result = results.get(module, {})
+        if result.get("deferred_loaded"):
+            failures.append(f"import {module} loaded deferred dependencies: {', '.join(result['deferred_loaded'])}")
+    return {"budget_seconds": budget, "modules": results, "failures": failures}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure per-module import time and enforce the startup budget")
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS, help="Maximum seconds to import app")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module; the fastest run is reported")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest imports to list per module")
+    args = parser.parse_args()
+    report = run(args.repeat, args.budget, args.top)
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report["failures"] else 0)
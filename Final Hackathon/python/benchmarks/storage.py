@@ -0,0 +1,147 @@
+"""
+Bytes stored per candidate: the original document layout versus the compact layout (storage.py).
+
+Builds a representative candidate (parsed resume, answers, GitHub repositories) and the
+evaluations the agents produce for it, then BSON-encodes the documents each layout
+writes across candidates, answers, communication_evaluations, evaluations and
+cultural_evaluations. For the compact layout the llm_outputs documents are reported
+separately, since they expire after LLM_OUTPUT_RETENTION_DAYS.
+
+Usage: python -m benchmarks.storage [--answers 8] [--repos 20] [--answer-chars 800]
+"""
+import argparse
+import copy
+import json
+import random
+import bson
+from storage import normalize, pack_document
+
+def vocabulary(rng, size=3000):
+    """
+    Pseudo-words with an English-like length distribution; drawn with Zipf weights, the
+    text compresses about as well as real prose (a tiny vocabulary would overstate it).
+    """
+    letters = "etaoinshrdlcumwfgypbvkjxqz"
+    return [
+        "".join(rng.choice(letters[:rng.choice([12, 20, 26])]) for _ in range(max(2, int(rng.gauss(5, 2)))))
+        for _ in range(size)
+    ]
+
+WORDS = vocabulary(random.Random(0))
+WEIGHTS = [1 / (rank + 1) for rank in range(len(WORDS))]
+
+def sentence(rng, chars):
+    words = []
+    total = 0
+    while total < chars:
+        word = rng.choices(WORDS, WEIGHTS)[0]
+        words.append(word)
+        total += len(word) + 1
+    return " ".join(words)[:chars]
+
+def sample_candidate(rng, answers, repos, answer_chars):
+    """
+    The candidate document, answers and evaluations written for one evaluated candidate.
+    """
+    answers_array = [{"text": sentence(rng, answer_chars), "type": "culture-fit" if i % 3 == 0 else "technical"} for i in range(answers)]
+    github = [{"repo_name": f"project-{i}", "description": sentence(rng, 120), "stars": rng.randint(0, 300),
+               "forks": rng.randint(0, 60), "language": "Python"} for i in range(repos)]
+    candidate = {
+        "name": "Sample Candidate",
+        "email": "sample@example.com",
+        "skills": ["Python", "React", "Node.js", "SQL", "Docker", "AWS", "Teamwork", "Leadership", "Communication", "Kubernetes"],
+        "work_experience": [{"title": "Software Engineer", "company": f"Company {i}", "duration": "2 years",
+                             "description": sentence(rng, 400)} for i in range(3)],
+        "education": [{"degree": "BSc Computer Science", "institution": "University", "year": "2018"}],
+        "certifications": ["AWS Certified Developer", "Certified Kubernetes Application Developer"],
+        "answers": answers_array,
+        "github_contributions": github,
+        "created_at": "2026-01-01 00:00:00"
+    }
+    communication = {
+        "communication_score": 78,
+        "clarity_assessment": sentence(rng, 600),
+        "structure_assessment": sentence(rng, 600),
+        "tone_assessment": sentence(rng, 500),
+        "strengths": [sentence(rng, 120) for _ in range(3)],
+        "weaknesses": [sentence(rng, 120) for _ in range(3)],
+        "candidate_id": "0" * 24,
+        "created_at": "2026-01-01 00:00:00",
+        "processing_time": 3.2
+    }
+    technical = {
+        "matched_skills": [{"skill": skill, "jd_requirement": skill, "proficiency": "Intermediate", "evidence": sentence(rng, 150)}
+                           for skill in candidate["skills"][:8]],
+        "project_evaluation": [{"repo_name": repo["repo_name"], "complexity": "Medium", "relevance": "High",
+                                "details": sentence(rng, 200)} for repo in github],
+        "technical_answers_score": "Medium",
+        "overall_technical_fit": "High",
+        "coverage_percentage": 82.5
+    }
+    evaluation = {
+        "technical_evaluation": technical,
+        "communication_evaluation": dict(communication, evaluation_id="1" * 24),
+        "candidate_id": "0" * 24,
+        "created_at": "2026-01-01 00:00:00",
+        "processing_time": 9.8
+    }
+    cultural = {
+        "cultural_fit_score": 74,
+        "matched_cultural_attributes": [{"attribute": attribute, "jd_requirement": attribute, "evidence": sentence(rng, 150)}
+                                        for attribute in ["Collaboration", "Adaptability", "Integrity", "Ownership"]],
+        "behavioral_answers_assessment": sentence(rng, 600),
+        "github_indicators_assessment": sentence(rng, 400),
+        "cultural_fit_report": sentence(rng, 1200),
+        "strengths": [sentence(rng, 120) for _ in range(3)],
+        "weaknesses": [sentence(rng, 120) for _ in range(3)],
+        "coverage_percentage": 75.0,
+        "candidate_id": "0" * 24,
+        "created_at": "2026-01-01 00:00:00",
+        "processing_time": 4.1
+    }
+    answer_documents = [{"candidate_id": "0" * 24, "text": answer["text"], "type": answer["type"], "created_at": "2026-01-01 00:00:00"}
+                        for answer in answers_array]
+    return {
+        "candidates": [candidate],
+        "answers": answer_documents,
+        "communication_evaluations": [communication],
+        "evaluations": [evaluation],
+        "cultural_evaluations": [cultural],
+    }
+
+def encoded_size(document):
+    return len(bson.encode(dict(document, _id=bson.ObjectId())))
+
+def run(answers, repos, answer_chars, seed):
+    documents = sample_candidate(random.Random(seed), answers, repos, answer_chars)
+
+    before = {name: sum(encoded_size(doc) for doc in docs) for name, docs in documents.items()}
+    after, llm_outputs = {}, 0
+    for name, docs in documents.items():
+        after[name] = 0
+        for doc in docs:
+            stored, llm_output = pack_document(name, copy.deepcopy(doc))
+            after[name] += encoded_size(stored)
+            if llm_output is not None:
+                llm_outputs += encoded_size(llm_output)
+
+    # Size of the normalized documents alone, before compression
+    normalized = sum(encoded_size(normalize(name, copy.deepcopy(doc))) for name, docs in documents.items() for doc in docs)
+    return {
+        "bytes_per_candidate_before": sum(before.values()),
+        "bytes_per_candidate_after": sum(after.values()) + llm_outputs,
+        "bytes_per_candidate_after_retention": sum(after.values()),
+        "bytes_after_normalization_only": normalized,
+        "by_collection_before": before,
+        "by_collection_after": dict(after, llm_outputs=llm_outputs),
+        "reduction": round(1 - (sum(after.values()) + llm_outputs) / sum(before.values()), 3)
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare bytes stored per candidate in the original and compact layouts")
+    parser.add_argument("--answers", type=int, default=8)
+    parser.add_argument("--repos", type=int, default=20)
+    parser.add_argument("--answer-chars", type=int, default=800)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(run(args.answers, args.repos, args.answer_chars, args.seed), indent=2))
@@ -0,0 +1,265 @@
+"""
+Local communication scoring from readability, structure and tone statistics.
+
+CommunicationSkillsEvaluatorAgent asks the LLM for clarity (0-40), structure (0-30) and
+tone (0-30) points. prescore_communication() estimates the same three parts locally:
+
+- clarity: Flesch reading ease, words per sentence, how developed each answer is,
+  vocabulary range (Guiraud's index) and filler words
+- structure: sentences per answer, connectives ("because", "for example", "as a result")
+  per sentence, capitalized and punctuated sentences, run-on sentences, and paragraphs or
+  lists in long answers
+- tone: slang, informal words, profanity, shouting, repeated exclamation marks,
+  emoticons and a lowercase "i"
+
+Counts are taken per answer with regular expressions; the scoring runs on numpy arrays
+over every answer of every candidate at once (prescore_many), and a candidate's parts
+are the means over their answers, so one long answer does not hide several dismissive
+ones. The result has the shape of the LLM evaluation, with templated assessments,
+strengths and weaknesses.
+
+Prescoring is off by default (COMMUNICATION_PRESCORE=1 turns it on) until its agreement
+with the LLM has been measured: benchmarks/communication_prescore.py --record scores the
+fixture set with the LLM and reports how closely the local scores follow. When on, the
+agent keeps the local score unless it falls inside COMMUNICATION_BORDERLINE, where a few
+points change how the candidate is read, or the request asks for narrative feedback
+(X-Communication-Feedback: narrative); only then is the LLM called.
+"""
+import contextvars
+import os
+import re
+import numpy as np
+
+COMMUNICATION_PRESCORE = os.getenv("COMMUNICATION_PRESCORE", "0") == "1"
+COMMUNICATION_BORDERLINE = tuple(float(value) for value in os.getenv("COMMUNICATION_BORDERLINE", "50,80").split(","))
+
+FEEDBACK_MODES = {"score", "narrative"}
+_feedback_context = contextvars.ContextVar("communication_feedback", default="score")
+
+LONG_SENTENCE_WORDS = 35
+DEVELOPED_ANSWER_WORDS = 40
+# Profanity anywhere in the answers caps the tone part and the score, however good the rest is
+PROFANITY_TONE_CAP = 8
+PROFANITY_SCORE_CAP = 45
+
+WORD_RE = re.compile(r"[A-Za-z]+(?:['’][A-Za-z]+)*")
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+LIST_ITEM_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+", re.MULTILINE)
+VOWEL_GROUP_RE = re.compile(r"[aeiouy]+")
+
+CONNECTIVES_RE = re.compile(r"\b(?:because|therefore|however|although|though|first(?:ly)?|second(?:ly)?|third(?:ly)?|then|next|"
+                            r"finally|for example|for instance|such as|as a result|in addition|additionally|moreover|so that|"
+                            r"in the end|overall|instead|meanwhile|afterwards|consequently|specifically|which meant|"
+                            r"in short|on the other hand|while|since|once|after that|to (?:do|solve|fix|address) this)\b", re.I)
+FILLERS_RE = re.compile(r"\b(?:um+|uh+|erm|basically|literally|you know|sort of|i mean|whatever)\b|\blike,", re.I)
+SLANG_RE = re.compile(r"\b(?:gonna|wanna|gotta|kinda|sorta|lol|lmao|rofl|tbh|idk|imo|btw|omg|dude|bro|ya|yep|nope|nah|cuz|coz|"
+                      r"thx|pls|plz|u|ur|ain't|y'all|dunno|gimme|lemme|legit)\b", re.I)
+INFORMAL_RE = re.compile(r"\b(?:yeah|cool|awesome|super|stuff|guys|hey|totally|pretty much|tons of|a bunch of|chill|crazy|sucks?|"
+                         r"screwed up|no big deal)\b", re.I)
+PROFANITY_RE = re.compile(r"\b(?:f+u+c+k\w*|shit\w*|bullshit|crap\w*|damn\w*|hell|ass(?:hole)?s?|dumbass|bitch\w*|bastard\w*|"
+                          r"wtf|stfu|piss(?:ed)?)\b", re.I)
+SHOUTING_RE = re.compile(r"\b[A-Z]{2,}(?:\s+[A-Z]{2,}){3,}\b")
+EXCLAMATIONS_RE = re.compile(r"!{2,}|\?!|!\?")
+EMOTICONS_RE = re.compile(r"(?<!\w)[:;=]-?[)(DPp](?!\w)|\bxD\b|<3|[\U0001F300-\U0001FAFF☀-➿]")
+LOWERCASE_I_RE = re.compile(r"(?:^|\s)i(?:\s|'m|'ve|'d|'ll)")
+
+# Per-answer counts, in the column order of the count matrix
+FEATURES = ["words", "sentences", "syllables", "unique_words", "long_sentences", "capitalized", "terminated", "blocks",
+            "connectives", "fillers", "slang", "informal", "profanity", "shouting", "exclamations", "emoticons", "lowercase_i"]
+COLUMN = {name: index for index, name in enumerate(FEATURES)}
+
+def set_feedback_context(mode=None):
+    """
+    Accept a local communication score ("score", the default) or require the LLM's narrative
+    feedback ("narrative") for the current request (or task); returns a reset token.
+    """
+    return _feedback_context.set(mode if mode in FEEDBACK_MODES else "score")
+
+def reset_feedback_context(token):
+    _feedback_context.reset(token)
+
+def narrative_requested():
+    return _feedback_context.get() == "narrative"
+
+def is_borderline(score):
+    low, high = COMMUNICATION_BORDERLINE
+    return low <= score <= high
+
+def _syllables(word):
+    word = word.lower()
+    count = len(VOWEL_GROUP_RE.findall(word))
+    if count > 1 and word.endswith("e") and not word.endswith(("le", "ee", "ye")):
+        count -= 1
+    return max(count, 1)
+
+def _answer_counts(text):
+    """
+    One row of the count matrix for an answer, and the slang, informal and profane terms it uses.
+    """
+    words = WORD_RE.findall(text)
+    sentences = [sentence.strip() for sentence in SENTENCE_SPLIT_RE.split(text.strip()) if WORD_RE.search(sentence)]
+    flagged = {"slang": SLANG_RE.findall(text), "informal": INFORMAL_RE.findall(text), "profanity": PROFANITY_RE.findall(text)}
+    row = [
+        len(words),
+        len(sentences),
+        sum(_syllables(word) for word in words),
+        len({word.lower() for word in words}),
+        sum(1 for sentence in sentences if len(WORD_RE.findall(sentence)) > LONG_SENTENCE_WORDS),
+        sum(1 for sentence in sentences if sentence[0].isupper() or sentence[0].isdigit()),
+        sum(1 for sentence in sentences if sentence[-1] in ".!?:)\"'"),
+        sum(1 for paragraph in PARAGRAPH_SPLIT_RE.split(text) if paragraph.strip()) + len(LIST_ITEM_RE.findall(text)),
+        len(CONNECTIVES_RE.findall(text)),
+        len(FILLERS_RE.findall(text)),
+        len(flagged["slang"]),
+        len(flagged["informal"]),
+        len(flagged["profanity"]),
+        len(SHOUTING_RE.findall(text)),
+        len(EXCLAMATIONS_RE.findall(text)),
+        len(EMOTICONS_RE.findall(text)),
+        len(LOWERCASE_I_RE.findall(text)),
+    ]
+    return row, flagged
+
+def _part_scores(counts):
+    """
+    Clarity, structure and tone points of every answer, from an (answers x FEATURES) count matrix.
+    """
+    column = lambda name: counts[:, COLUMN[name]]
+    words = np.maximum(column("words"), 1)
+    sentences = np.maximum(column("sentences"), 1)
+    words_per_sentence = words / sentences
+
+    reading_ease = 206.835 - 1.015 * words_per_sentence - 84.6 * column("syllables") / words
+    readability = np.interp(reading_ease, [0, 30, 50, 70, 85, 100, 120], [0.35, 0.75, 1, 1, 0.8, 0.6, 0.5])
+    sentence_length = np.interp(words_per_sentence, [3, 8, 12, 22, 30, 45], [0.35, 0.75, 1, 1, 0.7, 0.3])
+    development = np.interp(words, [3, 15, DEVELOPED_ANSWER_WORDS, 80], [0.1, 0.35, 0.8, 1])
+    vocabulary = np.interp(column("unique_words") / np.sqrt(words), [2, 4, 6], [0.6, 0.9, 1])
+    fillers = 1 - np.minimum(column("fillers") / words * 8, 0.5)
+    clarity = 40 * (0.25 * readability + 0.2 * sentence_length + 0.4 * development + 0.15 * vocabulary) * fillers
+
+    multi_sentence = np.interp(column("sentences"), [1, 2, 4], [0.45, 0.8, 1])
+    flow = np.interp(column("connectives") / sentences, [0, 0.15, 0.4], [0.45, 0.8, 1])
+    mechanics = (column("capitalized") + column("terminated")) / (2 * sentences)
+    run_ons = 1 - 0.7 * column("long_sentences") / sentences
+    # One-liners have little structure to judge, and long answers read better split into paragraphs or lists
+    layout = np.interp(words, [5, 20, DEVELOPED_ANSWER_WORDS], [0.5, 0.8, 1]) * np.where((words > 150) & (column("blocks") < 2), 0.85, 1.0)
+    structure = 30 * (0.3 * multi_sentence + 0.3 * flow + 0.25 * mechanics + 0.15 * run_ons) * layout
+
+    penalties = (4 * column("slang") + 1.5 * column("informal") + 12 * column("profanity") + 8 * column("shouting")
+                 + 3 * column("exclamations") + 2 * column("emoticons") + np.minimum(column("lowercase_i"), 3))
+    tone = np.clip(30 - penalties, 0, 30)
+    return clarity, structure, tone
+
+def _evaluation(parts, totals, answer_count, developed, flagged):
+    """
+    One candidate's evaluation in the LLM's JSON shape, from their part scores and summed counts.
+    """
+    clarity, structure, tone = (round(float(part), 1) for part in parts)
+    total = lambda name: int(totals[COLUMN[name]])
+    words, sentences = max(total("words"), 1), max(total("sentences"), 1)
+    words_per_sentence = words / sentences
+    reading_ease = 206.835 - 1.015 * words_per_sentence - 84.6 * total("syllables") / words
+    connective_rate = total("connectives") / sentences
+    mechanics = (total("capitalized") + total("terminated")) / (2 * sentences)
+    flagged_terms = {kind: sorted({term.lower() for term in terms}) for kind, terms in flagged.items() if terms}
+    expressive = total("shouting") + total("exclamations") + total("emoticons")
+
+    clarity_assessment = (f"Reading ease {reading_ease:.0f} (Flesch) with {words_per_sentence:.1f} words per sentence; "
+                          f"{developed} of {answer_count} answers are developed ({DEVELOPED_ANSWER_WORDS}+ words)")
+    if total("fillers"):
+        clarity_assessment += f"; {total('fillers')} filler words"
+    structure_assessment = (f"{total('sentences')} sentences across {answer_count} answers with {connective_rate:.2f} "
+                            f"connectives per sentence; {total('long_sentences')} run-on sentences (over {LONG_SENTENCE_WORDS} words)")
+    if mechanics < 0.9:
+        structure_assessment += f"; {mechanics:.0%} capitalization and end punctuation"
+    if flagged_terms:
+        tone_assessment = "Flagged language: " + "; ".join(f"{kind} ({', '.join(terms)})" for kind, terms in flagged_terms.items())
+    else:
+        tone_assessment = "Professional tone; no slang or inappropriate language detected"
+    if expressive:
+        tone_assessment += f"; shouting, repeated exclamation marks or emoticons ({expressive})"
+
+    strengths, weaknesses = [], []
+    if clarity >= 32:
+        strengths.append("Answers are readable, with sentences of a comfortable length")
+    if developed == answer_count:
+        strengths.append("Every answer is developed with supporting detail")
+    if structure >= 24:
+        strengths.append("Ideas are connected with clear transitions")
+    if tone >= 28:
+        strengths.append("Consistently professional tone")
+    if words_per_sentence > 30:
+        weaknesses.append("Long sentences make some answers hard to follow")
+    if developed * 2 < answer_count:
+        weaknesses.append("Several answers are too brief to show reasoning")
+    if connective_rate < 0.1 and total("sentences") >= 3:
+        weaknesses.append("Few transitions between ideas")
+    if total("long_sentences"):
+        weaknesses.append(f"{total('long_sentences')} run-on sentences")
+    if mechanics < 0.8:
+        weaknesses.append("Inconsistent capitalization or end punctuation")
+    if total("fillers"):
+        weaknesses.append("Filler words dilute the answers")
+    if "profanity" in flagged_terms:
+        weaknesses.append(f"Inappropriate language: {', '.join(flagged_terms['profanity'])}")
+    if "slang" in flagged_terms:
+        weaknesses.append(f"Slang: {', '.join(flagged_terms['slang'])}")
+    if expressive:
+        weaknesses.append("Shouting, repeated exclamation marks or emoticons")
+
+    score = min(max(round(clarity + structure + tone), 0), PROFANITY_SCORE_CAP if "profanity" in flagged_terms else 100)
+    return {
+        "communication_score": int(score),
+        "clarity_assessment": clarity_assessment,
+        "structure_assessment": structure_assessment,
+        "tone_assessment": tone_assessment,
+        "strengths": strengths,
+        "weaknesses": weaknesses,
+        "score_breakdown": {"clarity": clarity, "structure": structure, "tone": tone},
+        "metrics": {
+            "answers": answer_count,
+            "words": total("words"),
+            "reading_ease": round(reading_ease, 1),
+            "words_per_sentence": round(words_per_sentence, 1),
+            "connectives_per_sentence": round(connective_rate, 2),
+        },
+        "flagged_language": flagged_terms,
+        "scored_by": "local",
+    }
+
+def prescore_many(answer_sets):
+    """
+    Local evaluations of many candidates' answers (lists of {"text", "type"} or strings) in one pass.
+    Candidates without any answers get None.
+    """
+    rows, owners, flagged = [], [], [{"slang": [], "informal": [], "profanity": []} for _ in answer_sets]
+    for owner, answers in enumerate(answer_sets):
+        for answer in answers or []:
+            text = answer.get("text", "") if isinstance(answer, dict) else str(answer)
+            row, terms = _answer_counts(text or "")
+            rows.append(row)
+            owners.append(owner)
+            for kind, found in terms.items():
+                flagged[owner][kind].extend(found)
+    if not rows:
+        return [None] * len(answer_sets)
+
+    counts = np.array(rows, dtype=float)
+    owners = np.array(owners)
+    size = len(answer_sets)
+    answer_counts = np.bincount(owners, minlength=size)
+    parts = [np.bincount(owners, weights=part, minlength=size) / np.maximum(answer_counts, 1) for part in _part_scores(counts)]
+    totals = np.zeros((size, len(FEATURES)))
+    np.add.at(totals, owners, counts)
+    parts[2] = np.where(totals[:, COLUMN["profanity"]] > 0, np.minimum(parts[2], PROFANITY_TONE_CAP), parts[2])
+    developed = np.bincount(owners, weights=counts[:, COLUMN["words"]] >= DEVELOPED_ANSWER_WORDS, minlength=size)
+
+    return [_evaluation([part[owner] for part in parts], totals[owner], int(answer_counts[owner]), int(developed[owner]), flagged[owner])
+            if answer_counts[owner] else None for owner in range(size)]
+
+def prescore_communication(answers):
+    """
+    Local evaluation of one candidate's answers, or None when there are none.
+    """
+    return prescore_many([answers])[0]
@@ -0,0 +1,116 @@
+"""
+End-to-end request deadlines.
+
+An endpoint opens a deadline_scope with the client's budget. The active Deadline
+lives in a context variable, so every stage below it (parse_candidate, each
+evaluator, the scoring graph) can read the remaining budget without it being
+threaded through every signature. Work that has not started when the deadline
+passes is not started; LLM calls get the remaining budget as their timeout.
+
+Context variables do not follow work submitted to a thread pool on their own,
+so pool submissions go through submit_in_context.
+"""
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+
+DEFAULT_REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "60"))
+
+_current_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a stage would start (or is still running) after the request deadline.
+    """
+    def __init__(self, stage):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+class Deadline:
+    """
+    A point in (monotonic) time by which the request must finish.
+    """
+    def __init__(self, seconds):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self, stage):
+        """
+        Raise DeadlineExceeded if there is no budget left to start stage.
+        """
+        if self.expired():
+            raise DeadlineExceeded(stage)
+        return self.remaining()
+
+def start_deadline(seconds):
+    """
+    Make a deadline `seconds` from now current. Returns a token for end_deadline.
+    """
+    return _current_deadline.set(Deadline(seconds))
+
+def end_deadline(token):
+    """
+    Restore the deadline that was current before start_deadline.
+    """
+    _current_deadline.reset(token)
+
+@contextmanager
+def deadline_scope(seconds):
+    """
+    Make a deadline `seconds` from now current for the enclosed block.
+    """
+    token = start_deadline(seconds)
+    try:
+        yield _current_deadline.get()
+    finally:
+        end_deadline(token)
+
+def current_deadline():
+    """
+    Return the active Deadline, or None outside a deadline_scope.
+    """
+    return _current_deadline.get()
+
+def remaining_budget(default=None):
+    """
+    Seconds left on the active deadline (default when there is none).
+    """
+    deadline = _current_deadline.get()
+    return default if deadline is None else deadline.remaining()
+
+def check_deadline(stage):
+    """
+    Raise DeadlineExceeded if the active deadline (if any) has passed.
+    """
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    """
+    Submit fn to executor with a copy of the caller's context (including its deadline).
+    """
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+def deadline_marker(stage):
+    """
+    Result placeholder for a stage that did not complete before the deadline.
+    """
+    return {"error": f"Deadline exceeded during {stage}", "deadline_exceeded": True, "stage": stage}
+
+def parse_deadline_seconds(value):
+    """
+    Parse a client-supplied budget (e.g. the X-Request-Deadline header), falling back to the default.
+    """
+    try:
+        seconds = float(value)
+        return seconds if seconds > 0 else DEFAULT_REQUEST_DEADLINE_SECONDS
+    except (TypeError, ValueError):
+        return DEFAULT_REQUEST_DEADLINE_SECONDS
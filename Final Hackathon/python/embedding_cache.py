@@ -0,0 +1,230 @@
+"""
+Persistent, content-addressed cache for embedding vectors.
+
+CachedEmbeddings wraps any LangChain Embeddings object (OpenAIEmbeddings in agents.py).
+Texts are keyed by a SHA-256 of the model name and the text, so a repeated text (the
+JD part of a RAG query, the benchmark documents embedded when an agent starts) never
+goes back to the network.
+
+Vectors live in two tiers:
+- a bounded in-memory LRU of recently used vectors
+- an append-only on-disk store shared by every worker process: float32 rows in
+  vectors.f32 read through a memory map, plus keys.log where line N is the key of row N
+
+Writers serialize on an flock'd lock file; readers pick up rows appended by other
+processes by tailing keys.log on a miss. A writer that crashed between writing its
+vectors and its keys leaves rows without keys (or a partial key line); the next writer
+truncates both files back to the last complete key before appending, so row N always
+stays the vector of key N.
+"""
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+import logging
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".embedding_cache"))
+EMBEDDING_CACHE_MEMORY_ITEMS = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "10000"))
+
+class EmbeddingStore:
+    """
+    Append-only float32 vector store with memory-mapped reads.
+    """
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.keys_path = os.path.join(directory, "keys.log")
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.lock_path = os.path.join(directory, ".lock")
+        self.index = {}
+        self.rows = 0
+        self.keys_offset = 0
+        self.dim = None
+        self._matrix = None
+        self._lock = threading.Lock()
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        """
+        Read rows appended (by any process) since the last refresh.
+        """
+        if self.dim is None and os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self.dim = json.load(f)["dim"]
+        if not os.path.exists(self.keys_path):
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self.keys_offset)
+            data = f.read()
+        # Only consume complete lines; a writer may be mid-append
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            self.index.setdefault(line.decode(), self.rows)
+            self.rows += 1
+        self.keys_offset += end
+
+    def _truncate_orphans(self):
+        """
+        Drop a partial key line and any vector rows without a key, left by a writer that crashed mid-append.
+        Called under the file lock, after _refresh.
+        """
+        for path, size in [(self.keys_path, self.keys_offset), (self.vectors_path, self.rows * self.dim * 4)]:
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                logger.warning(f"Discarding {os.path.getsize(path) - size} bytes of an interrupted append to {path}")
+                os.truncate(path, size)
+
+    def _vector(self, row):
+        if self._matrix is None or row >= self._matrix.shape[0]:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r").reshape(-1, self.dim)
+        return np.array(self._matrix[row])
+
+    def get(self, key):
+        """
+        Return the stored vector for key, or None.
+        """
+        with self._lock:
+            row = self.index.get(key)
+            if row is None:
+                self._refresh()
+                row = self.index.get(key)
+            if row is None:
+                return None
+            return self._vector(row)
+
+    def put_many(self, items):
+        """
+        Append (key, vector) pairs that are not already stored.
+        """
+        if not items:
+            return
+        with self._lock, open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                new_items = {}
+                for key, vector in items:
+                    if key not in self.index:
+                        new_items[key] = np.asarray(vector, dtype=np.float32)
+                if not new_items:
+                    return
+                if self.dim is None:
+                    self.dim = len(next(iter(new_items.values())))
+                    with open(self.meta_path, "w") as f:
+                        json.dump({"dim": self.dim}, f)
+
+                self._truncate_orphans()
+                # Vectors are written before their keys so a reader never sees a key without its row
+                with open(self.vectors_path, "ab") as f:
+                    f.write(np.stack(list(new_items.values())).tobytes())
+                with open(self.keys_path, "ab") as f:
+                    f.write("".join(f"{key}\n" for key in new_items).encode())
+                self._refresh()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_embedding_store(namespace, cache_dir=None):
+    """
+    Return the process-wide store for an embedding model, so all agents share one cache.
+    """
+    directory = os.path.join(cache_dir or EMBEDDING_CACHE_DIR, re.sub(r'[^\w.-]', '_', namespace) or "default")
+    with _stores_lock:
+        if directory not in _stores:
+            _stores[directory] = EmbeddingStore(directory)
+        return _stores[directory]
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from memory or disk instead of the network.
+    """
+    def __init__(self, underlying, namespace=None, cache_dir=None, memory_items=EMBEDDING_CACHE_MEMORY_ITEMS):
+        self.underlying = underlying
+        self.namespace = namespace or getattr(underlying, "model", type(underlying).__name__)
+        self.store = get_embedding_store(self.namespace, cache_dir)
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.namespace}\n{text}".encode()).hexdigest()
+
+    def _remember(self, key, vector):
+        with self._memory_lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, texts):
+        """
+        Resolve texts from the cache. Returns (vectors by key, keys, texts still missing by key).
+        """
+        found, keys, missing = {}, [], {}
+        for text in texts:
+            key = self._key(text)
+            keys.append(key)
+            if key in found or key in missing:
+                continue
+            with self._memory_lock:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+            if vector is not None:
+                self.stats["memory_hits"] += 1
+            else:
+                vector = self.store.get(key)
+                if vector is None:
+                    self.stats["misses"] += 1
+                    missing[key] = text
+                    continue
+                self.stats["disk_hits"] += 1
+                self._remember(key, vector)
+            found[key] = vector
+        return found, keys, missing
+
+    def _store_computed(self, found, missing, vectors):
+        computed = list(zip(missing.keys(), (np.asarray(vector, dtype=np.float32) for vector in vectors)))
+        self.store.put_many(computed)
+        for key, vector in computed:
+            self._remember(key, vector)
+            found[key] = vector
+
+    def embed_documents(self, texts):
+        found, keys, missing = self._lookup(texts)
+        if missing:
+            self._store_computed(found, missing, self.underlying.embed_documents(list(missing.values())))
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text):
+        found, keys, missing = self._lookup([text])
+        if missing:
+            self._store_computed(found, missing, [self.underlying.embed_query(text)])
+        return found[keys[0]].tolist()
+
+    # Storing takes the flock and writes to disk, so the async variants do it off the event loop
+
+    async def aembed_documents(self, texts):
+        found, keys, missing = self._lookup(texts)
+        if missing:
+            vectors = await self.underlying.aembed_documents(list(missing.values()))
+            await asyncio.to_thread(self._store_computed, found, missing, vectors)
+        return [found[key].tolist() for key in keys]
+
+    async def aembed_query(self, text):
+        found, keys, missing = self._lookup([text])
+        if missing:
+            vectors = [await self.underlying.aembed_query(text)]
+            await asyncio.to_thread(self._store_computed, found, missing, vectors)
+        return found[keys[0]].tolist()
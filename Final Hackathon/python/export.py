@@ -0,0 +1,291 @@
+"""
+Streaming export of candidates and their evaluations for analytics.
+
+Each exported record is one candidate joined with its latest technical, communication
+and cultural evaluations and all of its aggregate scores (one per job). Candidates are
+read through a batched cursor in _id order; for every EXPORT_BATCH_SIZE candidates the
+joined documents are fetched with one $in query per collection (on an index on
+candidate_id) and the records are written out before the next batch is read, so memory
+stays constant however large the collections are.
+
+Formats:
+- ndjson: one JSON record per line
+- parquet: columnar Parquet, one row group per batch (requires pyarrow)
+- arrow: Arrow IPC file, one record batch per batch (requires pyarrow)
+
+Incremental exports take a watermark (UTC, "YYYY-MM-DD HH:MM:SS") and export only the
+candidates that were saved or had an evaluation or score saved at or after it. Changed
+documents are found by ObjectId time in every collection and merged as sorted cursors,
+so the set of changed candidates is never held in memory either. A named export keeps
+its watermark in the export_watermarks collection and advances it to the start of each
+successful run; records can therefore repeat across runs (keep the latest by
+exported_at) but are never missed.
+
+Usage:
+    python export.py --format parquet --out evaluations.parquet
+    python export.py --format ndjson --out changes.ndjson --since "2026-10-01 00:00:00"
+    python export.py --format ndjson --out nightly.ndjson --incremental nightly
+"""
+import argparse
+import datetime
+import heapq
+import json
+import os
+import time
+import logging
+from bson import ObjectId
+from storage import unpack_document
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+FORMATS = ["ndjson", "parquet", "arrow"]
+# Collections joined to candidates by their candidate_id field
+JOINED_COLLECTIONS = ["evaluations", "communication_evaluations", "cultural_evaluations", "aggregate_scores"]
+TECHNICAL_FIT_SCORES = {"Low": 30, "Medium": 60, "High": 90}
+
+def parse_watermark(value):
+    """
+    A UTC datetime from "YYYY-MM-DD HH:MM:SS" (or an ISO date); raises ValueError.
+    """
+    return datetime.datetime.fromisoformat(value.strip()).replace(tzinfo=datetime.timezone.utc)
+
+def format_watermark(moment):
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+def _latest(documents):
+    """
+    The most recently created document per candidate_id.
+    """
+    latest = {}
+    for document in documents:
+        current = latest.get(document["candidate_id"])
+        if current is None or document.get("created_at", "") >= current.get("created_at", ""):
+            latest[document["candidate_id"]] = document
+    return latest
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+def build_record(candidate, evaluation, communication, cultural, scores, exported_at):
+    """
+    The flat export record for one candidate and its joined documents (any of which may be None/empty).
+    """
+    technical = (evaluation or {}).get("technical_evaluation") or {}
+    if communication is None and isinstance((evaluation or {}).get("communication_evaluation"), dict):
+        # Evaluations keep the communication score even when the full document is not found
+        communication = evaluation["communication_evaluation"]
+    score_rows = sorted(({
+        "job_id": score.get("job_id") or "",
+        "final_score": _number(score.get("final_score")),
+        "technical": _number(score.get("score_breakdown", {}).get("technical", {}).get("score")),
+        "communication": _number(score.get("score_breakdown", {}).get("communication", {}).get("score")),
+        "cultural": _number(score.get("score_breakdown", {}).get("cultural", {}).get("score")),
+        "optional": _number(score.get("score_breakdown", {}).get("optional", {}).get("score")),
+        "partial": bool(score.get("partial", False)),
+        "created_at": score.get("created_at"),
+    } for score in scores), key=lambda row: row["created_at"] or "")
+    final_scores = [row["final_score"] for row in score_rows if row["final_score"] is not None]
+    return {
+        "candidate_id": str(candidate["_id"]),
+        "name": candidate.get("name"),
+        "email": candidate.get("email"),
+        "skills": [str(skill) for skill in candidate.get("skills") or []],
+        "created_at": candidate.get("created_at"),
+        "technical_fit": technical.get("overall_technical_fit"),
+        "technical_fit_score": TECHNICAL_FIT_SCORES.get(technical.get("overall_technical_fit")),
+        "technical_answers_score": technical.get("technical_answers_score"),
+        "technical_coverage": _number(technical.get("coverage_percentage")),
+        "matched_skills": [str(skill.get("skill")) for skill in technical.get("matched_skills") or [] if isinstance(skill, dict)],
+        "technical_evaluated_at": (evaluation or {}).get("created_at"),
+        "communication_score": _number((communication or {}).get("communication_score")),
+        "communication_evaluated_at": (communication or {}).get("created_at"),
+        "cultural_fit_score": _number((cultural or {}).get("cultural_fit_score")),
+        "cultural_coverage": _number((cultural or {}).get("coverage_percentage")),
+        "cultural_evaluated_at": (cultural or {}).get("created_at"),
+        "partial": bool((evaluation or {}).get("partial", False)),
+        "scores": score_rows,
+        "score_count": len(score_rows),
+        "best_final_score": max(final_scores) if final_scores else None,
+        "exported_at": exported_at,
+    }
+
+def arrow_schema():
+    import pyarrow as pa
+
+    score = pa.struct([("job_id", pa.string()), ("final_score", pa.float64()), ("technical", pa.float64()),
+                       ("communication", pa.float64()), ("cultural", pa.float64()), ("optional", pa.float64()),
+                       ("partial", pa.bool_()), ("created_at", pa.string())])
+    return pa.schema([
+        ("candidate_id", pa.string()), ("name", pa.string()), ("email", pa.string()), ("skills", pa.list_(pa.string())),
+        ("created_at", pa.string()), ("technical_fit", pa.string()), ("technical_fit_score", pa.int64()),
+        ("technical_answers_score", pa.string()), ("technical_coverage", pa.float64()), ("matched_skills", pa.list_(pa.string())),
+        ("technical_evaluated_at", pa.string()), ("communication_score", pa.float64()), ("communication_evaluated_at", pa.string()),
+        ("cultural_fit_score", pa.float64()), ("cultural_coverage", pa.float64()), ("cultural_evaluated_at", pa.string()),
+        ("partial", pa.bool_()), ("scores", pa.list_(score)), ("score_count", pa.int64()), ("best_final_score", pa.float64()),
+        ("exported_at", pa.string()),
+    ])
+
+class NdjsonWriter:
+    def __init__(self, f):
+        self.f = f
+
+    def write_batch(self, records):
+        for record in records:
+            self.f.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+
+    def close(self):
+        self.f.flush()
+
+class ArrowWriter:
+    """
+    Writes each batch of records as one Parquet row group or Arrow IPC record batch.
+    """
+    def __init__(self, path, file_format):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.schema = arrow_schema()
+        if file_format == "parquet":
+            self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+
+    def write_batch(self, records):
+        import pyarrow as pa
+
+        if records:
+            self.writer.write_table(pa.Table.from_pylist(records, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+class EvaluationExporter:
+    """
+    Streams candidates joined with their evaluations and scores into an export file.
+    """
+    def __init__(self, db, batch_size=EXPORT_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        self.watermarks = db["export_watermarks"]
+        self._indexes_created = False
+
+    def ensure_indexes(self):
+        if not self._indexes_created:
+            for name in JOINED_COLLECTIONS:
+                self.db[name].create_index("candidate_id")
+            self._indexes_created = True
+
+    def _changed_candidate_ids(self, since):
+        """
+        Ids (as strings, ascending) of candidates saved, evaluated or scored at or after since, without duplicates.
+        """
+        since_id = ObjectId.from_datetime(since)
+        streams = [(str(document["_id"]) for document in
+                    self.db["candidates"].find({"_id": {"$gte": since_id}}, {"_id": 1}).sort("_id", 1).batch_size(self.batch_size))]
+        for name in JOINED_COLLECTIONS:
+            cursor = self.db[name].find({"_id": {"$gte": since_id}, "candidate_id": {"$type": "string"}}, {"candidate_id": 1, "_id": 0})
+            streams.append(document["candidate_id"] for document in cursor.sort("candidate_id", 1).batch_size(self.batch_size))
+        previous = None
+        for candidate_id in heapq.merge(*streams):
+            if candidate_id != previous and ObjectId.is_valid(candidate_id):
+                yield candidate_id
+            previous = candidate_id
+
+    def _candidate_batches(self, since):
+        """
+        Batches of stored candidate documents, in _id order.
+        """
+        if since is None:
+            batch = []
+            for candidate in self.db["candidates"].find({}).sort("_id", 1).batch_size(self.batch_size):
+                batch.append(candidate)
+                if len(batch) == self.batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+            return
+
+        ids = []
+        for candidate_id in self._changed_candidate_ids(since):
+            ids.append(ObjectId(candidate_id))
+            if len(ids) == self.batch_size:
+                yield list(self.db["candidates"].find({"_id": {"$in": ids}}).sort("_id", 1))
+                ids = []
+        if ids:
+            yield list(self.db["candidates"].find({"_id": {"$in": ids}}).sort("_id", 1))
+
+    def _joined(self, name, candidate_ids):
+        return [unpack_document(document) for document in self.db[name].find({"candidate_id": {"$in": candidate_ids}})]
+
+    def records(self, since=None):
+        """
+        Yield lists of export records, one list per batch of candidates.
+        """
+        self.ensure_indexes()
+        exported_at = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        for candidates in self._candidate_batches(since):
+            candidate_ids = [str(candidate["_id"]) for candidate in candidates]
+            evaluations = _latest(self._joined("evaluations", candidate_ids))
+            communications = _latest(self._joined("communication_evaluations", candidate_ids))
+            culturals = _latest(self._joined("cultural_evaluations", candidate_ids))
+            scores = {}
+            for score in self.db["aggregate_scores"].find({"candidate_id": {"$in": candidate_ids}}):
+                scores.setdefault(score["candidate_id"], []).append(score)
+            yield [build_record(unpack_document(candidate), evaluations.get(candidate_id), communications.get(candidate_id),
+                                culturals.get(candidate_id), scores.get(candidate_id, []), exported_at)
+                   for candidate, candidate_id in zip(candidates, candidate_ids)]
+
+    def export(self, writer, since=None):
+        """
+        Write every record (or those changed since the watermark) with writer. Returns the number of records.
+        """
+        count = 0
+        try:
+            for records in self.records(since):
+                writer.write_batch(records)
+                count += len(records)
+        finally:
+            writer.close()
+        return count
+
+    def export_file(self, path, file_format="ndjson", since=None, name=None):
+        """
+        Export to a file. With a name, since defaults to the export's stored watermark, which is
+        advanced to the start of this run once the file is complete.
+        Returns {"records", "since", "watermark"}.
+        """
+        started = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+        if name is not None and since is None:
+            stored = self.watermarks.find_one({"_id": name})
+            since = parse_watermark(stored["watermark"]) if stored else None
+        if file_format == "ndjson":
+            with open(path, "w", encoding="utf-8") as f:
+                count = self.export(NdjsonWriter(f), since)
+        else:
+            count = self.export(ArrowWriter(path, file_format), since)
+        if name is not None:
+            self.watermarks.update_one({"_id": name}, {"$set": {
+                "watermark": format_watermark(started),
+                "records": count,
+                "updated_at": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+            }}, upsert=True)
+        logger.info(f"Exported {count} candidates to {path}")
+        return {"records": count, "since": format_watermark(since) if since else None, "watermark": format_watermark(started)}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export candidates joined with their evaluations and scores")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--since", help="only candidates changed at or after this UTC time (YYYY-MM-DD HH:MM:SS)")
+    parser.add_argument("--incremental", metavar="NAME", help="continue from (and advance) the named export's stored watermark")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from agents import get_mongo_client
+
+    exporter = EvaluationExporter(get_mongo_client()["candidate_db"], batch_size=args.batch_size)
+    since = parse_watermark(args.since) if args.since else None
+    print(json.dumps(exporter.export_file(args.out, args.format, since, args.incremental), indent=2))
@@ -0,0 +1,322 @@
+"""
+Tiered evaluation funnel that gates the expensive LLM stages.
+
+A full evaluation costs four or more LLM calls (resume parsing, technical, communication,
+cultural, optional factors). The funnel runs them in tiers and stops a candidate as soon
+as a cheaper tier rules them out:
+
+1. prescreen (no LLM call): the resume text is pre-parsed locally (resume_sections.py)
+   and checked against the job's hard requirements (every required skill present, at
+   least min_years_experience when the experience dates could be read) and its skill
+   overlap (share of the job's skills found in the resume) must reach min_skill_overlap
+2. parse and technical: the resume is parsed and evaluated technically on the cheapest
+   model tier only (routing stage "funnel_technical", never escalated); the technical
+   fit (Low/Medium/High as 30/60/90) must reach min_technical_score
+3. communication and cultural, in parallel, then the aggregate score (with aggregate set)
+
+Thresholds are configured per job (funnel_configs collection) over FUNNEL_DEFAULTS; the
+job's skills default to the short skill-like items of its job description. Every
+candidate's furthest stage is counted per job in funnel_stats, and the report joins
+those counts with the job's LLM spend per stage from the token ledger.
+"""
+import datetime
+import json
+import os
+import re
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from agents import convert_to_json_serializable
+from deadlines import DeadlineExceeded, submit_in_context, deadline_marker
+from ledger import llm_ledger
+from resume_sections import preparse_resume, RESUME_LOCAL_CONFIDENCE, ROLE_RE
+from similarity import normalize_skill
+
+logger = logging.getLogger(__name__)
+
+FUNNEL_DEFAULTS = {
+    "required_skills": [],
+    # The job's skills for the overlap check; None derives them from the job description
+    "skills": None,
+    "min_skill_overlap": 0.3,
+    "min_years_experience": 0,
+    "min_technical_score": 60,
+    "aggregate": True,
+}
+FUNNEL_DEFAULTS.update(json.loads(os.getenv("FUNNEL_DEFAULTS", "{}")))
+TECHNICAL_FIT_SCORES = {"Low": 30, "Medium": 60, "High": 90}
+
+# Lead-ins that precede skills in job descriptions ("experience with Kafka")
+SKILL_LEAD_RE = re.compile(r"^(?:(?:\d+\+?\s+years?\s+(?:of\s+)?)?(?:hands-on\s+|strong\s+|solid\s+|deep\s+|working\s+)?"
+                           r"(?:experience|knowledge|proficiency|familiarity|expertise|skills?)\s+(?:with|in|of|using)\s+|"
+                           r"(?:and|or|e\.g\.|such as|including|like)\s+)", re.IGNORECASE)
+SKILL_SPLIT_RE = re.compile(r"\s*[,;:|•·●▪()\n]\s*|\s+(?:and|or)\s+|\.\s+")
+MONTH_YEAR_RE = re.compile(r"(?:(\d{1,2})/)?((?:19|20)\d{2})")
+# Headings and soft phrases that look like skills to the extractor
+NOT_A_SKILL_RE = re.compile(r"^(?:requirements|responsibilities|qualifications|nice to have|preferred|benefits|about(?: us| the role)?|"
+                            r"what you.*|who you are|the role|bonus)$|\b(?:skills|abilities|years?)$", re.IGNORECASE)
+
+SENTENCE_OPENERS = {"we", "you", "your", "our", "the", "this", "it", "as", "in", "at", "if", "for", "to", "a", "an", "all", "must", "will"}
+
+def extract_jd_skills(job_description, limit=40):
+    """
+    Skill-like items of a job description: short (1-3 word) phrases that are capitalized or contain
+    a technology symbol ("Python", "AWS", "CI/CD", "Node.js", "C++").
+    """
+    skills = []
+    for item in SKILL_SPLIT_RE.split(job_description):
+        item = SKILL_LEAD_RE.sub("", item.strip(" .-*")).strip(" .-*")
+        words = item.split()
+        if not 1 <= len(words) <= 3 or not (item[0].isupper() or re.search(r"[./+#]", item)):
+            continue
+        # Sentence openers ("We", "The team"), headings and job titles are not skills
+        if item.split()[0].lower() in SENTENCE_OPENERS or NOT_A_SKILL_RE.search(item) or ROLE_RE.search(item):
+            continue
+        skill = normalize_skill(item)
+        if skill not in skills:
+            skills.append(skill)
+    return skills[:limit]
+
+def _skill_pattern(skill):
+    return re.compile(rf"(?<![\w+#.]){re.escape(skill)}(?![\w+#])")
+
+def _experience_years(work_experience):
+    """
+    Years covered by the union of the experience date ranges, or None when no range could be read.
+    """
+    now = datetime.date.today()
+    spans = []
+    for job in work_experience:
+        parts = str(job.get("duration", "") if isinstance(job, dict) else "").split(" - ")
+        if len(parts) != 2:
+            continue
+        start = MONTH_YEAR_RE.search(parts[0])
+        end = MONTH_YEAR_RE.search(parts[1])
+        if start is None or (end is None and not re.search(r"present|current|now", parts[1], re.IGNORECASE)):
+            continue
+        start_month = int(start.group(2)) * 12 + int(start.group(1) or 1) - 1
+        end_month = now.year * 12 + now.month - 1 if end is None else int(end.group(2)) * 12 + int(end.group(1) or 12) - 1
+        if end_month >= start_month:
+            spans.append((start_month, end_month + 1))
+    if not spans:
+        return None
+    months, covered_until = 0, None
+    for start_month, end_month in sorted(spans):
+        if covered_until is not None and start_month < covered_until:
+            start_month = covered_until
+        if end_month > start_month:
+            months += end_month - start_month
+            covered_until = end_month
+    return round(months / 12, 1)
+
+def prescreen(text, preparsed, job_description, config):
+    """
+    The local prescreen decision for a resume's text and its preparse_resume() result: {"passed",
+    "skill_overlap", "matched_skills", "missing_required_skills", "years_experience", "reasons"}.
+    """
+    lowered = text.lower()
+    resume_skills = set()
+    years = None
+    if preparsed is not None:
+        resume_skills = {normalize_skill(skill) for skill in preparsed.fields["skills"]}
+        if preparsed.confidence["work_experience"] >= RESUME_LOCAL_CONFIDENCE:
+            years = _experience_years(preparsed.fields["work_experience"])
+
+    def has(skill):
+        skill = normalize_skill(skill)
+        return skill in resume_skills or _skill_pattern(skill).search(lowered) is not None
+
+    job_skills = [normalize_skill(skill) for skill in config["skills"]] if config["skills"] else extract_jd_skills(job_description)
+    matched = [skill for skill in job_skills if has(skill)]
+    overlap = round(len(matched) / len(job_skills), 3) if job_skills else 1.0
+    missing_required = [skill for skill in config["required_skills"] if not has(skill)]
+
+    reasons = []
+    if missing_required:
+        reasons.append("missing_required_skills")
+    if overlap < config["min_skill_overlap"]:
+        reasons.append("low_skill_overlap")
+    # Experience that could not be read locally is left to the later stages rather than rejected
+    if config["min_years_experience"] and years is not None and years < config["min_years_experience"]:
+        reasons.append("too_little_experience")
+    return {
+        "passed": not reasons,
+        "skill_overlap": overlap,
+        "job_skills": job_skills,
+        "matched_skills": matched,
+        "missing_required_skills": missing_required,
+        "years_experience": years,
+        "reasons": reasons,
+    }
+
+def validate_config(overrides):
+    """
+    Validate funnel threshold overrides. Returns (overrides, None) or (None, error message).
+    """
+    if not isinstance(overrides, dict):
+        return None, "Funnel configuration must be a JSON object"
+    unknown = set(overrides) - set(FUNNEL_DEFAULTS)
+    if unknown:
+        return None, f"Unknown funnel settings: {', '.join(sorted(unknown))}"
+    for key in ("required_skills", "skills"):
+        value = overrides.get(key)
+        if value is not None and (not isinstance(value, list) or not all(isinstance(skill, str) for skill in value)):
+            return None, f"{key} must be a JSON array of strings"
+    for key, low, high in (("min_skill_overlap", 0, 1), ("min_years_experience", 0, 50), ("min_technical_score", 0, 100)):
+        value = overrides.get(key)
+        if value is not None and (not isinstance(value, (int, float)) or isinstance(value, bool) or not low <= value <= high):
+            return None, f"{key} must be a number between {low} and {high}"
+    if "aggregate" in overrides and not isinstance(overrides["aggregate"], bool):
+        return None, "aggregate must be true or false"
+    return overrides, None
+
+class CandidateFunnel:
+    """
+    Runs candidates through the prescreen, technical and full evaluation tiers of a job's funnel.
+    """
+    def __init__(self, parser_agent, technical_agent, cultural_agent, scoring_agent):
+        self.parser_agent = parser_agent
+        self.technical_agent = technical_agent
+        self.communication_agent = technical_agent.communication_agent
+        self.cultural_agent = cultural_agent
+        self.scoring_agent = scoring_agent
+        self.configs = parser_agent.db["funnel_configs"]
+        self.stats = parser_agent.db["funnel_stats"]
+
+    def get_config(self, job_id):
+        """
+        The job's effective funnel configuration (defaults with the job's overrides).
+        """
+        stored = self.configs.find_one({"_id": job_id}) or {}
+        return {**FUNNEL_DEFAULTS, **stored.get("overrides", {})}
+
+    def set_config(self, job_id, overrides):
+        """
+        Merge threshold overrides into the job's configuration. Returns (config, None) or (None, error message).
+        """
+        overrides, error = validate_config(overrides)
+        if error:
+            return None, error
+        stored = (self.configs.find_one({"_id": job_id}) or {}).get("overrides", {})
+        stored.update(overrides)
+        self.configs.update_one({"_id": job_id}, {"$set": {
+            "overrides": stored,
+            "updated_at": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        }}, upsert=True)
+        return {**FUNNEL_DEFAULTS, **stored}, None
+
+    def _record(self, job_id, outcome, reasons=()):
+        """
+        Count one candidate's furthest stage: "rejected_prescreen", "rejected_technical", "completed" or "failed".
+        """
+        increments = {"entered": 1, f"outcomes.{outcome}": 1}
+        for reason in reasons:
+            increments[f"reasons.{reason}"] = 1
+        self.stats.update_one({"_id": job_id}, {"$inc": increments}, upsert=True)
+
+    def evaluate(self, job_id, job_description, resume_path, answers_array, github_url, weights=None):
+        """
+        Run one candidate through the job's funnel. Returns the furthest stage reached, each stage's
+        result and, for candidates that pass every tier, the aggregate score.
+        """
+        start_time = time.time()
+        config = self.get_config(job_id)
+        text, error_result = self.parser_agent.extract_resume_text(resume_path, keep_lines=True)
+        if error_result:
+            return {"error": f"Candidate parsing failed: {error_result['error']}"}
+
+        # Tier 1: local prescreen, no LLM call. Parsing reuses the extracted and pre-parsed text
+        preparsed = preparse_resume(text)
+        screen = prescreen(text, preparsed, job_description, config)
+        response = {"job_id": job_id, "prescreen": screen}
+        if not screen["passed"]:
+            self._record(job_id, "rejected_prescreen", screen["reasons"])
+            return dict(response, stage_reached="prescreen", decision="rejected", processing_time=round(time.time() - start_time, 2))
+
+        # Tier 2: parse and a cheap technical evaluation
+        candidate_data = self.parser_agent.parse_candidate(resume_path, answers_array, github_url, resume_text=text, preparsed=preparsed)
+        if candidate_data.get("deadline_exceeded"):
+            return dict(candidate_data, **response)
+        if "error" in candidate_data:
+            self._record(job_id, "failed")
+            return {"error": f"Candidate parsing failed: {candidate_data['error']}", **response}
+        response["candidate_id"] = candidate_data.get("mongo_id", "")
+        try:
+            # On the cheapest tier: routing stage funnel_technical is never escalated
+            technical_evaluation = self.technical_agent.evaluate_technical(candidate_data, job_description, stage="funnel_technical")
+        except DeadlineExceeded as e:
+            return dict(deadline_marker(e.stage), **response)
+        except Exception as e:
+            self._record(job_id, "failed")
+            return {"error": f"Technical evaluation failed: {str(e)}", **response}
+        technical_score = TECHNICAL_FIT_SCORES.get(technical_evaluation.get("overall_technical_fit"), 0)
+        response["technical_evaluation"] = technical_evaluation
+        response["technical_score"] = technical_score
+
+        if technical_score < config["min_technical_score"]:
+            evaluation_result = self.technical_agent._build_evaluation_result(
+                technical_evaluation, {"error": "Not evaluated: rejected by the funnel at the technical stage"}, candidate_data, start_time)
+            self.technical_agent.save_to_mongodb(evaluation_result)
+            self._record(job_id, "rejected_technical", ["low_technical_score"])
+            return dict(response, stage_reached="technical", decision="rejected", processing_time=round(time.time() - start_time, 2))
+
+        # Tier 3: communication and cultural evaluations, then the aggregate score
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            communication_future = submit_in_context(executor, self.communication_agent.evaluate_communication, candidate_data)
+            cultural_future = submit_in_context(executor, self.cultural_agent.evaluate_cultural_fit, candidate_data, job_description)
+            communication_evaluation = communication_future.result()
+            cultural_evaluation = cultural_future.result()
+        evaluation_result = self.technical_agent._build_evaluation_result(technical_evaluation, communication_evaluation, candidate_data, start_time)
+        self.technical_agent.save_to_mongodb(evaluation_result)
+        response["communication_evaluation"] = communication_evaluation
+        response["cultural_evaluation"] = cultural_evaluation
+
+        if config["aggregate"] and not any("error" in evaluation for evaluation in (communication_evaluation, cultural_evaluation)):
+            response["aggregate_score"] = self.scoring_agent.calculate_score(
+                technical_evaluation=dict(technical_evaluation, candidate_id=response["candidate_id"]),
+                communication_evaluation=communication_evaluation,
+                cultural_evaluation=cultural_evaluation,
+                weights=weights,
+                job_id=job_id
+            )
+        incomplete_stages = [evaluation["stage"] for evaluation in (communication_evaluation, cultural_evaluation) if evaluation.get("deadline_exceeded")]
+        if incomplete_stages:
+            response["partial"] = True
+            response["incomplete_stages"] = incomplete_stages
+        self._record(job_id, "completed")
+        return convert_to_json_serializable(dict(response, stage_reached="completed", decision="passed",
+                                                 processing_time=round(time.time() - start_time, 2)))
+
+    def report(self, job_id):
+        """
+        The job's funnel: configuration, candidates reaching each stage, conversion between stages,
+        and LLM spend per pipeline stage with the cost per entered and per completed candidate.
+        """
+        stats = self.stats.find_one({"_id": job_id}) or {}
+        outcomes = stats.get("outcomes", {})
+        entered = stats.get("entered", 0)
+        # Candidates that failed on an error are counted as having reached the technical stage
+        reached = {
+            "prescreen": entered,
+            "technical": entered - outcomes.get("rejected_prescreen", 0),
+            "completed": outcomes.get("completed", 0),
+        }
+        conversion = {
+            "prescreen_to_technical": round(reached["technical"] / reached["prescreen"], 3) if reached["prescreen"] else None,
+            "technical_to_completed": round(reached["completed"] / reached["technical"], 3) if reached["technical"] else None,
+            "overall": round(reached["completed"] / entered, 3) if entered else None,
+        }
+        spend = llm_ledger.rollup(["stage"], job_id=job_id)
+        total_cost = sum(group["cost_usd"] for group in spend)
+        return {
+            "job_id": job_id,
+            "config": self.get_config(job_id),
+            "reached": reached,
+            "outcomes": outcomes,
+            "rejection_reasons": stats.get("reasons", {}),
+            "conversion": conversion,
+            "spend_by_stage": [{key: group[key] for key in ("stage", "calls", "prompt_tokens", "completion_tokens", "cost_usd")} for group in spend],
+            "total_cost_usd": round(total_cost, 6),
+            "cost_per_candidate_usd": round(total_cost / entered, 6) if entered else None,
+            "cost_per_completed_usd": round(total_cost / reached["completed"], 6) if reached["completed"] else None,
+        }
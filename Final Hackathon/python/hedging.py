@@ -0,0 +1,256 @@
+"""
+Hedged LLM calls.
+
+All chains in agents.py run at temperature 0, so repeating a call is safe. When
+hedging is enabled (LLM_HEDGING=1) and a call has not returned by the p90 latency
+observed for its stage, a duplicate is sent and whichever answers first wins.
+
+Extra spend is capped: hedges may not exceed LLM_HEDGE_BUDGET (default 10%) of the
+primary calls for a stage, and no hedging happens until LLM_HEDGE_MIN_SAMPLES
+latencies have been seen. Per-stage call counts, hedge rate, hedge wins, latency
+percentiles and the time saved when a hedge beat its primary are available from
+LLMHedger.snapshot().
+"""
+import asyncio
+import os
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from deadlines import submit_in_context
+
+logger = logging.getLogger(__name__)
+
+LLM_HEDGING = os.getenv("LLM_HEDGING", "0") == "1"
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.1"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "500"))
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "90"))
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a list of numbers (None when empty).
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+class StageStats:
+    """
+    Rolling latencies and hedging counters for one pipeline stage.
+    """
+    def __init__(self, window):
+        self.attempt_latencies = deque(maxlen=window)
+        self.call_latencies = deque(maxlen=window)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+        self.seconds_saved = 0.0
+
+    def hedge_after(self, min_samples, pct):
+        if len(self.attempt_latencies) < min_samples:
+            return None
+        return percentile(list(self.attempt_latencies), pct)
+
+    def snapshot(self):
+        latencies = list(self.call_latencies)
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_rate": round(self.hedges / self.calls, 4) if self.calls else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "budget_denied": self.budget_denied,
+            "seconds_saved": round(self.seconds_saved, 3),
+            "hedge_after_seconds": percentile(list(self.attempt_latencies), LLM_HEDGE_PERCENTILE),
+            "latency_p50": percentile(latencies, 50),
+            "latency_p90": percentile(latencies, 90),
+            "latency_p99": percentile(latencies, 99),
+        }
+
+def _discard_outcome(task):
+    """
+    Retrieve a finished task's exception so asyncio does not log it as never retrieved.
+    """
+    if not task.cancelled():
+        task.exception()
+
+class LLMHedger:
+    """
+    Runs idempotent LLM calls, sending a duplicate when the first one is slower than the stage's p90.
+    """
+    def __init__(self, enabled=LLM_HEDGING, budget=LLM_HEDGE_BUDGET, min_samples=LLM_HEDGE_MIN_SAMPLES,
+                 window=LLM_HEDGE_WINDOW, pct=LLM_HEDGE_PERCENTILE, max_workers=None):
+        self.enabled = enabled
+        self.budget = budget
+        self.min_samples = min_samples
+        self.window = window
+        self.pct = pct
+        self.stages = {}
+        # Re-entrant because _stats may create a stage while the lock is held
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or int(os.getenv("LLM_HEDGE_THREADS", "64")), thread_name_prefix="llm-hedge")
+
+    def _stats(self, stage):
+        stats = self.stages.get(stage)
+        if stats is None:
+            with self._lock:
+                stats = self.stages.setdefault(stage, StageStats(self.window))
+        return stats
+
+    def _record_attempt(self, stage, latency):
+        with self._lock:
+            self._stats(stage).attempt_latencies.append(latency)
+
+    def _record_call(self, stage, latency):
+        with self._lock:
+            stats = self._stats(stage)
+            stats.calls += 1
+            stats.call_latencies.append(latency)
+
+    def _hedge_delay(self, stage):
+        """
+        Seconds to wait before hedging this call, or None when it may not be hedged.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._stats(stage).hedge_after(self.min_samples, self.pct)
+
+    def _acquire_hedge(self, stage):
+        """
+        Take one hedge from the stage's budget; False when hedging would exceed it.
+        """
+        with self._lock:
+            stats = self._stats(stage)
+            if stats.hedges + 1 > self.budget * max(stats.calls, 1):
+                stats.budget_denied += 1
+                return False
+            stats.hedges += 1
+            return True
+
+    def _record_win(self, stage, primary):
+        """
+        A hedge answered first; once the primary finishes, credit how much later it would have answered.
+        """
+        won_at = time.monotonic()
+        with self._lock:
+            self._stats(stage).hedge_wins += 1
+
+        def credit(_):
+            with self._lock:
+                self._stats(stage).seconds_saved += time.monotonic() - won_at
+
+        primary.add_done_callback(credit)
+
+    def _timed(self, stage, fn, *args):
+        start = time.monotonic()
+        result = fn(*args)
+        self._record_attempt(stage, time.monotonic() - start)
+        return result
+
+    def call(self, stage, fn, *args):
+        """
+        Call fn(*args), hedging it once if it is slower than the stage's p90.
+        """
+        start = time.monotonic()
+        delay = self._hedge_delay(stage)
+        if delay is None:
+            result = self._timed(stage, fn, *args)
+            self._record_call(stage, time.monotonic() - start)
+            return result
+
+        primary = submit_in_context(self._executor, self._timed, stage, fn, *args)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._acquire_hedge(stage):
+            result = primary.result()
+            self._record_call(stage, time.monotonic() - start)
+            return result
+
+        hedge = submit_in_context(self._executor, self._timed, stage, fn, *args)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                # The slower attempt keeps running in the pool; its result is discarded
+                if future is hedge:
+                    self._record_win(stage, primary)
+                self._record_call(stage, time.monotonic() - start)
+                return future.result()
+        raise error
+
+    async def _atimed(self, stage, fn, *args):
+        start = time.monotonic()
+        result = await fn(*args)
+        self._record_attempt(stage, time.monotonic() - start)
+        return result
+
+    async def acall(self, stage, fn, *args):
+        """
+        Async variant of call.
+        """
+        start = time.monotonic()
+        delay = self._hedge_delay(stage)
+        if delay is None:
+            result = await self._atimed(stage, fn, *args)
+            self._record_call(stage, time.monotonic() - start)
+            return result
+
+        primary = asyncio.ensure_future(self._atimed(stage, fn, *args))
+        hedge = None
+        pending = set()
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._acquire_hedge(stage):
+                result = await primary
+                self._record_call(stage, time.monotonic() - start)
+                return result
+
+            hedge = asyncio.ensure_future(self._atimed(stage, fn, *args))
+            pending = {primary, hedge}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    if task is hedge:
+                        self._record_win(stage, primary)
+                    self._record_call(stage, time.monotonic() - start)
+                    return task.result()
+            raise error
+        except asyncio.CancelledError:
+            # asyncio.wait does not cancel what it waits on: when the caller gives up (deadline,
+            # client disconnect), stop every attempt so none keeps running and spending
+            primary.cancel()
+            if hedge is not None:
+                hedge.cancel()
+            raise
+        finally:
+            # A losing hedge is cancelled; a losing primary runs on so the time saved can be measured
+            if hedge in pending:
+                hedge.cancel()
+            # Nobody awaits a losing attempt, so retrieve its outcome for it
+            for task in pending:
+                task.add_done_callback(_discard_outcome)
+
+    def snapshot(self):
+        """
+        Per-stage hedging metrics.
+        """
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "budget": self.budget,
+                "stages": {stage: stats.snapshot() for stage, stats in self.stages.items()}
+            }
+
+llm_hedger = LLMHedger()
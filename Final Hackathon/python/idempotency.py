@@ -0,0 +1,171 @@
+"""
+Idempotency-Key support for the evaluation endpoints.
+
+A client that retries a POST with the same Idempotency-Key gets the stored response
+of the first attempt instead of a second run of the LLM pipeline (and a second set of
+candidates/answers/evaluations documents). Keys are scoped to the endpoint and stored
+in the idempotency_keys collection with a TTL index, so they expire after
+IDEMPOTENCY_TTL_SECONDS.
+
+While the first attempt is still running, a retry attaches to it for at most
+IDEMPOTENCY_WAIT_SECONDS (and never past its own deadline): in the same worker it waits on
+the in-flight computation, in another worker it polls the stored key. A retry still
+waiting then gets 409 with Retry-After, so retries of one slow request cannot tie up the
+worker's threads.
+A key whose owner died (its lease expired) is taken over by the next retry. Reusing a
+key with a different request body is rejected, and server errors are not stored so the
+retry runs again.
+"""
+import datetime
+import hashlib
+import os
+import socket
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "600"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "5"))
+
+def request_fingerprint(form, files):
+    """
+    SHA-256 over the form fields and uploaded file contents of a request.
+    """
+    digest = hashlib.sha256()
+    for name in sorted(form):
+        digest.update(f"{name}={form[name]}\n".encode())
+    for name in sorted(files):
+        stream = files[name].stream
+        position = stream.tell()
+        stream.seek(0)
+        digest.update(f"{name}:".encode())
+        for block in iter(lambda: stream.read(1 << 16), b""):
+            digest.update(block)
+        stream.seek(position)
+    return digest.hexdigest()
+
+class IdempotencyStore:
+    """
+    Stored responses and in-flight claims for idempotency keys, in MongoDB.
+    """
+    def __init__(self, db, ttl=IDEMPOTENCY_TTL_SECONDS, lease=IDEMPOTENCY_LEASE_SECONDS):
+        self.collection = db["idempotency_keys"]
+        self.ttl = ttl
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.inflight = {}
+        self._lock = threading.Lock()
+        self._indexes_created = False
+
+    def ensure_indexes(self):
+        """
+        Create the TTL index that expires keys.
+        """
+        if not self._indexes_created:
+            self.collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexes_created = True
+
+    def reset_after_fork(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.inflight = {}
+
+    def _now(self):
+        return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+    def lookup(self, key):
+        """
+        The unexpired document stored for key, or None. Reads nothing of the request.
+        """
+        document = self.collection.find_one({"_id": key})
+        if document is None or document["expires_at"] <= self._now():
+            return None
+        return document
+
+    def begin(self, key, fingerprint, wait=IDEMPOTENCY_WAIT_SECONDS):
+        """
+        Claim key for a new computation. Returns ("claimed", None), ("done", stored document)
+        or ("mismatch", None) when the key was used with a different request.
+        Blocks up to wait seconds while another attempt with the same key is in flight,
+        then returns ("in_progress", None).
+        """
+        from pymongo.errors import DuplicateKeyError
+
+        self.ensure_indexes()
+        deadline = time.monotonic() + wait
+        while True:
+            now = self._now()
+            try:
+                self.collection.insert_one({
+                    "_id": key,
+                    "fingerprint": fingerprint,
+                    "status": "in_progress",
+                    "owner": self.owner,
+                    "locked_until": now + datetime.timedelta(seconds=self.lease),
+                    "created_at": now,
+                    "expires_at": now + datetime.timedelta(seconds=self.ttl)
+                })
+                with self._lock:
+                    self.inflight[key] = threading.Event()
+                return "claimed", None
+            except DuplicateKeyError:
+                pass
+
+            document = self.collection.find_one({"_id": key})
+            if document is None or document["expires_at"] <= now:
+                # Expired but not yet removed by the TTL monitor
+                self.collection.delete_one({"_id": key, "expires_at": {"$lte": now}})
+                continue
+            if document["fingerprint"] != fingerprint:
+                return "mismatch", None
+            if document["status"] == "done":
+                return "done", document
+
+            # In flight: take over a claim whose owner died, otherwise wait for it
+            if document["locked_until"] <= now:
+                taken = self.collection.update_one(
+                    {"_id": key, "status": "in_progress", "locked_until": document["locked_until"]},
+                    {"$set": {"owner": self.owner, "locked_until": now + datetime.timedelta(seconds=self.lease)}}
+                )
+                if taken.modified_count:
+                    logger.warning(f"Took over stale idempotency key {key} from {document['owner']}")
+                    with self._lock:
+                        self.inflight[key] = threading.Event()
+                    return "claimed", None
+            if time.monotonic() >= deadline:
+                return "in_progress", None
+            with self._lock:
+                event = self.inflight.get(key)
+            if event is not None:
+                event.wait(timeout=max(0.0, deadline - time.monotonic()))
+            else:
+                time.sleep(0.5)
+
+    def _finish(self, key):
+        with self._lock:
+            event = self.inflight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def complete(self, key, body, status_code):
+        """
+        Store the response of a claimed key so retries replay it.
+        """
+        try:
+            self.collection.update_one(
+                {"_id": key, "owner": self.owner},
+                {"$set": {"status": "done", "body": body, "status_code": status_code, "completed_at": self._now()}}
+            )
+        finally:
+            self._finish(key)
+
+    def release(self, key):
+        """
+        Drop a claim without storing a response (server errors), so a retry recomputes.
+        """
+        try:
+            self.collection.delete_one({"_id": key, "owner": self.owner, "status": "in_progress"})
+        finally:
+            self._finish(key)
@@ -0,0 +1,224 @@
+"""
+Input-fingerprinted incremental re-evaluation.
+
+Every stage output (parse, communication, technical, cultural, aggregate) is stored in
+the stage_outputs collection together with a fingerprint of exactly the inputs the
+stage consumed:
+- parse: SHA-256 of the resume file and the GitHub URL
+- communication: the answers and how they are scored (local prescoring, its borderline
+  band and the request's feedback mode, see communication_prescore.py)
+- technical: the JD and the whole candidate data the technical prompt is sent (profile,
+  contact details, GitHub data and every answer), less the fields that change on every
+  build of it (VOLATILE_CANDIDATE_FIELDS)
+- cultural: the JD and the soft skills, culture-fit answers and GitHub contributions
+- aggregate: the fingerprints of the three evaluations, the weights and the job
+
+A re-evaluation recomputes only the stages whose fingerprint changed, so editing a JD
+reruns technical, cultural and aggregate but reuses parsing and communication, and
+adding one answer reruns communication but not parsing.
+"""
+import hashlib
+import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from storage import pack_document, unpack_document
+from deadlines import DeadlineExceeded, submit_in_context, deadline_marker
+from communication_prescore import COMMUNICATION_PRESCORE, COMMUNICATION_BORDERLINE, narrative_requested
+
+logger = logging.getLogger(__name__)
+
+# Stamped afresh each time candidate data is built or saved; not evaluation inputs
+VOLATILE_CANDIDATE_FIELDS = ("created_at", "mongo_id", "processing_time")
+
+def fingerprint(*parts):
+    """
+    Stable SHA-256 fingerprint of JSON-serializable stage inputs.
+    """
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+def stable_candidate_data(candidate_data):
+    """
+    Candidate data without the fields that differ between two builds of the same inputs.
+    """
+    return {key: value for key, value in candidate_data.items() if key not in VOLATILE_CANDIDATE_FIELDS}
+
+def file_sha256(path):
+    """
+    SHA-256 of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class IncrementalEvaluator:
+    """
+    Runs the full evaluation pipeline for a candidate, reusing stage outputs whose inputs are unchanged.
+    """
+    def __init__(self, parser_agent, technical_agent, cultural_agent, scoring_agent):
+        self.parser_agent = parser_agent
+        self.technical_agent = technical_agent
+        self.communication_agent = technical_agent.communication_agent
+        self.cultural_agent = cultural_agent
+        self.scoring_agent = scoring_agent
+        self.collection = parser_agent.db["stage_outputs"]
+        self._indexes_created = False
+
+    def ensure_indexes(self):
+        if not self._indexes_created:
+            from pymongo import ASCENDING
+
+            self.collection.create_index([("candidate_key", ASCENDING), ("stage", ASCENDING)], unique=True)
+            self._indexes_created = True
+
+    def _store(self, candidate_key, stage, stage_fingerprint, output):
+        # Outputs are stored compressed (see storage.py); they are only read back whole
+        stored_output, _ = pack_document("stage_outputs", output)
+        self.collection.update_one(
+            {"candidate_key": candidate_key, "stage": stage},
+            {"$set": {
+                "fingerprint": stage_fingerprint,
+                "output": stored_output,
+                "updated_at": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+            }},
+            upsert=True
+        )
+
+    def _run_stage(self, stored, report, candidate_key, stage, stage_fingerprint, compute):
+        """
+        Return the stored output when the fingerprint matches, otherwise compute and store it.
+        Failed outputs are returned but not stored, so the next re-evaluation retries them.
+        """
+        previous = stored.get(stage)
+        if previous and previous.get("fingerprint") == stage_fingerprint:
+            report[stage] = "reused"
+            return unpack_document(previous["output"])
+
+        try:
+            output = compute()
+        except DeadlineExceeded as e:
+            output = deadline_marker(e.stage)
+        except Exception as e:
+            output = {"error": f"{stage} stage failed: {str(e)}"}
+        if isinstance(output, dict) and "error" in output:
+            report[stage] = "failed"
+            return output
+
+        self._store(candidate_key, stage, stage_fingerprint, output)
+        report[stage] = "recomputed"
+        return output
+
+    def _parse(self, resume_path, answers_array, github_url):
+        """
+        Parse stage: resume and GitHub data, saved as a candidate document.
+        """
+        resume_data = self.parser_agent.parse_resume(resume_path)
+        if "error" in resume_data:
+            return {"error": resume_data["error"]}
+        github_data = self.parser_agent.fetch_github_contributions(github_url)
+
+        candidate_data = self.parser_agent._build_candidate_data(resume_data, answers_array, github_data)
+        mongo_id = self.parser_agent.save_to_mongodb(candidate_data, answers_array)
+        if isinstance(mongo_id, dict):
+            return mongo_id
+        return {
+            "resume_data": resume_data,
+            "github_data": github_data,
+            "mongo_id": mongo_id,
+            "answers_fingerprint": fingerprint(answers_array)
+        }
+
+    def reevaluate(self, candidate_key, resume_path, answers_array, github_url, job_description, weights=None, job_id=None):
+        """
+        Evaluate a candidate end to end, recomputing only stages whose inputs changed.
+        """
+        start_time = time.time()
+        self.ensure_indexes()
+        stored = {doc["stage"]: doc for doc in self.collection.find({"candidate_key": candidate_key})}
+        report = {}
+
+        # Parse stage
+        parse_fingerprint = fingerprint(file_sha256(resume_path), github_url)
+        parsed = self._run_stage(stored, report, candidate_key, "parse", parse_fingerprint,
+                                 lambda: self._parse(resume_path, answers_array, github_url))
+        if parsed.get("deadline_exceeded"):
+            return dict(parsed, stages=report)
+        if "error" in parsed:
+            return {"error": f"Candidate parsing failed: {parsed['error']}", "stages": report}
+
+        # Answers are not a parse input, but the saved candidate must carry the current ones
+        answers_fingerprint = fingerprint(answers_array)
+        if parsed["answers_fingerprint"] != answers_fingerprint:
+            self.parser_agent.update_answers(parsed["mongo_id"], answers_array)
+            parsed["answers_fingerprint"] = answers_fingerprint
+            self._store(candidate_key, "parse", parse_fingerprint, parsed)
+
+        candidate_data = self.parser_agent._build_candidate_data(parsed["resume_data"], answers_array, parsed["github_data"])
+        candidate_data["mongo_id"] = parsed["mongo_id"]
+
+        # Evaluation stages are independent of each other
+        # A locally scored communication evaluation must not be reused for a request that wants the LLM's narrative
+        communication_mode = ["prescore", list(COMMUNICATION_BORDERLINE), narrative_requested()] if COMMUNICATION_PRESCORE else ["llm"]
+        fingerprints = {
+            "communication": fingerprint(answers_fingerprint, communication_mode),
+            # evaluate_technical sends the whole candidate data (json.dumps) with the JD
+            "technical": fingerprint(job_description, stable_candidate_data(candidate_data)),
+            "cultural": fingerprint(job_description, *self.cultural_agent._cultural_inputs(candidate_data)),
+        }
+        computations = {
+            "communication": lambda: self.communication_agent.evaluate_communication(candidate_data),
+            "technical": lambda: self.technical_agent.evaluate_technical(candidate_data, job_description),
+            "cultural": lambda: self.cultural_agent.evaluate_cultural_fit(candidate_data, job_description),
+        }
+        with ThreadPoolExecutor(max_workers=len(computations)) as executor:
+            futures = {
+                stage: submit_in_context(executor, self._run_stage, stored, report, candidate_key, stage, fingerprints[stage], compute)
+                for stage, compute in computations.items()
+            }
+            results = {stage: future.result() for stage, future in futures.items()}
+
+        technical_evaluation = results["technical"]
+        communication_evaluation = results["communication"]
+        cultural_evaluation = results["cultural"]
+
+        # Keep the combined technical/communication evaluation document in step with recomputed stages
+        if "error" not in technical_evaluation and (report["technical"] == "recomputed" or report["communication"] == "recomputed"):
+            evaluation_result = self.technical_agent._build_evaluation_result(technical_evaluation, communication_evaluation, candidate_data, start_time)
+            self.technical_agent.save_to_mongodb(evaluation_result)
+
+        # Aggregate stage
+        aggregate = None
+        if any("error" in result for result in results.values()):
+            report["aggregate"] = "skipped"
+        else:
+            aggregate_fingerprint = fingerprint(fingerprints, weights, job_id)
+            aggregate = self._run_stage(
+                stored, report, candidate_key, "aggregate", aggregate_fingerprint,
+                lambda: self.scoring_agent.calculate_score(
+                    technical_evaluation=dict(technical_evaluation, candidate_id=parsed["mongo_id"]),
+                    communication_evaluation=communication_evaluation,
+                    cultural_evaluation=cultural_evaluation,
+                    weights=weights,
+                    job_id=job_id
+                )
+            )
+
+        logger.info(f"Re-evaluated candidate {candidate_key}: {report}")
+        incomplete_stages = [stage for stage, result in results.items() if result.get("deadline_exceeded")]
+        response = {
+            "candidate_key": candidate_key,
+            "candidate_id": parsed["mongo_id"],
+            "stages": report,
+            "candidate_data": candidate_data,
+            "technical_evaluation": technical_evaluation,
+            "communication_evaluation": communication_evaluation,
+            "cultural_evaluation": cultural_evaluation,
+            "aggregate_score": aggregate,
+            "processing_time": round(time.time() - start_time, 2)
+        }
+        if incomplete_stages:
+            response["partial"] = True
+            response["incomplete_stages"] = incomplete_stages
+        return response
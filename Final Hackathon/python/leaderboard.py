@@ -0,0 +1,193 @@
+"""
+Per-job candidate leaderboard.
+
+Every aggregate score saved by ScoringAndAggregationAgent is upserted into the
+leaderboard_entries collection (one document per job and candidate, backed by a
+compound (job_id, final_score, candidate_id) index) and into an in-memory sorted
+structure per job. Top-K, pagination and rank-of-candidate queries are served from
+memory in O(log n), independent of how many applicants the job has.
+
+Each worker keeps its own in-memory copy. A job's copy is loaded in full once; after
+that, once it is older than LEADERBOARD_REFRESH_SECONDS, only the entries updated since
+its watermark are read back (a (job_id, updated_at) index), so scores written by other
+workers show up within that window. Loads and refreshes run outside the process-wide
+lock, which only guards the in-memory structures; readers of a job being refreshed are
+served its current copy. The watermark trails by LEADERBOARD_CLOCK_SKEW_SECONDS to
+tolerate clock differences between workers.
+"""
+import os
+import threading
+import time
+import logging
+from pymongo import ASCENDING, DESCENDING
+from sortedcontainers import SortedList
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_REFRESH_SECONDS = float(os.getenv("LEADERBOARD_REFRESH_SECONDS", "30"))
+LEADERBOARD_CLOCK_SKEW_SECONDS = float(os.getenv("LEADERBOARD_CLOCK_SKEW_SECONDS", "5"))
+
+def _timestamp(seconds):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(seconds))
+
+class JobLeaderboard:
+    """
+    Sorted (highest score first) candidate scores for one job.
+    """
+    def __init__(self):
+        # Entries are (-final_score, candidate_id) so the natural sort order is the ranking
+        self.entries = SortedList()
+        self.by_candidate = {}
+        self.updated_at = {}
+        self.loaded_at = time.monotonic()
+        # Entries updated at or after this time are read back on the next refresh
+        self.watermark = ""
+
+    def upsert(self, candidate_id, final_score, updated_at=None):
+        # A refresh read before a newer local write must not roll the entry back
+        if updated_at is not None:
+            if updated_at < self.updated_at.get(candidate_id, ""):
+                return
+            self.updated_at[candidate_id] = updated_at
+        previous = self.by_candidate.get(candidate_id)
+        if previous is not None:
+            self.entries.remove(previous)
+        entry = (-float(final_score), candidate_id)
+        self.entries.add(entry)
+        self.by_candidate[candidate_id] = entry
+
+    def page(self, offset, limit):
+        return [
+            {"rank": offset + i + 1, "candidate_id": candidate_id, "final_score": -neg_score}
+            for i, (neg_score, candidate_id) in enumerate(self.entries.islice(offset, offset + limit))
+        ]
+
+    def rank(self, candidate_id):
+        entry = self.by_candidate.get(candidate_id)
+        if entry is None:
+            return None
+        return {"rank": self.entries.index(entry) + 1, "candidate_id": candidate_id, "final_score": -entry[0]}
+
+class LeaderboardIndex:
+    """
+    Leaderboards for all jobs, persisted in MongoDB and cached in memory.
+    """
+    def __init__(self, db):
+        self.collection = db["leaderboard_entries"]
+        self.jobs = {}
+        self._job_locks = {}
+        self._lock = threading.Lock()
+        self._indexes_created = False
+
+    def ensure_indexes(self):
+        """
+        Create the unique (job, candidate) index and the compound ranking index.
+        """
+        if self._indexes_created:
+            return
+        self.collection.create_index([("job_id", ASCENDING), ("candidate_id", ASCENDING)], unique=True)
+        self.collection.create_index([("job_id", ASCENDING), ("final_score", DESCENDING), ("candidate_id", ASCENDING)])
+        self.collection.create_index([("job_id", ASCENDING), ("updated_at", ASCENDING)])
+        self._indexes_created = True
+
+    def _load(self, job_id):
+        """
+        Build a job's in-memory leaderboard from the compound index. Runs outside the lock.
+        """
+        board = JobLeaderboard()
+        board.watermark = _timestamp(time.time() - LEADERBOARD_CLOCK_SKEW_SECONDS)
+        cursor = self.collection.find(
+            {"job_id": job_id},
+            {"_id": 0, "candidate_id": 1, "final_score": 1, "updated_at": 1}
+        ).sort([("final_score", DESCENDING), ("candidate_id", ASCENDING)]).batch_size(5000)
+        for doc in cursor:
+            board.upsert(doc["candidate_id"], doc["final_score"], doc.get("updated_at"))
+        logger.debug(f"Loaded leaderboard for job {job_id} with {len(board.entries)} candidates")
+        return board
+
+    def _refresh(self, job_id, board):
+        """
+        Apply the entries of a job updated (by any worker) since the board's watermark.
+        The query runs outside the lock; applying the changes takes it briefly.
+        """
+        watermark = _timestamp(time.time() - LEADERBOARD_CLOCK_SKEW_SECONDS)
+        changes = list(self.collection.find(
+            {"job_id": job_id, "updated_at": {"$gte": board.watermark}},
+            {"_id": 0, "candidate_id": 1, "final_score": 1, "updated_at": 1}
+        ))
+        with self._lock:
+            for doc in changes:
+                board.upsert(doc["candidate_id"], doc["final_score"], doc.get("updated_at"))
+            board.watermark = watermark
+            board.loaded_at = time.monotonic()
+
+    def _board(self, job_id):
+        """
+        The job's in-memory leaderboard, loaded on first use and refreshed once stale.
+        Only one thread per job loads or refreshes; while a refresh runs, others get the current copy.
+        """
+        with self._lock:
+            board = self.jobs.get(job_id)
+            if board is not None and time.monotonic() - board.loaded_at <= LEADERBOARD_REFRESH_SECONDS:
+                return board
+            job_lock = self._job_locks.setdefault(job_id, threading.Lock())
+        if not job_lock.acquire(blocking=board is None):
+            return board
+        try:
+            with self._lock:
+                board = self.jobs.get(job_id)
+            if board is None:
+                board = self._load(job_id)
+                with self._lock:
+                    self.jobs[job_id] = board
+            elif time.monotonic() - board.loaded_at > LEADERBOARD_REFRESH_SECONDS:
+                self._refresh(job_id, board)
+            return board
+        finally:
+            job_lock.release()
+
+    def record(self, job_id, candidate_id, final_score, score_id=None):
+        """
+        Upsert a candidate's latest score for a job into MongoDB and the in-memory leaderboard.
+        """
+        self.ensure_indexes()
+        updated_at = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        self.collection.update_one(
+            {"job_id": job_id, "candidate_id": candidate_id},
+            {"$set": {
+                "final_score": final_score,
+                "score_id": score_id,
+                "updated_at": updated_at
+            }},
+            upsert=True
+        )
+        with self._lock:
+            board = self.jobs.get(job_id)
+            if board is not None:
+                board.upsert(candidate_id, final_score, updated_at)
+
+    def top(self, job_id, limit=20, offset=0):
+        """
+        Return one page of the job's leaderboard, best score first.
+        """
+        board = self._board(job_id)
+        with self._lock:
+            return {
+                "job_id": job_id,
+                "total_candidates": len(board.entries),
+                "offset": offset,
+                "limit": limit,
+                "candidates": board.page(offset, limit)
+            }
+
+    def rank(self, job_id, candidate_id):
+        """
+        Return a candidate's 1-based rank for a job, or None if the candidate has no score.
+        """
+        board = self._board(job_id)
+        with self._lock:
+            result = board.rank(candidate_id)
+            if result is not None:
+                result["job_id"] = job_id
+                result["total_candidates"] = len(board.entries)
+            return result
@@ -0,0 +1,339 @@
+"""
+Token and cost ledger for every LLM and embedding call.
+
+Each chat call made through invoke_chain/ainvoke_chain (via a LangChain callback) and
+each embedding request that reaches the network (MeteredEmbeddings, inside the
+embedding cache) appends one compact entry to the llm_ledger collection:
+
+    t  timestamp            d  day (YYYY-MM-DD)     k  kind: chat | embedding | batch
+    s  pipeline stage       m  model                j  job id (when known)
+    p  prompt tokens        c  completion tokens    l  latency (ms)    e  1 if the call failed
+
+Entries are buffered in memory and written with insert_many every LEDGER_FLUSH_SECONDS
+(or LEDGER_FLUSH_RECORDS entries) by a background thread, so calls never wait on the
+ledger. The job id comes from the request context (set_ledger_context), so every stage
+of a request is attributed to the same job. rollup() groups the entries by stage, job,
+day, model or kind and prices them with LLM_PRICES (USD per million tokens).
+"""
+import atexit
+import contextvars
+from contextlib import contextmanager
+import datetime
+import json
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+LEDGER_FLUSH_SECONDS = float(os.getenv("LEDGER_FLUSH_SECONDS", "5"))
+LEDGER_FLUSH_RECORDS = int(os.getenv("LEDGER_FLUSH_RECORDS", "500"))
+LEDGER_RETENTION_DAYS = float(os.getenv("LEDGER_RETENTION_DAYS", "400"))
+# USD per million tokens: [prompt, completion]
+LLM_PRICES = {
+    "gpt-4o-mini": [0.15, 0.60],
+    "gpt-4o": [2.50, 10.00],
+    "text-embedding-ada-002": [0.10, 0],
+    "text-embedding-3-small": [0.02, 0],
+    "text-embedding-3-large": [0.13, 0],
+}
+LLM_PRICES.update(json.loads(os.getenv("LLM_PRICES", "{}")))
+# Batch API requests are billed at half price
+BATCH_DISCOUNT = 0.5
+
+GROUP_FIELDS = {"stage": "s", "job": "j", "day": "d", "model": "m", "kind": "k"}
+
+_ledger_context = contextvars.ContextVar("ledger_context", default={})
+_unpriced_models = set()
+
+def set_ledger_context(**fields):
+    """
+    Attribute the LLM calls of the current request (or task) to fields such as job_id; returns a reset token.
+    """
+    return _ledger_context.set({key: value for key, value in fields.items() if value})
+
+def reset_ledger_context(token):
+    _ledger_context.reset(token)
+
+def current_job_id():
+    return _ledger_context.get().get("job_id")
+
+def cost_usd(model, prompt_tokens, completion_tokens, kind="chat"):
+    """
+    Price of a call; models missing from LLM_PRICES cost 0 (and are logged once).
+    """
+    prices = LLM_PRICES.get(model)
+    if prices is None:
+        # Dated snapshots (gpt-4o-mini-2024-07-18) are priced as their base model
+        prices = next((value for name, value in LLM_PRICES.items() if model and model.startswith(name + "-")), None)
+    if prices is None:
+        if model not in _unpriced_models:
+            _unpriced_models.add(model)
+            logger.warning(f"No price configured for model {model}; set LLM_PRICES")
+        return 0.0
+    cost = (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+    return cost * BATCH_DISCOUNT if kind == "batch" else cost
+
+class Ledger:
+    """
+    Buffered writer and roll-up queries for the llm_ledger collection.
+    """
+    def __init__(self, collection_factory):
+        self.collection_factory = collection_factory
+        self._collection = None
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+        self._wake = threading.Event()
+        self._suspended = False
+        self._skipped = 0
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            self._collection = self.collection_factory()
+            self._collection.create_index("t", expireAfterSeconds=int(LEDGER_RETENTION_DAYS * 86400))
+            self._collection.create_index([("d", 1), ("s", 1)])
+            self._collection.create_index([("j", 1), ("d", 1)], sparse=True)
+        return self._collection
+
+    def _ensure_flusher(self):
+        # One flusher thread per process; a forked worker starts its own
+        if self._flusher_pid != os.getpid():
+            self._flusher_pid = os.getpid()
+            self._buffer = []
+            threading.Thread(target=self._flush_loop, name="ledger-flush", daemon=True).start()
+
+    def reset_after_fork(self):
+        """
+        Drop the collection, buffer and flusher inherited from the parent in a freshly forked
+        worker; the worker opens its own MongoDB connection on its first flush.
+        """
+        self._collection = None
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+        self._wake = threading.Event()
+        self._suspended = False
+        self._skipped = 0
+
+    @contextmanager
+    def suspended(self):
+        """
+        Skip recording inside the block, so a prefork master that warms up never starts a
+        flusher or a MongoDB client for its workers to inherit. Skipped calls are logged.
+        """
+        self._suspended, self._skipped = True, 0
+        try:
+            yield
+        finally:
+            self._suspended = False
+            if self._skipped:
+                logger.info(f"Skipped {self._skipped} ledger entries while recording was suspended")
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait(LEDGER_FLUSH_SECONDS)
+            self._wake.clear()
+            self.flush()
+
+    def record(self, kind, stage, model, prompt_tokens, completion_tokens, latency_ms, job_id=None, failed=False):
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        entry = {"t": now, "d": now.strftime("%Y-%m-%d"), "k": kind, "s": stage, "m": model or "unknown",
+                 "p": int(prompt_tokens or 0), "c": int(completion_tokens or 0), "l": int(latency_ms)}
+        if job_id:
+            entry["j"] = job_id
+        if failed:
+            entry["e"] = 1
+        with self._lock:
+            if self._suspended:
+                self._skipped += 1
+                return
+            self._ensure_flusher()
+            self._buffer.append(entry)
+            if len(self._buffer) >= LEDGER_FLUSH_RECORDS:
+                self._wake.set()
+
+    def flush(self):
+        """
+        Write buffered entries; entries are dropped (with a warning) if MongoDB is unavailable.
+        """
+        with self._lock:
+            entries, self._buffer = self._buffer, []
+        if not entries:
+            return
+        try:
+            self.collection.insert_many(entries, ordered=False)
+        except Exception as e:
+            logger.warning(f"Dropped {len(entries)} ledger entries: {str(e)}")
+
+    def rollup(self, group_by=("stage",), job_id=None, since=None, until=None, kind=None):
+        """
+        Calls, tokens, latency and cost grouped by any of stage, job, day, model and kind.
+        since/until are inclusive days (YYYY-MM-DD).
+        """
+        self.flush()
+        match = {}
+        if job_id:
+            match["j"] = job_id
+        if kind:
+            match["k"] = kind
+        if since or until:
+            match["d"] = {key: value for key, value in (("$gte", since), ("$lte", until)) if value}
+        # Always group by model and kind internally so each group can be priced
+        keys = list(dict.fromkeys(list(group_by) + ["model", "kind"]))
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": {key: f"${GROUP_FIELDS[key]}" for key in keys},
+                "calls": {"$sum": 1},
+                "failed_calls": {"$sum": {"$ifNull": ["$e", 0]}},
+                "prompt_tokens": {"$sum": "$p"},
+                "completion_tokens": {"$sum": "$c"},
+                "max_prompt_tokens": {"$max": "$p"},
+                "latency_ms": {"$sum": "$l"}
+            }}
+        ]
+        groups = {}
+        for row in self.collection.aggregate(pipeline):
+            group_key = tuple(row["_id"].get(key) for key in group_by)
+            group = groups.setdefault(group_key, {
+                **{key: row["_id"].get(key) for key in group_by},
+                "calls": 0, "failed_calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "max_prompt_tokens": 0, "latency_ms": 0, "cost_usd": 0.0
+            })
+            for field in ["calls", "failed_calls", "prompt_tokens", "completion_tokens", "latency_ms"]:
+                group[field] += row[field]
+            group["max_prompt_tokens"] = max(group["max_prompt_tokens"], row["max_prompt_tokens"])
+            group["cost_usd"] += cost_usd(row["_id"]["model"], row["prompt_tokens"], row["completion_tokens"], row["_id"]["kind"])
+
+        result = []
+        for group in groups.values():
+            calls = max(group["calls"], 1)
+            group["avg_prompt_tokens"] = round(group["prompt_tokens"] / calls, 1)
+            group["avg_completion_tokens"] = round(group["completion_tokens"] / calls, 1)
+            group["avg_latency_ms"] = round(group.pop("latency_ms") / calls, 1)
+            group["cost_usd"] = round(group["cost_usd"], 6)
+            result.append(group)
+        return sorted(result, key=lambda group: -group["cost_usd"])
+
+def _ledger_collection():
+    from agents import get_mongo_client
+
+    return get_mongo_client()["candidate_db"]["llm_ledger"]
+
+llm_ledger = Ledger(_ledger_collection)
+atexit.register(llm_ledger.flush)
+
+_callback_class = None
+
+def _usage(response):
+    """
+    (prompt tokens, completion tokens, model) from a LangChain LLMResult.
+    """
+    llm_output = response.llm_output or {}
+    model = llm_output.get("model_name")
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                metadata = getattr(generation.message, "response_metadata", {}) or {}
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0), model or metadata.get("model_name")
+    token_usage = llm_output.get("token_usage") or {}
+    return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0), model
+
+def ledger_callback(stage):
+    """
+    A LangChain callback handler that records the chat model calls of one chain invocation.
+    """
+    global _callback_class
+    if _callback_class is None:
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        class LedgerCallback(BaseCallbackHandler):
+            def __init__(self, stage, job_id):
+                self.stage = stage
+                self.job_id = job_id
+                self.started = {}
+
+            def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+                self.started[run_id] = time.monotonic()
+
+            def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+                self.started[run_id] = time.monotonic()
+
+            def on_llm_end(self, response, *, run_id, **kwargs):
+                latency_ms = (time.monotonic() - self.started.pop(run_id, time.monotonic())) * 1000
+                prompt_tokens, completion_tokens, model = _usage(response)
+                llm_ledger.record("chat", self.stage, model, prompt_tokens, completion_tokens, latency_ms, self.job_id)
+
+            def on_llm_error(self, error, *, run_id, **kwargs):
+                latency_ms = (time.monotonic() - self.started.pop(run_id, time.monotonic())) * 1000
+                llm_ledger.record("chat", self.stage, None, 0, 0, latency_ms, self.job_id, failed=True)
+
+        _callback_class = LedgerCallback
+    return _callback_class(stage, current_job_id())
+
+_encoding = None
+
+def count_tokens(text):
+    """
+    Tokens in text for the OpenAI embedding models (cl100k_base), or the ~4 characters per token estimate.
+    """
+    global _encoding
+    try:
+        if _encoding is None:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    except Exception:
+        return len(text) // 4 + 1
+
+class MeteredEmbeddings:
+    """
+    Embeddings wrapper that records every request in the ledger. Wrap it inside the
+    embedding cache so only the texts that actually reach the network are counted.
+    """
+    def __init__(self, underlying, stage):
+        self.underlying = underlying
+        self.stage = stage
+        # CachedEmbeddings namespaces its cache by the model name
+        self.model = getattr(underlying, "model", type(underlying).__name__)
+
+    def _record(self, texts, started, failed=False):
+        tokens = 0 if failed else sum(count_tokens(text) for text in texts)
+        llm_ledger.record("embedding", self.stage, self.model, tokens, 0, (time.monotonic() - started) * 1000, current_job_id(), failed)
+
+    def _metered(self, method, texts, argument):
+        started = time.monotonic()
+        try:
+            result = method(argument)
+        except Exception:
+            self._record(texts, started, failed=True)
+            raise
+        self._record(texts, started)
+        return result
+
+    async def _ametered(self, method, texts, argument):
+        started = time.monotonic()
+        try:
+            result = await method(argument)
+        except Exception:
+            self._record(texts, started, failed=True)
+            raise
+        self._record(texts, started)
+        return result
+
+    def embed_documents(self, texts):
+        return self._metered(self.underlying.embed_documents, texts, texts)
+
+    def embed_query(self, text):
+        return self._metered(self.underlying.embed_query, [text], text)
+
+    async def aembed_documents(self, texts):
+        return await self._ametered(self.underlying.aembed_documents, texts, texts)
+
+    async def aembed_query(self, text):
+        return await self._ametered(self.underlying.aembed_query, [text], text)
@@ -0,0 +1,209 @@
+"""
+Evaluation of one candidate against many job descriptions in one pass.
+
+Internal mobility and talent-pool matching score a candidate against 10-50 open roles.
+Running /evaluate_candidate once per role would re-parse the resume, re-fetch GitHub,
+re-score communication and re-embed the candidate every time. Here the candidate-side
+work is done once:
+
+- the candidate is parsed (or loaded from the store by candidate_id) once
+- communication is evaluated once, since it does not depend on the JD
+- the candidate's retrieval query is embedded together with all role queries in one
+  batched embedding call, and its knowledge-base hits are looked up once; each role's
+  context is its own hits merged with the candidate's, nearest first
+
+Only the JD-specific technical and cultural evaluations run per role, as independent
+LLM calls with at most MULTI_ROLE_CONCURRENCY in flight. The result is a role-by-dimension
+score matrix (technical fit, cultural fit, communication, and a weighted overall score),
+best role first, with each role's full evaluations alongside.
+"""
+import json
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from bson import ObjectId
+from agents import invoke_chain, convert_to_json_serializable, merge_hits
+from deadlines import DeadlineExceeded, submit_in_context, deadline_marker
+
+logger = logging.getLogger(__name__)
+
+MULTI_ROLE_MAX_ROLES = int(os.getenv("MULTI_ROLE_MAX_ROLES", "50"))
+MULTI_ROLE_CONCURRENCY = int(os.getenv("MULTI_ROLE_CONCURRENCY", "8"))
+RETRIEVAL_K = 3
+
+# overall_technical_fit is the JD-dependent part of the technical evaluation, so it ranks roles
+TECHNICAL_FIT_SCORES = {"Low": 30, "Medium": 60, "High": 90}
+DEFAULT_ROLE_WEIGHTS = {"technical": 0.5, "communication": 0.2, "cultural": 0.3}
+
+def parse_multi_role_request(form):
+    """
+    Validate the roles and weights form fields of a multi-role evaluation.
+    Returns ({"roles": [...], "weights": {...}}, None) or (None, error message).
+    """
+    try:
+        roles = json.loads(form.get("roles", ""))
+        weights = json.loads(form["weights"]) if form.get("weights") else DEFAULT_ROLE_WEIGHTS
+    except (ValueError, TypeError):
+        return None, "roles and weights must be valid JSON"
+    if not isinstance(roles, list) or not 1 <= len(roles) <= MULTI_ROLE_MAX_ROLES:
+        return None, f"roles must be a JSON array of 1 to {MULTI_ROLE_MAX_ROLES} roles"
+    normalized = []
+    for index, role in enumerate(roles):
+        if isinstance(role, str):
+            role = {"role_id": str(index), "job_description": role}
+        if not isinstance(role, dict) or not isinstance(role.get("job_description"), str) or not role["job_description"].strip():
+            return None, "Each role must be a job description string or an object with role_id and job_description"
+        normalized.append({"role_id": str(role.get("role_id", index)), "job_description": role["job_description"]})
+    if len({role["role_id"] for role in normalized}) != len(normalized):
+        return None, "role_id values must be unique"
+    if (not isinstance(weights, dict) or set(weights) != set(DEFAULT_ROLE_WEIGHTS)
+            or not all(isinstance(value, (int, float)) and value >= 0 for value in weights.values()) or not sum(weights.values())):
+        return None, "weights must be a JSON object with non-negative technical, communication and cultural weights"
+    return {"roles": normalized, "weights": weights}, None
+
+class MultiRoleEvaluator:
+    """
+    Scores one candidate against many roles, sharing all candidate-side work between them.
+    """
+    def __init__(self, technical_agent, cultural_agent):
+        self.technical_agent = technical_agent
+        self.parser_agent = technical_agent.parser_agent
+        self.communication_agent = technical_agent.communication_agent
+        self.cultural_agent = cultural_agent
+        self.store = technical_agent.store
+
+    def load_candidate(self, candidate_id):
+        """
+        A stored candidate (with its answers) in the shape parse_candidate returns, or None.
+        """
+        if not ObjectId.is_valid(candidate_id):
+            return None
+        candidate_data = self.store.load("candidates", {"_id": ObjectId(candidate_id)})
+        if candidate_data is None:
+            return None
+        candidate_data.pop("_id", None)
+        candidate_data["mongo_id"] = candidate_id
+        return convert_to_json_serializable(candidate_data)
+
+    def _role_contexts(self, agent, candidate_query, role_queries):
+        """
+        Retrieved context per role: one batched embedding call for the candidate and every role,
+        one search for the candidate, one per role, merged nearest first.
+        """
+        try:
+            vectors = agent.embeddings.embed_documents([candidate_query] + role_queries)
+            candidate_hits = agent.vector_store.similarity_search_with_score_by_vector(vectors[0], k=RETRIEVAL_K)
+            return [merge_hits([agent.vector_store.similarity_search_with_score_by_vector(vector, k=RETRIEVAL_K), candidate_hits], RETRIEVAL_K)
+                    for vector in vectors[1:]]
+        except Exception as e:
+            return [f"Error retrieving context: {str(e)}"] * len(role_queries)
+
+    def _technical(self, candidate_data, candidate_data_str, job_description, retrieved_context):
+        try:
+            result = invoke_chain(self.technical_agent.chain, {
+                "candidate_data": candidate_data_str,
+                "job_description": job_description,
+                "retrieved_context": retrieved_context
+            }, stage="technical")
+            return self.technical_agent._finalize_technical(result, candidate_data, job_description)
+        except DeadlineExceeded as e:
+            return deadline_marker(e.stage)
+        except Exception as e:
+            return {"error": f"Technical evaluation failed: {str(e)}"}
+
+    def _cultural(self, candidate_data, cultural_data_str, job_description, retrieved_context):
+        start_time = time.time()
+        try:
+            result = invoke_chain(self.cultural_agent.chain, {
+                "candidate_data": cultural_data_str,
+                "job_description": job_description,
+                "retrieved_context": retrieved_context
+            }, stage="cultural")
+            return self.cultural_agent._finalize_cultural(result, candidate_data, job_description, start_time)
+        except DeadlineExceeded as e:
+            return deadline_marker(e.stage)
+        except Exception as e:
+            return {"error": f"Cultural fit evaluation failed: {str(e)}"}
+
+    def evaluate(self, candidate_data, roles, weights=None):
+        """
+        Evaluate parsed candidate data against every role and return the role-by-dimension score matrix.
+        """
+        start_time = time.time()
+        weights = weights or DEFAULT_ROLE_WEIGHTS
+        job_descriptions = [role["job_description"] for role in roles]
+
+        # Candidate-side inputs, built once for every role
+        candidate_data_str = json.dumps(candidate_data, indent=2)
+        soft_skills, culture_fit_answers, github_contributions = self.cultural_agent._cultural_inputs(candidate_data)
+        cultural_data_str = json.dumps({
+            "soft_skills": soft_skills,
+            "culture_fit_answers": culture_fit_answers,
+            "github_contributions": github_contributions
+        }, indent=2)
+        technical_contexts = self._role_contexts(self.technical_agent, str(candidate_data.get("skills", [])), job_descriptions)
+        cultural_possible = bool(soft_skills or culture_fit_answers or github_contributions)
+        if cultural_possible:
+            cultural_contexts = self._role_contexts(self.cultural_agent, f"{soft_skills}\n{json.dumps(culture_fit_answers)}", job_descriptions)
+
+        tasks = [(None, "communication", self.communication_agent.evaluate_communication, (candidate_data,))]
+        for index, role in enumerate(roles):
+            tasks.append((role["role_id"], "technical", self._technical,
+                          (candidate_data, candidate_data_str, role["job_description"], technical_contexts[index])))
+            if cultural_possible:
+                tasks.append((role["role_id"], "cultural", self._cultural,
+                              (candidate_data, cultural_data_str, role["job_description"], cultural_contexts[index])))
+        with ThreadPoolExecutor(max_workers=min(MULTI_ROLE_CONCURRENCY, len(tasks))) as executor:
+            futures = [submit_in_context(executor, compute, *args) for _, _, compute, args in tasks]
+            outputs = [future.result() for future in futures]
+
+        communication_evaluation = outputs[0]
+        evaluations = {role["role_id"]: {
+            "technical_evaluation": None,
+            "cultural_evaluation": None if cultural_possible else {"error": "No relevant data (soft skills, culture-fit answers, or GitHub contributions) provided for cultural evaluation"}
+        } for role in roles}
+        for (role_id, dimension, _, _), output in zip(tasks[1:], outputs[1:]):
+            evaluations[role_id][f"{dimension}_evaluation"] = output
+
+        communication_score = communication_evaluation.get("communication_score")
+        matrix = []
+        for role in roles:
+            evaluation = evaluations[role["role_id"]]
+            scores = {
+                "technical": TECHNICAL_FIT_SCORES.get(evaluation["technical_evaluation"].get("overall_technical_fit")),
+                "communication": communication_score,
+                "cultural": evaluation["cultural_evaluation"].get("cultural_fit_score"),
+            }
+            # Dimensions that failed are left out of the overall score rather than counted as 0
+            scored = {dimension: score for dimension, score in scores.items() if isinstance(score, (int, float)) and weights[dimension]}
+            total_weight = sum(weights[dimension] for dimension in scored)
+            overall = round(sum(score * weights[dimension] for dimension, score in scored.items()) / total_weight, 2) if total_weight else None
+            matrix.append({"role_id": role["role_id"], **scores, "overall": overall, "missing": sorted(set(scores) - set(scored))})
+        matrix.sort(key=lambda row: row["overall"] if row["overall"] is not None else -1, reverse=True)
+
+        incomplete_stages = sorted({output["stage"] for output in outputs if isinstance(output, dict) and output.get("deadline_exceeded")})
+        logger.info(f"Evaluated candidate {candidate_data.get('mongo_id', '')} against {len(roles)} roles with {len(tasks)} LLM evaluations")
+        response = {
+            "candidate_id": candidate_data.get("mongo_id", ""),
+            "weights": weights,
+            "matrix": matrix,
+            "communication_evaluation": communication_evaluation,
+            "evaluations": evaluations,
+            "processing_time": round(time.time() - start_time, 2)
+        }
+        if incomplete_stages:
+            response["partial"] = True
+            response["incomplete_stages"] = incomplete_stages
+        return convert_to_json_serializable(response)
+
+    def evaluate_upload(self, resume_path, answers_array, github_url, roles, weights=None):
+        """
+        Parse (and save) an uploaded candidate once, then evaluate it against every role.
+        """
+        candidate_data = self.parser_agent.parse_candidate(resume_path, answers_array, github_url)
+        if candidate_data.get("deadline_exceeded"):
+            return candidate_data
+        if "error" in candidate_data:
+            return {"error": f"Candidate parsing failed: {candidate_data['error']}"}
+        return self.evaluate(candidate_data, roles, weights)
@@ -0,0 +1,124 @@
+"""
+On-demand profiling of a running worker, for the admin endpoints in app.py.
+
+- sample_stacks(): a sampling profiler. The calling thread reads every other thread's
+  Python stack (sys._current_frames) at a fixed interval for N seconds. mode="wall" keeps every
+  sample, which shows where requests wait (LLM calls, MongoDB). mode="cpu" drops samples
+  whose innermost frame is a known blocking wait, which leaves the CPU work.
+- MemoryProfile: tracemalloc allocations made while one request is handled, by traceback.
+
+Both produce the folded-stack format ("frame;frame;frame count" per line) read by
+flamegraph.pl, speedscope and inferno; allocation profiles are weighted in bytes.
+Nothing is installed while no profile is running, so the idle overhead is one header
+check per request. Only one profile of each kind runs at a time per process.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+MEMORY_PROFILE_FRAMES = int(os.getenv("MEMORY_PROFILE_FRAMES", "30"))
+MEMORY_PROFILES_KEPT = 10
+
+# Innermost Python functions of a thread blocked in C (locks, sockets, selectors) rather than running
+IDLE_FUNCTIONS = {"wait", "_wait_for_tstate_lock", "select", "accept", "read", "readinto", "recv_into", "readline"}
+
+_cpu_lock = threading.Lock()
+_memory_lock = threading.Lock()
+_memory_profiles = {}
+
+class ProfileBusy(Exception):
+    """
+    Raised when a profile of the same kind is already running in this process.
+    """
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _stack(frame):
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    return frames[::-1]
+
+def fold(counts):
+    """
+    Render {stack tuple: weight} as folded stacks, heaviest first.
+    """
+    return "".join(f"{';'.join(stack)} {weight}\n" for stack, weight in sorted(counts.items(), key=lambda item: -item[1]))
+
+def sample_stacks(seconds, interval=0.005, mode="wall"):
+    """
+    Sample every thread's stack for `seconds` and return (folded stacks, sample count).
+    Raises ProfileBusy if a sampling profile is already running in this process.
+    """
+    if not _cpu_lock.acquire(blocking=False):
+        raise ProfileBusy("A CPU profile is already running in this worker")
+    try:
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        counts = Counter()
+        samples = 0
+        deadline = time.monotonic() + min(seconds, PROFILE_MAX_SECONDS)
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = _stack(frame)
+                if mode == "cpu" and frames[-1].f_code.co_name in IDLE_FUNCTIONS:
+                    continue
+                thread_name = names.get(ident) or f"thread-{ident}"
+                counts[(thread_name.rstrip("0123456789_-") or "thread",) + tuple(_frame_label(f.f_code) for f in frames)] += 1
+            samples += 1
+            time.sleep(interval)
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+        return fold(counts), samples
+    finally:
+        _cpu_lock.release()
+
+class MemoryProfile:
+    """
+    Traces the allocations made while one request is handled. Allocations by other
+    threads during the request are included; the profile is meant for a quiet worker.
+    """
+    def __init__(self, profile_id):
+        if not _memory_lock.acquire(blocking=False):
+            raise ProfileBusy("A memory profile is already running in this worker")
+        self.profile_id = profile_id
+        self.started_here = not tracemalloc.is_tracing()
+        if self.started_here:
+            tracemalloc.start(MEMORY_PROFILE_FRAMES)
+        tracemalloc.reset_peak()
+        self.baseline = tracemalloc.take_snapshot()
+
+    def finish(self):
+        """
+        Stop tracing and keep the folded allocation profile (bytes still allocated, grouped by traceback).
+        """
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            if self.started_here:
+                tracemalloc.stop()
+        finally:
+            _memory_lock.release()
+
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        counts = Counter()
+        for stat in snapshot.filter_traces(filters).compare_to(self.baseline.filter_traces(filters), "traceback"):
+            if stat.size_diff > 0:
+                stack = tuple(f"{os.path.basename(frame.filename)}:{frame.lineno}" for frame in stat.traceback)
+                counts[stack] += stat.size_diff
+        profile = {"folded": fold(counts), "allocated_bytes": sum(counts.values()), "peak_traced_bytes": peak}
+        _memory_profiles[self.profile_id] = profile
+        while len(_memory_profiles) > MEMORY_PROFILES_KEPT:
+            _memory_profiles.pop(next(iter(_memory_profiles)))
+        return profile
+
+def get_memory_profile(profile_id):
+    return _memory_profiles.get(profile_id)
@@ -0,0 +1,380 @@
+"""
+Local resume sectioning and field extraction, ahead of the resume-parsing LLM call.
+
+preparse_resume() splits the extracted resume text into sections by their headers
+("Skills", "Work Experience", "Education", ...) and extracts each output field of the
+parser prompt deterministically where the layout allows it:
+
+- email: a regular expression over the whole text
+- name: the first line of the header block that looks like a person's name
+- skills: the items of the Skills section (comma, pipe or bullet separated, with
+  "Category: a, b" lines flattened)
+- work_experience: entries of the Experience section, one per date range, with the
+  role and company from the same or the preceding lines and bullets as responsibilities
+- education and certifications: one entry per degree/institution or certification line
+
+Every field gets a confidence between 0 and 1. Fields at or above RESUME_LOCAL_CONFIDENCE
+are taken as extracted; only the others go to the LLM, together with just the sections
+they are read from. When every field clears the threshold the LLM is not called at all.
+Text without recognizable section headers returns None and is parsed by the LLM as before.
+"""
+import os
+import re
+
+RESUME_PREPARSE = os.getenv("RESUME_PREPARSE", "1") == "1"
+RESUME_LOCAL_CONFIDENCE = float(os.getenv("RESUME_LOCAL_CONFIDENCE", "0.9"))
+
+RESUME_FIELDS = ["name", "email", "skills", "work_experience", "education", "certifications"]
+
+SECTION_ALIASES = {
+    "summary": ["summary", "profile", "professional summary", "career summary", "objective", "career objective",
+                "about", "about me", "professional profile"],
+    "skills": ["skills", "technical skills", "core skills", "key skills", "skills and tools", "skills and technologies",
+               "technologies", "tech stack", "technical stack", "tools", "tools and technologies", "core competencies",
+               "competencies", "expertise", "areas of expertise", "technical proficiencies"],
+    "experience": ["experience", "work experience", "professional experience", "relevant experience", "employment",
+                   "employment history", "work history", "career history", "professional background"],
+    "education": ["education", "academic background", "education and training", "academics", "academic qualifications",
+                  "educational background"],
+    "certifications": ["certifications", "certificates", "certification", "licenses and certifications",
+                       "licences and certifications", "certifications and training", "courses and certifications",
+                       "professional certifications"],
+    "projects": ["projects", "personal projects", "selected projects", "key projects", "academic projects",
+                 "open source", "open source projects"],
+    "other": ["awards", "honors", "honors and awards", "achievements", "publications", "interests", "hobbies",
+              "languages", "volunteer", "volunteering", "volunteer experience", "references", "activities",
+              "leadership", "contact", "contact information", "links"],
+}
+_HEADERS = {alias: section for section, aliases in SECTION_ALIASES.items() for alias in aliases}
+
+# Sections each field is read from when it has to go to the LLM ("header" is the text above the first section)
+FIELD_SECTIONS = {
+    "name": ["header"],
+    "email": ["header", "other"],
+    "skills": ["summary", "skills", "experience", "projects"],
+    "work_experience": ["experience"],
+    "education": ["education"],
+    "certifications": ["certifications"],
+}
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+BULLET_RE = re.compile(r"^\s*[•●▪◦‣∙·*\-–]\s*")
+MONTHS = {"jan": "01", "feb": "02", "mar": "03", "apr": "04", "may": "05", "jun": "06",
+          "jul": "07", "aug": "08", "sep": "09", "oct": "10", "nov": "11", "dec": "12"}
+_DATE = r"(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+\d{4}|\d{1,2}/\d{4}|(?:19|20)\d{2})"
+DATE_RANGE_RE = re.compile(rf"({_DATE})\s*(?:-|–|—|to)\s*({_DATE}|present|current|now|today)", re.IGNORECASE)
+YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+# Spelled-out degrees in any case; abbreviations (B.S., MSc, PhD) only as written, so "be" and "me" in prose do not match
+DEGREE_RE = re.compile(r"(?i:\b(?:bachelor|master|doctor(?:ate)?|associate(?:'s)? degree|diploma|high school)\b)"
+                       r"|\b(?:B\.?\s?S\.?c?|M\.?\s?S\.?c?|B\.?\s?A|M\.?\s?A|B\.?\s?E|M\.?\s?E|B\.?\s?Tech|M\.?\s?Tech|Ph\.?\s?D|MBA)(?!\w)")
+# Location parts ("Boston, MA") that read like degree abbreviations
+STATE_CODES = {"MA", "ME", "MS"}
+INSTITUTION_RE = re.compile(r"\b(?:university|universit[ée]|college|institute|school|academy|polytechnic|conservatory)\b", re.IGNORECASE)
+ROLE_RE = re.compile(r"\b(?:engineer|developer|programmer|manager|analyst|scientist|designer|consultant|architect|intern|"
+                     r"lead|director|specialist|administrator|officer|associate|coordinator|head|president|founder|"
+                     r"technician|assistant|researcher|tester|devops|sre|cto|ceo|owner|contractor|freelancer)\b", re.IGNORECASE)
+# Legal-form suffixes: "Lead Software Inc." is a company even though "lead" is a role word
+COMPANY_RE = re.compile(r"\b(?:inc|llc|ltd|corp|corporation|gmbh|plc|company)\b\.?", re.IGNORECASE)
+# Parts of a heading line that separate role, company and location
+PART_SPLIT_RE = re.compile(r"\s+[|—–-]\s+|\s+@\s+|\s+at\s+|,\s+|\s*\|\s*")
+IGNORED_EDUCATION_RE = re.compile(r"^(?:gpa|cgpa|grade|honou?rs|relevant coursework|coursework|thesis|minor|dean)", re.IGNORECASE)
+NOT_A_NAME = {"resume", "curriculum", "vitae", "cv", "profile", "contact"}
+
+def _header_section(line):
+    """
+    (section, rest of the line) when line is a section header, e.g. ("skills", "Python, SQL") for
+    "Skills: Python, SQL"; None otherwise.
+    """
+    head, _, rest = line.partition(":")
+    key = re.sub(r"\s+", " ", re.sub(r"[^a-z ]", " ", head.lower().replace("&", " and "))).strip()
+    if len(head) > 45 or key not in _HEADERS:
+        return None
+    # "Languages: Python, Go" inside a Skills section is a skill category, not a new section
+    if rest.strip() and _HEADERS[key] == "other":
+        return None
+    return _HEADERS[key], rest.strip()
+
+def _lines(text):
+    """
+    Non-empty lines with whitespace collapsed; a bullet glyph alone on its line is joined to the next line.
+    """
+    lines = []
+    joining = False
+    for raw in text.splitlines():
+        line = re.sub(r"\s+", " ", raw).strip()
+        if not line:
+            continue
+        if joining:
+            lines[-1] = f"{lines[-1]} {line}"
+            joining = False
+            continue
+        lines.append(line)
+        joining = BULLET_RE.sub("", line) == ""
+    return lines
+
+def _is_bullet(line):
+    return bool(BULLET_RE.match(line)) and not DATE_RANGE_RE.match(line)
+
+def _strip_bullet(line):
+    return BULLET_RE.sub("", line).strip()
+
+def _normalize_date(value):
+    value = value.strip().rstrip(".")
+    lowered = value.lower()
+    if lowered in ("present", "current", "now", "today"):
+        return "Present"
+    if "/" in value:
+        month, year = value.split("/")
+        return f"{int(month):02d}/{year}"
+    month = MONTHS.get(lowered[:3])
+    if month:
+        return f"{month}/{value.split()[-1]}"
+    return value
+
+def _without_dates(line):
+    """
+    line with date ranges, years and the brackets left empty by removing them blanked out.
+    """
+    line = YEAR_RE.sub(" ", DATE_RANGE_RE.sub(" ", line))
+    return re.sub(r"\(\s*[-–—,]?\s*\)", " ", line)
+
+def extract_email(text):
+    """
+    (email, confidence): the first address in the text, or "" when the text has none.
+    """
+    match = EMAIL_RE.search(text)
+    if match:
+        return match.group(0).rstrip("."), 1.0
+    # An "@" that is not a well-formed address (obfuscated, split across lines) needs the LLM
+    return "", 0.0 if "@" in text else 1.0
+
+def _looks_like_name(line):
+    words = line.split()
+    if not 2 <= len(words) <= 4 or any(word.lower().strip(".") in NOT_A_NAME for word in words):
+        return False
+    return all(word[0].isupper() and all(char.isalpha() or char in "'’.-" for char in word) for word in words)
+
+def extract_name(header_lines):
+    """
+    (name, confidence) from the first lines above the first section.
+    """
+    for line in header_lines[:3]:
+        # "Jane Doe | jane@example.com | +1 555..." keeps the first segment
+        candidate = re.split(r"\s*[|,•·]\s*|\s+[–—-]\s+", line)[0].strip()
+        if _looks_like_name(candidate):
+            return (candidate.title() if candidate.isupper() else candidate), 0.95
+        if candidate.lower().strip(" .") not in NOT_A_NAME and not EMAIL_RE.search(candidate):
+            # The first line is something else (a title, a photo caption): leave it to the LLM
+            break
+    return "", 0.0
+
+def extract_skills(lines):
+    """
+    (skills, confidence) from the lines of a Skills section.
+    """
+    skills = []
+    for line in lines:
+        line = _strip_bullet(line)
+        head, separator, rest = line.partition(":")
+        if separator and len(head.split()) <= 4:
+            line = rest
+        # Commas inside parentheses ("Python (Django, Flask)") do not separate skills
+        for item in re.split(r"\s*[;|•·●▪]\s*|\s*,\s*(?![^()]*\))", line):
+            item = item.strip(" .")
+            if item and item not in skills:
+                skills.append(item)
+    if not skills:
+        return [], 0.0
+    # Items that read like sentences mean the section is prose, which the LLM handles better
+    prose = sum(1 for item in skills if len(item) > 40 or len(item.split()) > 5)
+    return skills, 1.0 if prose == 0 else 0.5
+
+def _split_role_company(parts):
+    """
+    (role, company) from the parts of an experience heading; either may be "" when unclear.
+    """
+    role, company = "", ""
+    for part in parts:
+        if not role and ROLE_RE.search(part) and not COMPANY_RE.search(part):
+            role = part
+        elif not company:
+            company = part
+    if not role:
+        # No role keyword: "Company, Role" and "Role, Company" are indistinguishable
+        return "", company
+    return role, company
+
+def extract_work_experience(lines):
+    """
+    (entries, confidence) from the lines of an Experience section. A new entry starts at each date
+    range; its role and company come from the rest of that line and the non-bullet lines just above it.
+    """
+    entries, pending, unparsed = [], [], 0
+    for line in lines:
+        if _is_bullet(line):
+            if entries and not pending:
+                entries[-1]["responsibilities"].append(_strip_bullet(line))
+            else:
+                unparsed += 1
+            continue
+        match = DATE_RANGE_RE.search(line)
+        if match is None:
+            responsibilities = entries[-1]["responsibilities"] if entries and not pending else None
+            if responsibilities and (line[:1].islower() or len(line) > 70 or
+                                     (line.endswith(".") and not responsibilities[-1].endswith((".", ";", "!", "?")))):
+                # A bullet wrapped onto the next line by the PDF layout
+                responsibilities[-1] += f" {line}"
+            else:
+                pending.append(line)
+            continue
+
+        rest = (line[:match.start()] + " " + line[match.end():]).strip(" |,–—-()")
+        parts = [part.strip(" ()") for part in pending + PART_SPLIT_RE.split(rest) if part and part.strip(" ()")]
+        role, company = _split_role_company(parts)
+        duration = f"{_normalize_date(match.group(1))} - {_normalize_date(match.group(2))}"
+        entries.append({"company": company, "role": role, "duration": duration, "responsibilities": []})
+
+        # More heading lines than role, company and location: wrapped text got mixed in
+        unparsed += max(0, len(pending) - 2)
+        pending = []
+
+    unparsed += len(pending)
+    if not entries:
+        return [], 0.0
+    complete = sum(1 for entry in entries if entry["role"] and entry["company"])
+    confidence = 1.0 if complete == len(entries) and unparsed == 0 else 0.5 * complete / len(entries)
+    return entries, confidence
+
+def extract_education(lines):
+    """
+    (entries, confidence) from the lines of an Education section.
+    """
+    entries, unparsed = [], 0
+    current = None
+    for line in lines:
+        bullet = _is_bullet(line)
+        line = _strip_bullet(line)
+        if IGNORED_EDUCATION_RE.match(line):
+            continue
+        years = YEAR_RE.findall(line)
+        matched = False
+        for part in PART_SPLIT_RE.split(_without_dates(line)):
+            part = part.strip(" ()")
+            kind = "degree" if DEGREE_RE.search(part) else "institution" if INSTITUTION_RE.search(part) else None
+            if kind is None or part in STATE_CODES:
+                continue
+            matched = True
+            if current is None or current[kind]:
+                current = {"degree": "", "institution": "", "year": ""}
+                entries.append(current)
+            current[kind] = part
+        if years and current is not None:
+            current["year"] = years[-1]
+            matched = True
+        if not matched and not bullet:
+            unparsed += 1
+    if not entries:
+        return [], 0.0
+    complete = all(entry["degree"] and entry["institution"] for entry in entries)
+    return entries, 1.0 if complete and unparsed == 0 else 0.5
+
+def extract_certifications(lines):
+    """
+    (entries, confidence) from the lines of a Certifications section, one certification per line.
+    """
+    entries, ambiguous = [], False
+    for line in lines:
+        line = _strip_bullet(line)
+        years = YEAR_RE.findall(line)
+        parts = [part.strip(" ()") for part in re.split(r"\s+[|—–-]\s+|\s*\(|\)|,\s+|\s+by\s+", _without_dates(line))]
+        parts = [part for part in parts if part]
+        if not parts:
+            continue
+        entries.append({"name": parts[0], "issuer": parts[1] if len(parts) > 1 else "", "year": years[-1] if years else ""})
+        # "AWS Certified Solutions Architect - Associate, Amazon" splits three ways: name and issuer are ambiguous
+        ambiguous = ambiguous or len(parts) > 2
+    if not entries:
+        return [], 0.0
+    prose = any(len(entry["name"]) > 100 for entry in entries)
+    return entries, 0.5 if prose else 0.7 if ambiguous else 0.95
+
+class PreParsedResume:
+    """
+    Sections of a resume and the fields extracted from them locally, with a confidence per field.
+    """
+    def __init__(self, header, sections, fields, confidence):
+        self.header = header
+        self.sections = sections
+        self.fields = fields
+        self.confidence = confidence
+
+    def unresolved(self, threshold=RESUME_LOCAL_CONFIDENCE):
+        """
+        Fields whose local extraction is below threshold and must come from the LLM.
+        """
+        return [field for field in RESUME_FIELDS if self.confidence[field] < threshold]
+
+    def llm_text(self, fields):
+        """
+        The resume text the LLM needs for `fields`: the header and the sections those fields are read
+        from, in document order. Falls back to the whole text when none of them was found.
+        """
+        wanted = {section for field in fields for section in FIELD_SECTIONS[field]}
+        blocks = []
+        if "header" in wanted and self.header:
+            blocks.append("\n".join(self.header))
+        blocks.extend("\n".join([title] + lines) for section, title, lines in self.sections if section in wanted)
+        if not blocks or ("header" in wanted and not self.header):
+            return self.full_text()
+        return "\n\n".join(blocks)
+
+    def full_text(self):
+        return "\n".join(self.header + [line for _, title, lines in self.sections for line in [title] + lines])
+
+    def merge(self, llm_result, threshold=RESUME_LOCAL_CONFIDENCE):
+        """
+        The locally resolved fields plus, for the rest, whatever the LLM returned (missing keys stay missing).
+        """
+        result = {field: self.fields[field] for field in RESUME_FIELDS if self.confidence[field] >= threshold}
+        unresolved = self.unresolved(threshold)
+        result.update({key: value for key, value in llm_result.items() if key in unresolved or key == "error"})
+        return {field: result[field] for field in RESUME_FIELDS + ["error"] if field in result}
+
+def preparse_resume(text):
+    """
+    Section the resume text (with its line breaks) and extract what can be extracted locally.
+    Returns None when no section header is recognized.
+    """
+    header, sections = [], []
+    for line in _lines(text):
+        found = _header_section(line)
+        if found is not None:
+            section, rest = found
+            sections.append((section, line, [rest] if rest else []))
+        elif sections:
+            sections[-1][2].append(line)
+        else:
+            header.append(line)
+    if not sections:
+        return None
+
+    def section_lines(name):
+        return [line for section, _, lines in sections if section == name for line in lines]
+
+    present = {section for section, _, _ in sections}
+    fields, confidence = {}, {}
+    fields["email"], confidence["email"] = extract_email(text)
+    fields["name"], confidence["name"] = extract_name(header)
+    fields["skills"], confidence["skills"] = extract_skills(section_lines("skills"))
+    fields["work_experience"], confidence["work_experience"] = extract_work_experience(section_lines("experience"))
+    fields["education"], confidence["education"] = extract_education(section_lines("education"))
+    fields["certifications"], confidence["certifications"] = extract_certifications(section_lines("certifications"))
+
+    # A section that is absent is an empty field only when nothing in the text hints at its content
+    if "experience" not in present and not DATE_RANGE_RE.search(text):
+        confidence["work_experience"] = 0.9
+    if "education" not in present and not (DEGREE_RE.search(text) or INSTITUTION_RE.search(text)):
+        confidence["education"] = 0.9
+    if "certifications" not in present and not re.search(r"certif|licen[cs]e", text, re.IGNORECASE):
+        confidence["certifications"] = 0.9
+    return PreParsedResume(header, sections, fields, confidence)
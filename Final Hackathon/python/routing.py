@@ -0,0 +1,285 @@
+"""
+Cost- and latency-aware model routing for the agent chains.
+
+Every chain is built with gpt-4o-mini. Routing is opt-in (MODEL_ROUTING=1), since it can
+send calls to more expensive models; when it is on, invoke_chain/ainvoke_chain ask
+model_router for a Route, which picks the model tier for each call:
+
+- the stage's starting tier (ROUTING_POLICIES, per agent stage)
+- a higher tier when the prompt is larger than one of the stage's token thresholds
+  (estimated at ~4 characters per token, prompt template included)
+- after the call, the output is validated: it must be a JSON object carrying the
+  stage's required keys and must not have been cut off at max tokens. With
+  min_confidence set, the mean token probability of the answer (from logprobs,
+  returned with the same call) must also reach it. A failed check escalates the call
+  to the next tier, up to max_tier.
+
+MODEL_TIERS (JSON, cheapest first) maps tier names to models. A tier may also set
+base_url and api_key_env, e.g. to point it at a self-hosted or fake OpenAI-compatible
+endpoint. Routing decisions (tier per call, token upgrades, escalations by reason and
+their outcome, confidence percentiles) are available from ModelRouter.snapshot().
+"""
+import json
+import math
+import os
+import threading
+import logging
+from collections import deque
+from hedging import percentile
+
+logger = logging.getLogger(__name__)
+
+# Tier name -> model name or {"model": ..., "base_url": ..., "api_key_env": ...}, cheapest first
+MODEL_TIERS = json.loads(os.getenv("MODEL_TIERS", '{"mini": "gpt-4o-mini", "full": "gpt-4o"}'))
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "0") == "1"
+
+DEFAULT_POLICY = {
+    "tier": "mini",
+    # {"<estimated prompt tokens>": "<tier>"}: prompts at least that large start at that tier
+    "token_tiers": {},
+    "required_keys": [],
+    # Mean token probability below which the answer is escalated; None disables the check (and logprobs)
+    "min_confidence": None,
+    "max_tier": None,
+}
+STAGE_POLICIES = {
+    "parse_resume": {},
+    "communication": {"required_keys": ["communication_score"]},
+    "technical": {"required_keys": ["matched_skills"], "token_tiers": {"16000": "full"}},
+    "cultural": {"required_keys": ["matched_cultural_attributes"]},
+    "optional_factors": {"required_keys": ["optional_factors_score", "assessment"]},
+    # The funnel's gating technical evaluation (funnel.py) stays on the cheapest tier
+    "funnel_technical": {"required_keys": ["matched_skills"], "tier": next(iter(MODEL_TIERS), None), "max_tier": next(iter(MODEL_TIERS), None)},
+}
+# {"stage": {policy fields}} merged over the defaults above
+for _stage, _overrides in json.loads(os.getenv("ROUTING_POLICIES", "{}")).items():
+    STAGE_POLICIES[_stage] = {**STAGE_POLICIES.get(_stage, {}), **_overrides}
+
+def _tier_spec(tier):
+    spec = MODEL_TIERS[tier]
+    return {"model": spec} if isinstance(spec, str) else spec
+
+def estimate_prompt_tokens(chain, inputs):
+    """
+    Cheap token estimate (~4 characters per token) of the prompt the chain will send.
+    """
+    template = getattr(chain.first, "template", "")
+    return (len(template) + sum(len(value) if isinstance(value, str) else len(json.dumps(value, default=str)) for value in inputs.values())) // 4 + 1
+
+def check_output(result, required_keys):
+    """
+    The reason the output fails validation ("invalid_json" or "missing_keys"), or None when it passes.
+    """
+    text = result.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[4:] if text.startswith("json") else text
+    try:
+        parsed = json.loads(text)
+    except (ValueError, TypeError):
+        return "invalid_json"
+    if not isinstance(parsed, dict) or any(key not in parsed for key in required_keys):
+        return "missing_keys"
+    return None
+
+class StageRouting:
+    """
+    Routing counters for one pipeline stage.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.tier_calls = {}
+        self.final_tiers = {}
+        self.token_upgrades = 0
+        self.escalations = {}
+        self.escalations_recovered = 0
+        self.failed_at_top = 0
+        self.confidences = deque(maxlen=500)
+
+    def snapshot(self):
+        confidences = list(self.confidences)
+        return {
+            "calls": self.calls,
+            "attempts_by_tier": dict(self.tier_calls),
+            "final_tier": dict(self.final_tiers),
+            "token_upgrades": self.token_upgrades,
+            "escalations": dict(self.escalations),
+            "escalations_recovered": self.escalations_recovered,
+            "failed_at_top_tier": self.failed_at_top,
+            "confidence_p10": percentile(confidences, 10),
+            "confidence_p50": percentile(confidences, 50),
+        }
+
+class Route:
+    """
+    The tier of one chain call, moved up the tiers when an attempt fails validation.
+    """
+    def __init__(self, router, stage, chain, tier, max_tier, policy):
+        self.router = router
+        self.stage = stage
+        self.chain = chain
+        self.tier = tier
+        self.max_tier = max_tier
+        self.policy = policy
+        self.escalated = False
+        self._signal = None
+
+    def runnable(self):
+        """
+        The chain with the current tier's model.
+        """
+        return self.router.chain_for(self.chain, self.tier, self.policy.get("min_confidence") is not None)
+
+    def callbacks(self):
+        """
+        Callbacks for the attempt about to run; they capture the answer's confidence and finish reason.
+        """
+        self._signal = _signal_callback()
+        return [self._signal]
+
+    def accept(self, result):
+        """
+        Validate an attempt's output. Returns True when it is final (valid, or no tier is left to
+        escalate to); otherwise moves to the next tier and returns False.
+        """
+        self.router._count(self.stage, "tier_calls", self.tier)
+        reason = check_output(result, self.policy.get("required_keys", []))
+        signal = self._signal
+        if reason is None and signal is not None and signal.truncated:
+            reason = "truncated"
+        min_confidence = self.policy.get("min_confidence")
+        if signal is not None and signal.confidence is not None:
+            self.router._record_confidence(self.stage, signal.confidence)
+            if reason is None and min_confidence is not None and signal.confidence < min_confidence:
+                reason = "low_confidence"
+
+        tiers = list(MODEL_TIERS)
+        if reason is None or tiers.index(self.tier) >= tiers.index(self.max_tier):
+            self.router._finish(self.stage, self.tier, recovered=self.escalated and reason is None, failed=reason is not None)
+            return True
+        logger.info(f"Escalating {self.stage} from {self.tier}: {reason}")
+        self.router._count(self.stage, "escalations", reason)
+        self.tier = tiers[tiers.index(self.tier) + 1]
+        self.escalated = True
+        return False
+
+class ModelRouter:
+    """
+    Picks a model tier per chain call and keeps per-stage routing metrics.
+    """
+    def __init__(self, enabled=MODEL_ROUTING):
+        self.enabled = enabled and len(MODEL_TIERS) > 0
+        self.stages = {}
+        self._chains = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, stage):
+        stats = self.stages.get(stage)
+        if stats is None:
+            stats = self.stages.setdefault(stage, StageRouting())
+        return stats
+
+    def _count(self, stage, field, key):
+        with self._lock:
+            counts = getattr(self._stats(stage), field)
+            counts[key] = counts.get(key, 0) + 1
+
+    def _record_confidence(self, stage, confidence):
+        with self._lock:
+            self._stats(stage).confidences.append(round(confidence, 4))
+
+    def _finish(self, stage, tier, recovered, failed):
+        with self._lock:
+            stats = self._stats(stage)
+            stats.final_tiers[tier] = stats.final_tiers.get(tier, 0) + 1
+            stats.escalations_recovered += recovered
+            stats.failed_at_top += failed
+
+    def route(self, stage, chain, inputs):
+        """
+        A Route for one call of chain, or None when routing is disabled (the chain's own model is used).
+        """
+        if not self.enabled:
+            return None
+        policy = {**DEFAULT_POLICY, **STAGE_POLICIES.get(stage, {})}
+        tiers = list(MODEL_TIERS)
+        tier = policy["tier"] if policy["tier"] in MODEL_TIERS else tiers[0]
+        max_tier = policy["max_tier"] if policy["max_tier"] in MODEL_TIERS else tiers[-1]
+        upgraded = False
+        if policy["token_tiers"]:
+            tokens = estimate_prompt_tokens(chain, inputs)
+            for threshold, threshold_tier in sorted(policy["token_tiers"].items(), key=lambda item: int(item[0])):
+                if tokens >= int(threshold) and tiers.index(threshold_tier) > tiers.index(tier):
+                    tier, upgraded = threshold_tier, True
+        with self._lock:
+            stats = self._stats(stage)
+            stats.calls += 1
+            stats.token_upgrades += upgraded
+        return Route(self, stage, chain, tier, max_tier, policy)
+
+    def chain_for(self, chain, tier, logprobs=False):
+        """
+        chain with its chat model replaced by the tier's model (cached per chain and tier).
+        """
+        key = (id(chain), tier, logprobs)
+        cached = self._chains.get(key)
+        if cached is not None and cached[0] is chain:
+            return cached[1]
+        from langchain_core.runnables import RunnableSequence
+        from langchain_openai import ChatOpenAI
+
+        steps = [self._model(step, tier, logprobs) if isinstance(step, ChatOpenAI) else step for step in chain.middle]
+        routed = RunnableSequence(chain.first, *steps, chain.last)
+        # The chain is kept alongside so its id cannot be reused by another chain while cached
+        self._chains[key] = (chain, routed)
+        return routed
+
+    def _model(self, model, tier, logprobs):
+        from langchain_openai import ChatOpenAI
+
+        spec = _tier_spec(tier)
+        if "base_url" in spec or "api_key_env" in spec:
+            return ChatOpenAI(model=spec["model"], base_url=spec.get("base_url"), temperature=model.temperature,
+                              api_key=os.getenv(spec.get("api_key_env", "OPENAI_API_KEY")), logprobs=logprobs or None)
+        update = {"model_name": spec["model"]}
+        if logprobs:
+            update["logprobs"] = True
+        # Copies share the original's HTTP clients
+        return model if update == {"model_name": model.model_name} else model.model_copy(update=update)
+
+    def snapshot(self):
+        """
+        Per-stage routing decisions: attempts and final answers by tier, token upgrades, escalations by reason.
+        """
+        with self._lock:
+            return {"tiers": {tier: _tier_spec(tier)["model"] for tier in MODEL_TIERS},
+                    "stages": {stage: stats.snapshot() for stage, stats in self.stages.items()}}
+
+_signal_class = None
+
+def _signal_callback():
+    """
+    A LangChain callback that records the mean token probability and truncation of a chat model answer.
+    """
+    global _signal_class
+    if _signal_class is None:
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        class SignalCallback(BaseCallbackHandler):
+            def __init__(self):
+                self.confidence = None
+                self.truncated = False
+
+            def on_llm_end(self, response, **kwargs):
+                for generations in response.generations:
+                    for generation in generations:
+                        metadata = getattr(getattr(generation, "message", None), "response_metadata", None) or {}
+                        self.truncated = self.truncated or metadata.get("finish_reason") == "length"
+                        tokens = (metadata.get("logprobs") or {}).get("content") or []
+                        if tokens:
+                            self.confidence = math.exp(sum(token["logprob"] for token in tokens) / len(tokens))
+
+        _signal_class = SignalCallback
+    return _signal_class()
+
+model_router = ModelRouter()
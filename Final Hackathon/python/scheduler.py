@@ -0,0 +1,310 @@
+"""
+Weighted fair scheduling of LLM calls across tenants (recruiters).
+
+LLM throughput is the shared resource, so every chain call made through
+invoke_chain/ainvoke_chain takes a slot from llm_scheduler first. Calls wait in
+per-tenant queues and are dispatched by start-time fair queuing: each tenant has a
+virtual clock that advances by 1/weight per dispatched call, and the queued tenant
+with the earliest clock goes next. A tenant that was idle starts at the current
+virtual time, so it cannot bank credit and then burst.
+
+- Interactive calls are dispatched before bulk ones, and bulk calls never hold more
+  than SCHEDULER_BULK_SHARE of the slots, so an interactive call arriving behind a
+  2,000-resume upload waits for one slot rather than for the upload.
+- Each tenant runs at most its concurrency cap (SCHEDULER_TENANT_MAX_CONCURRENCY, or
+  TENANT_MAX_CONCURRENCY for specific tenants) at a time.
+- Time spent queued counts against the request deadline; a call still queued when
+  it passes raises DeadlineExceeded.
+
+The tenant and priority come from the request context (set_scheduling_context), which
+the apps fill from the X-Tenant-Id and X-Priority (interactive | bulk) headers. Limits
+apply per worker process. By default a worker runs SLOTS_PER_EVALUATION calls per
+evaluation it admits (admission.py), so the stages of one evaluation overlap but a full
+worker's calls queue here; SCHEDULER_MAX_CONCURRENCY overrides it and 0 disables
+scheduling. Tenants idle for SCHEDULER_TENANT_IDLE_SECONDS are dropped, so client-chosen
+tenant names do not accumulate.
+"""
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from deadlines import DeadlineExceeded
+from admission import ADMISSION_MAX_INFLIGHT
+from hedging import percentile
+
+logger = logging.getLogger(__name__)
+
+SLOTS_PER_EVALUATION = 2
+SCHEDULER_MAX_CONCURRENCY = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", str(SLOTS_PER_EVALUATION * ADMISSION_MAX_INFLIGHT)))
+SCHEDULER_TENANT_MAX_CONCURRENCY = int(os.getenv("SCHEDULER_TENANT_MAX_CONCURRENCY", "16"))
+SCHEDULER_BULK_SHARE = float(os.getenv("SCHEDULER_BULK_SHARE", "0.75"))
+SCHEDULER_WAIT_WINDOW = int(os.getenv("SCHEDULER_WAIT_WINDOW", "500"))
+SCHEDULER_TENANT_IDLE_SECONDS = float(os.getenv("SCHEDULER_TENANT_IDLE_SECONDS", "300"))
+# {"tenant": weight}; tenants not listed have weight 1
+TENANT_WEIGHTS = json.loads(os.getenv("TENANT_WEIGHTS", "{}"))
+# {"tenant": max concurrent calls}; tenants not listed get SCHEDULER_TENANT_MAX_CONCURRENCY
+TENANT_MAX_CONCURRENCY = json.loads(os.getenv("TENANT_MAX_CONCURRENCY", "{}"))
+
+DEFAULT_TENANT = "default"
+PRIORITIES = ("interactive", "bulk")
+
+_scheduling_context = contextvars.ContextVar("scheduling_context", default=(DEFAULT_TENANT, "interactive"))
+
+def set_scheduling_context(tenant=None, priority=None):
+    """
+    Schedule the LLM calls of the current request (or task) as `tenant` at `priority`; returns a reset token.
+    Unknown priorities are treated as interactive.
+    """
+    tenant = (tenant or DEFAULT_TENANT).strip()[:64] or DEFAULT_TENANT
+    return _scheduling_context.set((tenant, priority if priority in PRIORITIES else "interactive"))
+
+def reset_scheduling_context(token):
+    _scheduling_context.reset(token)
+
+class TenantQueue:
+    """
+    Queued calls, running count, virtual clock and wait statistics of one tenant.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.weight = max(float(TENANT_WEIGHTS.get(name, 1)), 0.01)
+        self.max_concurrency = int(TENANT_MAX_CONCURRENCY.get(name, SCHEDULER_TENANT_MAX_CONCURRENCY))
+        self.queues = {priority: deque() for priority in PRIORITIES}
+        self.running = 0
+        self.finish_tag = 0.0
+        self.dispatched = {priority: 0 for priority in PRIORITIES}
+        self.timeouts = 0
+        self.waits = {priority: deque(maxlen=SCHEDULER_WAIT_WINDOW) for priority in PRIORITIES}
+        # Monotonic time since which nothing is queued or running, None while busy
+        self.idle_since = None
+
+    def mark_idle(self):
+        if not self.running and not any(self.queues.values()):
+            self.idle_since = time.monotonic()
+
+    def snapshot(self):
+        result = {
+            "weight": self.weight,
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "timeouts": self.timeouts,
+        }
+        for priority in PRIORITIES:
+            waits = [round(wait, 4) for wait in self.waits[priority]]
+            result[priority] = {
+                "queued": len(self.queues[priority]),
+                "dispatched": self.dispatched[priority],
+                "wait_p50": percentile(waits, 50),
+                "wait_p95": percentile(waits, 95),
+                "wait_max": max(waits) if waits else None,
+            }
+        return result
+
+class _Waiter:
+    __slots__ = ("tenant", "priority", "enqueued", "state", "event", "loop", "future")
+
+    def __init__(self, tenant, priority):
+        self.tenant = tenant
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        # queued -> granted -> delivered (async only) | abandoned (async waiter gone before delivery)
+        self.state = "queued"
+        self.event = None
+        self.loop = None
+        self.future = None
+
+class FairScheduler:
+    """
+    Grants at most max_concurrency LLM call slots at a time, fairly across tenants.
+    """
+    def __init__(self, max_concurrency=SCHEDULER_MAX_CONCURRENCY, bulk_share=SCHEDULER_BULK_SHARE,
+                 tenant_idle_seconds=SCHEDULER_TENANT_IDLE_SECONDS):
+        self.bulk_share = bulk_share
+        self.max_concurrency = max_concurrency
+        self.bulk_limit = max(1, int(max_concurrency * bulk_share))
+        self.tenant_idle_seconds = tenant_idle_seconds
+        self.tenants = {}
+        self.running = 0
+        self.bulk_running = 0
+        self.virtual_time = 0.0
+        self._lock = threading.Lock()
+
+    def resize(self, max_concurrency):
+        """
+        Change the number of slots, e.g. to match a server's admission limit.
+        """
+        with self._lock:
+            self.max_concurrency = max_concurrency
+            self.bulk_limit = max(1, int(max_concurrency * self.bulk_share))
+            self._dispatch()
+
+    def _tenant(self, name):
+        tenant = self.tenants.get(name)
+        if tenant is None:
+            tenant = self.tenants[name] = TenantQueue(name)
+        return tenant
+
+    def _evict_idle(self):
+        """
+        Drop tenants idle for longer than tenant_idle_seconds. Called with the lock held.
+        An evicted tenant that comes back starts at the current virtual time, as any idle one does.
+        """
+        cutoff = time.monotonic() - self.tenant_idle_seconds
+        for name in [name for name, tenant in self.tenants.items() if tenant.idle_since is not None and tenant.idle_since < cutoff]:
+            del self.tenants[name]
+
+    def _next(self):
+        """
+        The waiter to dispatch next, or None when nothing may run. Called with the lock held.
+        """
+        if self.running >= self.max_concurrency:
+            return None
+        for priority in PRIORITIES:
+            if priority == "bulk" and self.bulk_running >= self.bulk_limit:
+                return None
+            best, best_start = None, None
+            for tenant in self.tenants.values():
+                if tenant.queues[priority] and tenant.running < tenant.max_concurrency:
+                    start = max(tenant.finish_tag, self.virtual_time)
+                    if best is None or start < best_start:
+                        best, best_start = tenant, start
+            if best is not None:
+                self.virtual_time = best_start
+                best.finish_tag = best_start + 1 / best.weight
+                return best.queues[priority].popleft()
+        return None
+
+    def _dispatch(self):
+        """
+        Grant slots to queued waiters while capacity allows. Called with the lock held.
+        """
+        while True:
+            waiter = self._next()
+            if waiter is None:
+                return
+            tenant = self.tenants[waiter.tenant]
+            tenant.running += 1
+            tenant.dispatched[waiter.priority] += 1
+            tenant.waits[waiter.priority].append(time.monotonic() - waiter.enqueued)
+            self.running += 1
+            if waiter.priority == "bulk":
+                self.bulk_running += 1
+            waiter.state = "granted"
+            if waiter.event is not None:
+                waiter.event.set()
+            else:
+                waiter.loop.call_soon_threadsafe(self._deliver, waiter)
+
+    def _enqueue(self, waiter):
+        with self._lock:
+            self._evict_idle()
+            tenant = self._tenant(waiter.tenant)
+            tenant.idle_since = None
+            tenant.queues[waiter.priority].append(waiter)
+            self._dispatch()
+
+    def _abandon(self, waiter):
+        """
+        Remove a waiter that gave up while still queued. Returns False if it was granted meanwhile.
+        Called with the lock held.
+        """
+        if waiter.state != "queued":
+            return False
+        tenant = self.tenants[waiter.tenant]
+        tenant.queues[waiter.priority].remove(waiter)
+        tenant.timeouts += 1
+        tenant.mark_idle()
+        return True
+
+    def _release(self, waiter):
+        with self._lock:
+            tenant = self.tenants[waiter.tenant]
+            tenant.running -= 1
+            tenant.mark_idle()
+            self.running -= 1
+            if waiter.priority == "bulk":
+                self.bulk_running -= 1
+            self._dispatch()
+
+    def _deliver(self, waiter):
+        # Runs on the waiter's event loop, so it never interleaves with the waiter's own cleanup
+        if waiter.state == "abandoned":
+            self._release(waiter)
+            return
+        waiter.state = "delivered"
+        if not waiter.future.done():
+            waiter.future.set_result(None)
+
+    @contextmanager
+    def slot(self, stage, timeout=None):
+        """
+        Hold one LLM call slot for the current tenant and priority. Raises DeadlineExceeded if
+        no slot is granted within timeout seconds.
+        """
+        if self.max_concurrency <= 0:
+            yield
+            return
+        tenant, priority = _scheduling_context.get()
+        waiter = _Waiter(tenant, priority)
+        waiter.event = threading.Event()
+        self._enqueue(waiter)
+        if not waiter.event.wait(timeout):
+            with self._lock:
+                if self._abandon(waiter):
+                    raise DeadlineExceeded(stage)
+        try:
+            yield
+        finally:
+            self._release(waiter)
+
+    @asynccontextmanager
+    async def aslot(self, stage, timeout=None):
+        """
+        Async variant of slot.
+        """
+        if self.max_concurrency <= 0:
+            yield
+            return
+        tenant, priority = _scheduling_context.get()
+        waiter = _Waiter(tenant, priority)
+        waiter.loop = asyncio.get_running_loop()
+        waiter.future = waiter.loop.create_future()
+        self._enqueue(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except BaseException as e:
+            with self._lock:
+                abandoned = self._abandon(waiter)
+                if not abandoned and waiter.state == "granted":
+                    # _deliver is already scheduled on this loop and will release the slot
+                    waiter.state = "abandoned"
+            if waiter.state == "delivered":
+                self._release(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise DeadlineExceeded(stage)
+            raise
+        try:
+            yield
+        finally:
+            self._release(waiter)
+
+    def snapshot(self):
+        """
+        Slot usage and per-tenant queue depth, dispatch counts and queue wait percentiles (seconds).
+        """
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "bulk_limit": self.bulk_limit,
+                "running": self.running,
+                "bulk_running": self.bulk_running,
+                "queued": sum(len(queue) for tenant in self.tenants.values() for queue in tenant.queues.values()),
+                "tenants": {name: tenant.snapshot() for name, tenant in self.tenants.items()},
+            }
+
+llm_scheduler = FairScheduler()
@@ -0,0 +1,92 @@
+"""
+Screening of the stored candidate pool against a new job description.
+
+The whole pool is ranked by cosine similarity between each candidate's profile vector
+(similarity.py, computed when the candidate was saved) and the embedded JD, in one
+matrix-vector product, after hard filters (required skills, excluded candidates, a
+similarity floor). Only the shortlist is then sent to the LLM: optionally the top
+`evaluate` candidates get a technical evaluation by TechnicalDepthEvaluatorAgent.
+"""
+import json
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from bson import ObjectId
+from similarity import get_profile_index
+from deadlines import DeadlineExceeded, submit_in_context, deadline_marker
+
+logger = logging.getLogger(__name__)
+
+SCREEN_MAX_TOP_N = int(os.getenv("SCREEN_MAX_TOP_N", "1000"))
+SCREEN_MAX_EVALUATIONS = int(os.getenv("SCREEN_MAX_EVALUATIONS", "20"))
+
+def parse_screen_request(form):
+    """
+    Validate the form fields of a screening request.
+    Returns (keyword arguments for CandidateScreener.screen, None) or (None, error message).
+    """
+    if not form.get("job_description"):
+        return None, "Missing job description"
+    try:
+        options = {
+            "job_description": form["job_description"],
+            "top_n": int(form.get("top_n", 100)),
+            "required_skills": json.loads(form.get("required_skills", "[]")),
+            "exclude": json.loads(form.get("exclude", "[]")),
+            "min_similarity": float(form["min_similarity"]) if form.get("min_similarity") else None,
+            "evaluate": int(form.get("evaluate", 0))
+        }
+    except (ValueError, TypeError):
+        return None, "top_n and evaluate must be integers, min_similarity a number, required_skills and exclude JSON arrays"
+    if not isinstance(options["required_skills"], list) or not isinstance(options["exclude"], list):
+        return None, "required_skills and exclude must be JSON arrays"
+    if not 1 <= options["top_n"] <= SCREEN_MAX_TOP_N:
+        return None, f"top_n must be between 1 and {SCREEN_MAX_TOP_N}"
+    if not 0 <= options["evaluate"] <= min(options["top_n"], SCREEN_MAX_EVALUATIONS):
+        return None, f"evaluate must be between 0 and the smaller of top_n and {SCREEN_MAX_EVALUATIONS}"
+    return options, None
+
+class CandidateScreener:
+    """
+    Ranks every indexed candidate against a JD and technically evaluates the shortlist.
+    """
+    def __init__(self, technical_agent):
+        self.technical_agent = technical_agent
+        self.store = technical_agent.store
+
+    def _evaluate(self, candidate_id, job_description):
+        candidate_data = self.store.load("candidates", {"_id": ObjectId(candidate_id)}, resolve=False)
+        if candidate_data is None:
+            return {"error": "Candidate not found"}
+        candidate_data.pop("_id", None)
+        try:
+            return self.technical_agent.evaluate_technical(candidate_data, job_description)
+        except DeadlineExceeded as e:
+            return deadline_marker(e.stage)
+        except Exception as e:
+            return {"error": f"Technical evaluation failed: {str(e)}"}
+
+    def screen(self, job_description, top_n=100, required_skills=None, exclude=None, min_similarity=None, evaluate=0):
+        """
+        Return the top_n candidates for a JD, best first, with technical evaluations for the first `evaluate`.
+        """
+        start_time = time.time()
+        shortlist = get_profile_index().screen(job_description, top_n, required_skills, exclude, min_similarity)
+        ranked_seconds = time.time() - start_time
+
+        for rank, candidate in enumerate(shortlist, start=1):
+            candidate["rank"] = rank
+        to_evaluate = [candidate for candidate in shortlist[:evaluate] if ObjectId.is_valid(candidate["candidate_id"])]
+        if to_evaluate:
+            with ThreadPoolExecutor(max_workers=len(to_evaluate)) as executor:
+                futures = [submit_in_context(executor, self._evaluate, candidate["candidate_id"], job_description) for candidate in to_evaluate]
+                for candidate, future in zip(to_evaluate, futures):
+                    candidate["technical_evaluation"] = future.result()
+
+        logger.info(f"Screened {len(shortlist)} candidates in {ranked_seconds:.3f}s")
+        return {
+            "candidates": shortlist,
+            "screening_time": round(ranked_seconds, 3),
+            "processing_time": round(time.time() - start_time, 2)
+        }
@@ -0,0 +1,93 @@
+"""
+Production entry point for the candidate evaluation service.
+
+Runs the Flask app under gunicorn with preforked multi-threaded workers. Agents, FAISS
+vector stores and the MongoDB client are built in the master before forking so every
+worker shares them copy-on-write, and SIGTERM drains in-flight evaluations before exit.
+
+Usage: python serve.py
+"""
+import logging
+import multiprocessing
+import os
+import signal
+from gunicorn.app.base import BaseApplication
+import app as evaluation_app
+from ledger import llm_ledger
+
+logger = logging.getLogger(__name__)
+
+# Evaluations spend 10-30 seconds waiting on the LLM, so give draining workers room to finish them
+DRAIN_TIMEOUT = int(os.getenv("EVAL_DRAIN_TIMEOUT", "120"))
+
+def post_fork(server, worker):
+    """
+    Give the worker its own HTTP connections and a clean in-flight counter.
+    """
+    evaluation_app.reset_after_fork()
+
+def post_worker_init(worker):
+    """
+    Chain the worker's SIGTERM handler so readiness fails as soon as draining starts.
+    """
+    original_handler = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        evaluation_app.begin_drain()
+        if callable(original_handler):
+            original_handler(signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+def worker_exit(server, worker):
+    """
+    Log any evaluations that were still running when the worker exited.
+    """
+    remaining = evaluation_app.wait_for_drain(timeout=1)
+    if remaining:
+        logger.warning(f"Worker {worker.pid} exited with {remaining} evaluations still in flight")
+
+def default_options():
+    """
+    Build the gunicorn settings from environment variables.
+    """
+    return {
+        "bind": os.getenv("BIND", "0.0.0.0:5000"),
+        "workers": int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count()))),
+        "worker_class": "gthread",
+        "threads": int(os.getenv("WORKER_THREADS", "8")),
+        "graceful_timeout": DRAIN_TIMEOUT,
+        "timeout": int(os.getenv("WORKER_TIMEOUT", "180")),
+        "keepalive": 5,
+        "accesslog": "-",
+        "post_fork": post_fork,
+        "post_worker_init": post_worker_init,
+        "worker_exit": worker_exit,
+    }
+
+class EvaluationServer(BaseApplication):
+    """
+    Gunicorn application that serves an already loaded (pre-warmed) Flask app.
+    """
+    def __init__(self, application, options=None):
+        self.application = application
+        self.options = options or {}
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key.lower(), value)
+
+    def load(self):
+        return self.application
+
+def main():
+    # Embedding misses while building the vector stores are not ledgered: recording them would
+    # start a flusher and a MongoDB connection in the master that every worker then inherits
+    with llm_ledger.suspended():
+        evaluation_app.warmup()
+    EvaluationServer(evaluation_app.app, default_options()).run()
+
+if __name__ == '__main__':
+    main()
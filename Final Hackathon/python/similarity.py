@@ -0,0 +1,361 @@
+"""
+Approximate nearest-neighbour index of candidate profiles.
+
+Every candidate saved by CandidateDataParserAgent is embedded (skills, work experience,
+education, certifications) in the background and appended to a persistent index that
+answers "candidates similar to X" and "probable duplicates of X" (the same person
+applying again under another email).
+
+On disk (SIMILARITY_INDEX_DIR), shared by every worker process:
+- vectors.f32: normalized float32 embeddings, one row per saved profile
+- profiles.log: line N is the JSON metadata (candidate_id, name, email, skills) of row N
+- index.faiss + index.json: a periodic snapshot of the HNSW graph and the rows it covers
+
+Appends are serialized with an flock'd lock file, vectors before metadata, as in
+embedding_cache.py, and rows or a partial line left by a writer that crashed mid-append
+are truncated before the next append. Each process holds an in-memory FAISS HNSW index (inner product over
+normalized vectors, i.e. cosine similarity), starts from the latest snapshot and adds
+rows appended by any process since, so queries stay in the low milliseconds at a
+million profiles. A candidate saved again gets a new row; older rows are skipped.
+
+screen() ranks the whole pool against a job description in one matrix-vector product
+over the memory-mapped vectors, with hard filters applied as boolean masks.
+
+Usage (index candidates saved before the index existed): python similarity.py --backfill
+"""
+import argparse
+import fcntl
+import json
+import os
+import re
+import threading
+import logging
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SIMILARITY_INDEX_DIR = os.getenv("SIMILARITY_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".similarity_index"))
+SIMILARITY_EMBEDDING_MODEL = os.getenv("SIMILARITY_EMBEDDING_MODEL", "text-embedding-3-small")
+SIMILARITY_DIMENSIONS = int(os.getenv("SIMILARITY_DIMENSIONS", "256"))
+SIMILARITY_DUPLICATE_THRESHOLD = float(os.getenv("SIMILARITY_DUPLICATE_THRESHOLD", "0.95"))
+SIMILARITY_SNAPSHOT_EVERY = int(os.getenv("SIMILARITY_SNAPSHOT_EVERY", "5000"))
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 96
+
+def profile_text(candidate_data):
+    """
+    The text embedded for a profile: skills, work experience, education and certifications.
+    """
+    parts = ["Skills: " + ", ".join(str(skill) for skill in candidate_data.get("skills", []))]
+    for job in candidate_data.get("work_experience", []):
+        parts.append("Experience: " + (" | ".join(str(value) for value in job.values()) if isinstance(job, dict) else str(job)))
+    for education in candidate_data.get("education", []):
+        parts.append("Education: " + (" | ".join(str(value) for value in education.values()) if isinstance(education, dict) else str(education)))
+    parts.append("Certifications: " + ", ".join(str(cert) for cert in candidate_data.get("certifications", [])))
+    return "\n".join(parts)
+
+def normalize_name(name):
+    return re.sub(r"[^a-z]", "", (name or "").lower())
+
+def normalize_skill(skill):
+    return " ".join(str(skill).lower().split())
+
+def create_profile_embeddings():
+    """
+    Embeddings client for profiles, reduced to SIMILARITY_DIMENSIONS to keep a million profiles in memory.
+    """
+    from langchain_openai import OpenAIEmbeddings
+    from embedding_cache import CachedEmbeddings
+    from ledger import MeteredEmbeddings
+
+    return CachedEmbeddings(
+        MeteredEmbeddings(OpenAIEmbeddings(model=SIMILARITY_EMBEDDING_MODEL, dimensions=SIMILARITY_DIMENSIONS, api_key=os.getenv("OPENAI_API_KEY")), stage="profile_embedding"),
+        namespace=f"{SIMILARITY_EMBEDDING_MODEL}-{SIMILARITY_DIMENSIONS}"
+    )
+
+class ProfileIndex:
+    """
+    Persistent, incrementally updated HNSW index over candidate profile embeddings.
+    """
+    def __init__(self, directory, dim, embeddings_factory=create_profile_embeddings):
+        import faiss
+
+        os.makedirs(directory, exist_ok=True)
+        self.dim = dim
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.profiles_path = os.path.join(directory, "profiles.log")
+        self.snapshot_path = os.path.join(directory, "index.faiss")
+        self.snapshot_meta_path = os.path.join(directory, "index.json")
+        self.lock_path = os.path.join(directory, ".lock")
+        self.embeddings_factory = embeddings_factory
+        self._embeddings = None
+        self.profiles = []
+        self.row_of = {}
+        # Per row: 1 while it is the candidate's latest row. Per skill: the rows that list it
+        self.current = bytearray()
+        self.skill_rows = {}
+        self.profiles_offset = 0
+        self._matrix = None
+        self._lock = threading.Lock()
+
+        self.index = None
+        if os.path.exists(self.snapshot_path) and os.path.exists(self.snapshot_meta_path):
+            try:
+                self.index = faiss.read_index(self.snapshot_path)
+                if self.index.d != dim:
+                    logger.warning(f"Ignoring profile index snapshot with dimension {self.index.d}, expected {dim}")
+                    self.index = None
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable profile index snapshot: {str(e)}")
+        if self.index is None:
+            self.index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            self.index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        self.index.hnsw.efSearch = HNSW_EF_SEARCH
+        with self._lock:
+            self._catch_up()
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            self._embeddings = self.embeddings_factory()
+        return self._embeddings
+
+    def _vectors(self, start, stop):
+        if self._matrix is None or stop > self._matrix.shape[0]:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r").reshape(-1, self.dim)
+        return np.asarray(self._matrix[start:stop])
+
+    def _catch_up(self):
+        """
+        Read profiles appended (by any process) since the last call and add their rows to the graph.
+        """
+        if os.path.exists(self.profiles_path):
+            with open(self.profiles_path, "rb") as f:
+                f.seek(self.profiles_offset)
+                data = f.read()
+            # Only consume complete lines; a writer may be mid-append
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                profile = json.loads(line)
+                row = len(self.profiles)
+                previous = self.row_of.get(profile["candidate_id"])
+                if previous is not None:
+                    self.current[previous] = 0
+                self.row_of[profile["candidate_id"]] = row
+                self.current.append(1)
+                for skill in profile.pop("skills", []):
+                    self.skill_rows.setdefault(skill, array("q")).append(row)
+                self.profiles.append(profile)
+            self.profiles_offset += end
+        if self.index.ntotal < len(self.profiles):
+            self.index.add(self._vectors(self.index.ntotal, len(self.profiles)))
+
+    def _truncate_orphans(self):
+        """
+        Drop a partial profile line and any vector rows without a profile, left by a writer that crashed mid-append.
+        Called under the file lock, after _catch_up.
+        """
+        for path, size in [(self.profiles_path, self.profiles_offset), (self.vectors_path, len(self.profiles) * self.dim * 4)]:
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                logger.warning(f"Discarding {os.path.getsize(path) - size} bytes of an interrupted append to {path}")
+                os.truncate(path, size)
+
+    def _snapshot(self):
+        import faiss
+
+        tmp_path = self.snapshot_path + ".tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, self.snapshot_path)
+        with open(self.snapshot_meta_path, "w") as f:
+            json.dump({"rows": self.index.ntotal, "dim": self.dim}, f)
+
+    def _normalized(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def add(self, candidate_id, candidate_data):
+        """
+        Embed a saved candidate's profile and append it to the index.
+        """
+        self.add_many([(candidate_id, candidate_data)])
+
+    def add_many(self, candidates):
+        """
+        Embed a batch of (candidate_id, candidate_data) profiles and append them to the index.
+        """
+        vectors = self._normalized(self.embeddings.embed_documents([profile_text(data) for _, data in candidates]))
+        lines = "".join(json.dumps({
+            "candidate_id": candidate_id,
+            "name": data.get("name", ""),
+            "email": data.get("email", ""),
+            "skills": sorted({normalize_skill(skill) for skill in data.get("skills", [])})
+        }) + "\n" for candidate_id, data in candidates)
+
+        with self._lock, open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._catch_up()
+                before = self.index.ntotal
+                self._truncate_orphans()
+                # Vectors are written before their metadata so a reader never sees a profile without its row
+                with open(self.vectors_path, "ab") as f:
+                    f.write(vectors.tobytes())
+                with open(self.profiles_path, "ab") as f:
+                    f.write(lines.encode())
+                self._catch_up()
+                if self.index.ntotal // SIMILARITY_SNAPSHOT_EVERY > before // SIMILARITY_SNAPSHOT_EVERY:
+                    self._snapshot()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _neighbours(self, row, k):
+        vector = self._vectors(row, row + 1)
+        # Over-fetch: the query row itself and superseded rows are filtered out
+        scores, rows = self.index.search(vector, k + 8)
+        results = []
+        for score, neighbour in zip(scores[0], rows[0]):
+            if neighbour < 0 or neighbour == row:
+                continue
+            profile = self.profiles[neighbour]
+            if self.row_of.get(profile["candidate_id"]) != neighbour or profile["candidate_id"] == self.profiles[row]["candidate_id"]:
+                continue
+            results.append(dict(profile, similarity=round(float(score), 4)))
+            if len(results) == k:
+                break
+        return results
+
+    def similar(self, candidate_id, k=10):
+        """
+        The k profiles most similar to a candidate, or None if the candidate is not indexed.
+        """
+        with self._lock:
+            self._catch_up()
+            row = self.row_of.get(candidate_id)
+            if row is None:
+                return None
+            return self._neighbours(row, k)
+
+    def duplicates(self, candidate_id, threshold=SIMILARITY_DUPLICATE_THRESHOLD, k=20):
+        """
+        Profiles that are probably the same person: near-identical embeddings, or very similar
+        ones with the same name. None if the candidate is not indexed.
+        """
+        with self._lock:
+            self._catch_up()
+            row = self.row_of.get(candidate_id)
+            if row is None:
+                return None
+            name = normalize_name(self.profiles[row]["name"])
+            name_threshold = threshold - 0.05
+            return [
+                neighbour for neighbour in self._neighbours(row, k)
+                if neighbour["similarity"] >= threshold
+                or (name and normalize_name(neighbour["name"]) == name and neighbour["similarity"] >= name_threshold)
+            ]
+
+    def screen(self, job_description, top_n=100, required_skills=None, exclude=None, min_similarity=None):
+        """
+        Rank every indexed candidate against a job description, best first. Candidates missing
+        any of required_skills, listed in exclude, or below min_similarity are filtered out.
+        """
+        jd_vector = self._normalized(self.embeddings.embed_query(job_description))[0]
+        with self._lock:
+            self._catch_up()
+            rows = len(self.profiles)
+            if rows == 0:
+                return []
+            mask = np.frombuffer(self.current, dtype=np.uint8).astype(bool)
+            for skill in {normalize_skill(skill) for skill in required_skills or []}:
+                has_skill = np.zeros(rows, dtype=bool)
+                has_skill[np.frombuffer(self.skill_rows.get(skill, array("q")), dtype=np.int64)] = True
+                mask &= has_skill
+            for candidate_id in exclude or []:
+                if candidate_id in self.row_of:
+                    mask[self.row_of[candidate_id]] = False
+
+            # One BLAS matrix-vector product over the whole pool
+            scores = self._vectors(0, rows) @ jd_vector
+            scores[~mask] = -np.inf
+            if min_similarity is not None:
+                scores[scores < min_similarity] = -np.inf
+            top_n = min(top_n, rows)
+            top = np.argpartition(-scores, top_n - 1)[:top_n]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [
+                dict(self.profiles[row], similarity=round(float(scores[row]), 4))
+                for row in top if np.isfinite(scores[row])
+            ]
+
+    def size(self):
+        with self._lock:
+            self._catch_up()
+            return len(self.row_of)
+
+_profile_index = None
+_profile_index_lock = threading.Lock()
+# Write-time indexing runs off the request path
+_indexing_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="profile-index")
+
+def get_profile_index():
+    """
+    Return the process-wide profile index, loading it on first use.
+    """
+    global _profile_index
+    if _profile_index is None:
+        with _profile_index_lock:
+            if _profile_index is None:
+                _profile_index = ProfileIndex(SIMILARITY_INDEX_DIR, SIMILARITY_DIMENSIONS)
+    return _profile_index
+
+def _index_profile(candidate_id, candidate_data):
+    try:
+        get_profile_index().add(candidate_id, candidate_data)
+    except Exception as e:
+        logger.error(f"Failed to index profile {candidate_id}: {str(e)}")
+
+def index_profile_async(candidate_id, candidate_data):
+    """
+    Queue a saved candidate for embedding and indexing.
+    """
+    _indexing_executor.submit(_index_profile, candidate_id, dict(candidate_data))
+
+def backfill_profiles(db, batch_size=256):
+    """
+    Index every stored candidate that is not in the index yet; returns the number indexed.
+    """
+    from storage import CompactStore
+
+    index = get_profile_index()
+    store = CompactStore(db)
+    indexed = set(index.row_of)
+    batch, total = [], 0
+    for stored in db["candidates"].find({"error": {"$exists": False}}, {"_id": 1}):
+        candidate_id = str(stored["_id"])
+        if candidate_id in indexed:
+            continue
+        candidate_data = store.load("candidates", {"_id": stored["_id"]}, resolve=False)
+        if candidate_data is None or "error" in candidate_data:
+            continue
+        batch.append((candidate_id, candidate_data))
+        if len(batch) == batch_size:
+            index.add_many(batch)
+            total += len(batch)
+            batch = []
+            logger.info(f"Indexed {total} candidate profiles")
+    if batch:
+        index.add_many(batch)
+        total += len(batch)
+    return total
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Maintain the candidate profile similarity index")
+    parser.add_argument("--backfill", action="store_true", help="index stored candidates saved before the index existed")
+    args = parser.parse_args()
+    if args.backfill:
+        from agents import get_mongo_client
+
+        logging.basicConfig(level=logging.INFO)
+        print(f"Indexed {backfill_profiles(get_mongo_client()['candidate_db'])} candidate profiles")
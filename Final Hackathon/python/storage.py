@@ -0,0 +1,203 @@
+"""
+Compact document layout for candidate and evaluation collections.
+
+Documents written by the agents are stored as:
+- hot summary fields (ids, scores, timestamps, skills) as plain top-level fields, so
+  queries, indexes and projections work without decompression
+- everything else as one zlib-compressed JSON blob ("body_z"), or plain "body" when
+  it is smaller than STORAGE_COMPRESS_MIN_BYTES
+- raw LLM narratives (assessments, reports, strengths/weaknesses) in the llm_outputs
+  collection, compressed and expired by a TTL index after LLM_OUTPUT_RETENTION_DAYS;
+  the summary document keeps its scores forever and points at them with llm_output_id
+
+Duplicated sub-documents are normalized away: answers are stored only in the answers
+collection (not again inside candidates), and evaluations reference the stored
+communication evaluation instead of embedding a copy.
+
+CompactStore.load() reverses all of this. Documents written before this layout (no
+"storage_format" field) are returned unchanged.
+"""
+import datetime
+import json
+import os
+import zlib
+from bson import Binary, ObjectId
+
+STORAGE_FORMAT = 1
+STORAGE_COMPRESS_MIN_BYTES = int(os.getenv("STORAGE_COMPRESS_MIN_BYTES", "256"))
+LLM_OUTPUT_RETENTION_DAYS = float(os.getenv("LLM_OUTPUT_RETENTION_DAYS", "90"))
+
+# Per collection: fields kept uncompressed at the top level, and LLM narrative fields moved to llm_outputs
+LAYOUTS = {
+    "candidates": {
+        "hot": ["name", "email", "skills", "created_at", "error"],
+        "narrative": [],
+    },
+    "answers": {
+        "hot": ["candidate_id", "type", "created_at"],
+        "narrative": [],
+    },
+    "communication_evaluations": {
+        "hot": ["candidate_id", "communication_score", "chunk_count", "created_at", "processing_time", "partial"],
+        "narrative": ["clarity_assessment", "structure_assessment", "tone_assessment", "strengths", "weaknesses"],
+    },
+    "evaluations": {
+        "hot": ["candidate_id", "created_at", "processing_time", "partial", "incomplete_stages"],
+        "narrative": [],
+    },
+    "cultural_evaluations": {
+        "hot": ["candidate_id", "cultural_fit_score", "coverage_percentage", "created_at", "processing_time"],
+        "narrative": ["behavioral_answers_assessment", "github_indicators_assessment", "cultural_fit_report", "strengths", "weaknesses"],
+    },
+    "stage_outputs": {
+        "hot": [],
+        "narrative": [],
+    },
+}
+
+def compress_json(value):
+    return Binary(zlib.compress(json.dumps(value, separators=(",", ":")).encode(), 6))
+
+def decompress_json(blob):
+    return json.loads(zlib.decompress(bytes(blob)).decode())
+
+def _pack_body(stored, body):
+    encoded = json.dumps(body, separators=(",", ":")).encode()
+    if len(encoded) >= STORAGE_COMPRESS_MIN_BYTES:
+        stored["body_z"] = Binary(zlib.compress(encoded, 6))
+    elif body:
+        stored["body"] = body
+
+def _unpack_body(stored):
+    if "body_z" in stored:
+        return decompress_json(stored["body_z"])
+    return dict(stored.get("body", {}))
+
+def normalize(collection_name, document):
+    """
+    Drop sub-documents that are stored canonically elsewhere.
+    """
+    if collection_name == "candidates":
+        # Answers are stored one per document in the answers collection
+        document.pop("answers", None)
+    elif collection_name == "evaluations":
+        communication = document.get("communication_evaluation")
+        if isinstance(communication, dict) and isinstance(communication.get("evaluation_id"), str):
+            # The full communication evaluation is in communication_evaluations
+            document["communication_evaluation"] = {
+                "evaluation_id": communication["evaluation_id"],
+                "communication_score": communication.get("communication_score")
+            }
+    return document
+
+def pack_document(collection_name, document, now=None):
+    """
+    Convert a JSON-serializable document to its stored form.
+    Returns (stored document, llm_outputs document or None).
+    """
+    layout = LAYOUTS[collection_name]
+    document = normalize(collection_name, dict(document))
+    stored = {"storage_format": STORAGE_FORMAT}
+    if "_id" in document:
+        stored["_id"] = document.pop("_id")
+    for field in layout["hot"]:
+        if field in document:
+            stored[field] = document.pop(field)
+
+    llm_output = None
+    narratives = {field: document.pop(field) for field in layout["narrative"] if field in document}
+    if narratives:
+        now = now or datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        llm_output = {
+            "_id": ObjectId(),
+            "collection": collection_name,
+            "fields_z": compress_json(narratives),
+            "created_at": now,
+            "expires_at": now + datetime.timedelta(days=LLM_OUTPUT_RETENTION_DAYS)
+        }
+        stored["llm_output_id"] = llm_output["_id"]
+
+    _pack_body(stored, document)
+    return stored, llm_output
+
+def unpack_document(stored, llm_output=None):
+    """
+    Rebuild a document from its stored form (and its llm_outputs document, if still retained).
+    """
+    if stored.get("storage_format") is None:
+        return stored
+    document = _unpack_body(stored)
+    for field, value in stored.items():
+        if field not in ("storage_format", "body", "body_z", "llm_output_id"):
+            document[field] = value
+    if "llm_output_id" in stored:
+        if llm_output is not None:
+            document.update(decompress_json(llm_output["fields_z"]))
+        else:
+            document["llm_output_expired"] = True
+    return document
+
+class CompactStore:
+    """
+    Writes and reads agent documents in the compact layout.
+    """
+    def __init__(self, db):
+        self.db = db
+        self.llm_outputs = db["llm_outputs"]
+        self._indexes_created = False
+
+    def ensure_indexes(self):
+        """
+        Create the TTL index that expires raw LLM narratives.
+        """
+        if not self._indexes_created:
+            self.llm_outputs.create_index("expires_at", expireAfterSeconds=0)
+            self._indexes_created = True
+
+    def insert(self, collection_name, document):
+        """
+        Store a document; returns its id.
+        """
+        stored, llm_output = pack_document(collection_name, document)
+        if llm_output is not None:
+            self.ensure_indexes()
+            self.llm_outputs.insert_one(llm_output)
+        return self.db[collection_name].insert_one(stored).inserted_id
+
+    async def ainsert(self, async_db, collection_name, document):
+        """
+        Store a document through the async driver (async_db is a Motor database); returns its id.
+        """
+        stored, llm_output = pack_document(collection_name, document)
+        if llm_output is not None:
+            if not self._indexes_created:
+                await async_db["llm_outputs"].create_index("expires_at", expireAfterSeconds=0)
+                self._indexes_created = True
+            await async_db["llm_outputs"].insert_one(llm_output)
+        result = await async_db[collection_name].insert_one(stored)
+        return result.inserted_id
+
+    def load(self, collection_name, query, resolve=True):
+        """
+        Find one document and rebuild it, re-attaching retained narratives and, with resolve,
+        the normalized sub-documents (candidate answers, embedded communication evaluation).
+        """
+        stored = self.db[collection_name].find_one(query)
+        if stored is None:
+            return None
+        llm_output = self.llm_outputs.find_one({"_id": stored["llm_output_id"]}) if "llm_output_id" in stored else None
+        document = unpack_document(stored, llm_output)
+        if not resolve or stored.get("storage_format") is None:
+            return document
+
+        if collection_name == "candidates":
+            answers = (unpack_document(answer) for answer in self.db["answers"].find({"candidate_id": str(stored["_id"])}).sort("_id", 1))
+            document["answers"] = [{"text": answer["text"], "type": answer["type"]} for answer in answers]
+        elif collection_name == "evaluations":
+            reference = document.get("communication_evaluation", {})
+            if isinstance(reference.get("evaluation_id"), str) and ObjectId.is_valid(reference["evaluation_id"]):
+                communication = self.load("communication_evaluations", {"_id": ObjectId(reference["evaluation_id"])})
+                if communication is not None:
+                    communication.pop("_id", None)
+                    document["communication_evaluation"] = dict(communication, evaluation_id=reference["evaluation_id"])
+        return document
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The service modules are flat files in the python directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
@@ -0,0 +1,36 @@
+"""
+Admission limits (admission.py): the bulk share and per-tenant caps.
+"""
+import pytest
+from admission import AdmissionController, AdmissionRejected
+
+def test_bulk_requests_leave_slots_for_interactive_ones():
+    controller = AdmissionController(max_inflight=6, tenant_max_inflight=0, queue_seconds=0, max_waiting=0)
+    tickets = [controller.admit("uploader", 0, priority="bulk") for _ in range(controller.bulk_limit)]
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("uploader-2", 0, priority="bulk")
+    assert (rejected.value.status_code, rejected.value.reason) == (429, "bulk_inflight")
+
+    tickets += [controller.admit(f"recruiter-{i}", 0) for i in range(6 - controller.bulk_limit)]
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("recruiter-x", 0)
+    assert (rejected.value.status_code, rejected.value.reason) == (503, "inflight")
+
+    controller.release(tickets[0])
+    controller.admit("uploader", 0, priority="bulk")
+
+def test_named_tenants_are_capped_at_half_the_slots():
+    controller = AdmissionController(max_inflight=6, queue_seconds=0, max_waiting=0)
+    assert controller.tenant_max_inflight == 3
+    for _ in range(3):
+        controller.admit("tenant-a", 0)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("tenant-a", 0)
+    assert rejected.value.status_code == 429
+    controller.admit("tenant-b", 0)
+
+def test_requests_without_a_tenant_are_not_capped():
+    controller = AdmissionController(max_inflight=6, queue_seconds=0, max_waiting=0)
+    for _ in range(6):
+        controller.admit(None, 0)
+    assert controller.snapshot()["tenants"] == {"default": 6}
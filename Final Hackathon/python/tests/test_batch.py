@@ -0,0 +1,138 @@
+"""
+Offline batch mode (batch.py): render, process with a local fake batch processor and ingest,
+for both rounds, against mongomock.
+"""
+import json
+import random
+import pytest
+from benchmarks.replay import FAKE_LLM_RESPONSE, filler_text
+
+CANDIDATES = 5
+
+@pytest.fixture
+def evaluator(monkeypatch):
+    """
+    A BatchEvaluator whose agents use mongomock and fake embeddings, and whose ledger
+    entries are collected in evaluator.recorded. Nothing leaves the process.
+    """
+    mongomock = pytest.importorskip("mongomock")
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    import agents
+    import batch
+
+    monkeypatch.setattr(agents, "_mongo_client", mongomock.MongoClient())
+    monkeypatch.setattr(agents, "create_embeddings", lambda: DeterministicFakeEmbedding(size=256))
+    # Profile indexing embeds through OpenAI; it is not part of the batch cycle
+    monkeypatch.setattr(agents, "index_profile_async", lambda candidate_id, candidate_data: None)
+    recorded = []
+    monkeypatch.setattr(batch.llm_ledger, "record", lambda *args, **kwargs: recorded.append(args))
+
+    technical = agents.TechnicalDepthEvaluatorAgent()
+    evaluator = batch.BatchEvaluator(technical, agents.CulturalFitEvaluatorAgent(), agents.ScoringAndAggregationAgent())
+    evaluator.parser_agent = technical.parser_agent
+    evaluator.recorded = recorded
+    return evaluator
+
+def seed_candidates(parser_agent, count, rng):
+    candidate_ids = []
+    for i in range(count):
+        answers_array = [{"text": filler_text(rng, rng.randint(200, 800)), "type": "culture-fit" if j % 3 == 0 else "technical"} for j in range(3)]
+        candidate_data = parser_agent._build_candidate_data({
+            "name": f"Candidate {i}", "email": f"candidate{i}@example.com",
+            "skills": rng.sample(["Python", "SQL", "React", "Docker", "AWS", "Teamwork", "Leadership"], 4),
+            "work_experience": [{"title": "Engineer", "company": f"Company {i}", "duration": "2 years"}],
+            "education": [], "certifications": [], "soft_skills": ["Teamwork"]
+        }, answers_array, [{"repo_name": f"repo-{i}", "description": filler_text(rng, 80), "stars": rng.randint(0, 200), "forks": rng.randint(0, 40)}])
+        candidate_ids.append(parser_agent.save_to_mongodb(candidate_data, answers_array))
+    return candidate_ids
+
+def process(evaluator, job, round_name, directory, break_candidate=None):
+    """
+    Render and process a round; break_candidate's technical response is replaced by invalid JSON.
+    """
+    from batch import LocalBatchProcessor
+
+    requests_path = directory / f"{round_name}.requests.jsonl"
+    results_path = directory / f"{round_name}.results.jsonl"
+    rendered = evaluator.render(job, round_name, str(requests_path))
+    LocalBatchProcessor(lambda body: FAKE_LLM_RESPONSE).process(str(requests_path), str(results_path))
+    if break_candidate is not None:
+        lines = [json.loads(line) for line in results_path.read_text().splitlines()]
+        broken = next(line for line in lines if line["custom_id"].startswith(f"{break_candidate}:technical:"))
+        broken["response"]["body"]["choices"][0]["message"]["content"] = "not json"
+        results_path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+    return rendered, str(results_path)
+
+def counts(evaluator):
+    return {name: evaluator.db[name].count_documents({}) for name in
+            ["communication_evaluations", "evaluations", "cultural_evaluations", "aggregate_scores", "batch_runs"]}
+
+def test_batch_cycle_ingests_once_and_reports_failures_per_candidate(evaluator, tmp_path):
+    candidate_ids = seed_candidates(evaluator.parser_agent, CANDIDATES, random.Random(7))
+    job = {"job_id": "batch-test", "job_description": "Backend engineer: Python, SQL, AWS; collaborative team player", "candidate_ids": candidate_ids}
+    broken_id = candidate_ids[0]
+
+    rendered, results_path = process(evaluator, job, "evaluate", tmp_path, break_candidate=broken_id)
+    summary = evaluator.ingest(job, "evaluate", results_path)
+    assert summary["ingested"] == CANDIDATES - 1
+    assert list(summary["failed"]) == [broken_id]
+    assert summary["stale"] == []
+    evaluated = {"communication_evaluations": CANDIDATES - 1, "evaluations": CANDIDATES - 1, "cultural_evaluations": CANDIDATES - 1,
+                 "aggregate_scores": 0, "batch_runs": CANDIDATES - 1}
+    assert counts(evaluator) == evaluated
+    # Spend is recorded for the ingested candidates' requests only
+    requests_per_candidate = rendered // CANDIDATES
+    assert len(evaluator.recorded) == (CANDIDATES - 1) * requests_per_candidate
+
+    again = evaluator.ingest(job, "evaluate", results_path)
+    assert again["ingested"] == 0
+    assert again["skipped"] == CANDIDATES - 1
+    assert list(again["failed"]) == [broken_id]
+    assert counts(evaluator) == evaluated
+    assert len(evaluator.recorded) == (CANDIDATES - 1) * requests_per_candidate
+
+    recorded_before_score = len(evaluator.recorded)
+    _, results_path = process(evaluator, job, "score", tmp_path)
+    summary = evaluator.ingest(job, "score", results_path)
+    assert summary["ingested"] == CANDIDATES - 1
+    assert summary["failed"] == {}
+    assert counts(evaluator) == dict(evaluated, aggregate_scores=CANDIDATES - 1)
+    assert len(evaluator.recorded) == recorded_before_score + CANDIDATES - 1
+
+    again = evaluator.ingest(job, "score", results_path)
+    assert again["ingested"] == 0
+    assert again["skipped"] == CANDIDATES - 1
+    assert counts(evaluator) == dict(evaluated, aggregate_scores=CANDIDATES - 1)
+    assert len(evaluator.recorded) == recorded_before_score + CANDIDATES - 1
+
+def test_retry_after_a_failed_save_does_not_duplicate_saved_documents(evaluator, tmp_path, monkeypatch):
+    candidate_ids = seed_candidates(evaluator.parser_agent, 2, random.Random(11))
+    job = {"job_id": "batch-test", "job_description": "Backend engineer: Python, SQL, AWS; collaborative team player", "candidate_ids": candidate_ids}
+    _, results_path = process(evaluator, job, "evaluate", tmp_path)
+
+    # The cultural save, the last of the three, fails for the first candidate only
+    save_cultural = evaluator.cultural_agent.save_to_mongodb
+    failed = []
+
+    def flaky_save(evaluation):
+        if not failed:
+            failed.append(evaluation)
+            return {"error": "MongoDB unavailable"}
+        return save_cultural(evaluation)
+
+    monkeypatch.setattr(evaluator.cultural_agent, "save_to_mongodb", flaky_save)
+    summary = evaluator.ingest(job, "evaluate", results_path)
+    assert summary["ingested"] == 1
+    assert list(summary["failed"].values()) == ["Ingestion failed: MongoDB unavailable"]
+    assert counts(evaluator)["communication_evaluations"] == 2
+    assert counts(evaluator)["evaluations"] == 2
+    assert counts(evaluator)["cultural_evaluations"] == 1
+
+    again = evaluator.ingest(job, "evaluate", results_path)
+    assert (again["ingested"], again["skipped"], again["failed"]) == (1, 1, {})
+    assert counts(evaluator) == {"communication_evaluations": 2, "evaluations": 2, "cultural_evaluations": 2,
+                                 "aggregate_scores": 0, "batch_runs": 2}
+
+    # The score round reads the ids recorded across both attempts
+    _, results_path = process(evaluator, job, "score", tmp_path)
+    assert evaluator.ingest(job, "score", results_path)["ingested"] == 2
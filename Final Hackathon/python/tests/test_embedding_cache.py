@@ -0,0 +1,46 @@
+"""
+RAG retrieval through the embedding cache (embedding_cache.py, agents.py): the JD is embedded
+once per job, not once per candidate.
+"""
+import asyncio
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+JOB_DESCRIPTION = "Backend engineer: Python, SQL, AWS; collaborative team player"
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    """
+    Fake embeddings that record every text sent to the "network".
+    """
+    embedded: list = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+@pytest.fixture
+def technical(monkeypatch, tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    import agents
+    from embedding_cache import CachedEmbeddings
+
+    underlying = CountingEmbedding(size=64, embedded=[])
+    monkeypatch.setattr(agents, "_mongo_client", mongomock.MongoClient())
+    monkeypatch.setattr(agents, "create_embeddings", lambda: CachedEmbeddings(underlying, namespace="test", cache_dir=str(tmp_path)))
+    agent = agents.TechnicalDepthEvaluatorAgent()
+    underlying.embedded.clear()
+    return agent, underlying.embedded
+
+def test_job_description_is_embedded_once_across_candidates(technical):
+    agent, embedded = technical
+    first = agent._retrieve_context(JOB_DESCRIPTION, "['Python', 'SQL']")
+    second = agent._retrieve_context(JOB_DESCRIPTION, "['React', 'AWS']")
+    assert embedded == [JOB_DESCRIPTION, "['Python', 'SQL']", "['React', 'AWS']"]
+    assert first.count("\n") == 2 and second.count("\n") == 2
+
+def test_async_retrieval_shares_the_cache(technical):
+    agent, embedded = technical
+    agent._retrieve_context(JOB_DESCRIPTION, "['Python', 'SQL']")
+    context = asyncio.run(agent._aretrieve_context(JOB_DESCRIPTION, "['Go']"))
+    assert embedded == [JOB_DESCRIPTION, "['Python', 'SQL']", "['Go']"]
+    assert context and not context.startswith("Error")
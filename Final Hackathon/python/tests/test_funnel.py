@@ -0,0 +1,71 @@
+"""
+Tiered evaluation funnel (funnel.py), against mongomock with the LLM calls answered locally.
+"""
+import json
+import pytest
+
+RESUME_TEXT = """Jane Doe
+jane.doe@example.com
+Skills
+Python, SQL, AWS, Docker
+Experience
+Backend Engineer, Acme Corp, 01/2018 - 01/2024
+Built billing services in Python on AWS
+Education
+BSc Computer Science, State University, 2017"""
+JOB_DESCRIPTION = "Backend engineer: Python, SQL, AWS"
+
+@pytest.fixture
+def funnel(monkeypatch):
+    """
+    A CandidateFunnel whose resume text extraction, pre-parsing and LLM calls are counted in funnel.counts.
+    """
+    mongomock = pytest.importorskip("mongomock")
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    import agents
+    import funnel as funnel_module
+
+    monkeypatch.setattr(agents, "_mongo_client", mongomock.MongoClient())
+    monkeypatch.setattr(agents, "create_embeddings", lambda: DeterministicFakeEmbedding(size=64))
+    monkeypatch.setattr(agents, "index_profile_async", lambda candidate_id, candidate_data: None)
+    counts = {"extract": 0, "preparse": 0, "stages": []}
+
+    def preparse(text, original=agents.preparse_resume):
+        counts["preparse"] += 1
+        return original(text)
+
+    def invoke_chain(chain, inputs, stage):
+        counts["stages"].append(stage)
+        if stage == "parse_resume":
+            return json.dumps({"name": "Jane Doe", "email": "jane.doe@example.com", "skills": ["Python", "SQL", "AWS"],
+                               "work_experience": [], "education": [], "certifications": []})
+        return json.dumps({"matched_skills": [{"skill": "Python"}], "missing_skills": [], "overall_technical_fit": "Low"})
+
+    monkeypatch.setattr(agents, "preparse_resume", preparse)
+    monkeypatch.setattr(funnel_module, "preparse_resume", preparse)
+    monkeypatch.setattr(agents, "invoke_chain", invoke_chain)
+
+    technical = agents.TechnicalDepthEvaluatorAgent()
+    parser = technical.parser_agent
+
+    def extract_resume_text(file_path, keep_lines=False):
+        counts["extract"] += 1
+        return RESUME_TEXT, None
+
+    monkeypatch.setattr(parser, "extract_resume_text", extract_resume_text)
+    monkeypatch.setattr(parser, "fetch_github_contributions", lambda github_url: [])
+    evaluator = funnel_module.CandidateFunnel(parser, technical, agents.CulturalFitEvaluatorAgent(), agents.ScoringAndAggregationAgent())
+    evaluator.counts = counts
+    return evaluator
+
+def test_resume_is_extracted_and_preparsed_once(funnel):
+    result = funnel.evaluate("job-1", JOB_DESCRIPTION, "resume.pdf", [], "")
+    assert result["prescreen"]["passed"]
+    assert result["stage_reached"] == "technical"
+    assert funnel.counts["extract"] == 1
+    assert funnel.counts["preparse"] == 1
+
+def test_technical_tier_runs_the_agents_evaluation_under_the_funnel_stage(funnel):
+    funnel.evaluate("job-1", JOB_DESCRIPTION, "resume.pdf", [], "")
+    assert funnel.counts["stages"][-1] == "funnel_technical"
+    assert "technical" not in funnel.counts["stages"]
@@ -0,0 +1,76 @@
+"""
+Cancellation and losing attempts in LLMHedger.acall (hedging.py).
+"""
+import asyncio
+import gc
+from hedging import LLMHedger
+
+def warmed_hedger(latency=0.01):
+    """
+    A hedger that has seen enough fast calls to hedge after about `latency` seconds.
+    """
+    hedger = LLMHedger(enabled=True, budget=1.0, min_samples=3)
+    for _ in range(3):
+        hedger._record_attempt("stage", latency)
+        hedger._record_call("stage", latency)
+    return hedger
+
+def test_cancelling_the_caller_cancels_every_attempt():
+    hedger = warmed_hedger()
+    attempts = []
+
+    async def slow():
+        attempts.append(asyncio.current_task())
+        await asyncio.sleep(10)
+
+    async def main():
+        caller = asyncio.ensure_future(hedger.acall("stage", slow))
+        await asyncio.sleep(0.1)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert len(attempts) == 2
+        assert all(attempt.cancelled() for attempt in attempts)
+
+    asyncio.run(main())
+
+def test_cancelling_before_the_hedge_cancels_the_primary():
+    hedger = warmed_hedger(latency=5)
+    attempts = []
+
+    async def slow():
+        attempts.append(asyncio.current_task())
+        await asyncio.sleep(10)
+
+    async def main():
+        caller = asyncio.ensure_future(hedger.acall("stage", slow))
+        await asyncio.sleep(0.05)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert len(attempts) == 1
+        assert attempts[0].cancelled()
+
+    asyncio.run(main())
+
+def test_losing_primary_error_is_retrieved():
+    hedger = warmed_hedger()
+    calls = []
+    unretrieved = []
+
+    async def flaky():
+        calls.append(None)
+        if len(calls) == 1:
+            await asyncio.sleep(0.2)
+            raise RuntimeError("primary failed after the hedge won")
+        return "hedge"
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unretrieved.append(context))
+        assert await hedger.acall("stage", flaky) == "hedge"
+        await asyncio.sleep(0.3)
+        gc.collect()
+
+    asyncio.run(main())
+    assert unretrieved == []
+    assert hedger.snapshot()["stages"]["stage"]["hedge_wins"] == 1
@@ -0,0 +1,80 @@
+"""
+Idempotency-Key handling in the Flask service (app.py, idempotency.py) around admission control.
+"""
+import io
+import threading
+import time
+import pytest
+
+@pytest.fixture
+def service(monkeypatch):
+    """
+    The Flask app with a mongomock idempotency store, one admission slot and an
+    /evaluate_candidate view that answers once service.release is set (it is, unless a test
+    clears it), counting its calls in service.calls.
+    """
+    mongomock = pytest.importorskip("mongomock")
+    import app as service
+    from admission import AdmissionController
+    from idempotency import IdempotencyStore
+
+    monkeypatch.setattr(service, "_idempotency_store", IdempotencyStore(mongomock.MongoClient()["candidate_db"]))
+    monkeypatch.setattr(service, "admission_controller", AdmissionController(max_inflight=1, queue_seconds=0, max_waiting=0))
+    calls = []
+    service.release = threading.Event()
+    service.release.set()
+
+    def evaluation():
+        calls.append(None)
+        service.release.wait(10)
+        return service.jsonify({"technical_score": 70})
+
+    monkeypatch.setitem(service.app.view_functions, "evaluate_candidate_data", evaluation)
+    service.calls = calls
+    return service
+
+def post(service, key, resume=b"resume"):
+    return service.app.test_client().post("/evaluate_candidate", data={"resume": (io.BytesIO(resume), "resume.pdf")},
+                                          content_type="multipart/form-data", headers={"Idempotency-Key": key})
+
+def test_replay_takes_no_admission_slot(service):
+    assert post(service, "key-1").status_code == 200
+
+    # Every evaluation slot is taken; a retry of a finished request is still replayed
+    ticket = service.admission_controller.admit(None, 0)
+    try:
+        replayed = post(service, "key-1")
+        assert replayed.status_code == 200
+        assert replayed.headers["Idempotent-Replayed"] == "true"
+        assert post(service, "key-2").status_code == 503
+    finally:
+        service.admission_controller.release(ticket)
+    assert len(service.calls) == 1
+
+def test_reused_key_with_another_body_is_rejected(service):
+    assert post(service, "key-1").status_code == 200
+    assert post(service, "key-1", resume=b"another resume").status_code == 422
+    assert len(service.calls) == 1
+
+def test_retry_of_a_request_in_flight_gets_409_without_waiting_long(service, monkeypatch):
+    monkeypatch.setattr(service, "IDEMPOTENCY_WAIT_SECONDS", 0.2)
+    service.release.clear()
+    first = threading.Thread(target=post, args=(service, "key-1"))
+    first.start()
+    try:
+        while not service.calls:
+            time.sleep(0.01)
+        # The first attempt holds the only evaluation slot; the retry is answered without one
+        started = time.monotonic()
+        retried = post(service, "key-1")
+        assert retried.status_code == 409
+        assert int(retried.headers["Retry-After"]) >= 1
+        assert time.monotonic() - started < 2
+    finally:
+        service.release.set()
+        first.join()
+
+    replayed = post(service, "key-1")
+    assert replayed.status_code == 200
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert len(service.calls) == 1
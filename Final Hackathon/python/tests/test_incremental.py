@@ -0,0 +1,67 @@
+"""
+Stage reuse in IncrementalEvaluator.reevaluate (incremental.py), against mongomock with the
+agents' LLM-backed steps replaced by canned outputs.
+"""
+import time
+import pytest
+
+JOB_DESCRIPTION = "Backend engineer: Python, SQL, AWS; collaborative team player"
+ANSWERS = [{"type": "technical", "text": "I built a billing service in Python."},
+           {"type": "culture-fit", "text": "I like teams that review each other's work."}]
+
+@pytest.fixture
+def incremental(monkeypatch, tmp_path):
+    """
+    An IncrementalEvaluator whose stage computations are counted in evaluator.computed.
+    """
+    mongomock = pytest.importorskip("mongomock")
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    import agents
+    from incremental import IncrementalEvaluator
+
+    monkeypatch.setattr(agents, "_mongo_client", mongomock.MongoClient())
+    monkeypatch.setattr(agents, "create_embeddings", lambda: DeterministicFakeEmbedding(size=256))
+    monkeypatch.setattr(agents, "index_profile_async", lambda candidate_id, candidate_data: None)
+
+    technical = agents.TechnicalDepthEvaluatorAgent()
+    cultural = agents.CulturalFitEvaluatorAgent()
+    scoring = agents.ScoringAndAggregationAgent()
+    computed = []
+
+    def canned(stage, output):
+        def compute(*args, **kwargs):
+            computed.append(stage)
+            return dict(output)
+        return compute
+
+    parser = technical.parser_agent
+    monkeypatch.setattr(parser, "parse_resume", canned("parse", {"name": "Candidate", "email": "candidate@example.com", "skills": ["Python", "SQL"]}))
+    monkeypatch.setattr(parser, "fetch_github_contributions", lambda github_url: [{"repo_name": "billing", "stars": 3, "forks": 1}])
+    monkeypatch.setattr(technical.communication_agent, "evaluate_communication", canned("communication", {"communication_score": 70}))
+    monkeypatch.setattr(technical, "evaluate_technical", canned("technical", {"technical_answers_score": "Medium", "matched_skills": []}))
+    monkeypatch.setattr(cultural, "evaluate_cultural_fit", canned("cultural", {"cultural_fit_score": 65}))
+    monkeypatch.setattr(scoring, "calculate_score", canned("aggregate", {"final_score": 68}))
+
+    evaluator = IncrementalEvaluator(parser, technical, cultural, scoring)
+    evaluator.computed = computed
+    resume_path = tmp_path / "resume.pdf"
+    resume_path.write_bytes(b"%PDF-1.4 resume")
+    evaluator.resume_path = str(resume_path)
+    return evaluator
+
+def test_second_reevaluation_with_the_same_inputs_reuses_every_stage(incremental):
+    first = incremental.reevaluate("candidate-1", incremental.resume_path, ANSWERS, "https://github.com/candidate", JOB_DESCRIPTION)
+    assert set(first["stages"].values()) == {"recomputed"}
+
+    # Candidate data is stamped with created_at to the second; it must not count as an input
+    time.sleep(1.1)
+    incremental.computed.clear()
+    second = incremental.reevaluate("candidate-1", incremental.resume_path, ANSWERS, "https://github.com/candidate", JOB_DESCRIPTION)
+    assert second["stages"] == {stage: "reused" for stage in ["parse", "communication", "technical", "cultural", "aggregate"]}
+    assert incremental.computed == []
+
+def test_changed_job_description_reruns_only_the_stages_that_read_it(incremental):
+    incremental.reevaluate("candidate-1", incremental.resume_path, ANSWERS, "https://github.com/candidate", JOB_DESCRIPTION)
+    second = incremental.reevaluate("candidate-1", incremental.resume_path, ANSWERS, "https://github.com/candidate", JOB_DESCRIPTION + "; Docker")
+    assert second["stages"] == {"parse": "reused", "communication": "reused", "technical": "recomputed",
+                                "cultural": "recomputed", "aggregate": "recomputed"}
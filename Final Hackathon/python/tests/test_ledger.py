@@ -0,0 +1,32 @@
+"""
+Ledger (ledger.py) state across a prefork: nothing recorded in the master reaches its workers.
+"""
+import pytest
+from ledger import Ledger
+
+@pytest.fixture
+def ledger():
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+    return Ledger(lambda: client["candidate_db"]["llm_ledger"])
+
+def test_recording_is_skipped_while_suspended(ledger):
+    with ledger.suspended():
+        ledger.record("embedding", "warmup", "text-embedding-3-small", 100, 0, 5)
+    assert ledger._buffer == []
+    assert ledger._flusher_pid is None
+    assert ledger._collection is None
+
+    ledger.record("embedding", "technical", "text-embedding-3-small", 100, 0, 5)
+    assert len(ledger._buffer) == 1
+
+def test_reset_after_fork_drops_the_parents_connection_and_flusher(ledger):
+    ledger.record("chat", "technical", "gpt-4o-mini", 100, 20, 5)
+    ledger.flush()
+    assert ledger._collection is not None and ledger._flusher_pid is not None
+
+    ledger.reset_after_fork()
+    assert (ledger._collection, ledger._buffer, ledger._flusher_pid) == (None, [], None)
+    ledger.record("chat", "technical", "gpt-4o-mini", 100, 20, 5)
+    ledger.flush()
+    assert ledger.collection.count_documents({}) == 2
@@ -0,0 +1,110 @@
+"""
+Tier routing and escalation (routing.py) against a fake OpenAI-compatible endpoint.
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+GOOD_ANSWER = json.dumps({"matched_skills": [{"skill": "Python"}], "communication_score": 70})
+
+@pytest.fixture
+def fake_models():
+    """
+    A local /v1/chat/completions server. gpt-4o-mini answers broken JSON to prompts containing
+    BREAK; every other answer is valid. Records the model of every request.
+    """
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            calls.append(body["model"])
+            prompt = " ".join(message["content"] for message in body["messages"])
+            content = GOOD_ANSWER[:-10] if body["model"] == "gpt-4o-mini" and "BREAK" in prompt else GOOD_ANSWER
+            payload = json.dumps({
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1", calls
+    server.shutdown()
+
+@pytest.fixture
+def routed(monkeypatch, fake_models):
+    """
+    invoke_chain with both tiers pointed at the fake endpoint and routing enabled.
+    Returns (invoke(stage, text), chain, requested models, router).
+    """
+    from langchain_core.callbacks import BaseCallbackHandler
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import PromptTemplate
+    from langchain_openai import ChatOpenAI
+    import agents
+    import routing
+
+    base_url, calls = fake_models
+    monkeypatch.setenv("FAKE_MODEL_API_KEY", "sk-fake")
+    monkeypatch.setattr(routing, "MODEL_TIERS", {
+        "mini": {"model": "gpt-4o-mini", "base_url": base_url, "api_key_env": "FAKE_MODEL_API_KEY"},
+        "full": {"model": "gpt-4o", "base_url": base_url, "api_key_env": "FAKE_MODEL_API_KEY"},
+    })
+    # Keep the test's calls out of the token ledger
+    monkeypatch.setattr(agents, "ledger_callback", lambda stage: BaseCallbackHandler())
+    router = routing.ModelRouter(enabled=True)
+    monkeypatch.setattr(agents, "model_router", router)
+    llm = ChatOpenAI(model="gpt-4o-mini", base_url=base_url, api_key="sk-fake", temperature=0, max_retries=0)
+    chain = PromptTemplate.from_template("Evaluate: {text}") | llm | StrOutputParser()
+    return lambda stage, text: agents.invoke_chain(chain, {"text": text}, stage=stage), calls, router
+
+def test_routing_is_opt_in():
+    import routing
+
+    if "MODEL_ROUTING" in os.environ:
+        pytest.skip("MODEL_ROUTING is set in the environment")
+    assert routing.MODEL_ROUTING is False
+    assert routing.ModelRouter().route("technical", None, {}) is None
+
+def test_valid_answer_stays_on_cheapest_tier(routed):
+    invoke, calls, router = routed
+    assert json.loads(invoke("technical", "a short profile")) == json.loads(GOOD_ANSWER)
+    assert calls == ["gpt-4o-mini"]
+    assert router.snapshot()["stages"]["technical"]["escalations"] == {}
+
+def test_invalid_answer_escalates_to_next_tier(routed):
+    invoke, calls, router = routed
+    result = invoke("technical", "BREAK")
+    assert json.loads(result) == json.loads(GOOD_ANSWER)
+    assert calls == ["gpt-4o-mini", "gpt-4o"]
+    stats = router.snapshot()["stages"]["technical"]
+    assert stats["escalations"] == {"invalid_json": 1}
+    assert stats["escalations_recovered"] == 1
+    assert stats["final_tier"] == {"full": 1}
+
+def test_max_tier_caps_escalation(routed, monkeypatch):
+    import routing
+
+    invoke, calls, router = routed
+    monkeypatch.setitem(routing.STAGE_POLICIES, "funnel_technical", {"required_keys": ["matched_skills"], "tier": "mini", "max_tier": "mini"})
+    invoke("funnel_technical", "BREAK")
+    assert calls == ["gpt-4o-mini"]
+    assert router.snapshot()["stages"]["funnel_technical"]["failed_at_top_tier"] == 1
+
+def test_large_prompt_starts_on_upgraded_tier(routed):
+    invoke, calls, router = routed
+    invoke("technical", "x" * 4 * 16000)
+    assert calls == ["gpt-4o"]
+    assert router.snapshot()["stages"]["technical"]["token_upgrades"] == 1
@@ -0,0 +1,35 @@
+"""
+Fair scheduler (scheduler.py): default sizing and idle tenant eviction.
+"""
+import os
+import pytest
+from scheduler import FairScheduler, SLOTS_PER_EVALUATION, set_scheduling_context, reset_scheduling_context
+
+def run_call(scheduler, tenant):
+    token = set_scheduling_context(tenant, "interactive")
+    try:
+        with scheduler.slot("technical", timeout=1):
+            pass
+    finally:
+        reset_scheduling_context(token)
+
+def test_default_slots_follow_the_admission_limit():
+    import admission
+    import scheduler
+
+    if "SCHEDULER_MAX_CONCURRENCY" in os.environ:
+        pytest.skip("SCHEDULER_MAX_CONCURRENCY is set in the environment")
+    assert scheduler.SCHEDULER_MAX_CONCURRENCY == SLOTS_PER_EVALUATION * admission.ADMISSION_MAX_INFLIGHT
+
+def test_idle_tenants_are_evicted():
+    scheduler = FairScheduler(max_concurrency=4, tenant_idle_seconds=0)
+    for i in range(100):
+        run_call(scheduler, f"tenant-{i}")
+    # Each call evicts the tenants that went idle before it
+    assert list(scheduler.snapshot()["tenants"]) == ["tenant-99"]
+
+def test_recently_active_tenants_are_kept():
+    scheduler = FairScheduler(max_concurrency=4, tenant_idle_seconds=300)
+    for i in range(3):
+        run_call(scheduler, f"tenant-{i}")
+    assert sorted(scheduler.snapshot()["tenants"]) == ["tenant-0", "tenant-1", "tenant-2"]
@@ -0,0 +1,75 @@
+"""
+Opt-in recorder of anonymized request shapes.
+
+When TRAFFIC_RECORD_PATH is set, app.py appends one JSON line per evaluation request
+describing its shape only: endpoint, arrival offset, status and latency, the size and
+type of each uploaded file, the number, lengths and types of the answers, and the
+length of every other form field (job description, evaluations, ...). No content,
+file names, GitHub URLs or identifiers are recorded.
+
+benchmarks/replay.py replays a recording against the app.
+"""
+import json
+import os
+import threading
+import time
+
+TRAFFIC_RECORD_PATH = os.getenv("TRAFFIC_RECORD_PATH")
+
+def file_shape(storage):
+    """
+    Size in bytes and lower-case extension of an uploaded file.
+    """
+    stream = storage.stream
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return {"size": size, "type": os.path.splitext(storage.filename or "")[1].lower().lstrip(".")}
+
+def answers_shape(raw):
+    """
+    Count, per-answer text length and type of an answers form field (None if it is not valid).
+    """
+    try:
+        answers = json.loads(raw)
+        return {
+            "count": len(answers),
+            "lengths": [len(answer.get("text", "")) for answer in answers],
+            "types": [str(answer.get("type", "")) for answer in answers]
+        }
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+class TrafficRecorder:
+    """
+    Appends request shapes to a JSONL file, shared safely between request threads.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def shape(self, request, status_code, latency):
+        form = request.form
+        return {
+            "endpoint": request.path,
+            "offset_seconds": round(time.time() - self.started_at - latency, 3),
+            "status": status_code,
+            "latency_ms": round(latency * 1000, 1),
+            "files": {name: file_shape(storage) for name, storage in request.files.items()},
+            "answers": answers_shape(form["answers"]) if "answers" in form else None,
+            "field_lengths": {name: len(value) for name, value in form.items() if name not in ("answers", "github_url", "candidate_key", "job_id")},
+            "has_job_id": "job_id" in form
+        }
+
+    def record(self, request, status_code, latency):
+        line = json.dumps(self.shape(request, status_code, latency))
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+def get_recorder():
+    """
+    Return a recorder when TRAFFIC_RECORD_PATH is set, otherwise None.
+    """
+    return TrafficRecorder(TRAFFIC_RECORD_PATH) if TRAFFIC_RECORD_PATH else None